@@ -1,10 +1,120 @@
+import os
 import sys
-import io
-import traceback
-from contextlib import redirect_stdout, redirect_stderr
-import time
-import threading
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import json
+import shutil
+import tempfile
+
+from olympiads.checkers import check_output
+
+# Скрипт, выполняющий solution на наборе тестов в отдельном процессе
+HARNESS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solution_harness.py')
+
+# Ограничение памяти процесса проверки
+SOLUTION_MEMORY_LIMIT = 256 * 1024 * 1024  # 256 MB в байтах
+
+def run_solution_tests(code, inputs, timeout=5, memory_limit=SOLUTION_MEMORY_LIMIT):
+    """
+    Выполняет функцию solution на наборе входных данных в изолированном процессе
+    
+    Код загружается один раз, после чего solution вызывается для каждого теста
+    с отдельным ограничением времени (см. solution_harness.py). Процесс
+    запускается в песочнице проверки олимпиад, поэтому зависший вызов не
+    продолжает занимать процессор после истечения времени.
+    
+    Args:
+        code (str): Код для выполнения
+        inputs (list): Входные данные тестов
+        timeout (int): Максимальное время одного вызова в секундах
+        memory_limit (int): Ограничение памяти в байтах
+        
+    Returns:
+        tuple: (load_error, results), где
+            load_error (str): Сообщение об ошибке загрузки кода или None
+            results (list): Для каждого теста словарь со статусом 'ok'
+                (ключи 'stdout', 'stderr'), 'timeout' или 'error' (ключ 'message')
+    """
+    from olympiads.code_runner import get_output_limit, run_in_sandbox
+    
+    inputs = list(inputs)
+    job = json.dumps({'code': code, 'inputs': inputs, 'timeout': timeout}, ensure_ascii=False)
+    work_dir = tempfile.mkdtemp(prefix='assignment-')
+    
+    try:
+        # Общее ограничение - время загрузки кода и всех вызовов
+        run = run_in_sandbox(
+            [sys.executable, '-I', HARNESS_PATH],
+            'python',
+            input_data=job,
+            time_limit=timeout * (len(inputs) + 1),
+            memory_limit=memory_limit,
+            cwd=work_dir,
+            capture_limit=get_output_limit()
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    results = []
+    for line in run['stdout'].splitlines():
+        try:
+            results.append(json.loads(line))
+        except ValueError:
+            # Последняя строка может быть обрезана при аварийном завершении
+            break
+    
+    if results:
+        status = results[0].get('status')
+        if status == 'syntax_error':
+            return f"Синтаксическая ошибка: {results[0]['message']}", []
+        if status == 'load_error':
+            return f"Ошибка выполнения: {results[0]['message']}", []
+        if status == 'no_solution':
+            return "Не найдена функция solution", []
+        if status == 'load_timeout':
+            return f"Превышено время выполнения ({timeout} сек)", []
+    
+    # Процесс завершился раньше, чем обработал все тесты
+    if len(results) < len(inputs):
+        if run['memory_limit_exceeded']:
+            failure = {'status': 'error', 'message': "Превышено ограничение памяти"}
+        elif run['timed_out']:
+            failure = {'status': 'timeout'}
+        else:
+            failure = {
+                'status': 'error',
+                'message': run['stderr'].strip() or f"процесс завершился с кодом {run['returncode']}"
+            }
+        results.extend(failure for _ in range(len(inputs) - len(results)))
+    
+    return None, results[:len(inputs)]
+
+def test_verdict(result, expected_output, timeout=5):
+    """
+    Формирует вердикт по результату вызова solution
+    
+    Args:
+        result (dict): Результат теста из run_solution_tests
+        expected_output (str): Ожидаемый результат
+        timeout (int): Ограничение времени вызова (для сообщения)
+        
+    Returns:
+        tuple: (result, error) - как в run_code_with_test_case
+    """
+    if result['status'] == 'timeout':
+        return False, f"Превышено время выполнения ({timeout} сек)"
+    if result['status'] == 'error':
+        return False, f"Ошибка выполнения: {result['message']}"
+    
+    stdout_output = result['stdout'].strip()
+    stderr_output = result['stderr'].strip()
+    
+    # Проверяем наличие ошибок
+    if stderr_output:
+        return False, f"Ошибка выполнения: {stderr_output}"
+    
+    # Сравниваем результат с ожидаемым выходом построчно (игнорируя пробелы в конце строк)
+    if check_output(expected_output, stdout_output, {'mode': 'lines'}):
+        return True, None
+    return False, f"Результат не соответствует ожидаемому.\nОжидалось: {expected_output}\nПолучено: {stdout_output}"
 
 def run_code_with_test_case(code, input_data, expected_output, timeout=5):
     """
@@ -21,84 +131,10 @@ def run_code_with_test_case(code, input_data, expected_output, timeout=5):
             result (bool): True, если выходные данные соответствуют ожидаемому результату
             error (str): Сообщение об ошибке, если произошла ошибка, иначе None
     """
-    # Создаем буферы для перехвата стандартного ввода/вывода/ошибок
-    stdout_buffer = io.StringIO()
-    stderr_buffer = io.StringIO()
-    
-    # Подменяем стандартный ввод данными из теста
-    sys.stdin = io.StringIO(input_data)
-    
-    # Создаем изолированное пространство имен для выполнения кода
-    namespace = {}
-    
-    try:
-        # Выполняем код в изолированном пространстве с ограничением времени
-        with redirect_stdout(stdout_buffer), redirect_stderr(stderr_buffer):
-            # Запускаем выполнение кода в отдельном потоке с таймаутом
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(exec, code, namespace)
-                try:
-                    future.result(timeout=timeout)
-                except TimeoutError:
-                    return False, f"Превышено время выполнения ({timeout} сек)"
-        
-        # Проверяем, есть ли функция solution в пространстве имен
-        if 'solution' not in namespace:
-            return False, "Не найдена функция solution"
-        
-        # Запускаем функцию solution с входными данными и перехватываем вывод
-        solution_func = namespace['solution']
-        with redirect_stdout(stdout_buffer), redirect_stderr(stderr_buffer):
-            # Обрабатываем различные типы входных данных
-            try:
-                # Если входные данные - это несколько строк, передаем каждую строку как отдельный аргумент
-                if '\n' in input_data:
-                    args = input_data.strip().split('\n')
-                    result = solution_func(*args)
-                # Если входные данные - это несколько значений в одной строке, передаем их как отдельные аргументы
-                elif ' ' in input_data.strip():
-                    args = input_data.strip().split()
-                    result = solution_func(*args)
-                # Если входная строка пуста, вызываем функцию без аргументов
-                elif not input_data.strip():
-                    result = solution_func()
-                # Иначе передаем всю строку как один аргумент
-                else:
-                    result = solution_func(input_data.strip())
-                
-                # Если функция возвращает значение, добавляем его в вывод
-                if result is not None:
-                    print(result, file=stdout_buffer)
-            except Exception as e:
-                # Перехватываем ошибки при вызове функции solution
-                traceback.print_exc(file=stderr_buffer)
-        
-        # Получаем результаты выполнения
-        stdout_output = stdout_buffer.getvalue().strip()
-        stderr_output = stderr_buffer.getvalue().strip()
-        
-        # Проверяем наличие ошибок
-        if stderr_output:
-            return False, f"Ошибка выполнения: {stderr_output}"
-        
-        # Сравниваем результат с ожидаемым выходом (игнорируя пробелы в конце строк)
-        expected_lines = [line.rstrip() for line in expected_output.strip().split('\n')]
-        actual_lines = [line.rstrip() for line in stdout_output.strip().split('\n')]
-        
-        if expected_lines == actual_lines:
-            return True, None
-        else:
-            return False, f"Результат не соответствует ожидаемому.\nОжидалось: {expected_output}\nПолучено: {stdout_output}"
-        
-    except SyntaxError as e:
-        # Обрабатываем синтаксические ошибки в коде
-        return False, f"Синтаксическая ошибка: {str(e)}"
-    except Exception as e:
-        # Обрабатываем другие исключения
-        return False, f"Ошибка выполнения: {str(e)}"
-    finally:
-        # Восстанавливаем стандартный ввод
-        sys.stdin = sys.__stdin__
+    load_error, results = run_solution_tests(code, [input_data], timeout)
+    if load_error:
+        return False, load_error
+    return test_verdict(results[0], expected_output, timeout)
 
 def check_assignment(submission):
     """
@@ -108,31 +144,52 @@ def check_assignment(submission):
         submission: объект AssignmentSubmission для проверки
     """
     from .models import TestCase
+    from olympiads import verdict_cache
+    from olympiads.models import VerdictCache
     
     # Обновляем статус на "проверяется"
     submission.status = 'checking'
     submission.save()
     
     # Получаем все тестовые случаи для задания
-    test_cases = TestCase.objects.filter(assignment=submission.assignment)
+    test_cases = list(TestCase.objects.filter(assignment=submission.assignment).order_by('id'))
     
-    if not test_cases.exists():
+    if not test_cases:
         submission.status = 'error'
         submission.feedback = "Для этого задания не созданы тестовые случаи"
         submission.save()
         return
     
+    # Повторная отправка того же кода получает сохраненный вердикт
+    version = verdict_cache.tests_version(
+        ({'id': tc.id, 'input': tc.input_data, 'expected': tc.expected_output, 'hidden': tc.is_hidden}
+         for tc in test_cases),
+        checker='lines'
+    )
+    cache_args = (VerdictCache.TaskKind.ASSIGNMENT, submission.assignment_id, 'python', submission.code, version)
+    
+    cached = verdict_cache.get_verdict(*cache_args)
+    if cached is not None:
+        submission.status = cached['status']
+        submission.score = cached['score']
+        submission.feedback = cached['feedback']
+        submission.save()
+        return
+    
     # Проверяем решение на каждом тестовом случае
     passed_tests = 0
-    total_tests = test_cases.count()
+    total_tests = len(test_cases)
     all_feedback = []
+    timed_out = False
     
-    for test_case in test_cases:
-        result, error = run_code_with_test_case(
-            submission.code,
-            test_case.input_data,
-            test_case.expected_output
-        )
+    # Код загружается один раз, solution вызывается для всех тестов в одном процессе
+    load_error, results = run_solution_tests(submission.code, [tc.input_data for tc in test_cases])
+    
+    for test_case, test_result in zip(test_cases, results or [None] * total_tests):
+        if load_error:
+            result, error = False, load_error
+        else:
+            result, error = test_verdict(test_result, test_case.expected_output)
         
         # Формируем обратную связь по тесту
         if test_case.is_hidden:
@@ -144,6 +201,8 @@ def check_assignment(submission):
             passed_tests += 1
             test_feedback = f"{test_info}: Пройден ✓"
         else:
+            if error and error.startswith("Превышено время выполнения"):
+                timed_out = True
             if test_case.is_hidden:
                 test_feedback = f"{test_info}: Не пройден ✗ (проверьте правильность решения)"
             else:
@@ -164,3 +223,11 @@ def check_assignment(submission):
     # Сохраняем обратную связь
     submission.feedback = "\n\n".join(all_feedback)
     submission.save()
+    
+    # Превышение времени зависит от нагрузки на сервер - такой вердикт не кэшируем
+    if not timed_out:
+        verdict_cache.store_verdict(*cache_args, {
+            'status': submission.status,
+            'score': submission.score,
+            'feedback': submission.feedback
+        })
@@ -0,0 +1,146 @@
+"""
+Изолированный запуск функции solution на наборе тестов.
+
+Скрипт выполняется отдельным процессом в песочнице (см.
+code_checker.run_solution_tests) и не зависит от Django. На стандартный ввод
+подается JSON-задание:
+
+    {"code": "...", "inputs": ["...", ...], "timeout": 5}
+
+Код студента выполняется один раз, после чего solution вызывается для
+каждого теста с отдельным ограничением времени. Результат каждого вызова
+сразу выводится отдельной строкой JSON, поэтому при аварийном завершении
+процесса результаты уже пройденных тестов не теряются:
+
+    {"status": "ok", "stdout": "...", "stderr": "..."}
+    {"status": "timeout"}
+
+Ошибки загрузки кода выводятся одной строкой со статусом 'syntax_error',
+'no_solution', 'load_timeout' или 'load_error'.
+"""
+import io
+import os
+import sys
+import json
+import signal
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+
+# Сколько символов вывода одного вызова передавать родительскому процессу
+MAX_CALL_OUTPUT = 1024 * 1024
+
+
+class CallTimeout(BaseException):
+    """Превышено время вызова (не перехватывается через except Exception)"""
+
+
+def _on_alarm(signum, frame):
+    raise CallTimeout()
+
+
+def _call_args(input_data):
+    """Разбирает входные данные теста в аргументы solution"""
+    # Если входные данные - это несколько строк, передаем каждую строку как отдельный аргумент
+    if '\n' in input_data:
+        return input_data.strip().split('\n')
+    # Если входные данные - это несколько значений в одной строке, передаем их как отдельные аргументы
+    if ' ' in input_data.strip():
+        return input_data.strip().split()
+    # Если входная строка пуста, вызываем функцию без аргументов
+    if not input_data.strip():
+        return []
+    # Иначе передаем всю строку как один аргумент
+    return [input_data.strip()]
+
+
+def _run_limited(func, timeout, input_data, prefix=('', '')):
+    """
+    Выполняет func с подмененными потоками и ограничением времени
+
+    Returns:
+        Кортеж (timed_out, stdout, stderr)
+    """
+    stdout_buffer = io.StringIO(prefix[0])
+    stdout_buffer.seek(0, io.SEEK_END)
+    stderr_buffer = io.StringIO(prefix[1])
+    stderr_buffer.seek(0, io.SEEK_END)
+    sys.stdin = io.StringIO(input_data)
+    timed_out = False
+
+    with redirect_stdout(stdout_buffer), redirect_stderr(stderr_buffer):
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            func()
+        except CallTimeout:
+            timed_out = True
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    return timed_out, stdout_buffer.getvalue(), stderr_buffer.getvalue()
+
+
+def main():
+    # Результаты пишем в копию дескриптора stdout, а сам stdout закрываем от
+    # кода студента, чтобы его вывод через os.write не смешивался с JSON
+    out = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    def emit(result):
+        out.write(json.dumps(result, ensure_ascii=False) + '\n')
+        out.flush()
+
+    job = json.load(sys.stdin)
+    timeout = job['timeout']
+    signal.signal(signal.SIGALRM, _on_alarm)
+
+    # Загружаем код один раз для всех тестов
+    namespace = {'__name__': 'solution'}
+    try:
+        code = compile(job['code'], '<solution>', 'exec')
+    except SyntaxError as e:
+        emit({'status': 'syntax_error', 'message': str(e)})
+        return
+
+    load_errors = []
+
+    def load():
+        try:
+            exec(code, namespace)
+        except Exception as e:
+            load_errors.append(str(e))
+
+    timed_out, load_stdout, load_stderr = _run_limited(load, timeout, '')
+    if timed_out:
+        emit({'status': 'load_timeout'})
+        return
+    if load_errors:
+        emit({'status': 'load_error', 'message': load_errors[0]})
+        return
+    if 'solution' not in namespace:
+        emit({'status': 'no_solution'})
+        return
+
+    solution = namespace['solution']
+    for input_data in job['inputs']:
+        def call():
+            try:
+                result = solution(*_call_args(input_data))
+                # Если функция возвращает значение, добавляем его в вывод
+                if result is not None:
+                    print(result)
+            except Exception:
+                traceback.print_exc()
+
+        # Вывод при загрузке кода относится к каждому тесту, как при
+        # отдельном выполнении кода для каждого теста
+        timed_out, stdout, stderr = _run_limited(call, timeout, input_data, (load_stdout, load_stderr))
+        if timed_out:
+            emit({'status': 'timeout'})
+        else:
+            emit({'status': 'ok', 'stdout': stdout[:MAX_CALL_OUTPUT], 'stderr': stderr[:MAX_CALL_OUTPUT]})
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,7 @@ from users.models import CustomUser, Profile
 from courses.models import Course
 from lessons.models import Lesson, LessonContent
 from .models import Assignment, TestCase as AssignmentTestCase, AssignmentSubmission
-from .code_checker import run_code_with_test_case
+from .code_checker import run_code_with_test_case, run_solution_tests
 
 class AssignmentModelTests(TestCase):
     def setUp(self):
@@ -118,3 +118,33 @@ def solution(n)
         result, error = run_code_with_test_case(syntax_error_code, test_input, expected_output)
         self.assertFalse(result)
         self.assertIsNotNone(error)
+
+    def test_output_compared_line_by_line(self):
+        code = """
+def solution(*args):
+    return '1 2  \\n3'
+"""
+        result, _ = run_code_with_test_case(code, '', '1 2\n3')
+        self.assertTrue(result)
+        # Переводы строк значимы: те же числа в одной строке - неверный ответ
+        result, _ = run_code_with_test_case(code, '', '1 2 3')
+        self.assertFalse(result)
+
+    def test_run_solution_tests_batch(self):
+        code = """
+def solution(n):
+    if n == '2':
+        while True:
+            pass
+    return int(n) * 10
+"""
+        load_error, results = run_solution_tests(code, ['1', '2', '3'], timeout=1)
+        self.assertIsNone(load_error)
+        self.assertEqual([r['status'] for r in results], ['ok', 'timeout', 'ok'])
+        self.assertEqual(results[0]['stdout'].strip(), '10')
+        # Зависший вызов не мешает следующим тестам
+        self.assertEqual(results[2]['stdout'].strip(), '30')
+
+        load_error, results = run_solution_tests('x = 1', ['1'])
+        self.assertEqual(load_error, "Не найдена функция solution")
+        self.assertEqual(results, [])
@@ -4,7 +4,8 @@ from django.contrib import messages
 from django.core.paginator import Paginator
 from .models import Assignment, TestCase, AssignmentSubmission
 from .forms import AssignmentForm, TestCaseForm, SubmissionForm
-from .code_checker import check_assignment
+from olympiads.judge import enqueue
+from olympiads.models import JudgeJob
 from courses.models import Enrollment
 
 @login_required
@@ -94,10 +95,13 @@ def assignment_solve(request, pk):
             submission.status = 'pending'
             submission.save()
             
-            # Проверяем решение
-            check_assignment(submission)
+            # Проверяем решение (в очереди проверки или сразу)
+            job = enqueue(JudgeJob.JobKind.ASSIGNMENT, {'submission_id': submission.id}, user=request.user)
+            submission.refresh_from_db()
             
-            if submission.status == 'passed':
+            if job.status != JudgeJob.JobStatus.DONE:
+                messages.info(request, 'Решение отправлено на проверку. Результат появится на этой странице.')
+            elif submission.status == 'passed':
                 messages.success(request, 'Поздравляем! Ваше решение успешно прошло все тесты.')
             else:
                 messages.warning(request, 'Ваше решение не прошло некоторые тесты. Попробуйте еще раз.')
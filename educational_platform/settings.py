@@ -193,3 +193,80 @@ CSRF_FAILURE_VIEW = 'educational_platform.csrf_hack.csrf_failure_view'
 CSRF_COOKIE_SECURE = not DEBUG  # Включаем только для production
 CSRF_USE_SESSIONS = False       # Храним CSRF токен в cookie
 CSRF_COOKIE_HTTPONLY = False    # Разрешаем доступ к куки из JavaScript
+
+# Песочница для запуска кода в олимпиадах
+# Размер пула рабочих процессов на язык (0 - запускать код напрямую без пула).
+# Можно задать словарем: {'python': 8, 'default': 2}
+OLYMPIADS_SANDBOX_POOL_SIZE = int(os.environ.get('OLYMPIADS_SANDBOX_POOL_SIZE', min(4, os.cpu_count() or 1)))
+
+# Кэш артефактов компиляции (C++, Java). Пустая директория отключает кэш
+OLYMPIADS_COMPILE_CACHE_DIR = os.environ.get('OLYMPIADS_COMPILE_CACHE_DIR', BASE_DIR / 'cache' / 'compile')
+OLYMPIADS_COMPILE_CACHE_MAX_BYTES = int(os.environ.get('OLYMPIADS_COMPILE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# Число тестов одного решения, проверяемых параллельно (по умолчанию - число ядер)
+OLYMPIADS_PARALLEL_TESTS = int(os.environ['OLYMPIADS_PARALLEL_TESTS']) if os.environ.get('OLYMPIADS_PARALLEL_TESTS') else None
+
+# Общий для всех процессов хоста лимит одновременных запусков кода
+OLYMPIADS_SANDBOX_MAX_CONCURRENCY = int(os.environ.get('OLYMPIADS_SANDBOX_MAX_CONCURRENCY', os.cpu_count() or 1))
+
+# Очередь проверки решений: True - проверка выполняется процессами
+# `manage.py judge_worker`, False - сразу в веб-запросе
+OLYMPIADS_JUDGE_ASYNC = os.environ.get('OLYMPIADS_JUDGE_ASYNC', 'False').lower() == 'true'
+
+# Сколько заданий одного пользователя может одновременно ждать в очереди
+# проверки (0 - без ограничения)
+OLYMPIADS_JUDGE_MAX_QUEUED_PER_USER = 5
+
+# Ограничение объема вывода программы участника (байт): при превышении
+# программа сразу завершается с вердиктом «превышено ограничение вывода»
+OLYMPIADS_OUTPUT_LIMIT = 64 * 1024 * 1024
+
+# Изоляция запусков: 'rlimit' - setrlimit (RLIMIT_AS мешает JVM и Node),
+# 'cgroup' - отдельная cgroup v2 на запуск (memory.max, cpu.max, pids.max),
+# 'auto' - cgroup, если доступна. Каталог OLYMPIADS_CGROUP_ROOT должен быть
+# делегирован пользователю, от имени которого работает проверка
+OLYMPIADS_SANDBOX_BACKEND = os.environ.get('OLYMPIADS_SANDBOX_BACKEND', 'rlimit')
+OLYMPIADS_CGROUP_ROOT = os.environ.get('OLYMPIADS_CGROUP_ROOT', '/sys/fs/cgroup/olympiads')
+
+# Форматирование кода в редакторе: размер LRU-кэша результатов (записей) и
+# число запросов форматирования в минуту на пользователя (попадания в кэш не
+# учитываются, 0 - без ограничения)
+OLYMPIADS_FORMAT_CACHE_SIZE = 1024
+OLYMPIADS_FORMAT_RATE_LIMIT = 60
+
+# Профили компиляции C++ (имя -> флаги g++), выбираются в задании олимпиады.
+# Для каждого профиля обработчики проверки при запуске собирают
+# предкомпилированный bits/stdc++.h (OLYMPIADS_CPP_PCH)
+OLYMPIADS_CPP_PROFILES = {
+    'c++17': ['-std=c++17'],
+    'c++17-O2': ['-std=c++17', '-O2'],
+    'c++20-O2': ['-std=c++20', '-O2'],
+}
+OLYMPIADS_CPP_DEFAULT_PROFILE = 'c++17'
+OLYMPIADS_CPP_PCH = os.environ.get('OLYMPIADS_CPP_PCH', 'True').lower() == 'true'
+
+# Рабочие каталоги запусков: корень (по умолчанию в tmpfs /dev/shm), квота на
+# объем файлов каталога и число очищенных каталогов, которые процесс хранит
+# для повторного использования
+OLYMPIADS_WORKSPACE_ROOT = os.environ.get('OLYMPIADS_WORKSPACE_ROOT') or None
+OLYMPIADS_WORKSPACE_QUOTA = 64 * 1024 * 1024
+OLYMPIADS_WORKSPACE_POOL_SIZE = 16
+
+# Хранилище больших тестов (сжатые блобы по sha256, см. olympiads/blob_store.py):
+# тесты больше OLYMPIADS_TEST_BLOB_THRESHOLD байт сохраняются в блобы, а не в
+# базу. Пустой каталог отключает хранилище. OLYMPIADS_TEST_BLOB_CACHE_DIR -
+# каталог распакованных блобов (по умолчанию <каталог хранилища>/raw)
+OLYMPIADS_TEST_BLOB_DIR = os.environ.get('OLYMPIADS_TEST_BLOB_DIR', '')
+OLYMPIADS_TEST_BLOB_CACHE_DIR = os.environ.get('OLYMPIADS_TEST_BLOB_CACHE_DIR', '')
+OLYMPIADS_TEST_BLOB_THRESHOLD = 64 * 1024
+
+# Запуск решений на Java: 'process' - отдельная JVM на каждый тест (с архивом
+# CDS классов JDK), 'warm' - долгоживущие JVM из пула (быстрее, но решения
+# изолированы друг от друга слабее, см. olympiads/java_runner.py)
+OLYMPIADS_JAVA_MODE = os.environ.get('OLYMPIADS_JAVA_MODE', 'process')
+
+# Трансляция таблицы лидеров (olympiads/scoreboard.py): интервал опроса новых
+# событий процессом (сек) и время, через которое сервер закрывает поток, чтобы
+# не занимать рабочий процесс бесконечно (браузер переподключается сам)
+OLYMPIADS_SCOREBOARD_POLL_INTERVAL = 1.0
+OLYMPIADS_SCOREBOARD_STREAM_TIMEOUT = 300
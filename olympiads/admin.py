@@ -1,27 +1,84 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.translation import gettext_lazy as _
 
 from .models import (
     Olympiad, 
     OlympiadTask, 
     OlympiadTestCase, 
+    OlympiadTestGroup,
     OlympiadMultipleChoiceOption,
     OlympiadParticipation, 
     OlympiadTaskSubmission,
+    OlympiadTaskResult,
+    OlympiadTestResult,
     OlympiadInvitation,
-    OlympiadCertificate
+    OlympiadCertificate,
+    JudgeJob,
+    VerdictCache,
+    RejudgeBatch
 )
+from .judge import is_async_enabled, run_rejudge, start_rejudge
+
+def task_groups(request):
+    """Группы тестов редактируемого задания (пусто для нового задания)"""
+    return OlympiadTestGroup.objects.filter(task_id=request.resolver_match.kwargs.get('object_id'))
+
+class OlympiadTestGroupInline(admin.TabularInline):
+    model = OlympiadTestGroup
+    extra = 0
+    fields = ('name', 'points', 'scoring', 'is_sample', 'depends_on', 'order')
+    
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        if db_field.name == 'depends_on':
+            kwargs['queryset'] = task_groups(request)
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
 
 class OlympiadTestCaseInline(admin.TabularInline):
     model = OlympiadTestCase
     extra = 1
-    fields = ('input_data', 'expected_output', 'is_hidden', 'points', 'order')
+    fields = ('input_data', 'expected_output', 'input_blob', 'expected_blob', 'group', 'is_hidden', 'points', 'order')
+    readonly_fields = ('input_blob', 'expected_blob')
+    
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'group':
+            kwargs['queryset'] = task_groups(request)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
     
 class OlympiadMultipleChoiceOptionInline(admin.TabularInline):
     model = OlympiadMultipleChoiceOption
     extra = 2
     fields = ('text', 'is_correct', 'explanation', 'order')
 
+class OlympiadTestResultInline(admin.TabularInline):
+    model = OlympiadTestResult
+    extra = 0
+    can_delete = False
+    fields = ('test_number', 'verdict', 'cpu_time', 'wall_time', 'memory_used', 'judge_host', 'from_cache')
+    readonly_fields = fields
+
+class OlympiadTaskResultInline(admin.TabularInline):
+    model = OlympiadTaskResult
+    extra = 0
+    can_delete = False
+    fields = ('task', 'score', 'is_correct', 'best_submission', 'updated_at')
+    readonly_fields = fields
+
+def launch_rejudge(modeladmin, request, olympiad, task=None):
+    """Запускает перепроверку и сообщает о ней администратору"""
+    batch = start_rejudge(olympiad, task, user=request.user)
+    if not is_async_enabled() and batch.status != RejudgeBatch.BatchStatus.DONE:
+        # Без обработчиков очереди перепроверка выполняется сразу
+        batch = run_rejudge(batch)
+
+    if batch.status == RejudgeBatch.BatchStatus.DONE:
+        modeladmin.message_user(request, _('Перепроверка «%(name)s» завершена: отправок %(total)s') % {
+            'name': task or olympiad, 'total': batch.total
+        }, messages.SUCCESS)
+    else:
+        modeladmin.message_user(request, _('Перепроверка «%(name)s» (#%(id)s) поставлена в очередь: отправок %(total)s') % {
+            'name': task or olympiad, 'id': batch.id, 'total': batch.total
+        }, messages.SUCCESS)
+
 class OlympiadTaskInline(admin.TabularInline):
     model = OlympiadTask
     extra = 0
@@ -42,12 +99,18 @@ class OlympiadTaskAdmin(admin.ModelAdmin):
             'fields': ('points', 'min_passing_score', 'time_limit_minutes', 'memory_limit_mb')
         }),
         (_('Программирование'), {
-            'fields': ('initial_code',),
+            'fields': ('initial_code', 'checker_type', 'checker_epsilon', 'checker_code', 'compile_profile'),
             'classes': ('collapse',),
             'description': _('Настройки для заданий типа "Программирование"')
         }),
     )
-    inlines = [OlympiadTestCaseInline, OlympiadMultipleChoiceOptionInline]
+    inlines = [OlympiadTestGroupInline, OlympiadTestCaseInline, OlympiadMultipleChoiceOptionInline]
+    actions = ['rejudge_submissions']
+    
+    @admin.action(description=_('Перепроверить отправки'))
+    def rejudge_submissions(self, request, queryset):
+        for task in queryset.filter(task_type=OlympiadTask.TaskType.PROGRAMMING).select_related('olympiad'):
+            launch_rejudge(self, request, task.olympiad, task)
 
 @admin.register(Olympiad)
 class OlympiadAdmin(admin.ModelAdmin):
@@ -62,7 +125,7 @@ class OlympiadAdmin(admin.ModelAdmin):
             'fields': ('title', 'short_description', 'description', 'image', 'status')
         }),
         (_('Время проведения'), {
-            'fields': ('start_datetime', 'end_datetime', 'time_limit_minutes')
+            'fields': ('start_datetime', 'end_datetime', 'time_limit_minutes', 'freeze_minutes')
         }),
         (_('Настройки доступа'), {
             'fields': ('is_open', 'is_rated', 'min_passing_score', 'related_course')
@@ -73,6 +136,12 @@ class OlympiadAdmin(admin.ModelAdmin):
         }),
     )
     inlines = [OlympiadTaskInline]
+    actions = ['rejudge_submissions']
+    
+    @admin.action(description=_('Перепроверить отправки'))
+    def rejudge_submissions(self, request, queryset):
+        for olympiad in queryset:
+            launch_rejudge(self, request, olympiad)
     
     def save_model(self, request, obj, form, change):
         if not change:  # Если это новая олимпиада
@@ -85,6 +154,7 @@ class OlympiadParticipationAdmin(admin.ModelAdmin):
     list_filter = ('is_completed', 'passed', 'started_at')
     search_fields = ('user__username', 'olympiad__title')
     readonly_fields = ('started_at', 'finished_at', 'score', 'max_score')
+    inlines = [OlympiadTaskResultInline]
 
 @admin.register(OlympiadTaskSubmission)
 class OlympiadTaskSubmissionAdmin(admin.ModelAdmin):
@@ -92,6 +162,7 @@ class OlympiadTaskSubmissionAdmin(admin.ModelAdmin):
     list_filter = ('is_correct', 'submitted_at')
     search_fields = ('participation__user__username', 'task__title')
     readonly_fields = ('submitted_at', 'execution_time', 'memory_usage')
+    inlines = [OlympiadTestResultInline]
 
 @admin.register(OlympiadInvitation)
 class OlympiadInvitationAdmin(admin.ModelAdmin):
@@ -103,4 +174,28 @@ class OlympiadInvitationAdmin(admin.ModelAdmin):
 class OlympiadCertificateAdmin(admin.ModelAdmin):
     list_display = ('certificate_id', 'participation', 'issue_date')
     search_fields = ('certificate_id', 'participation__user__username', 'participation__olympiad__title')
-    readonly_fields = ('issue_date',)
\ No newline at end of file
+    readonly_fields = ('issue_date',)
+
+@admin.register(JudgeJob)
+class JudgeJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'priority', 'status', 'user', 'attempts', 'worker', 'created_at', 'finished_at')
+    list_filter = ('kind', 'priority', 'status', 'created_at')
+    search_fields = ('user__username', 'worker')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'payload', 'result', 'error_message')
+
+@admin.register(VerdictCache)
+class VerdictCacheAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task_kind', 'task_id', 'language', 'hits', 'created_at', 'last_used_at')
+    list_filter = ('task_kind', 'language')
+    readonly_fields = ('key', 'tests_version', 'result', 'hits', 'created_at', 'last_used_at')
+
+@admin.register(RejudgeBatch)
+class RejudgeBatchAdmin(admin.ModelAdmin):
+    list_display = ('id', 'olympiad', 'task', 'status', 'progress', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('olympiad__title', 'task__title')
+    readonly_fields = ('olympiad', 'task', 'status', 'total', 'created_by', 'created_at', 'finished_at')
+    
+    @admin.display(description=_('Проверено'))
+    def progress(self, obj):
+        return f"{obj.processed_count()} / {obj.total}"
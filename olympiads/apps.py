@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class OlympiadsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'olympiads'
-    verbose_name = 'Олимпиады'
\ No newline at end of file
+    verbose_name = 'Олимпиады'
+    
+    def ready(self):
+        import olympiads.signals
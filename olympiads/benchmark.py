@@ -0,0 +1,474 @@
+"""
+Нагрузочный тест проверяющей системы (см. команду bench_judge).
+
+Эталонные решения каждого вида (быстрое, превышение времени, превышение
+памяти, поток вывода, ошибка компиляции) проверяются через check_solution и
+через изолированный запуск solution из assignments.code_checker с заданной
+параллельностью. По результатам считаются перцентили задержки, пропускная
+способность, накладные расходы на запуск процесса и разброс замеров
+процессорного времени - именно разброс показывает, с какой нагрузки
+ограничения времени перестают быть надежными.
+"""
+import os
+import math
+import time
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from django.conf import settings
+
+from .code_runner import (
+    LANGUAGE_CONFIG, DEFAULT_MEMORY_LIMIT, CompilationError,
+    check_solution, compile_code, create_temp_file, remove_temp_file, run_code_with_input
+)
+
+# Виды эталонных решений
+KINDS = ('fast', 'tle', 'mle', 'output_flood', 'compile_error')
+
+# Ожидаемые вердикты по видам решений. Превышение памяти при ограничении
+# через RLIMIT_AS проявляется как ошибка выполнения (MemoryError, bad_alloc)
+EXPECTED_VERDICTS = {
+    'fast': {'passed'},
+    'tle': {'timed_out'},
+    'mle': {'memory_limit_exceeded', 'runtime_error'},
+    'output_flood': {'output_limit_exceeded'},
+    # В интерпретируемых языках синтаксическая ошибка - ошибка выполнения
+    'compile_error': {'compile_error', 'runtime_error'},
+}
+
+CORPUS = {
+    'python': {
+        'fast': "a, b = map(int, input().split())\nprint(a + b)\n",
+        'tle': "while True:\n    pass\n",
+        'mle': "data = b'x' * (1 << 30)\nprint(len(data))\n",
+        'output_flood': "line = 'x' * 1000\nwhile True:\n    print(line)\n",
+        'compile_error': "print(\n",
+    },
+    'javascript': {
+        'fast': (
+            "const [a, b] = require('fs').readFileSync(0, 'utf8').trim().split(/\\s+/).map(Number);\n"
+            "console.log(a + b);\n"
+        ),
+        'tle': "while (true) {}\n",
+        'mle': "const chunks = [];\nwhile (true) { chunks.push(Buffer.alloc(1 << 24, 1)); }\n",
+        'output_flood': (
+            "const fs = require('fs');\nconst line = 'x'.repeat(1000) + '\\n';\n"
+            "while (true) { fs.writeSync(1, line); }\n"
+        ),
+        'compile_error': "function (\n",
+    },
+    'java': {
+        'fast': (
+            "import java.util.Scanner;\n"
+            "public class Main {\n"
+            "    public static void main(String[] args) {\n"
+            "        Scanner in = new Scanner(System.in);\n"
+            "        long a = in.nextLong(), b = in.nextLong();\n"
+            "        System.out.println(a + b);\n"
+            "    }\n"
+            "}\n"
+        ),
+        'tle': "public class Main {\n    public static void main(String[] args) {\n        while (true) {}\n    }\n}\n",
+        'mle': (
+            "import java.util.ArrayList;\n"
+            "public class Main {\n"
+            "    public static void main(String[] args) {\n"
+            "        ArrayList<long[]> chunks = new ArrayList<>();\n"
+            "        while (true) { chunks.add(new long[1 << 21]); }\n"
+            "    }\n"
+            "}\n"
+        ),
+        'output_flood': (
+            "public class Main {\n"
+            "    public static void main(String[] args) {\n"
+            "        String line = \"x\".repeat(1000);\n"
+            "        while (true) { System.out.println(line); }\n"
+            "    }\n"
+            "}\n"
+        ),
+        'compile_error': "public class Main {\n    public static void main(String[] args) {\n        int x = \n    }\n}\n",
+    },
+    'cpp': {
+        'fast': "#include <iostream>\nint main() { long long a, b; std::cin >> a >> b; std::cout << a + b << std::endl; }\n",
+        'tle': "int main() { volatile unsigned long long x = 0; while (true) { x++; } }\n",
+        'mle': (
+            "#include <vector>\n#include <cstdio>\n"
+            "int main() { std::vector<char> v(1u << 30, 1); std::printf(\"%d\\n\", (int)v[12345]); }\n"
+        ),
+        'output_flood': (
+            "#include <cstdio>\n#include <string>\n"
+            "int main() { std::string line(1000, 'x'); while (true) { std::puts(line.c_str()); } }\n"
+        ),
+        'compile_error': "int main() { return }\n",
+    },
+}
+
+# Программы для замера накладных расходов на запуск (ничего не делают)
+EMPTY_PROGRAMS = {
+    'python': "pass\n",
+    'javascript': "\n",
+    'java': "public class Main {\n    public static void main(String[] args) {}\n}\n",
+    'cpp': "int main() { return 0; }\n",
+}
+
+# Программы с фиксированным объемом вычислений для замера разброса времени
+CPU_PROGRAMS = {
+    'python': "total = 0\nfor i in range(3000000):\n    total += i * i\nprint(total)\n",
+    'javascript': "let total = 0;\nfor (let i = 0; i < 300000000; i++) { total = (total + i * i) % 1000003; }\nconsole.log(total);\n",
+    'java': (
+        "public class Main {\n"
+        "    public static void main(String[] args) {\n"
+        "        long total = 0;\n"
+        "        for (long i = 0; i < 300000000L; i++) { total = (total + i * i) % 1000003; }\n"
+        "        System.out.println(total);\n"
+        "    }\n"
+        "}\n"
+    ),
+    'cpp': (
+        "#include <cstdio>\n"
+        "int main() { volatile unsigned long long total = 0;"
+        " for (unsigned long long i = 0; i < 300000000ULL; i++) { total = total + i * i; }"
+        " std::printf(\"%llu\\n\", (unsigned long long)total); }\n"
+    ),
+}
+
+# Эталонные решения для функции solution заданий курсов
+ASSIGNMENT_CORPUS = {
+    'fast': "def solution(a, b):\n    return int(a) + int(b)\n",
+    'tle': "def solution(a, b):\n    while True:\n        pass\n",
+    'mle': "def solution(a, b):\n    data = b'x' * (1 << 30)\n    return len(data)\n",
+    'output_flood': "def solution(a, b):\n    while True:\n        print('x' * 1000)\n",
+    'compile_error': "def solution(a, b)\n    return a\n",
+}
+
+ASSIGNMENT_EXPECTED_VERDICTS = {
+    'fast': {'passed'},
+    'tle': {'timed_out'},
+    'mle': {'memory_limit_exceeded', 'runtime_error'},
+    # Вывод solution собирается в памяти процесса проверки, поэтому поток
+    # вывода заканчивается превышением памяти или времени
+    'output_flood': {'timed_out', 'memory_limit_exceeded', 'runtime_error'},
+    'compile_error': {'compile_error'},
+}
+
+
+def language_available(language: str) -> bool:
+    """Установлены ли компилятор и среда выполнения языка"""
+    config = LANGUAGE_CONFIG[language]
+    tools = [config['run_cmd'][0]]
+    if config['compile_cmd']:
+        tools.append(config['compile_cmd'][0])
+    return all(shutil.which(tool) for tool in tools if '{' not in tool)
+
+
+def make_test_cases(count: int, seed: int = 0) -> List[Dict[str, str]]:
+    """Тесты задачи «сумма двух чисел»"""
+    rng = random.Random(seed)
+    test_cases = []
+    for _ in range(count):
+        a, b = rng.randint(-10 ** 9, 10 ** 9), rng.randint(-10 ** 9, 10 ** 9)
+        test_cases.append({'input': f'{a} {b}', 'expected': str(a + b)})
+    return test_cases
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Перцентили p50/p95/p99, среднее и максимум (в миллисекундах)"""
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None, 'mean': None, 'max': None}
+
+    ordered = sorted(values)
+
+    def pick(q):
+        # Метод ближайшего ранга
+        return ordered[min(len(ordered), max(1, math.ceil(q * len(ordered)))) - 1]
+
+    return {
+        'p50': round(pick(0.50) * 1000, 3),
+        'p95': round(pick(0.95) * 1000, 3),
+        'p99': round(pick(0.99) * 1000, 3),
+        'mean': round(statistics.fmean(ordered) * 1000, 3),
+        'max': round(ordered[-1] * 1000, 3),
+    }
+
+
+def solution_verdict(result: Dict[str, Any]) -> str:
+    """Итоговый вердикт результата check_solution"""
+    if result['status'] != 'success':
+        return 'compile_error' if not result.get('error', '').startswith('Внутренняя ошибка') else 'internal_error'
+
+    for test in result['test_results']:
+        if test.get('passed'):
+            continue
+        for flag in ('timed_out', 'memory_limit_exceeded', 'output_limit_exceeded', 'internal_error'):
+            if test.get(flag):
+                return flag
+        return 'runtime_error' if test.get('error') else 'wrong_answer'
+    return 'passed'
+
+
+def assignment_verdict(load_error: Optional[str], results: List[Dict[str, Any]], expected: List[str]) -> str:
+    """Итоговый вердикт результата run_solution_tests"""
+    from assignments.code_checker import test_verdict
+
+    if load_error:
+        if load_error.startswith('Синтаксическая ошибка'):
+            return 'compile_error'
+        return 'timed_out' if load_error.startswith('Превышено время') else 'runtime_error'
+
+    for result, expected_output in zip(results, expected):
+        passed, error = test_verdict(result, expected_output)
+        if passed:
+            continue
+        if result['status'] == 'timeout':
+            return 'timed_out'
+        if error.startswith('Ошибка выполнения: Превышено ограничение памяти'):
+            return 'memory_limit_exceeded'
+        return 'runtime_error' if error.startswith('Ошибка выполнения') else 'wrong_answer'
+    return 'passed'
+
+
+def run_jobs(jobs: List[Tuple[str, str, Callable[[], str]]], concurrency: int) -> Dict[str, Any]:
+    """
+    Выполняет задания с заданной параллельностью
+
+    Args:
+        jobs: Список (группа, вид решения, функция проверки, возвращающая вердикт)
+        concurrency: Число одновременно проверяемых решений
+
+    Returns:
+        Задержки и вердикты по каждому заданию и общее время
+    """
+    def timed(job):
+        group, kind, func = job
+        started = time.perf_counter()
+        verdict = func()
+        return group, kind, verdict, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(timed, jobs))
+    return {'samples': samples, 'elapsed': time.perf_counter() - started}
+
+
+def summarize(samples: List[Tuple[str, str, str, float]], elapsed: float,
+              expected: Dict[str, Dict[str, set]]) -> Dict[str, Any]:
+    """Сводка по группам, видам решений и в целом"""
+    groups: Dict[str, Dict[str, Any]] = {}
+    for group, kind, verdict, latency in samples:
+        entry = groups.setdefault(group, {}).setdefault(kind, {'latencies': [], 'verdicts': {}})
+        entry['latencies'].append(latency)
+        entry['verdicts'][verdict] = entry['verdicts'].get(verdict, 0) + 1
+
+    report = {}
+    for group, kinds in groups.items():
+        report[group] = {}
+        for kind, entry in kinds.items():
+            correct = sum(n for v, n in entry['verdicts'].items() if v in expected[group][kind])
+            report[group][kind] = {
+                'count': len(entry['latencies']),
+                'latency_ms': percentiles(entry['latencies']),
+                'verdicts': entry['verdicts'],
+                'expected_verdict_ratio': round(correct / len(entry['latencies']), 3),
+            }
+
+    latencies = [sample[3] for sample in samples]
+    return {
+        'submissions': len(samples),
+        'elapsed_sec': round(elapsed, 3),
+        'throughput_per_sec': round(len(samples) / elapsed, 3) if elapsed > 0 else None,
+        'latency_ms': percentiles(latencies),
+        'groups': report,
+    }
+
+
+def measure_programs(language: str, code: str, runs: int, concurrency: int,
+                     time_limit: float) -> Optional[Dict[str, Any]]:
+    """
+    Многократно запускает одну скомпилированную программу
+
+    Returns:
+        Задержка запуска и замеры процессорного времени или None, если
+        программа не компилируется
+    """
+    file_path, _, _ = create_temp_file(code, language)
+    try:
+        if LANGUAGE_CONFIG[language]['compile_cmd']:
+            try:
+                compile_code(file_path, language)
+            except CompilationError:
+                return None
+
+        def run(_):
+            started = time.perf_counter()
+            result = run_code_with_input(file_path, language, '', time_limit, DEFAULT_MEMORY_LIMIT, compiled=True)
+            return time.perf_counter() - started, result
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = list(executor.map(run, range(runs)))
+    finally:
+        remove_temp_file(file_path, language)
+
+    ok = [result for _, result in samples if result['status'] == 'success']
+    cpu_times = [result['execution_time'] for result in ok]
+    return {
+        'latencies': [latency for latency, _ in samples],
+        'cpu_times': cpu_times,
+        'wall_times': [result['wall_time'] for result in ok],
+        'failed': len(samples) - len(ok),
+    }
+
+
+def spawn_overhead(language: str, runs: int) -> Optional[Dict[str, Any]]:
+    """Накладные расходы на запуск пустой программы (последовательно)"""
+    measured = measure_programs(language, EMPTY_PROGRAMS[language], runs, 1, 5)
+    if measured is None:
+        return None
+    return {
+        'runs': runs,
+        'latency_ms': percentiles(measured['latencies']),
+        'wall_time_ms': percentiles(measured['wall_times']),
+        'failed': measured['failed'],
+    }
+
+
+def timing_jitter(language: str, runs: int, concurrency: int) -> Optional[Dict[str, Any]]:
+    """
+    Разброс замеров процессорного времени одной и той же программы
+
+    Коэффициент вариации (stdev / mean) показывает, насколько вердикт по
+    времени зависит от нагрузки на хост, а не от решения.
+    """
+    measured = measure_programs(language, CPU_PROGRAMS[language], runs, concurrency, 10)
+    if measured is None or len(measured['cpu_times']) < 2:
+        return None
+
+    cpu = measured['cpu_times']
+    wall = measured['wall_times']
+    mean = statistics.fmean(cpu)
+    return {
+        'runs': runs,
+        'concurrency': concurrency,
+        'cpu_time_mean_ms': round(mean * 1000, 3),
+        'cpu_time_stdev_ms': round(statistics.stdev(cpu) * 1000, 3),
+        'cpu_time_cv': round(statistics.stdev(cpu) / mean, 4) if mean else None,
+        'cpu_time_spread_ms': round((max(cpu) - min(cpu)) * 1000, 3),
+        'wall_to_cpu_ratio': round(statistics.fmean(wall) / mean, 3) if mean else None,
+        'failed': measured['failed'],
+    }
+
+
+def git_revision() -> Optional[str]:
+    """Текущий коммит репозитория (для сравнения прогонов)"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(
+    languages: List[str],
+    kinds: List[str],
+    concurrency_levels: List[int],
+    iterations: int = 3,
+    tests: int = 5,
+    time_limit: float = 1.0,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    assignments: bool = True,
+    jitter_runs: int = 10,
+    log: Optional[Callable[[str], None]] = None
+) -> Dict[str, Any]:
+    """
+    Выполняет нагрузочный тест
+
+    Args:
+        languages: Языки олимпиадных решений
+        kinds: Виды эталонных решений (см. KINDS)
+        concurrency_levels: Уровни параллельности
+        iterations: Сколько раз проверяется каждое решение на каждом уровне
+        tests: Число тестов в каждой проверке
+        time_limit: Ограничение времени на тест (секунд)
+        memory_limit: Ограничение памяти (байт)
+        assignments: Проверять также функции solution заданий курсов
+        jitter_runs: Число запусков для замеров накладных расходов и разброса
+        log: Функция вывода хода выполнения
+
+    Returns:
+        Отчет, сериализуемый в JSON
+    """
+    from assignments.code_checker import run_solution_tests
+
+    log = log or (lambda message: None)
+    available = [language for language in languages if language_available(language)]
+    test_cases = make_test_cases(tests)
+    inputs = [tc['input'] for tc in test_cases]
+    expected_outputs = [tc['expected'] for tc in test_cases]
+
+    jobs = []
+    expected = {}
+    for language in available:
+        expected[language] = {kind: EXPECTED_VERDICTS[kind] for kind in kinds}
+        for kind in kinds:
+            code = CORPUS[language][kind]
+
+            def check(code=code, language=language):
+                return solution_verdict(check_solution(code, language, test_cases, time_limit, memory_limit))
+
+            jobs.append((language, kind, check))
+
+    if assignments:
+        expected['assignment'] = {kind: ASSIGNMENT_EXPECTED_VERDICTS[kind] for kind in kinds}
+        for kind in kinds:
+            code = ASSIGNMENT_CORPUS[kind]
+
+            def check_assignment(code=code):
+                load_error, results = run_solution_tests(code, inputs, time_limit, memory_limit)
+                return assignment_verdict(load_error, results, expected_outputs)
+
+            jobs.append(('assignment', kind, check_assignment))
+
+    report = {
+        'meta': {
+            'host': socket.gethostname(),
+            'cpu_count': os.cpu_count(),
+            'revision': git_revision(),
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'sandbox_backend': getattr(settings, 'OLYMPIADS_SANDBOX_BACKEND', 'rlimit'),
+            'sandbox_pool_size': getattr(settings, 'OLYMPIADS_SANDBOX_POOL_SIZE', None),
+            'time_limit': time_limit,
+            'memory_limit': memory_limit,
+            'tests_per_submission': tests,
+            'iterations': iterations,
+        },
+        'languages': available,
+        'skipped_languages': [language for language in languages if language not in available],
+        'spawn_overhead': {},
+        'concurrency': {},
+    }
+
+    for language in available:
+        log(f'Накладные расходы на запуск: {language}')
+        report['spawn_overhead'][language] = spawn_overhead(language, jitter_runs)
+
+    for concurrency in concurrency_levels:
+        log(f'Параллельность {concurrency}: {len(jobs) * iterations} проверок')
+        # Перемешиваем задания, чтобы медленные решения не шли подряд
+        batch = jobs * iterations
+        random.Random(concurrency).shuffle(batch)
+        measured = run_jobs(batch, concurrency)
+
+        level = summarize(measured['samples'], measured['elapsed'], expected)
+        level['timing_jitter'] = {
+            language: timing_jitter(language, max(jitter_runs, concurrency), concurrency)
+            for language in available
+        }
+        report['concurrency'][str(concurrency)] = level
+
+    return report
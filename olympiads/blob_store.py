@@ -0,0 +1,210 @@
+"""
+Хранилище тестовых данных в виде сжатых блобов.
+
+Большие входные данные и ответы тестов не хранятся в базе: тестовый случай
+ссылается на блоб по sha256 содержимого. Блоб хранится сжатым (zstd, если
+установлен пакет zstandard, иначе gzip):
+
+    <root>/ab/<sha256>.zst или <root>/ab/<sha256>.gz
+
+Для запуска блоб один раз распаковывается в <cache_dir>/ab/<sha256>. Этот
+файл подается программе на stdin напрямую (sandbox.execute(input_file=...)),
+а файл ответа читается проверкой вывода по частям (checkers.make_checker(
+expected_file=...)) - строки Python с данными теста целиком не создаются.
+read_bytes и read_text нужны для начала данных при отображении.
+"""
+import os
+import re
+import gzip
+import mmap
+import shutil
+import hashlib
+import tempfile
+import threading
+from typing import BinaryIO, Optional, Union
+
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Размер блока при хэшировании и сжатии
+CHUNK_SIZE = 1024 * 1024
+
+# Тесты больше этого размера (байт) сохраняются в блобы
+DEFAULT_BLOB_THRESHOLD = 64 * 1024
+
+_DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class BlobNotFound(Exception):
+    """Блоб отсутствует в хранилище"""
+    pass
+
+
+class BlobStore:
+    """Адресуемое содержимым хранилище сжатых блобов"""
+
+    def __init__(self, root: str, cache_dir: Optional[str] = None):
+        self.root = root
+        self.cache_dir = cache_dir or os.path.join(root, 'raw')
+        self.compression = 'zst' if zstandard is not None else 'gz'
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _check_digest(digest: str) -> str:
+        if not _DIGEST_RE.match(digest or ''):
+            raise BlobNotFound(f"Некорректный идентификатор блоба: {digest!r}")
+        return digest
+
+    def _compressed_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.root, digest[:2], f'{digest}.{ext}')
+
+    def _find(self, digest: str) -> Optional[str]:
+        for ext in ('zst', 'gz'):
+            path = self._compressed_path(digest, ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def exists(self, digest: str) -> bool:
+        return self._find(self._check_digest(digest)) is not None
+
+    def _open_writer(self, raw: BinaryIO):
+        if self.compression == 'zst':
+            return zstandard.ZstdCompressor(level=10).stream_writer(raw)
+        return gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0)
+
+    def put(self, data: Union[bytes, BinaryIO]) -> str:
+        """
+        Сохраняет данные в хранилище
+
+        Args:
+            data: Байты или открытый на чтение двоичный файл
+
+        Returns:
+            sha256 содержимого - идентификатор блоба
+        """
+        if isinstance(data, bytes):
+            digest = hashlib.sha256(data).hexdigest()
+            if self._find(digest):
+                return digest
+            chunks = (data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE))
+        else:
+            # Файл читается дважды: для хэша и для сжатия
+            hasher = hashlib.sha256()
+            for chunk in iter(lambda: data.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+            digest = hasher.hexdigest()
+            if self._find(digest):
+                return digest
+            data.seek(0)
+            chunks = iter(lambda: data.read(CHUNK_SIZE), b'')
+
+        target = self._compressed_path(digest, self.compression)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=os.path.dirname(target))
+        try:
+            with os.fdopen(fd, 'wb') as raw:
+                writer = self._open_writer(raw)
+                for chunk in chunks:
+                    writer.write(chunk)
+                writer.close()
+            os.replace(tmp_path, target)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return digest
+
+    def _open_reader(self, path: str) -> BinaryIO:
+        if path.endswith('.zst'):
+            if zstandard is None:
+                raise BlobNotFound(f"Для чтения {path} нужен пакет zstandard")
+            return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return gzip.open(path, 'rb')
+
+    def path(self, digest: str) -> str:
+        """
+        Возвращает путь к распакованному блобу, распаковывая его при первом обращении
+
+        Raises:
+            BlobNotFound: Если блоба нет в хранилище
+        """
+        digest = self._check_digest(digest)
+        raw_path = os.path.join(self.cache_dir, digest[:2], digest)
+        if os.path.exists(raw_path):
+            return raw_path
+
+        compressed = self._find(digest)
+        if compressed is None:
+            raise BlobNotFound(f"Блоб {digest} не найден")
+
+        os.makedirs(os.path.dirname(raw_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=os.path.dirname(raw_path))
+        try:
+            with os.fdopen(fd, 'wb') as out, self._open_reader(compressed) as reader:
+                shutil.copyfileobj(reader, out, CHUNK_SIZE)
+            os.replace(tmp_path, raw_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return raw_path
+
+    def size(self, digest: str) -> int:
+        """Размер распакованного блоба в байтах"""
+        return os.path.getsize(self.path(digest))
+
+    def read_bytes(self, digest: str, limit: Optional[int] = None) -> bytes:
+        """
+        Читает блоб (или его первые limit байт) через mmap
+
+        Без limit возвращает копию всего блоба - для проверки вывода файл
+        нужно передавать путем (path).
+        """
+        with open(self.path(digest), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b''
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[:limit] if limit is not None else mapped[:]
+
+    def read_text(self, digest: str, limit: Optional[int] = None) -> str:
+        """Читает блоб как текст UTF-8"""
+        return self.read_bytes(digest, limit).decode('utf-8', errors='replace')
+
+
+_blob_store: Optional[BlobStore] = None
+_blob_store_lock = threading.Lock()
+
+
+def get_blob_store() -> Optional[BlobStore]:
+    """
+    Возвращает хранилище тестовых данных
+
+    Returns:
+        Хранилище или None, если OLYMPIADS_TEST_BLOB_DIR не задан
+    """
+    global _blob_store
+
+    root = getattr(settings, 'OLYMPIADS_TEST_BLOB_DIR', None)
+    if not root:
+        return None
+
+    if _blob_store is None or _blob_store.root != str(root):
+        with _blob_store_lock:
+            if _blob_store is None or _blob_store.root != str(root):
+                _blob_store = BlobStore(str(root), getattr(settings, 'OLYMPIADS_TEST_BLOB_CACHE_DIR', None) or None)
+
+    return _blob_store
+
+
+def get_blob_threshold() -> int:
+    """Размер теста в байтах, начиная с которого данные сохраняются в блоб"""
+    return getattr(settings, 'OLYMPIADS_TEST_BLOB_THRESHOLD', DEFAULT_BLOB_THRESHOLD)
@@ -0,0 +1,140 @@
+"""
+Изоляция запусков через cgroup v2.
+
+Каждый запуск помещается в собственную дочернюю cgroup с ограничениями
+memory.max, cpu.max и pids.max. В отличие от RLIMIT_AS ограничивается
+реально используемая память, поэтому JVM и Node, резервирующие большое
+виртуальное адресное пространство, работают с честными лимитами. По
+завершении запуска все процессы cgroup убиваются, а из ее счетчиков берутся
+процессорное время и пиковая память всего дерева процессов.
+
+Корневая cgroup (OLYMPIADS_CGROUP_ROOT) должна быть делегирована
+пользователю, от имени которого работает проверка, например через systemd
+(Delegate=yes) или заранее созданным каталогом с нужными правами. Модуль не
+зависит от Django.
+"""
+import os
+import time
+import signal
+import uuid
+from typing import Dict, Optional
+
+# Контроллеры, необходимые для изоляции запуска
+REQUIRED_CONTROLLERS = ('memory', 'cpu', 'pids')
+
+# Максимальное число процессов и потоков в запуске (JVM создает десятки потоков)
+DEFAULT_PIDS_MAX = 64
+
+# Период cpu.max в микросекундах; квота на запуск - одно ядро
+CPU_PERIOD_USEC = 100000
+
+
+def _write(path: str, value: str) -> None:
+    with open(path, 'w') as f:
+        f.write(value)
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _read_keyed(path: str) -> Dict[str, int]:
+    """Читает файлы вида «ключ значение» (cpu.stat, memory.events)"""
+    values = {}
+    for line in (_read(path) or '').splitlines():
+        key, _, value = line.partition(' ')
+        if value.strip().isdigit():
+            values[key] = int(value)
+    return values
+
+
+def cgroup_available(root: str) -> bool:
+    """
+    Проверяет, можно ли создавать cgroup запусков в каталоге root
+
+    Включает нужные контроллеры для дочерних cgroup, если они еще не включены.
+    """
+    controllers = _read(os.path.join(root, 'cgroup.controllers'))
+    if controllers is None or not all(c in controllers.split() for c in REQUIRED_CONTROLLERS):
+        return False
+
+    subtree = os.path.join(root, 'cgroup.subtree_control')
+    enabled = (_read(subtree) or '').split()
+    missing = [c for c in REQUIRED_CONTROLLERS if c not in enabled]
+    if missing:
+        try:
+            _write(subtree, ' '.join(f'+{c}' for c in missing))
+        except OSError:
+            return False
+
+    return os.access(root, os.W_OK)
+
+
+class CgroupRun:
+    """Cgroup одного запуска программы"""
+
+    def __init__(self, root: str, memory_limit: int, pids_max: int = DEFAULT_PIDS_MAX):
+        self.path = os.path.join(root, f'run-{uuid.uuid4().hex}')
+        os.mkdir(self.path)
+        try:
+            _write(os.path.join(self.path, 'memory.max'), str(memory_limit))
+            # Без подкачки: иначе превышение памяти превращается в превышение времени
+            if os.path.exists(os.path.join(self.path, 'memory.swap.max')):
+                _write(os.path.join(self.path, 'memory.swap.max'), '0')
+            _write(os.path.join(self.path, 'pids.max'), str(pids_max))
+            _write(os.path.join(self.path, 'cpu.max'), f'{CPU_PERIOD_USEC} {CPU_PERIOD_USEC}')
+        except OSError:
+            self.remove()
+            raise
+
+    @property
+    def procs_path(self) -> str:
+        """Файл, запись «0» в который переносит текущий процесс в cgroup"""
+        return os.path.join(self.path, 'cgroup.procs')
+
+    def kill(self) -> None:
+        """Убивает все процессы cgroup, включая отделившихся от группы процессов"""
+        try:
+            _write(os.path.join(self.path, 'cgroup.kill'), '1')
+            return
+        except OSError:
+            pass
+
+        # cgroup.kill появился в Linux 5.14 - на старых ядрах убиваем по списку
+        for pid in (_read(self.procs_path) or '').split():
+            try:
+                os.kill(int(pid), signal.SIGKILL)
+            except (ProcessLookupError, PermissionError, ValueError):
+                pass
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        """
+        Возвращает счетчики запуска
+
+        Returns:
+            Словарь: 'cpu_usec' - процессорное время всех процессов,
+            'memory_peak' - пиковая память (None, если ядро не поддерживает
+            memory.peak), 'oom_killed' - число процессов, убитых за превышение памяти
+        """
+        peak = _read(os.path.join(self.path, 'memory.peak'))
+        return {
+            'cpu_usec': _read_keyed(os.path.join(self.path, 'cpu.stat')).get('usage_usec'),
+            'memory_peak': int(peak) if peak and peak.strip().isdigit() else None,
+            'oom_killed': _read_keyed(os.path.join(self.path, 'memory.events')).get('oom_kill', 0),
+        }
+
+    def remove(self) -> None:
+        """Удаляет cgroup (после завершения всех ее процессов)"""
+        for _ in range(50):
+            try:
+                os.rmdir(self.path)
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                # Убитые процессы еще не покинули cgroup
+                time.sleep(0.01)
@@ -0,0 +1,470 @@
+"""
+Потоковая проверка вывода программы.
+
+Вывод сравнивается с ожидаемым ответом по мере чтения из канала, поэтому
+даже очень большой правильный вывод не собирается в памяти целиком. Модуль
+не зависит от Django: проверка выполняется внутри рабочих процессов песочницы.
+
+Режим проверки задается словарем (см. make_checker):
+    {'mode': 'exact'} - точное совпадение без учета пробелов по краям
+    {'mode': 'lines'} - построчное совпадение без учета пробелов в конце строк
+    {'mode': 'tokens'} - совпадение последовательности токенов
+    {'mode': 'float', 'epsilon': 1e-6} - токены, числа сравниваются с погрешностью
+    {'mode': 'unordered_lines'} - совпадение набора строк в любом порядке
+    {'mode': 'custom', 'cmd': [...]} - внешняя программа-чекер
+
+Большой ожидаемый ответ (тест из хранилища блобов) передается файлом
+(expected_file) и тоже читается по частям.
+"""
+import os
+import math
+import shutil
+import tempfile
+import subprocess
+from collections import Counter
+from typing import Dict, Any, Iterator, Optional
+
+# Пробельные символы, которые отбрасываются по краям вывода (как bytes.strip)
+WHITESPACE = b' \t\n\r\x0b\x0c'
+
+# Погрешность сравнения вещественных чисел по умолчанию
+DEFAULT_EPSILON = 1e-6
+
+# Ограничение времени работы внешнего чекера (секунд)
+CUSTOM_CHECKER_TIME_LIMIT = 10
+
+# Размер части, которой читается файл с ожидаемым ответом
+EXPECTED_CHUNK_SIZE = 64 * 1024
+
+
+def expected_chunks(expected: str, expected_file: Optional[str] = None) -> Iterator[bytes]:
+    """Ожидаемый ответ по частям: из файла, если он задан, иначе строка целиком"""
+    if expected_file is None:
+        yield expected.encode('utf-8')
+        return
+    with open(expected_file, 'rb') as f:
+        while True:
+            data = f.read(EXPECTED_CHUNK_SIZE)
+            if not data:
+                return
+            yield data
+
+
+def split_lines(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Строки данных, поданных частями (как data.split(b'\\n'))"""
+    partial = b''
+    for data in chunks:
+        lines = (partial + data).split(b'\n')
+        partial = lines.pop()
+        yield from lines
+    yield partial
+
+
+def split_tokens(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Токены данных, поданных частями (как data.split())"""
+    partial = b''
+    for data in chunks:
+        data = partial + data
+        tokens = data.split()
+        # Последний токен может продолжиться в следующей части
+        partial = tokens.pop() if tokens and not data[-1:].isspace() else b''
+        yield from tokens
+    if partial:
+        yield partial
+
+
+class OutputChecker:
+    """
+    Базовый класс проверки вывода
+
+    Вывод подается частями через feed(), итог возвращает finish(). После
+    первого расхождения (failed = True) остальной вывод не анализируется.
+    Ожидаемый ответ читается частями из self._chunks по мере сравнения.
+    """
+
+    def __init__(self, expected: str, expected_file: Optional[str] = None):
+        self.failed = False
+        self.expected_file = expected_file
+        self._chunks = expected_chunks(expected, expected_file)
+
+    def feed(self, data: bytes) -> None:
+        """Обрабатывает очередную часть вывода"""
+        raise NotImplementedError
+
+    def finish(self) -> bool:
+        """Возвращает True, если вывод принят"""
+        try:
+            return self._result()
+        finally:
+            self.close()
+
+    def _result(self) -> bool:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Освобождает ресурсы, если проверка не будет завершена"""
+        # Закрывает файл с ожидаемым ответом, если он еще не дочитан
+        self._chunks.close()
+
+
+class ExactChecker(OutputChecker):
+    """
+    Точное сравнение вывода с ожидаемым ответом без учета пробельных символов
+    в начале и в конце (эквивалент actual.strip() == expected.strip())
+
+    Храним только еще не сравненную часть прочитанного ответа и хвост из
+    пробельных символов, который может оказаться концом вывода.
+    """
+
+    def __init__(self, expected: str, expected_file: Optional[str] = None):
+        super().__init__(expected, expected_file)
+        self.started = False
+        self._expected_started = False
+        self._expected = b''
+        self._pending = b''
+        self._carry = b''
+
+    def _take_expected(self, size: int) -> bytes:
+        """Следующие size байт ответа без пробельных символов в начале (меньше, если ответ кончился)"""
+        while len(self._expected) < size:
+            data = next(self._chunks, None)
+            if data is None:
+                break
+            if not self._expected_started:
+                data = data.lstrip(WHITESPACE)
+                if not data:
+                    continue
+                self._expected_started = True
+            self._expected += data
+        taken, self._expected = self._expected[:size], self._expected[size:]
+        return taken
+
+    def feed(self, data: bytes) -> None:
+        if self.failed or not data:
+            return
+
+        # Приводим переводы строк к \n, как при декодировании вывода; \r в
+        # конце части может оказаться началом \r\n
+        data = self._carry + data
+        self._carry = b''
+        if data.endswith(b'\r'):
+            data, self._carry = data[:-1], b'\r'
+        data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+
+        if not self.started:
+            data = data.lstrip(WHITESPACE)
+            if not data:
+                return
+            self.started = True
+
+        body = data.rstrip(WHITESPACE)
+        if not body:
+            # Пробельные символы могут оказаться концом вывода - откладываем
+            self._pending += data
+            return
+
+        chunk = self._pending + body
+        self._pending = data[len(body):]
+        if self._take_expected(len(chunk)) != chunk:
+            self.failed = True
+
+    def _result(self) -> bool:
+        # Отложенные пробельные символы в конце вывода не учитываются, а
+        # остаток ответа может состоять только из пробельных символов
+        if self.failed or self._expected.strip(WHITESPACE):
+            return False
+        return not any(data.strip(WHITESPACE) for data in self._chunks)
+
+
+class LineChecker(OutputChecker):
+    """
+    Построчное сравнение: пробельные символы в конце строк и пустые строки
+    в начале и в конце вывода не учитываются (эквивалент сравнения списков
+    [line.rstrip() for line in text.strip().split('\\n')])
+
+    Из вывода хранится только незавершенная строка и число пустых строк,
+    которые могут оказаться концом вывода.
+    """
+
+    def __init__(self, expected: str, expected_file: Optional[str] = None):
+        super().__init__(expected, expected_file)
+        self._expected_lines = self._stripped_lines(self._chunks)
+        self._partial = b''
+        self._started = False
+        self._blank = 0
+
+    @staticmethod
+    def _stripped_lines(chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """Строки ответа без пустых строк в начале и в конце (как text.strip().split('\\n'))"""
+        started = False
+        blank = 0
+        for line in split_lines(chunks):
+            if not line.strip(WHITESPACE):
+                if started:
+                    blank += 1
+                continue
+            if not started:
+                line = line.lstrip(WHITESPACE)
+                started = True
+            for _ in range(blank):
+                yield b''
+            blank = 0
+            yield line
+
+    def _compare(self, line: bytes) -> None:
+        expected = next(self._expected_lines, None)
+        if expected is None or expected.rstrip(WHITESPACE) != line:
+            self.failed = True
+
+    def _check(self, line: bytes) -> None:
+        line = line.rstrip(WHITESPACE)
+        if not self._started:
+            line = line.lstrip(WHITESPACE)
+            if not line:
+                return
+            self._started = True
+        if not line:
+            # Пустые строки учитываются, только если за ними есть вывод
+            self._blank += 1
+            return
+        for _ in range(self._blank):
+            self._compare(b'')
+            if self.failed:
+                return
+        self._blank = 0
+        self._compare(line)
+
+    def feed(self, data: bytes) -> None:
+        if self.failed or not data:
+            return
+
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._check(line)
+            if self.failed:
+                return
+
+    def _result(self) -> bool:
+        if not self.failed and self._partial:
+            self._check(self._partial)
+            self._partial = b''
+        return not self.failed and next(self._expected_lines, None) is None
+
+
+class TokenChecker(OutputChecker):
+    """
+    Сравнение последовательностей токенов, разделенных любыми пробельными
+    символами
+
+    Токены ожидаемого ответа берутся генератором по мере необходимости, из
+    вывода хранится только незавершенный токен на границе частей.
+    """
+
+    def __init__(self, expected: str, expected_file: Optional[str] = None):
+        super().__init__(expected, expected_file)
+        self._expected_tokens = split_tokens(self._chunks)
+        self._partial = b''
+
+    def tokens_equal(self, actual: bytes, expected: bytes) -> bool:
+        return actual == expected
+
+    def _check(self, token: bytes) -> None:
+        expected = next(self._expected_tokens, None)
+        if expected is None or not self.tokens_equal(token, expected):
+            self.failed = True
+
+    def feed(self, data: bytes) -> None:
+        if self.failed or not data:
+            return
+
+        data = self._partial + data
+        tokens = data.split()
+        # Последний токен может продолжиться в следующей части вывода
+        if tokens and not data[-1:].isspace():
+            self._partial = tokens.pop()
+        else:
+            self._partial = b''
+
+        for token in tokens:
+            self._check(token)
+            if self.failed:
+                return
+
+    def _result(self) -> bool:
+        if not self.failed and self._partial:
+            self._check(self._partial)
+            self._partial = b''
+        return not self.failed and next(self._expected_tokens, None) is None
+
+
+class FloatChecker(TokenChecker):
+    """
+    Сравнение токенов, в котором вещественные числа считаются равными при
+    абсолютной или относительной разнице не больше epsilon
+    """
+
+    def __init__(self, expected: str, epsilon: float = DEFAULT_EPSILON, expected_file: Optional[str] = None):
+        super().__init__(expected, expected_file)
+        self.epsilon = epsilon
+
+    def tokens_equal(self, actual: bytes, expected: bytes) -> bool:
+        if actual == expected:
+            return True
+        try:
+            a, b = float(actual), float(expected)
+        except ValueError:
+            return False
+        if math.isnan(a) or math.isnan(b):
+            return False
+        return abs(a - b) <= self.epsilon or abs(a - b) <= self.epsilon * abs(b)
+
+
+class UnorderedLinesChecker(OutputChecker):
+    """
+    Сравнение наборов строк без учета порядка (пустые строки и пробелы в
+    конце строк не учитываются)
+
+    Вместо самих строк храним счетчик их хэшей.
+    """
+
+    def __init__(self, expected: str, expected_file: Optional[str] = None):
+        super().__init__(expected, expected_file)
+        self._remaining = Counter()
+        for line in split_lines(self._chunks):
+            line = line.rstrip(WHITESPACE)
+            if line:
+                self._remaining[hash(line)] += 1
+        self._partial = b''
+
+    def _check(self, line: bytes) -> None:
+        line = line.rstrip(WHITESPACE)
+        if not line:
+            return
+        key = hash(line)
+        if self._remaining[key] <= 0:
+            self.failed = True
+            return
+        self._remaining[key] -= 1
+
+    def feed(self, data: bytes) -> None:
+        if self.failed or not data:
+            return
+
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._check(line)
+            if self.failed:
+                return
+
+    def _result(self) -> bool:
+        if not self.failed and self._partial:
+            self._check(self._partial)
+            self._partial = b''
+        return not self.failed and not any(self._remaining.values())
+
+
+class CustomChecker(OutputChecker):
+    """
+    Проверка внешней программой-чекером (в стиле testlib)
+
+    Вывод записывается во временный файл, после завершения программы чекер
+    запускается с аргументами <вход> <вывод> <ответ>; код возврата 0 означает,
+    что ответ принят. Файл с ответом (expected_file) передается чекеру как есть.
+    """
+
+    def __init__(self, expected: str, cmd, input_data: str = '', input_file: Optional[str] = None,
+                 expected_file: Optional[str] = None):
+        super().__init__(expected, expected_file)
+        self.cmd = list(cmd)
+        self.expected = expected
+        self.input_data = input_data
+        self.input_file = input_file
+        self.work_dir = tempfile.mkdtemp(prefix='checker-')
+        self.output_path = os.path.join(self.work_dir, 'output.txt')
+        try:
+            self._output = open(self.output_path, 'wb')
+        except BaseException:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            raise
+
+    def feed(self, data: bytes) -> None:
+        if data:
+            self._output.write(data)
+
+    def close(self) -> None:
+        try:
+            self._output.close()
+        finally:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            super().close()
+
+    def finish(self) -> bool:
+        # Каталог с выводом и ответом удаляется при любом исходе проверки
+        try:
+            self._output.close()
+            input_path = self.input_file
+            if input_path is None:
+                input_path = os.path.join(self.work_dir, 'input.txt')
+                with open(input_path, 'w', encoding='utf-8') as f:
+                    f.write(self.input_data)
+            answer_path = self.expected_file
+            if answer_path is None:
+                answer_path = os.path.join(self.work_dir, 'answer.txt')
+                with open(answer_path, 'w', encoding='utf-8') as f:
+                    f.write(self.expected)
+
+            result = subprocess.run(
+                self.cmd + [input_path, self.output_path, answer_path],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=CUSTOM_CHECKER_TIME_LIMIT
+            )
+            return result.returncode == 0
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        finally:
+            self.close()
+
+
+def make_checker(expected: str, spec: Optional[Dict[str, Any]] = None, input_data: str = '',
+                 input_file: Optional[str] = None, expected_file: Optional[str] = None) -> OutputChecker:
+    """
+    Создает проверку вывода по описанию режима
+
+    Args:
+        expected: Ожидаемый ответ
+        spec: Режим проверки (см. описание модуля); по умолчанию 'exact'
+        input_data: Входные данные теста (нужны внешнему чекеру)
+        input_file: Файл с входными данными вместо input_data
+        expected_file: Файл с ожидаемым ответом вместо expected (читается по частям)
+
+    Returns:
+        Объект проверки с методами feed() и finish()
+    """
+    spec = spec or {}
+    mode = spec.get('mode', 'exact')
+
+    if mode == 'exact':
+        return ExactChecker(expected, expected_file)
+    if mode == 'lines':
+        return LineChecker(expected, expected_file)
+    if mode == 'tokens':
+        return TokenChecker(expected, expected_file)
+    if mode == 'float':
+        return FloatChecker(expected, spec.get('epsilon', DEFAULT_EPSILON), expected_file)
+    if mode == 'unordered_lines':
+        return UnorderedLinesChecker(expected, expected_file)
+    if mode == 'custom':
+        return CustomChecker(expected, spec['cmd'], input_data, input_file, expected_file)
+
+    raise ValueError(f"Неизвестный режим проверки: {mode}")
+
+
+def check_output(expected: str, actual: str, spec: Optional[Dict[str, Any]] = None, input_data: str = '') -> bool:
+    """Проверяет уже полученный вывод программы"""
+    checker = make_checker(expected, spec, input_data)
+    checker.feed(actual.encode('utf-8'))
+    return checker.finish()
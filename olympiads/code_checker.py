@@ -9,6 +9,8 @@ import signal
 import resource
 from datetime import datetime
 
+from .checkers import check_output
+
 def run_code_with_test_case(code, input_data, expected_output, time_limit=1000, memory_limit=256):
     """
     Выполняет код с заданными входными данными и проверяет соответствие ожидаемому результату
@@ -81,17 +83,17 @@ def run_code_with_test_case(code, input_data, expected_output, time_limit=1000,
         else:
             # Нормализуем выходные данные (удаляем лишние пробелы и переносы строк)
             normalized_output = stdout.strip()
-            normalized_expected = expected_output.strip()
             
             result['output'] = normalized_output
             result['execution_time'] = int(execution_time)
             
-            if normalized_output == normalized_expected:
+            # Сравниваем без построения нормализованной копии ожидаемого ответа
+            if check_output(expected_output, stdout):
                 result['passed'] = True
                 result['status'] = 'accepted'
             else:
                 result['status'] = 'wrong_answer'
-                result['error'] = f'Ожидаемый вывод:\n{normalized_expected}\n\nФактический вывод:\n{normalized_output}'
+                result['error'] = f'Ожидаемый вывод:\n{expected_output.strip()}\n\nФактический вывод:\n{normalized_output}'
         
     except subprocess.TimeoutExpired:
         result['status'] = 'time_limit'
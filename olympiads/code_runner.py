@@ -1,16 +1,52 @@
 import os
+import glob
 import subprocess
 import tempfile
 import time
 import signal
 import resource
 import json
-from typing import Dict, List, Optional, Tuple, Any
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple, Any, Callable, Iterable
+
+from django.conf import settings
+
+from .sandbox import SandboxPool, SandboxError, HostSlots, execute, limit_resources
+from .cgroups import cgroup_available
+from .compile_cache import CompileCache
+from .pch import PchManager
+from .workspace import WorkspaceManager, WorkspaceQuotaExceeded, default_root
+from .java_runner import JavaRunnerPool, JavaRunnerError, build_runner, build_cds_archive, jvm_flags
+
+logger = logging.getLogger(__name__)
 
 # Константы для ограничений
 DEFAULT_TIME_LIMIT = 5  # секунд
 DEFAULT_MEMORY_LIMIT = 128 * 1024 * 1024  # 128 MB в байтах
 MAX_OUTPUT_LENGTH = 100 * 1024  # 100 KB
+DEFAULT_OUTPUT_LIMIT = 64 * 1024 * 1024  # 64 MB
+
+# Каталог делегированной cgroup v2 для изоляции запусков по умолчанию
+DEFAULT_CGROUP_ROOT = '/sys/fs/cgroup/olympiads'
+
+# Размер пула рабочих процессов песочницы на язык по умолчанию
+DEFAULT_SANDBOX_POOL_SIZE = 4
+
+# Профили компиляции C++ по умолчанию: имя -> флаги компилятора
+DEFAULT_CPP_PROFILES = {
+    'c++17': ['-std=c++17'],
+    'c++17-O2': ['-std=c++17', '-O2'],
+    'c++20-O2': ['-std=c++20', '-O2'],
+}
+DEFAULT_CPP_PROFILE = 'c++17'
+
+# Квота на объем файлов рабочего каталога запуска по умолчанию
+DEFAULT_WORKSPACE_QUOTA = 64 * 1024 * 1024  # 64 MB
+
+# Максимальный объем кэша компиляции по умолчанию
+DEFAULT_COMPILE_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
 
 # Классы для исключений
 class ExecutionError(Exception):
@@ -50,21 +86,53 @@ LANGUAGE_CONFIG = {
     'java': {
         'file_ext': '.java',
         'compile_cmd': ['javac', '{file}'],
+        'version_cmd': ['javac', '-version'],
         'run_cmd': ['java', '-cp', '{dir}', 'Main'],
         'format_cmd': ['google-java-format', '-i', '{file}'],
         'main_class': 'Main',
+        'artifacts': ['*.class'],
     },
     'cpp': {
         'file_ext': '.cpp',
-        'compile_cmd': ['g++', '-std=c++17', '-o', '{dir}/a.out', '{file}'],
+        # Флаги стандарта и оптимизации берутся из профиля (get_cpp_profile_flags)
+        'compile_cmd': ['g++', '-o', '{dir}/a.out', '{file}'],
+        'version_cmd': ['g++', '--version'],
         'run_cmd': ['{dir}/a.out'],
         'format_cmd': ['clang-format', '-i', '{file}'],
+        'artifacts': ['a.out'],
     }
 }
 
+_workspace_manager: Optional[WorkspaceManager] = None
+_workspace_manager_lock = threading.Lock()
+
+def get_workspace_manager() -> WorkspaceManager:
+    """
+    Возвращает менеджер рабочих каталогов запусков
+
+    Корень задается OLYMPIADS_WORKSPACE_ROOT (по умолчанию каталог в
+    /dev/shm), квота на объем файлов - OLYMPIADS_WORKSPACE_QUOTA, число
+    очищенных каталогов для повторного использования -
+    OLYMPIADS_WORKSPACE_POOL_SIZE.
+    """
+    global _workspace_manager
+
+    if _workspace_manager is None:
+        with _workspace_manager_lock:
+            if _workspace_manager is None:
+                _workspace_manager = WorkspaceManager(
+                    str(getattr(settings, 'OLYMPIADS_WORKSPACE_ROOT', None) or default_root()),
+                    pool_size=getattr(settings, 'OLYMPIADS_WORKSPACE_POOL_SIZE', 16),
+                    quota_bytes=getattr(settings, 'OLYMPIADS_WORKSPACE_QUOTA', DEFAULT_WORKSPACE_QUOTA)
+                )
+
+    return _workspace_manager
+
 def create_temp_file(code: str, language: str) -> Tuple[str, str, str]:
     """
-    Создает временный файл с кодом и возвращает путь к файлу и директории
+    Создает файл с кодом в отдельном рабочем каталоге (см. workspace.py)
+    
+    Каталог нужно вернуть через remove_temp_file.
     
     Args:
         code: Исходный код
@@ -80,28 +148,147 @@ def create_temp_file(code: str, language: str) -> Tuple[str, str, str]:
     # Для Java создаем файл с именем Main.java
     if language == 'java':
         file_name = f"{config['main_class']}{config['file_ext']}"
-        temp_dir = tempfile.mkdtemp()
-        file_path = os.path.join(temp_dir, file_name)
     else:
-        # Для других языков используем временный файл
-        fd, file_path = tempfile.mkstemp(suffix=config['file_ext'])
-        os.close(fd)
-        temp_dir = os.path.dirname(file_path)
-        file_name = os.path.basename(file_path)
+        file_name = f"solution{config['file_ext']}"
+    
+    temp_dir = get_workspace_manager().acquire()
+    file_path = os.path.join(temp_dir, file_name)
     
     # Записываем код в файл
-    with open(file_path, 'w') as f:
-        f.write(code)
+    try:
+        with open(file_path, 'w') as f:
+            f.write(code)
+    except OSError:
+        get_workspace_manager().release(temp_dir)
+        raise
     
     return file_path, file_name, temp_dir
 
-def compile_code(file_path: str, language: str) -> None:
+_compile_cache: Optional[CompileCache] = None
+_compile_cache_lock = threading.Lock()
+
+def get_compile_cache() -> Optional[CompileCache]:
+    """
+    Возвращает кэш компиляции, настроенный через OLYMPIADS_COMPILE_CACHE_DIR
+    и OLYMPIADS_COMPILE_CACHE_MAX_BYTES
+
+    Returns:
+        Кэш или None, если кэш отключен (пустая директория или нулевой размер)
+    """
+    global _compile_cache
+
+    if _compile_cache is None:
+        root = getattr(settings, 'OLYMPIADS_COMPILE_CACHE_DIR',
+                       os.path.join(tempfile.gettempdir(), 'olympiads-compile-cache'))
+        max_bytes = getattr(settings, 'OLYMPIADS_COMPILE_CACHE_MAX_BYTES', DEFAULT_COMPILE_CACHE_MAX_BYTES)
+        if not root or max_bytes <= 0:
+            return None
+
+        with _compile_cache_lock:
+            if _compile_cache is None:
+                _compile_cache = CompileCache(str(root), max_bytes)
+
+    return _compile_cache
+
+_compiler_versions: Dict[str, str] = {}
+
+def get_compiler_version(language: str) -> str:
+    """
+    Версия компилятора языка (вывод version_cmd), вычисляется один раз на процесс
+
+    Returns:
+        Версия или пустая строка, если компилятор недоступен
+    """
+    version = _compiler_versions.get(language)
+    if version is None:
+        version = ''
+        cmd = LANGUAGE_CONFIG.get(language, {}).get('version_cmd')
+        if cmd:
+            try:
+                # javac до версии 9 выводит версию в stderr
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+                if result.returncode == 0:
+                    version = result.stdout + result.stderr
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        _compiler_versions[language] = version
+    return version
+
+def get_cpp_profiles() -> Dict[str, List[str]]:
+    """Профили компиляции C++ из настройки OLYMPIADS_CPP_PROFILES"""
+    return getattr(settings, 'OLYMPIADS_CPP_PROFILES', DEFAULT_CPP_PROFILES)
+
+def get_cpp_profile_flags(profile: Optional[str] = None) -> List[str]:
+    """
+    Возвращает флаги компилятора C++ для профиля
+
+    Args:
+        profile: Имя профиля; пустое значение или неизвестный профиль -
+            профиль OLYMPIADS_CPP_DEFAULT_PROFILE
+    """
+    profiles = get_cpp_profiles()
+    if profile and profile in profiles:
+        return list(profiles[profile])
+    default = getattr(settings, 'OLYMPIADS_CPP_DEFAULT_PROFILE', DEFAULT_CPP_PROFILE)
+    return list(profiles.get(default, DEFAULT_CPP_PROFILES[DEFAULT_CPP_PROFILE]))
+
+_pch_manager: Optional[PchManager] = None
+
+def get_pch_manager() -> Optional[PchManager]:
+    """
+    Возвращает менеджер предкомпилированных заголовков C++
+
+    Returns:
+        Менеджер или None, если заголовки отключены (OLYMPIADS_CPP_PCH = False)
+    """
+    global _pch_manager
+
+    if not getattr(settings, 'OLYMPIADS_CPP_PCH', True):
+        return None
+
+    if _pch_manager is None:
+        root = getattr(settings, 'OLYMPIADS_COMPILE_CACHE_DIR', None) or tempfile.gettempdir()
+        with _compile_cache_lock:
+            if _pch_manager is None:
+                _pch_manager = PchManager(os.path.join(str(root), 'pch'))
+
+    return _pch_manager
+
+def prepare_cpp_pch() -> Dict[str, bool]:
+    """
+    Собирает предкомпилированные заголовки для всех профилей C++ и удаляет
+    заголовки старых версий компилятора и удаленных профилей
+
+    Вызывается при запуске обработчиков проверки, чтобы первая компиляция
+    не ждала сборки заголовка.
+
+    Returns:
+        Словарь {профиль: заголовок готов}
+    """
+    manager = get_pch_manager()
+    if manager is None:
+        return {}
+
+    ready = {}
+    dirs = []
+    for profile in get_cpp_profiles():
+        include_dir = manager.include_dir(get_cpp_profile_flags(profile))
+        ready[profile] = include_dir is not None
+        dirs.append(include_dir)
+    manager.prune(dirs)
+    return ready
+
+def compile_code(file_path: str, language: str, compile_profile: Optional[str] = None) -> None:
     """
     Компилирует код, если это необходимо (для языков типа C++, Java)
     
+    Результаты компиляции кэшируются по (язык, версия компилятора, флаги, sha256 исходника),
+    поэтому повторная компиляция того же кода не вызывает компилятор.
+    
     Args:
         file_path: Путь к файлу с исходным кодом
         language: Язык программирования
+        compile_profile: Профиль компиляции C++ (см. get_cpp_profile_flags)
     
     Raises:
         CompilationError: Если компиляция завершилась с ошибкой
@@ -110,14 +297,38 @@ def compile_code(file_path: str, language: str) -> None:
     if not config or not config['compile_cmd']:
         return  # Компиляция не требуется (Python, JavaScript)
     
-    cmd = [c.format(file=file_path, dir=os.path.dirname(file_path)) for c in config['compile_cmd']]
+    work_dir = os.path.dirname(file_path)
+    cmd = [c.format(file=file_path, dir=work_dir) for c in config['compile_cmd']]
+    cache_flags = list(config['compile_cmd'])
+    
+    if language == 'cpp':
+        flags = get_cpp_profile_flags(compile_profile)
+        cache_flags[1:1] = flags
+        # Предкомпилированный заголовок не меняет результат компиляции,
+        # поэтому в ключ кэша не входит
+        pch = get_pch_manager()
+        include_dir = pch.include_dir(flags) if pch is not None else None
+        if include_dir:
+            flags = [*flags, '-I', include_dir]
+        cmd[1:1] = flags
+    
+    # Пробуем взять артефакты из кэша
+    cache = get_compile_cache()
+    cache_key = None
+    if cache is not None:
+        with open(file_path, 'rb') as f:
+            cache_key = cache.make_key(language, cache_flags, f.read(), get_compiler_version(language))
+        if cache.restore(cache_key, work_dir):
+            return
     
     try:
+        quota = get_workspace_manager().quota_bytes
         process = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            universal_newlines=True
+            universal_newlines=True,
+            preexec_fn=(lambda: resource.setrlimit(resource.RLIMIT_FSIZE, (quota, quota))) if quota else None
         )
         stdout, stderr = process.communicate(timeout=30)
         
@@ -126,26 +337,279 @@ def compile_code(file_path: str, language: str) -> None:
     except subprocess.TimeoutExpired:
         process.kill()
         raise CompilationError(f"Компиляция превысила лимит времени (30 секунд)")
+    
+    # Сохраняем артефакты в кэш
+    if cache is not None:
+        artifacts = []
+        for pattern in config.get('artifacts', []):
+            artifacts.extend(glob.glob(os.path.join(work_dir, pattern)))
+        cache.store(cache_key, artifacts)
 
-def limit_resources(max_memory_bytes: int) -> None:
+def remove_temp_file(file_path: str, language: str) -> None:
     """
-    Ограничивает ресурсы для дочернего процесса
-    
+    Удаляет временные файлы, созданные create_temp_file и компиляцией
+
+    Рабочий каталог очищается и возвращается менеджеру для следующего запуска.
+
     Args:
-        max_memory_bytes: Максимальное количество памяти в байтах
+        file_path: Путь к файлу с исходным кодом
+        language: Язык программирования
     """
-    # Ограничение использования памяти
-    resource.setrlimit(resource.RLIMIT_AS, (max_memory_bytes, max_memory_bytes))
-    
-    # Запрещаем создание новых процессов
-    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    import shutil
+
+    work_dir = os.path.dirname(file_path)
+    manager = get_workspace_manager()
+    if manager.owns(work_dir):
+        manager.release(work_dir)
+        return
+
+    try:
+        if LANGUAGE_CONFIG[language]['compile_cmd']:
+            # Исходник и артефакты компиляции лежат в отдельной директории
+            shutil.rmtree(os.path.dirname(file_path))
+        else:
+            os.remove(file_path)
+    except OSError:
+        pass
+
+# Пулы рабочих процессов песочницы по языкам
+_sandbox_pools: Dict[str, SandboxPool] = {}
+_sandbox_pools_lock = threading.Lock()
+_host_slots: Optional[HostSlots] = None
+
+def get_host_slots() -> HostSlots:
+    """
+    Возвращает общий для всех процессов хоста лимит одновременных запусков
+
+    Размер задается OLYMPIADS_SANDBOX_MAX_CONCURRENCY (по умолчанию - число
+    ядер), каталог файлов блокировки - OLYMPIADS_SANDBOX_LOCK_DIR.
+    """
+    global _host_slots
+
+    if _host_slots is None:
+        lock_dir = getattr(settings, 'OLYMPIADS_SANDBOX_LOCK_DIR',
+                           os.path.join(tempfile.gettempdir(), 'olympiads-sandbox-slots'))
+        size = getattr(settings, 'OLYMPIADS_SANDBOX_MAX_CONCURRENCY', None) or os.cpu_count() or 1
+        with _sandbox_pools_lock:
+            if _host_slots is None:
+                _host_slots = HostSlots(str(lock_dir), int(size))
+
+    return _host_slots
+
+def get_sandbox_pool_size(language: str) -> int:
+    """
+    Возвращает размер пула песочницы для языка из настроек
+
+    Настройка OLYMPIADS_SANDBOX_POOL_SIZE может быть числом (одинаково для всех
+    языков) или словарем {'python': 8, 'default': 2}. Значение 0 отключает пул.
+    """
+    pool_size = getattr(settings, 'OLYMPIADS_SANDBOX_POOL_SIZE', DEFAULT_SANDBOX_POOL_SIZE)
+    if isinstance(pool_size, dict):
+        return int(pool_size.get(language, pool_size.get('default', 0)))
+    return int(pool_size)
+
+def get_sandbox_pool(language: str) -> Optional[SandboxPool]:
+    """
+    Возвращает пул рабочих процессов песочницы для языка
+
+    Returns:
+        Пул или None, если пул для языка отключен в настройках
+    """
+    pool = _sandbox_pools.get(language)
+    if pool is not None:
+        return pool
+
+    size = get_sandbox_pool_size(language)
+    if size <= 0:
+        return None
+
+    with _sandbox_pools_lock:
+        pool = _sandbox_pools.get(language)
+        if pool is None:
+            pool = SandboxPool(size)
+            _sandbox_pools[language] = pool
+    return pool
+
+_cgroup_root: Optional[str] = None
+_cgroup_checked = False
+
+def get_cgroup_root() -> Optional[str]:
+    """
+    Возвращает каталог cgroup v2 для изоляции запусков или None для rlimit
+
+    Способ изоляции задается OLYMPIADS_SANDBOX_BACKEND:
+        'rlimit' - ограничения через setrlimit (по умолчанию),
+        'cgroup' - cgroup v2 в каталоге OLYMPIADS_CGROUP_ROOT,
+        'auto' - cgroup v2, если она доступна, иначе rlimit.
+    Если cgroup недоступна, используется rlimit.
+    """
+    global _cgroup_root, _cgroup_checked
+
+    if not _cgroup_checked:
+        backend = getattr(settings, 'OLYMPIADS_SANDBOX_BACKEND', 'rlimit')
+        root = str(getattr(settings, 'OLYMPIADS_CGROUP_ROOT', DEFAULT_CGROUP_ROOT))
+        if backend in ('cgroup', 'auto'):
+            if cgroup_available(root):
+                _cgroup_root = root
+            elif backend == 'cgroup':
+                logger.warning("cgroup v2 недоступна в %s, используются ограничения rlimit", root)
+        _cgroup_checked = True
+
+    return _cgroup_root
+
+_java_runner_pool: Optional[JavaRunnerPool] = None
+_java_runner_checked = False
+_java_flags: Optional[List[str]] = None
+_java_lock = threading.Lock()
+
+def get_java_cache_dir() -> str:
+    """Каталог для собранного JudgeRunner и архива CDS (рядом с кэшем компиляции)"""
+    root = getattr(settings, 'OLYMPIADS_COMPILE_CACHE_DIR', None) or tempfile.gettempdir()
+    cache_dir = os.path.join(str(root), 'java')
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+def get_java_flags() -> List[str]:
+    """
+    Возвращает флаги быстрого старта JVM для запуска решения отдельным
+    процессом; архив CDS с классами JDK собирается при первом вызове
+    """
+    global _java_flags
+
+    if _java_flags is None:
+        with _java_lock:
+            if _java_flags is None:
+                try:
+                    cds_archive = build_cds_archive(get_java_cache_dir())
+                except OSError:
+                    cds_archive = None
+                _java_flags = jvm_flags(cds_archive)
+
+    return _java_flags
+
+def get_java_runner_pool() -> Optional[JavaRunnerPool]:
+    """
+    Возвращает пул прогретых JVM, если OLYMPIADS_JAVA_MODE = 'warm'
+
+    Returns:
+        Пул или None, если используется запуск процессом на тест или
+        JudgeRunner не удалось собрать
+    """
+    global _java_runner_pool, _java_runner_checked
+
+    if not _java_runner_checked:
+        with _java_lock:
+            if not _java_runner_checked:
+                if getattr(settings, 'OLYMPIADS_JAVA_MODE', 'process') == 'warm':
+                    try:
+                        runner_dir = build_runner(get_java_cache_dir())
+                        size = get_sandbox_pool_size('java') or 1
+                        _java_runner_pool = JavaRunnerPool(runner_dir, size)
+                    except (OSError, JavaRunnerError) as e:
+                        logger.warning("Прогретые JVM недоступны, Java запускается процессом на тест: %s", e)
+                _java_runner_checked = True
+
+    return _java_runner_pool
+
+def get_output_limit() -> int:
+    """Ограничение объема вывода программы в байтах (OLYMPIADS_OUTPUT_LIMIT)"""
+    return getattr(settings, 'OLYMPIADS_OUTPUT_LIMIT', DEFAULT_OUTPUT_LIMIT)
+
+def run_in_sandbox(
+    cmd: List[str],
+    language: str,
+    input_data: str = "",
+    time_limit: float = DEFAULT_TIME_LIMIT,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    cwd: Optional[str] = None,
+    python_file: Optional[str] = None,
+    expected_output: Optional[str] = None,
+    checker: Optional[Dict[str, Any]] = None,
+    capture_limit: int = MAX_OUTPUT_LENGTH,
+    input_file: Optional[str] = None,
+    expected_file: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Запускает команду через пул песочницы языка, а если пул отключен или
+    недоступен - напрямую из текущего процесса
+
+    Args:
+        cmd: Команда запуска
+        language: Язык программирования (определяет пул)
+        input_data: Входные данные
+        time_limit: Ограничение времени выполнения в секундах
+        memory_limit: Ограничение памяти в байтах
+        cwd: Рабочий каталог процесса
+        python_file: Python-файл для запуска в уже прогретом интерпретаторе
+        expected_output: Ожидаемый ответ для сравнения с выводом по мере чтения
+        checker: Режим проверки вывода (см. checkers.make_checker)
+        capture_limit: Сколько байт каждого потока сохранять в результате
+        input_file: Файл, подаваемый на stdin вместо input_data (см. blob_store.py)
+        expected_file: Файл с ожидаемым ответом вместо expected_output
+
+    Returns:
+        Результат sandbox.execute
+    """
+    job = {
+        'cmd': cmd,
+        'input_data': input_data,
+        'time_limit': time_limit,
+        'memory_limit': memory_limit,
+        'cwd': cwd,
+        'output_limit': get_output_limit(),
+        'capture_limit': capture_limit,
+        'expected_output': expected_output,
+        'checker': checker,
+        'cgroup_root': get_cgroup_root(),
+        'file_size_limit': get_workspace_manager().quota_bytes or None,
+        'input_file': input_file,
+        'expected_file': expected_file,
+    }
+
+    # Не даем параллельным проверкам занять больше ядер, чем есть на хосте:
+    # иначе замеры времени становятся нестабильными
+    with get_host_slots().acquire():
+        java_pool = get_java_runner_pool() if language == 'java' and cwd else None
+        if java_pool is not None:
+            try:
+                return java_pool.run(
+                    memory_limit,
+                    class_dir=cwd,
+                    input_data=input_data,
+                    time_limit=time_limit,
+                    output_limit=job['output_limit'],
+                    capture_limit=capture_limit,
+                    expected_output=expected_output,
+                    checker=checker,
+                    input_file=input_file,
+                    expected_file=expected_file
+                )
+            except JavaRunnerError:
+                # Раннер не запустился или упал - запускаем отдельным процессом
+                pass
+
+        pool = get_sandbox_pool(language)
+        if pool is not None:
+            try:
+                return pool.run(python_file=python_file, **job)
+            except SandboxError:
+                # Рабочий процесс упал или завис - выполняем запуск напрямую
+                pass
+
+        return execute(**job)
 
 def run_code_with_input(
     file_path: str, 
     language: str, 
     input_data: str = "",
     time_limit: float = DEFAULT_TIME_LIMIT,
-    memory_limit: int = DEFAULT_MEMORY_LIMIT
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    compiled: bool = False,
+    expected_output: Optional[str] = None,
+    checker: Optional[Dict[str, Any]] = None,
+    compile_profile: Optional[str] = None,
+    input_file: Optional[str] = None,
+    expected_file: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Запускает код с заданными входными данными и ограничениями
@@ -156,14 +620,25 @@ def run_code_with_input(
         input_data: Входные данные
         time_limit: Ограничение времени выполнения в секундах
         memory_limit: Ограничение памяти в байтах
+        compiled: True, если код уже скомпилирован (компиляция пропускается)
+        expected_output: Ожидаемый ответ; вывод сравнивается с ним по мере
+            чтения, итог сравнения возвращается в поле 'matched'
+        checker: Режим проверки вывода (по умолчанию точное сравнение)
+        compile_profile: Профиль компиляции C++ (см. get_cpp_profile_flags)
+        input_file: Файл с входными данными вместо input_data; передается
+            программе на stdin без чтения в память
+        expected_file: Файл с ожидаемым ответом вместо expected_output;
+            читается по частям во время сравнения
     
     Returns:
         Словарь с результатами выполнения:
         {
             'status': 'success' или 'error',
             'output': строка вывода (при успехе) или сообщение об ошибке,
-            'execution_time': время выполнения в секундах,
-            'memory_used': использованная память в байтах (приблизительно)
+            'execution_time': процессорное время (user + sys) в секундах,
+            'wall_time': реальное время выполнения в секундах,
+            'memory_used': пиковый объем резидентной памяти в байтах,
+            'matched': совпал ли вывод с expected_output (если он задан)
         }
     """
     try:
@@ -175,69 +650,95 @@ def run_code_with_input(
             }
         
         # Компилируем код, если требуется
-        if config['compile_cmd']:
-            compile_code(file_path, language)
+        if config['compile_cmd'] and not compiled:
+            compile_code(file_path, language, compile_profile)
         
         # Подготавливаем команду запуска
         cmd = [c.format(file=file_path, dir=os.path.dirname(file_path)) for c in config['run_cmd']]
+        if language == 'java':
+            cmd[1:1] = get_java_flags()
         
-        # Запускаем процесс
-        start_time = time.time()
-        
-        process = subprocess.Popen(
+        # Запускаем процесс в песочнице
+        result = run_in_sandbox(
             cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True,
-            preexec_fn=lambda: limit_resources(memory_limit)
+            language,
+            input_data,
+            time_limit,
+            memory_limit,
+            cwd=os.path.dirname(file_path),
+            python_file=file_path if language == 'python' else None,
+            expected_output=expected_output,
+            checker=checker,
+            input_file=input_file,
+            expected_file=expected_file
         )
+        stdout = result['stdout']
+        stderr = result['stderr']
         
-        try:
-            stdout, stderr = process.communicate(input=input_data, timeout=time_limit)
-            execution_time = time.time() - start_time
-            
-            # Ограничиваем размер вывода
-            if len(stdout) > MAX_OUTPUT_LENGTH:
-                stdout = stdout[:MAX_OUTPUT_LENGTH] + "\n... (вывод обрезан)"
-            
-            if process.returncode != 0:
-                return {
-                    'status': 'error',
-                    'output': f"Ошибка выполнения (код {process.returncode}):\n{stderr}",
-                    'execution_time': execution_time
-                }
-            
-            # Если есть вывод ошибок, но код возврата 0, добавляем их к stdout
-            if stderr and process.returncode == 0:
-                full_output = stdout
-                if stderr.strip():
-                    full_output += "\n--- Stderr ---\n" + stderr
-                
-                return {
-                    'status': 'success',
-                    'output': full_output,
-                    'execution_time': execution_time
-                }
-            
+        # Файлы, созданные программой, не должны превышать квоту каталога
+        manager = get_workspace_manager()
+        if manager.owns(os.path.dirname(file_path)):
+            manager.check_quota(os.path.dirname(file_path))
+        
+        # Процессорное время, реальное время и пиковая память запуска
+        usage = {
+            'execution_time': result['execution_time'],
+            'wall_time': result['wall_time'],
+            'memory_used': result['memory_used']
+        }
+        
+        if result['timed_out']:
             return {
-                'status': 'success',
-                'output': stdout,
-                'execution_time': execution_time
+                'status': 'error',
+                'output': f"Превышено ограничение времени выполнения ({time_limit} сек)",
+                'timed_out': True,
+                **usage
             }
-            
-        except subprocess.TimeoutExpired:
-            # Если процесс не завершился вовремя, убиваем его
-            os.killpg(os.getpgid(process.pid), signal.SIGTERM)
-            process.kill()
-            
+        
+        if result['memory_limit_exceeded']:
             return {
                 'status': 'error',
-                'output': f"Превышено ограничение времени выполнения ({time_limit} сек)",
-                'execution_time': time_limit
+                'output': f"Превышено ограничение памяти ({memory_limit // (1024 * 1024)} МБ)",
+                'memory_limit_exceeded': True,
+                **usage
+            }
+        
+        if result['output_limit_exceeded']:
+            return {
+                'status': 'error',
+                'output': f"Превышено ограничение объема вывода ({get_output_limit() // (1024 * 1024)} МБ)",
+                'output_limit_exceeded': True,
+                **usage
+            }
+        
+        # Сохраняется только начало вывода
+        if result['output_truncated']:
+            stdout += "\n... (вывод обрезан)"
+        
+        if result['returncode'] != 0:
+            return {
+                'status': 'error',
+                'output': f"Ошибка выполнения (код {result['returncode']}):\n{stderr}",
+                **usage
+            }
+        
+        # Если есть вывод ошибок, но код возврата 0, добавляем их к stdout
+        if stderr.strip():
+            return {
+                'status': 'success',
+                'output': stdout + "\n--- Stderr ---\n" + stderr,
+                'matched': result['matched'],
+                **usage
             }
+        
+        return {
+            'status': 'success',
+            'output': stdout,
+            'matched': result['matched'],
+            **usage
+        }
     
-    except CompilationError as e:
+    except (CompilationError, WorkspaceQuotaExceeded) as e:
         return {
             'status': 'error',
             'output': str(e)
@@ -245,15 +746,271 @@ def run_code_with_input(
     except Exception as e:
         return {
             'status': 'error',
-            'output': f"Внутренняя ошибка: {str(e)}"
+            'output': f"Внутренняя ошибка: {str(e)}",
+            'internal_error': True
+        }
+
+def run_test_case(
+    file_path: str,
+    language: str,
+    test_number: int,
+    test_case: Dict[str, str],
+    time_limit: float = DEFAULT_TIME_LIMIT,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    checker: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Запускает уже скомпилированный код на одном тестовом случае
+
+    Тестовый случай может задавать ввод файлом ('input_file'), тогда 'input'
+    используется только для отображения, и ответ файлом ('expected_file');
+    'expected_preview' заменяет ожидаемый ответ в результате теста.
+
+    Returns:
+        Результат теста в формате элемента test_results из check_solution
+    """
+    input_data = test_case.get('input', '')
+    input_file = test_case.get('input_file')
+    expected_file = test_case.get('expected_file')
+    expected_output = test_case.get('expected', '').strip()
+    expected_shown = test_case.get('expected_preview', expected_output)
+    
+    # Запускаем код с текущим входным набором; вывод сравнивается с
+    # ожидаемым по мере чтения и целиком в памяти не хранится
+    result = run_code_with_input(
+        file_path, 
+        language, 
+        input_data, 
+        time_limit, 
+        memory_limit,
+        compiled=True,
+        expected_output=expected_output,
+        checker=checker,
+        input_file=input_file,
+        expected_file=expected_file
+    )
+    
+    if result['status'] == 'success':
+        return {
+            'test_number': test_number,
+            'input': input_data,
+            'expected': expected_shown,
+            'actual': result['output'].strip(),
+            'execution_time': result.get('execution_time', 0),
+            'wall_time': result.get('wall_time', 0),
+            'memory_used': result.get('memory_used', 0),
+            'passed': bool(result['matched'])
         }
+    
+    # Если произошла ошибка выполнения, помечаем тест как не пройденный
+    test_result = {
+        'test_number': test_number,
+        'input': input_data,
+        'expected': expected_shown,
+        'actual': result['output'],
+        'execution_time': result.get('execution_time', 0),
+        'wall_time': result.get('wall_time', 0),
+        'memory_used': result.get('memory_used', 0),
+        'passed': False,
+        'error': True
+    }
+    # Причина ошибки; превышение времени и внутренние ошибки зависят от
+    # нагрузки на сервер, а не только от решения - такие результаты не кэшируются
+    for flag in ('timed_out', 'memory_limit_exceeded', 'output_limit_exceeded', 'internal_error'):
+        if result.get(flag):
+            test_result[flag] = True
+    return test_result
+
+def prepare_custom_checker(checker: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    """
+    Компилирует внешний чекер (C++) и возвращает режим проверки с командой запуска
+
+    Returns:
+        Кортеж (режим_проверки, путь_к_исходнику_чекера); исходник удаляется
+        через remove_temp_file(путь, 'cpp') после проверки
+
+    Raises:
+        CompilationError: Если чекер не компилируется
+    """
+    file_path, _, temp_dir = create_temp_file(checker['source'], 'cpp')
+    try:
+        compile_code(file_path, 'cpp')
+    except Exception:
+        remove_temp_file(file_path, 'cpp')
+        raise
+
+    spec = {key: value for key, value in checker.items() if key != 'source'}
+    spec['cmd'] = [c.format(file=file_path, dir=temp_dir) for c in LANGUAGE_CONFIG['cpp']['run_cmd']]
+    return spec, file_path
+
+def get_test_workers() -> int:
+    """
+    Возвращает число параллельно проверяемых тестов одного решения
+
+    OLYMPIADS_PARALLEL_TESTS: 0 или 1 - последовательная проверка,
+    None (по умолчанию) - по числу ядер хоста.
+    """
+    workers = getattr(settings, 'OLYMPIADS_PARALLEL_TESTS', None)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(1, int(workers))
+
+def run_test_batch(
+    file_path: str,
+    language: str,
+    test_cases: List[Dict[str, str]],
+    test_results: List[Optional[Dict[str, Any]]],
+    time_limit: float,
+    memory_limit: int,
+    checker: Optional[Dict[str, Any]],
+    workers: int,
+    indices: Iterable[int],
+    on_failure: Optional[Callable[[int], Iterable[int]]] = None
+) -> None:
+    """
+    Запускает тесты с номерами indices и записывает результаты в test_results
+
+    Args:
+        workers: Число параллельно выполняемых тестов
+        on_failure: Вызывается для непройденного теста и возвращает номера
+            тестов, которые больше не нужно запускать
+    """
+    indices = list(indices)
+    if workers <= 1:
+        # Проверяем каждый тестовый случай по очереди
+        cancelled = set()
+        for i in indices:
+            if i in cancelled:
+                continue
+            test_results[i] = run_test_case(
+                file_path, language, i + 1, test_cases[i], time_limit, memory_limit, checker
+            )
+            if on_failure and not test_results[i]['passed']:
+                cancelled.update(on_failure(i))
+        return
+    
+    # Раздаем тесты пулу потоков; сами запуски ограничены слотами хоста
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            i: executor.submit(
+                run_test_case, file_path, language, i + 1, test_cases[i], time_limit, memory_limit, checker
+            )
+            for i in indices
+        }
+        numbers = {future: i for i, future in futures.items()}
+        
+        for future in as_completed(numbers):
+            if future.cancelled():
+                continue
+            i = numbers[future]
+            test_results[i] = future.result()
+            if on_failure and not test_results[i]['passed']:
+                # Отменяем тесты, которые еще не начали выполняться
+                for j in on_failure(i):
+                    if j in futures:
+                        futures[j].cancel()
+
+def run_test_groups(
+    file_path: str,
+    language: str,
+    test_cases: List[Dict[str, str]],
+    test_results: List[Optional[Dict[str, Any]]],
+    time_limit: float,
+    memory_limit: int,
+    checker: Optional[Dict[str, Any]],
+    workers: int,
+    groups: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Запускает тесты по группам (подзадачам)
+    
+    Группа описывается словарем {'id', 'depends_on': [id, ...], 'is_sample',
+    'all_or_nothing'}. Сначала выполняются группы примеров, затем остальные:
+    группа запускается, когда пройдены все группы, от которых она зависит, а
+    если какая-то из них не пройдена - тесты группы пропускаются. В группе
+    all_or_nothing после первого непройденного теста остальные ее тесты не
+    запускаются. Тесты без группы выполняются вместе с первыми группами после
+    примеров.
+    
+    Returns:
+        Результаты групп в порядке groups:
+        [{'id', 'passed', 'skipped', 'passed_count', 'total_count'}, ...]
+    """
+    by_id = {group['id']: group for group in groups}
+    members: Dict[Any, List[int]] = {group['id']: [] for group in groups}
+    ungrouped = []
+    for i, test_case in enumerate(test_cases):
+        members.get(test_case.get('group'), ungrouped).append(i)
+    group_of = {i: group_id for group_id, indices in members.items() for i in indices}
+    
+    def dependencies(group_id):
+        return [d for d in by_id[group_id].get('depends_on', ()) if d in by_id and d != group_id]
+    
+    def on_failure(i):
+        group_id = group_of.get(i)
+        if group_id is not None and by_id[group_id].get('all_or_nothing'):
+            return members[group_id]
+        return ()
+    
+    passed: Dict[Any, bool] = {}
+    skipped = set()
+    pending = [group['id'] for group in groups]
+    
+    while pending or ungrouped:
+        # Пропускаем группы, зависящие от непройденных (в том числе транзитивно)
+        changed = True
+        while changed:
+            changed = False
+            for group_id in list(pending):
+                if any(passed.get(d) is False for d in dependencies(group_id)):
+                    passed[group_id] = False
+                    skipped.add(group_id)
+                    pending.remove(group_id)
+                    changed = True
+        
+        ready = [group_id for group_id in pending if all(passed.get(d) for d in dependencies(group_id))]
+        if pending and not ready:
+            # Циклические зависимости - запускаем оставшиеся группы как есть
+            ready = list(pending)
+        samples = [group_id for group_id in ready if by_id[group_id].get('is_sample')]
+        if samples:
+            ready = samples
+        
+        indices = [i for group_id in ready for i in members[group_id]]
+        if not samples:
+            indices += ungrouped
+            ungrouped = []
+        run_test_batch(
+            file_path, language, test_cases, test_results, time_limit, memory_limit, checker, workers,
+            indices, on_failure
+        )
+        
+        for group_id in ready:
+            passed[group_id] = all(test_results[i] is not None and test_results[i]['passed'] for i in members[group_id])
+            pending.remove(group_id)
+    
+    return [
+        {
+            'id': group['id'],
+            'passed': passed.get(group['id'], False),
+            'skipped': group['id'] in skipped,
+            'passed_count': sum(1 for i in members[group['id']] if test_results[i] and test_results[i]['passed']),
+            'total_count': len(members[group['id']])
+        }
+        for group in groups
+    ]
 
 def check_solution(
     code: str,
     language: str,
     test_cases: List[Dict[str, str]],
     time_limit: float = DEFAULT_TIME_LIMIT,
-    memory_limit: int = DEFAULT_MEMORY_LIMIT
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    parallel: bool = True,
+    fail_fast: bool = False,
+    checker: Optional[Dict[str, Any]] = None,
+    compile_profile: Optional[str] = None,
+    groups: Optional[List[Dict[str, Any]]] = None
 ) -> Dict[str, Any]:
     """
     Проверяет решение на наборе тестовых случаев
@@ -264,6 +1021,14 @@ def check_solution(
         test_cases: Список тестовых случаев вида [{'input': '...', 'expected': '...'}]
         time_limit: Ограничение времени выполнения в секундах
         memory_limit: Ограничение памяти в байтах
+        parallel: Запускать тесты параллельно (число потоков - get_test_workers)
+        fail_fast: Прекратить проверку после первого непройденного теста;
+            не запущенные тесты помечаются как пропущенные ('skipped')
+        checker: Режим проверки вывода (см. checkers.make_checker); для
+            режима 'custom' исходный код чекера на C++ передается в 'source'
+        compile_profile: Профиль компиляции C++ (см. get_cpp_profile_flags)
+        groups: Группы тестов (подзадачи), см. run_test_groups; тест
+            относится к группе по ключу 'group'. С группами fail_fast не действует
     
     Returns:
         Словарь с результатами проверки:
@@ -272,18 +1037,35 @@ def check_solution(
             'all_passed': True/False если все тесты пройдены,
             'passed_count': количество пройденных тестов,
             'total_count': общее количество тестов,
-            'test_results': список результатов по каждому тесту,
+            'test_results': список результатов по каждому тесту (в порядке тестов),
+            'group_results': результаты групп (только если заданы groups),
             'error': сообщение об ошибке (если есть)
         }
     """
+    checker_path = None
+    file_path = None
     try:
+        # Компилируем внешний чекер задания, если он задан исходным кодом
+        if checker and checker.get('mode') == 'custom' and 'source' in checker:
+            try:
+                checker, checker_path = prepare_custom_checker(checker)
+            except CompilationError as e:
+                return {
+                    'status': 'error',
+                    'error': f"Ошибка компиляции чекера: {e}",
+                    'all_passed': False,
+                    'passed_count': 0,
+                    'total_count': len(test_cases),
+                    'test_results': []
+                }
+        
         # Создаем временный файл с кодом
         file_path, _, _ = create_temp_file(code, language)
         
         # Компилируем код, если требуется
         try:
             if LANGUAGE_CONFIG[language]['compile_cmd']:
-                compile_code(file_path, language)
+                compile_code(file_path, language, compile_profile)
         except CompilationError as e:
             return {
                 'status': 'error',
@@ -294,63 +1076,42 @@ def check_solution(
                 'test_results': []
             }
         
-        # Проверяем каждый тестовый случай
-        test_results = []
-        passed_count = 0
+        test_results: List[Optional[Dict[str, Any]]] = [None] * len(test_cases)
+        workers = min(get_test_workers(), len(test_cases)) if parallel else 1
+        
+        run_args = (file_path, language, test_cases, test_results, time_limit, memory_limit, checker, workers)
+        group_results = None
+        if groups:
+            group_results = run_test_groups(*run_args, groups)
+        else:
+            all_tests = range(len(test_cases))
+            run_test_batch(*run_args, all_tests, on_failure=(lambda i: all_tests) if fail_fast else None)
         
+        # Не запущенные из-за fail_fast или проваленных групп тесты
         for i, test_case in enumerate(test_cases):
-            input_data = test_case.get('input', '')
-            expected_output = test_case.get('expected', '').strip()
-            
-            # Запускаем код с текущим входным набором
-            result = run_code_with_input(
-                file_path, 
-                language, 
-                input_data, 
-                time_limit, 
-                memory_limit
-            )
-            
-            if result['status'] == 'success':
-                actual_output = result['output'].strip()
-                is_passed = actual_output == expected_output
-                
-                if is_passed:
-                    passed_count += 1
-                
-                test_results.append({
-                    'test_number': i + 1,
-                    'input': input_data,
-                    'expected': expected_output,
-                    'actual': actual_output,
-                    'execution_time': result.get('execution_time', 0),
-                    'passed': is_passed
-                })
-            else:
-                # Если произошла ошибка выполнения, помечаем тест как не пройденный
-                test_results.append({
+            if test_results[i] is None:
+                test_results[i] = {
                     'test_number': i + 1,
-                    'input': input_data,
-                    'expected': expected_output,
-                    'actual': result['output'],
-                    'execution_time': result.get('execution_time', 0),
+                    'input': test_case.get('input', ''),
+                    'expected': test_case.get('expected_preview', test_case.get('expected', '').strip()),
+                    'actual': '',
+                    'execution_time': 0,
                     'passed': False,
-                    'error': True
-                })
+                    'skipped': True
+                }
         
-        # Очищаем временный файл
-        try:
-            os.remove(file_path)
-        except:
-            pass
+        passed_count = sum(1 for result in test_results if result['passed'])
         
-        return {
+        result = {
             'status': 'success',
             'all_passed': passed_count == len(test_cases),
             'passed_count': passed_count,
             'total_count': len(test_cases),
             'test_results': test_results
         }
+        if group_results is not None:
+            result['group_results'] = group_results
+        return result
     
     except Exception as e:
         return {
@@ -361,6 +1122,12 @@ def check_solution(
             'total_count': len(test_cases),
             'test_results': []
         }
+    finally:
+        # Рабочие каталоги освобождаются и при ошибке компиляции
+        if file_path:
+            remove_temp_file(file_path, language)
+        if checker_path:
+            remove_temp_file(checker_path, 'cpp')
 
 def format_code(code: str, language: str) -> Dict[str, Any]:
     """
@@ -413,12 +1180,6 @@ def format_code(code: str, language: str) -> Dict[str, Any]:
             with open(file_path, 'r') as f:
                 formatted_code = f.read()
             
-            # Очищаем временный файл
-            try:
-                os.remove(file_path)
-            except:
-                pass
-            
             return {
                 'status': 'success',
                 'formatted_code': formatted_code
@@ -431,6 +1192,10 @@ def format_code(code: str, language: str) -> Dict[str, Any]:
                 'error': "Форматирование превысило лимит времени (10 секунд)"
             }
         
+        finally:
+            # Возвращаем рабочий каталог менеджеру при любом исходе
+            remove_temp_file(file_path, language)
+        
     except Exception as e:
         return {
             'status': 'error',
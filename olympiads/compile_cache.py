@@ -0,0 +1,163 @@
+"""
+Кэш результатов компиляции решений (C++, Java).
+
+Артефакты компиляции хранятся на диске в каталоге, адресуемом ключом
+sha256(язык, версия компилятора, флаги компилятора, исходный код), поэтому
+после обновления компилятора старые записи не используются. Повторный запуск
+того же кода восстанавливает артефакты из кэша вместо вызова компилятора. Размер кэша
+ограничивается суммарным объемом файлов, при переполнении удаляются давно не
+использовавшиеся записи (LRU по времени последнего обращения).
+"""
+import os
+import glob
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Iterable
+
+
+class CompileCache:
+    """Дисковый кэш артефактов компиляции с LRU-вытеснением по объему"""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Optional["OrderedDict[str, int]"] = None
+
+    @staticmethod
+    def make_key(language: str, flags: Iterable[str], source: bytes, compiler_version: str = '') -> str:
+        """Вычисляет ключ записи по языку, флагам и версии компилятора и исходному коду"""
+        digest = hashlib.sha256()
+        digest.update(json.dumps([language, compiler_version, list(flags)]).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(source)
+        return digest.hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        total = 0
+        for name in os.listdir(path):
+            try:
+                total += os.path.getsize(os.path.join(path, name))
+            except OSError:
+                pass
+        return total
+
+    def _scan(self) -> "OrderedDict[str, int]":
+        """Читает записи кэша с диска в порядке от давно использованных к недавним"""
+        found = []
+        for entry_dir in glob.glob(os.path.join(self.root, '??', '*')):
+            key = os.path.basename(entry_dir)
+            if key.startswith('.'):
+                continue
+            try:
+                found.append((os.stat(entry_dir).st_mtime, key, self._dir_size(entry_dir)))
+            except OSError:
+                continue
+        found.sort()
+        return OrderedDict((key, size) for _, key, size in found)
+
+    def _index(self) -> "OrderedDict[str, int]":
+        if self._entries is None:
+            self._entries = self._scan()
+        return self._entries
+
+    def restore(self, key: str, dest_dir: str) -> bool:
+        """
+        Копирует артефакты из кэша в каталог запуска
+
+        Returns:
+            True при попадании в кэш
+        """
+        entry_dir = self._entry_dir(key)
+        try:
+            names = os.listdir(entry_dir)
+            for name in names:
+                shutil.copy2(os.path.join(entry_dir, name), os.path.join(dest_dir, name))
+            # Время изменения каталога служит отметкой последнего использования
+            os.utime(entry_dir)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+                self._index().pop(key, None)
+            return False
+
+        with self._lock:
+            self.hits += 1
+            entries = self._index()
+            if key in entries:
+                entries.move_to_end(key)
+            else:
+                entries[key] = self._dir_size(entry_dir)
+        return True
+
+    def store(self, key: str, artifacts: List[str]) -> None:
+        """
+        Сохраняет артефакты компиляции в кэш
+
+        Args:
+            key: Ключ записи
+            artifacts: Пути к файлам, полученным при компиляции
+        """
+        entry_dir = self._entry_dir(key)
+        if os.path.isdir(entry_dir) or not artifacts:
+            return
+
+        parent = os.path.dirname(entry_dir)
+        os.makedirs(parent, exist_ok=True)
+
+        # Записываем во временный каталог и атомарно переименовываем, чтобы
+        # параллельные процессы не увидели частично записанную запись
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+        try:
+            size = 0
+            for path in artifacts:
+                target = os.path.join(tmp_dir, os.path.basename(path))
+                shutil.copy2(path, target)
+                size += os.path.getsize(target)
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        with self._lock:
+            entries = self._index()
+            entries[key] = size
+            if sum(entries.values()) > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Удаляет давно использованные записи, пока кэш не уложится в лимит"""
+        # Другие процессы тоже пишут в кэш, поэтому перечитываем его с диска
+        entries = self._entries = self._scan()
+        total = sum(entries.values())
+        while entries and total > self.max_bytes:
+            key, size = entries.popitem(last=False)
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает счетчики попаданий и промахов и текущий размер кэша"""
+        with self._lock:
+            entries = self._index()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(entries),
+                'bytes': sum(entries.values()),
+            }
+
+    def clear(self) -> None:
+        """Полностью очищает кэш"""
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self._entries = OrderedDict()
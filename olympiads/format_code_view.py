@@ -3,7 +3,7 @@ from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 import json
 
-from .code_runner import format_code as format_code_function
+from .formatter import get_formatter_service
 
 @csrf_exempt
 @require_POST
@@ -14,8 +14,19 @@ def format_code_view(request):
         code = data.get('code', '')
         language = data.get('language', 'python')
         
-        # Используем функцию из code_runner для форматирования
-        result = format_code_function(code, language)
+        # Ограничение частоты запросов - по пользователю, для гостей по IP
+        if request.user.is_authenticated:
+            rate_key = f'user:{request.user.pk}'
+        else:
+            rate_key = f"ip:{request.META.get('REMOTE_ADDR', '')}"
+        
+        result = get_formatter_service().format(code, language, rate_key=rate_key)
+        
+        if result.get('rate_limited'):
+            return JsonResponse({
+                'status': 'error',
+                'error': result['error']
+            }, status=429)
         
         if result['status'] == 'success':
             return JsonResponse({
@@ -0,0 +1,284 @@
+"""
+Сервис форматирования кода для редактора.
+
+Форматирование вызывается из редактора очень часто, поэтому запуск
+форматера отдельным процессом на каждый запрос (code_runner.format_code)
+используется только как запасной вариант:
+
+- Python форматируется в текущем процессе через API библиотеки black;
+- JavaScript - долгоживущим процессом prettier (formatter_daemon.js);
+- результаты хранятся в LRU-кэше по ключу (язык, sha256(код)), поэтому
+  повторный запрос того же кода не запускает форматер вовсе;
+- число запросов, требующих форматирования, ограничено для каждого
+  пользователя (OLYMPIADS_FORMAT_RATE_LIMIT в минуту).
+"""
+import os
+import json
+import time
+import select
+import hashlib
+import logging
+import threading
+import subprocess
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .code_runner import format_code
+
+logger = logging.getLogger(__name__)
+
+try:
+    import black
+except ImportError:
+    black = None
+
+# Размер LRU-кэша отформатированного кода (записей)
+DEFAULT_FORMAT_CACHE_SIZE = 1024
+
+# Запросов форматирования в минуту на пользователя (без учета попаданий в кэш)
+DEFAULT_FORMAT_RATE_LIMIT = 60
+RATE_LIMIT_WINDOW = 60  # секунд
+
+# Ограничения времени процесса-форматера (секунд)
+DAEMON_START_TIMEOUT = 10
+DAEMON_REQUEST_TIMEOUT = 10
+
+# Пауза перед повторной попыткой запустить недоступный процесс-форматер
+DAEMON_RETRY_INTERVAL = 60  # секунд
+
+DAEMON_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'formatter_daemon.js')
+
+# Языки, форматируемые долгоживущими процессами: команда и парсер prettier
+DAEMON_CONFIG = {
+    'javascript': (['node', DAEMON_SCRIPT], 'babel'),
+}
+
+
+class FormatterUnavailable(Exception):
+    """Процесс-форматер не запущен или перестал отвечать"""
+    pass
+
+
+class FormatterDaemon:
+    """
+    Долгоживущий процесс форматирования
+
+    Запросы передаются по одному через stdin/stdout строками JSON (см.
+    formatter_daemon.js). Процесс запускается при первом запросе и
+    перезапускается, если завершился или не ответил вовремя.
+    """
+
+    def __init__(self, cmd: List[str]):
+        self.cmd = cmd
+        self._process: Optional[subprocess.Popen] = None
+        self._buffer = b''
+        self._next_id = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def _read_message(self, timeout: float) -> Dict[str, Any]:
+        deadline = time.monotonic() + timeout
+        fd = self._process.stdout.fileno()
+        while b'\n' not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise FormatterUnavailable("Форматер не ответил вовремя")
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise FormatterUnavailable("Форматер завершился")
+            self._buffer += chunk
+
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        return json.loads(line)
+
+    def _start(self) -> None:
+        if time.monotonic() < self._retry_at:
+            raise FormatterUnavailable("Форматер недоступен")
+
+        try:
+            self._process = subprocess.Popen(
+                self.cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True
+            )
+            self._buffer = b''
+            ready = self._read_message(DAEMON_START_TIMEOUT)
+            if not ready.get('ready'):
+                raise FormatterUnavailable(ready.get('error') or "Форматер не запустился")
+        except (OSError, ValueError, FormatterUnavailable) as e:
+            self.stop()
+            # Не пытаемся запускать форматер на каждый запрос
+            self._retry_at = time.monotonic() + DAEMON_RETRY_INTERVAL
+            logger.warning("Не удалось запустить форматер %s: %s", self.cmd, e)
+            raise FormatterUnavailable(str(e)) from e
+
+    def stop(self) -> None:
+        """Останавливает процесс-форматер"""
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process.stdin.close()
+            self._process.stdout.close()
+            self._process = None
+
+    def format(self, code: str, parser: str) -> Tuple[bool, str]:
+        """
+        Форматирует код
+
+        Returns:
+            Кортеж (успех, отформатированный код или сообщение об ошибке)
+
+        Raises:
+            FormatterUnavailable: Если процесс-форматер недоступен
+        """
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._start()
+
+            self._next_id += 1
+            request = {'id': self._next_id, 'code': code, 'parser': parser}
+            try:
+                self._process.stdin.write(json.dumps(request).encode('utf-8') + b'\n')
+                self._process.stdin.flush()
+                response = self._read_message(DAEMON_REQUEST_TIMEOUT)
+                if response.get('id') != request['id']:
+                    raise FormatterUnavailable("Форматер вернул ответ на другой запрос")
+            except (OSError, ValueError, FormatterUnavailable) as e:
+                self.stop()
+                raise FormatterUnavailable(str(e)) from e
+
+        if 'error' in response:
+            return False, response['error']
+        return True, response['formatted']
+
+
+class FormatterService:
+    """Форматирование кода с LRU-кэшем результатов"""
+
+    def __init__(self, cache_size: int = DEFAULT_FORMAT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._daemons: Dict[str, FormatterDaemon] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(code: str, language: str) -> Tuple[str, str]:
+        return language, hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+    def get_cached(self, code: str, language: str) -> Optional[str]:
+        """Возвращает отформатированный код из кэша или None"""
+        key = self.cache_key(code, language)
+        with self._lock:
+            formatted = self._cache.get(key)
+            if formatted is not None:
+                self._cache.move_to_end(key)
+            return formatted
+
+    def _store(self, code: str, language: str, formatted: str) -> None:
+        with self._lock:
+            self._cache[self.cache_key(code, language)] = formatted
+            # Повторное форматирование результата ничего не меняет
+            self._cache[self.cache_key(formatted, language)] = formatted
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _daemon(self, language: str) -> FormatterDaemon:
+        with self._lock:
+            if language not in self._daemons:
+                self._daemons[language] = FormatterDaemon(DAEMON_CONFIG[language][0])
+            return self._daemons[language]
+
+    def _format_uncached(self, code: str, language: str) -> Dict[str, Any]:
+        if language == 'python' and black is not None:
+            try:
+                return {'status': 'success', 'formatted_code': black.format_str(code, mode=black.Mode())}
+            except Exception as e:
+                return {'status': 'error', 'error': f"Ошибка форматирования ({language}):\n{e}"}
+
+        if language in DAEMON_CONFIG:
+            try:
+                ok, output = self._daemon(language).format(code, DAEMON_CONFIG[language][1])
+                if ok:
+                    return {'status': 'success', 'formatted_code': output}
+                return {'status': 'error', 'error': f"Ошибка форматирования ({language}):\n{output}"}
+            except FormatterUnavailable:
+                # Форматируем отдельным процессом
+                pass
+
+        return format_code(code, language)
+
+    def format(self, code: str, language: str, rate_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Форматирует код
+
+        Args:
+            code: Исходный код
+            language: Язык программирования
+            rate_key: Ключ ограничения частоты запросов (например, пользователь);
+                None - без ограничения
+
+        Returns:
+            Словарь как у code_runner.format_code; при превышении частоты
+            запросов дополнительно 'rate_limited': True
+        """
+        formatted = self.get_cached(code, language)
+        if formatted is not None:
+            return {'status': 'success', 'formatted_code': formatted}
+
+        if rate_key is not None and not allow_format_request(rate_key):
+            return {
+                'status': 'error',
+                'error': "Слишком много запросов форматирования, попробуйте позже",
+                'rate_limited': True
+            }
+
+        result = self._format_uncached(code, language)
+        if result['status'] == 'success':
+            self._store(code, language, result['formatted_code'])
+        return result
+
+
+def allow_format_request(rate_key: str) -> bool:
+    """
+    Учитывает запрос форматирования в ограничении частоты
+
+    Returns:
+        True, если лимит OLYMPIADS_FORMAT_RATE_LIMIT за текущую минуту не превышен
+    """
+    limit = getattr(settings, 'OLYMPIADS_FORMAT_RATE_LIMIT', DEFAULT_FORMAT_RATE_LIMIT)
+    if not limit:
+        return True
+
+    window = int(time.time() // RATE_LIMIT_WINDOW)
+    key = f'olympiads:format_rate:{rate_key}:{window}'
+    cache.add(key, 0, timeout=RATE_LIMIT_WINDOW * 2)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # Запись успела истечь между add и incr
+        cache.set(key, 1, timeout=RATE_LIMIT_WINDOW * 2)
+        count = 1
+    return count <= limit
+
+
+_formatter_service: Optional[FormatterService] = None
+_formatter_service_lock = threading.Lock()
+
+
+def get_formatter_service() -> FormatterService:
+    """Возвращает сервис форматирования текущего процесса"""
+    global _formatter_service
+
+    if _formatter_service is None:
+        with _formatter_service_lock:
+            if _formatter_service is None:
+                _formatter_service = FormatterService(
+                    getattr(settings, 'OLYMPIADS_FORMAT_CACHE_SIZE', DEFAULT_FORMAT_CACHE_SIZE)
+                )
+
+    return _formatter_service
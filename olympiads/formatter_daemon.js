@@ -0,0 +1,42 @@
+// Долгоживущий процесс форматирования кода через prettier (см. formatter.py).
+//
+// Запросы и ответы передаются по одной строке JSON:
+//   -> {"id": 1, "code": "...", "parser": "babel"}
+//   <- {"id": 1, "formatted": "..."} или {"id": 1, "error": "..."}
+// После запуска процесс выводит {"ready": true}, а если prettier не
+// установлен - {"ready": false, "error": "..."} и завершается.
+const readline = require('readline');
+
+function respond(message) {
+    process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+let prettier;
+try {
+    prettier = require('prettier');
+} catch (e) {
+    respond({ ready: false, error: String(e) });
+    process.exit(1);
+}
+
+respond({ ready: true });
+
+const input = readline.createInterface({ input: process.stdin });
+input.on('line', async (line) => {
+    let request;
+    try {
+        request = JSON.parse(line);
+    } catch (e) {
+        respond({ id: null, error: 'Некорректный запрос' });
+        return;
+    }
+
+    try {
+        // В prettier 3 format асинхронный, в prettier 2 - синхронный
+        const formatted = await prettier.format(request.code, { parser: request.parser });
+        respond({ id: request.id, formatted: formatted });
+    } catch (e) {
+        respond({ id: request.id, error: e.message || String(e) });
+    }
+});
+input.on('close', () => process.exit(0));
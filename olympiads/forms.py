@@ -18,6 +18,7 @@ class OlympiadForm(forms.ModelForm):
             'start_datetime', 
             'end_datetime', 
             'time_limit_minutes',
+            'freeze_minutes',
             'is_open',
             'min_passing_score',
             'is_rated',
@@ -56,6 +57,11 @@ class OlympiadForm(forms.ModelForm):
                 'min': '0',
                 'placeholder': '0'
             }),
+            'freeze_minutes': forms.NumberInput(attrs={
+                'class': 'w-full px-3 py-2 border border-gray-300 dark:border-gray-600 rounded-md shadow-sm focus:outline-none focus:ring-blue-500 focus:border-blue-500 dark:bg-gray-700 dark:text-white',
+                'min': '0',
+                'placeholder': '0'
+            }),
             'is_open': forms.CheckboxInput(attrs={
                 'class': 'w-4 h-4 text-blue-600 border-gray-300 rounded focus:ring-blue-500 dark:focus:ring-blue-600 dark:ring-offset-gray-800 dark:bg-gray-700 dark:border-gray-600'
             }),
@@ -0,0 +1,244 @@
+import java.io.BufferedInputStream;
+import java.io.BufferedOutputStream;
+import java.io.BufferedReader;
+import java.io.File;
+import java.io.FileDescriptor;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
+import java.io.FilterOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.management.ManagementFactory;
+import java.lang.management.MemoryPoolMXBean;
+import java.lang.management.MemoryType;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+
+/**
+ * Прогретая JVM для запуска решений на Java (см. olympiads/java_runner.py).
+ *
+ * Процесс читает команды из stdin по одной строке (поля через табуляцию):
+ *
+ *   RUN <каталог классов> <вход> <вывод> <ошибки> <время, мс> <реальное время, мс> <лимит вывода, байт>
+ *
+ * Каждый запуск загружает Main в новом загрузчике классов (статические поля
+ * решения не переживают запуск), подменяет System.in/out/err файлами и
+ * отвечает строкой:
+ *
+ *   DONE <статус> <код возврата> <процессорное время, нс> <реальное время, нс> <пик кучи, байт>
+ *
+ * Статусы: OK, EXCEPTION, TIMEOUT, OOM, OUTPUT_LIMIT. После TIMEOUT и OOM
+ * процесс завершается сам: зависший поток решения нельзя остановить, а куча
+ * после OutOfMemoryError ненадежна. System.exit в решении завершает процесс с
+ * кодом решения - родитель запускает новый.
+ */
+public class JudgeRunner {
+    private static final PrintStream PROTOCOL = new PrintStream(
+        new FileOutputStream(FileDescriptor.out), true, StandardCharsets.UTF_8
+    );
+
+    private static volatile PrintStream currentOut;
+    private static volatile PrintStream currentErr;
+
+    /** Превышение объема вывода; Error, чтобы решение не перехватило его через catch (Exception) */
+    static final class OutputLimitExceeded extends Error {
+        OutputLimitExceeded() {
+            super("Output limit exceeded", null, false, false);
+        }
+    }
+
+    /** Поток вывода с ограничением суммарного объема stdout и stderr */
+    static final class LimitedOutputStream extends FilterOutputStream {
+        private final long[] written;
+        private final long limit;
+
+        LimitedOutputStream(OutputStream out, long[] written, long limit) {
+            super(out);
+            this.written = written;
+            this.limit = limit;
+        }
+
+        private void count(long n) {
+            written[0] += n;
+            if (written[0] > limit) {
+                throw new OutputLimitExceeded();
+            }
+        }
+
+        @Override
+        public void write(int b) throws IOException {
+            count(1);
+            out.write(b);
+        }
+
+        @Override
+        public void write(byte[] b, int off, int len) throws IOException {
+            count(len);
+            out.write(b, off, len);
+        }
+    }
+
+    private static long processCpuTime() {
+        java.lang.management.OperatingSystemMXBean bean = ManagementFactory.getOperatingSystemMXBean();
+        if (bean instanceof com.sun.management.OperatingSystemMXBean) {
+            return ((com.sun.management.OperatingSystemMXBean) bean).getProcessCpuTime();
+        }
+        return ManagementFactory.getThreadMXBean().getCurrentThreadCpuTime();
+    }
+
+    private static void resetHeapPeak() {
+        for (MemoryPoolMXBean pool : ManagementFactory.getMemoryPoolMXBeans()) {
+            if (pool.getType() == MemoryType.HEAP) {
+                pool.resetPeakUsage();
+            }
+        }
+    }
+
+    private static long heapPeak() {
+        long peak = 0;
+        for (MemoryPoolMXBean pool : ManagementFactory.getMemoryPoolMXBeans()) {
+            if (pool.getType() == MemoryType.HEAP) {
+                peak += pool.getPeakUsage().getUsed();
+            }
+        }
+        return peak;
+    }
+
+    private static void respond(String status, int exitCode, long cpu, long wall, long memory) {
+        PROTOCOL.println("DONE\t" + status + "\t" + exitCode + "\t" + cpu + "\t" + wall + "\t" + memory);
+    }
+
+    private static void run(String[] args) throws Exception {
+        File classDir = new File(args[1]);
+        long timeLimitNanos = Long.parseLong(args[5]) * 1_000_000L;
+        long wallLimitMillis = Long.parseLong(args[6]);
+        long outputLimit = Long.parseLong(args[7]);
+        long[] written = new long[1];
+
+        InputStream in = new BufferedInputStream(new FileInputStream(args[2]), 1 << 16);
+        PrintStream out = new PrintStream(new LimitedOutputStream(
+            new BufferedOutputStream(new FileOutputStream(args[3]), 1 << 16), written, outputLimit), false);
+        PrintStream err = new PrintStream(new LimitedOutputStream(
+            new BufferedOutputStream(new FileOutputStream(args[4]), 1 << 13), written, outputLimit), true);
+        currentOut = out;
+        currentErr = err;
+        System.setIn(in);
+        System.setOut(out);
+        System.setErr(err);
+
+        // Родитель - загрузчик платформы: классы самого раннера решению не видны
+        URLClassLoader loader = new URLClassLoader(
+            new URL[] {classDir.toURI().toURL()}, ClassLoader.getPlatformClassLoader()
+        );
+        Throwable[] failure = new Throwable[1];
+
+        Thread thread = new Thread(null, () -> {
+            try {
+                Class<?> mainClass = Class.forName("Main", true, loader);
+                Method main = mainClass.getMethod("main", String[].class);
+                main.invoke(null, (Object) new String[0]);
+            } catch (InvocationTargetException e) {
+                failure[0] = e.getCause();
+            } catch (Throwable e) {
+                failure[0] = e;
+            }
+        }, "main", 256L * 1024 * 1024);
+
+        resetHeapPeak();
+        long cpuStart = processCpuTime();
+        long wallStart = System.nanoTime();
+        thread.start();
+
+        boolean timedOut = false;
+        while (thread.isAlive()) {
+            thread.join(10);
+            long wallMillis = (System.nanoTime() - wallStart) / 1_000_000L;
+            if (processCpuTime() - cpuStart > timeLimitNanos || wallMillis > wallLimitMillis) {
+                timedOut = thread.isAlive();
+                break;
+            }
+        }
+
+        long cpu = processCpuTime() - cpuStart;
+        long wall = System.nanoTime() - wallStart;
+        long memory = heapPeak();
+
+        if (timedOut) {
+            respond("TIMEOUT", 0, cpu, wall, memory);
+            Runtime.getRuntime().halt(3);
+        }
+
+        String status = "OK";
+        int exitCode = 0;
+        Throwable error = failure[0];
+        try {
+            out.flush();
+        } catch (OutputLimitExceeded e) {
+            error = e;
+        }
+
+        if (error instanceof OutputLimitExceeded) {
+            status = "OUTPUT_LIMIT";
+            exitCode = 1;
+        } else if (error instanceof OutOfMemoryError) {
+            respond("OOM", 1, cpu, wall, memory);
+            Runtime.getRuntime().halt(4);
+        } else if (error != null) {
+            status = "EXCEPTION";
+            exitCode = 1;
+            try {
+                error.printStackTrace(err);
+            } catch (OutputLimitExceeded e) {
+                status = "OUTPUT_LIMIT";
+            }
+        }
+
+        try {
+            out.close();
+            err.close();
+            in.close();
+            loader.close();
+        } catch (OutputLimitExceeded | IOException e) {
+            // Файлы запуска больше не нужны
+        }
+        currentOut = null;
+        currentErr = null;
+        respond(status, exitCode, cpu, wall, memory);
+    }
+
+    public static void main(String[] args) throws Exception {
+        // При System.exit в решении сохраняем уже выведенные данные
+        Runtime.getRuntime().addShutdownHook(new Thread(() -> {
+            PrintStream out = currentOut;
+            PrintStream err = currentErr;
+            try {
+                if (out != null) {
+                    out.flush();
+                }
+                if (err != null) {
+                    err.flush();
+                }
+            } catch (Throwable e) {
+                // Процесс все равно завершается
+            }
+        }));
+
+        PROTOCOL.println("READY");
+        BufferedReader commands = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        String line;
+        while ((line = commands.readLine()) != null) {
+            String[] parts = line.split("\t");
+            if (parts.length == 8 && parts[0].equals("RUN")) {
+                run(parts);
+            } else {
+                PROTOCOL.println("ERROR\tunknown command");
+            }
+        }
+    }
+}
@@ -0,0 +1,438 @@
+"""
+Запуск решений на Java в прогретой JVM.
+
+Запуск `java -cp {dir} Main` на каждый тест тратит 0.3-0.6 с на старт JVM,
+что для большинства решений дольше самой программы. В режиме 'warm' тесты
+выполняются долгоживущими процессами JudgeRunner (java/JudgeRunner.java):
+каждый запуск загружает Main в новом загрузчике классов с подмененными
+System.in/out, а раннер, превысивший время или память, убивается и
+запускается заново.
+
+Изоляция здесь слабее, чем у отдельного процесса: решения выполняются по
+одному в одной JVM, память ограничивается размером кучи (-Xmx), а время -
+процессорным временем всего процесса JVM за запуск. Поэтому режим включается
+явно (OLYMPIADS_JAVA_MODE = 'warm').
+
+Для обычного режима (процесс на тест) модуль собирает архив CDS с классами
+JDK, которые используют типичные решения, и добавляет флаги быстрого старта
+JVM (см. jvm_flags). Модуль не зависит от Django.
+"""
+import os
+import time
+import queue
+import select
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from typing import Dict, Any, List, Optional
+
+from .checkers import make_checker
+from .sandbox import SandboxError, sandbox_env, wall_time_limit, _decode, READ_CHUNK_SIZE
+
+RUNNER_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'java', 'JudgeRunner.java')
+
+# Ожидание готовности нового раннера (секунд)
+RUNNER_START_TIMEOUT = 30
+
+# Запас к реальному времени запуска при ожидании ответа раннера (секунд)
+RUNNER_RESPONSE_MARGIN = 5
+
+# Память JVM сверх кучи (метаданные классов, стеки, JIT)
+JVM_OVERHEAD_BYTES = 64 * 1024 * 1024
+
+# Флаги быстрого старта JVM: без многоуровневой JIT-компиляции и с
+# однопоточным сборщиком мусора; неизвестные старым JDK флаги игнорируются
+FAST_START_FLAGS = [
+    '-XX:+IgnoreUnrecognizedVMOptions',
+    '-XX:TieredStopAtLevel=1',
+    '-XX:+UseSerialGC',
+    '-Xshare:auto',
+]
+
+# Классы JDK для архива CDS: ввод-вывод и коллекции типичных решений
+CDS_CLASSES = [
+    'java/util/Scanner',
+    'java/util/StringTokenizer',
+    'java/io/BufferedReader',
+    'java/io/InputStreamReader',
+    'java/io/BufferedWriter',
+    'java/io/OutputStreamWriter',
+    'java/io/PrintWriter',
+    'java/io/StreamTokenizer',
+    'java/util/ArrayList',
+    'java/util/ArrayDeque',
+    'java/util/HashMap',
+    'java/util/HashSet',
+    'java/util/TreeMap',
+    'java/util/TreeSet',
+    'java/util/PriorityQueue',
+    'java/util/Arrays',
+    'java/util/Collections',
+    'java/util/regex/Pattern',
+    'java/util/regex/Matcher',
+    'java/math/BigInteger',
+    'java/math/BigDecimal',
+]
+
+
+class JavaRunnerError(SandboxError):
+    """Раннер не запустился или перестал отвечать"""
+    pass
+
+
+def build_runner(cache_dir: str, javac: str = 'javac') -> str:
+    """
+    Компилирует JudgeRunner (один раз для каждой версии исходника)
+
+    Returns:
+        Каталог с классами раннера
+
+    Raises:
+        JavaRunnerError: Если компиляция не удалась
+    """
+    with open(RUNNER_SOURCE, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+
+    target = os.path.join(cache_dir, f'java-runner-{digest}')
+    if os.path.exists(os.path.join(target, 'JudgeRunner.class')):
+        return target
+
+    build_dir = tempfile.mkdtemp(prefix='java-runner-', dir=cache_dir)
+    try:
+        result = subprocess.run(
+            [javac, '-d', build_dir, RUNNER_SOURCE],
+            capture_output=True, text=True, timeout=120
+        )
+        if result.returncode != 0:
+            raise JavaRunnerError(f"Не удалось скомпилировать JudgeRunner:\n{result.stderr}")
+        try:
+            os.rename(build_dir, target)
+        except OSError:
+            # Раннер одновременно собрал другой процесс
+            shutil.rmtree(build_dir, ignore_errors=True)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise JavaRunnerError(f"Не удалось скомпилировать JudgeRunner: {e}") from e
+    except JavaRunnerError:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    return target
+
+
+def build_cds_archive(cache_dir: str, java: str = 'java') -> Optional[str]:
+    """
+    Создает архив CDS (class data sharing) с классами JDK из CDS_CLASSES
+
+    В архиве нет классов приложения, поэтому он подходит для любого
+    classpath, и отдельная программа на каждый тест стартует быстрее.
+
+    Returns:
+        Путь к архиву или None, если JVM не поддерживает создание архива
+    """
+    path = os.path.join(cache_dir, 'java-jdk.jsa')
+    if os.path.exists(path):
+        return path
+
+    class_list = os.path.join(cache_dir, 'java-jdk.classlist')
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(class_list, 'w') as f:
+            f.write('\n'.join(CDS_CLASSES) + '\n')
+        result = subprocess.run(
+            [java, '-Xshare:dump', f'-XX:SharedClassListFile={class_list}', f'-XX:SharedArchiveFile={tmp_path}'],
+            capture_output=True, timeout=120
+        )
+        if result.returncode != 0 or not os.path.exists(tmp_path):
+            return None
+        os.replace(tmp_path, path)
+        return path
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    finally:
+        for leftover in (class_list, tmp_path):
+            try:
+                os.remove(leftover)
+            except OSError:
+                pass
+
+
+def jvm_flags(cds_archive: Optional[str] = None) -> List[str]:
+    """Флаги JVM для запуска решения отдельным процессом"""
+    flags = list(FAST_START_FLAGS)
+    if cds_archive:
+        flags.append(f'-XX:SharedArchiveFile={cds_archive}')
+    return flags
+
+
+class JavaRunner:
+    """Один процесс JudgeRunner с фиксированным размером кучи"""
+
+    def __init__(self, runner_dir: str, memory_limit: int, java: str = 'java'):
+        self.memory_limit = memory_limit
+        heap_mb = max(16, (memory_limit - JVM_OVERHEAD_BYTES) // (1024 * 1024))
+        # Многоуровневую JIT-компиляцию не отключаем: прогретый процесс
+        # успевает скомпилировать классы JDK оптимизирующим компилятором
+        self.cmd = [
+            java, '-XX:+IgnoreUnrecognizedVMOptions', '-XX:+UseSerialGC', '-Xshare:auto',
+            f'-Xmx{heap_mb}m', f'-Xms{min(heap_mb, 64)}m',
+            '-XX:-UsePerfData', '-cp', runner_dir, 'JudgeRunner'
+        ]
+        self.process: Optional[subprocess.Popen] = None
+        self._buffer = b''
+
+    def _read_line(self, timeout: float) -> Optional[str]:
+        """Читает строку протокола; None - раннер завершился или не ответил"""
+        deadline = time.monotonic() + timeout
+        fd = self.process.stdout.fileno()
+        while b'\n' not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                return None
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                return None
+            self._buffer += chunk
+
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        return line.decode('utf-8', errors='replace')
+
+    def start(self) -> None:
+        self._buffer = b''
+        try:
+            self.process = subprocess.Popen(
+                self.cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                env=sandbox_env(),
+                start_new_session=True
+            )
+        except OSError as e:
+            raise JavaRunnerError(f"Не удалось запустить JVM: {e}") from e
+
+        if self._read_line(RUNNER_START_TIMEOUT) != 'READY':
+            self.kill()
+            raise JavaRunnerError("JudgeRunner не запустился")
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def kill(self) -> None:
+        """Убивает раннер (вместе с потоками зависшего решения)"""
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        self.process = None
+
+    def run(
+        self,
+        class_dir: str,
+        input_data: str = "",
+        time_limit: float = 5,
+        output_limit: Optional[int] = None,
+        capture_limit: Optional[int] = None,
+        expected_output: Optional[str] = None,
+        checker: Optional[Dict[str, Any]] = None,
+        input_file: Optional[str] = None,
+        expected_file: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Выполняет Main из class_dir
+
+        Если задан input_file, раннер читает ввод прямо из него; ответ из
+        expected_file читается по частям во время сравнения.
+
+        Returns:
+            Результат в формате sandbox.execute
+
+        Raises:
+            JavaRunnerError: Если раннер завершился, не выполнив запуск
+        """
+        if not self.alive():
+            self.start()
+
+        work_dir = tempfile.mkdtemp(prefix='java-run-')
+        try:
+            paths = {name: os.path.join(work_dir, name) for name in ('input', 'output', 'error')}
+            if input_file is not None:
+                paths['input'] = input_file
+            else:
+                with open(paths['input'], 'w', encoding='utf-8') as f:
+                    f.write(input_data)
+
+            wall_limit = wall_time_limit(time_limit)
+            command = '\t'.join([
+                'RUN', class_dir, paths['input'], paths['output'], paths['error'],
+                str(int(time_limit * 1000)), str(int(wall_limit * 1000)),
+                str(output_limit if output_limit is not None else 2 ** 62)
+            ])
+
+            started = time.monotonic()
+            try:
+                self.process.stdin.write(command.encode('utf-8') + b'\n')
+                self.process.stdin.flush()
+            except OSError as e:
+                self.kill()
+                raise JavaRunnerError(f"JudgeRunner недоступен: {e}") from e
+
+            response = self._read_line(wall_limit + RUNNER_RESPONSE_MARGIN)
+            wall_time = time.monotonic() - started
+
+            if response is None:
+                # Раннер завершился сам (System.exit в решении) или завис
+                try:
+                    returncode = self.process.wait(timeout=1)
+                    status = 'OK'
+                except subprocess.TimeoutExpired:
+                    returncode = -9
+                    status = 'TIMEOUT'
+                self.kill()
+                # Точное процессорное время неизвестно - берем реальное
+                cpu_time, memory_used = wall_time, 0
+            else:
+                parts = response.split('\t')
+                if len(parts) != 6 or parts[0] != 'DONE':
+                    self.kill()
+                    raise JavaRunnerError(f"Некорректный ответ JudgeRunner: {response}")
+                status = parts[1]
+                returncode = int(parts[2])
+                cpu_time = int(parts[3]) / 1e9
+                wall_time = int(parts[4]) / 1e9
+                memory_used = int(parts[5])
+                if status in ('TIMEOUT', 'OOM'):
+                    # Раннер завершается сам; дожидаемся и запускаем новый при следующем запуске
+                    self.kill()
+
+            return self._collect(
+                paths, status, returncode, cpu_time, wall_time, memory_used,
+                time_limit, capture_limit, expected_output, checker, input_data, input_file, expected_file
+            )
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    @staticmethod
+    def _read_capture(path: str, capture_limit: Optional[int], output_checker=None):
+        """Читает файл вывода по частям: сохраняет начало и передает все в проверку"""
+        chunks, captured, truncated = [], 0, False
+        try:
+            with open(path, 'rb') as f:
+                while True:
+                    data = f.read(READ_CHUNK_SIZE)
+                    if not data:
+                        break
+                    if capture_limit is not None and captured + len(data) > capture_limit:
+                        data_to_keep = data[:max(capture_limit - captured, 0)]
+                        truncated = True
+                    else:
+                        data_to_keep = data
+                    if data_to_keep:
+                        chunks.append(data_to_keep)
+                        captured += len(data_to_keep)
+                    if output_checker is not None:
+                        output_checker.feed(data)
+        except FileNotFoundError:
+            pass
+        return _decode(b''.join(chunks)), truncated
+
+    def _collect(self, paths, status, returncode, cpu_time, wall_time, memory_used,
+                 time_limit, capture_limit, expected_output, checker, input_data,
+                 input_file=None, expected_file=None) -> Dict[str, Any]:
+        timed_out = status == 'TIMEOUT' or cpu_time > time_limit
+        memory_limit_exceeded = status == 'OOM'
+        output_limit_exceeded = status == 'OUTPUT_LIMIT'
+        failed = timed_out or memory_limit_exceeded or output_limit_exceeded or returncode != 0
+
+        output_checker = None
+        if expected_output is not None and not failed:
+            output_checker = make_checker(expected_output, checker, input_data, input_file, expected_file)
+
+        stdout, stdout_truncated = self._read_capture(paths['output'], capture_limit, output_checker)
+        stderr, stderr_truncated = self._read_capture(paths['error'], capture_limit)
+
+        matched = None
+        if expected_output is not None:
+            matched = output_checker.finish() if output_checker is not None else False
+
+        return {
+            'returncode': returncode,
+            'stdout': stdout,
+            'stderr': stderr,
+            'execution_time': time_limit if timed_out else cpu_time,
+            'cpu_time': cpu_time,
+            'wall_time': wall_time,
+            'memory_used': memory_used,
+            'timed_out': timed_out,
+            'memory_limit_exceeded': memory_limit_exceeded,
+            'output_limit_exceeded': output_limit_exceeded,
+            'output_truncated': stdout_truncated or stderr_truncated or output_limit_exceeded,
+            'matched': matched,
+        }
+
+
+class JavaRunnerPool:
+    """
+    Пул прогретых JVM
+
+    Раннеры запускаются лениво (до `size` штук) и выполняют запуски по
+    одному. Раннер с другим размером кучи перезапускается под ограничение
+    памяти очередного запуска.
+    """
+
+    def __init__(self, runner_dir: str, size: int, java: str = 'java'):
+        self.runner_dir = runner_dir
+        self.size = size
+        self.java = java
+        self._idle: "queue.Queue[JavaRunner]" = queue.Queue()
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self, memory_limit: int) -> JavaRunner:
+        try:
+            runner = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._count < self.size:
+                    self._count += 1
+                    return JavaRunner(self.runner_dir, memory_limit, self.java)
+            runner = self._idle.get()
+
+        if runner.memory_limit != memory_limit:
+            runner.kill()
+            runner = JavaRunner(self.runner_dir, memory_limit, self.java)
+        return runner
+
+    def run(self, memory_limit: int, **job) -> Dict[str, Any]:
+        """
+        Выполняет запуск в свободном раннере
+
+        Принимает аргументы JavaRunner.run и ограничение памяти.
+
+        Raises:
+            JavaRunnerError: Если раннер недоступен
+        """
+        runner = self._acquire(memory_limit)
+        try:
+            return runner.run(**job)
+        except JavaRunnerError:
+            runner.kill()
+            raise
+        finally:
+            self._idle.put(runner)
+
+    def shutdown(self) -> None:
+        """Останавливает все раннеры пула"""
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
@@ -0,0 +1,912 @@
+"""
+Очередь проверки решений.
+
+Веб-запросы создают задания JudgeJob и сразу возвращают ответ, а проверку
+выполняют отдельные процессы `manage.py judge_worker`. Если асинхронная
+проверка отключена (OLYMPIADS_JUDGE_ASYNC = False), задание выполняется сразу
+в том же запросе - это удобно для разработки и небольших установок.
+"""
+import os
+import time
+import socket
+import logging
+import threading
+from datetime import timedelta
+from typing import Dict, Any, Callable, Optional, List
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Subquery, Sum, Value, Window, Avg, Min, F
+from django.db.models.functions import Coalesce, RowNumber
+from django.utils import timezone
+
+from . import verdict_cache
+from .models import (
+    JudgeJob,
+    VerdictCache,
+    RejudgeBatch,
+    OlympiadTask,
+    OlympiadParticipation,
+    OlympiadLeaderboard,
+    OlympiadTaskSubmission,
+    OlympiadTaskResult,
+    OlympiadTestGroup,
+    OlympiadTestResult
+)
+from .code_runner import (
+    check_solution,
+    create_temp_file,
+    remove_temp_file,
+    run_code_with_input,
+    DEFAULT_TIME_LIMIT,
+    DEFAULT_MEMORY_LIMIT
+)
+
+logger = logging.getLogger(__name__)
+
+# Задание в статусе «проверяется» дольше этого времени считается потерянным
+# (обработчик упал) и возвращается в очередь
+STALE_JOB_TIMEOUT = timedelta(minutes=10)
+
+# Сколько раз задание может быть возвращено в очередь после падения обработчика
+MAX_JOB_ATTEMPTS = 3
+
+# Сколько заданий одного пользователя может одновременно ждать в очереди
+DEFAULT_MAX_QUEUED_PER_USER = 5
+
+# Окно, за которое считается среднее время ожидания в метриках очереди
+METRICS_WINDOW = timedelta(minutes=15)
+
+# Приоритеты по умолчанию для типов заданий
+DEFAULT_PRIORITIES = {
+    JudgeJob.JobKind.OLYMPIAD_TEST: JudgeJob.JobPriority.PRACTICE,
+    JudgeJob.JobKind.OLYMPIAD_SUBMISSION: JudgeJob.JobPriority.PRACTICE,
+    JudgeJob.JobKind.OLYMPIAD_RUN: JudgeJob.JobPriority.PRACTICE,
+    JudgeJob.JobKind.ASSIGNMENT: JudgeJob.JobPriority.ASSIGNMENT,
+    JudgeJob.JobKind.OLYMPIAD_REJUDGE: JudgeJob.JobPriority.REJUDGE,
+}
+
+
+class QueueFull(Exception):
+    """У пользователя слишком много заданий, ожидающих проверки"""
+    pass
+
+
+def is_async_enabled() -> bool:
+    """Включена ли асинхронная проверка через judge_worker"""
+    return getattr(settings, 'OLYMPIADS_JUDGE_ASYNC', False)
+
+
+def worker_name() -> str:
+    """Имя текущего обработчика для диагностики"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def olympiad_priority(olympiad) -> int:
+    """
+    Приоритет оцениваемых отправок олимпиады: отправки активной олимпиады
+    никогда не ждут за тренировочными запусками
+    """
+    if olympiad.is_active():
+        return JudgeJob.JobPriority.CONTEST
+    return JudgeJob.JobPriority.PRACTICE
+
+
+def enqueue(kind: str, payload: Dict[str, Any], user=None, priority: Optional[int] = None) -> JudgeJob:
+    """
+    Ставит задание в очередь проверки
+
+    Если асинхронная проверка отключена, задание выполняется немедленно.
+
+    Args:
+        kind: Тип задания (JudgeJob.JobKind)
+        payload: Параметры задания (должны сериализоваться в JSON)
+        user: Пользователь, которому принадлежит задание
+        priority: Класс приоритета (JudgeJob.JobPriority); по умолчанию
+            определяется типом задания
+
+    Returns:
+        Созданное задание
+
+    Raises:
+        QueueFull: Если у пользователя слишком много заданий в очереди
+    """
+    if priority is None:
+        priority = DEFAULT_PRIORITIES.get(kind, JudgeJob.JobPriority.PRACTICE)
+
+    if is_async_enabled() and user is not None and priority != JudgeJob.JobPriority.REJUDGE:
+        max_queued = getattr(settings, 'OLYMPIADS_JUDGE_MAX_QUEUED_PER_USER', DEFAULT_MAX_QUEUED_PER_USER)
+        queued = JudgeJob.objects.filter(user=user, status=JudgeJob.JobStatus.QUEUED).count()
+        if max_queued and queued >= max_queued:
+            raise QueueFull("Слишком много решений ожидают проверки. Дождитесь результатов предыдущих.")
+
+    job = JudgeJob.objects.create(kind=kind, payload=payload, user=user, priority=priority)
+
+    if not is_async_enabled():
+        if claim_job(job):
+            process_job(job)
+
+    return job
+
+
+def claim_job(job: JudgeJob, worker: Optional[str] = None) -> bool:
+    """
+    Переводит задание из очереди в статус «проверяется»
+
+    Returns:
+        True, если задание удалось захватить (его не забрал другой обработчик)
+    """
+    now = timezone.now()
+    worker = worker or worker_name()
+    updated = JudgeJob.objects.filter(pk=job.pk, status=JudgeJob.JobStatus.QUEUED).update(
+        status=JudgeJob.JobStatus.RUNNING,
+        started_at=now,
+        worker=worker,
+        attempts=job.attempts + 1
+    )
+    if updated:
+        job.status = JudgeJob.JobStatus.RUNNING
+        job.started_at = now
+        job.worker = worker
+        job.attempts += 1
+    return bool(updated)
+
+
+def claim_next_job(worker: Optional[str] = None) -> Optional[JudgeJob]:
+    """
+    Забирает из очереди следующее задание
+
+    Порядок выбора: класс приоритета, затем справедливость между
+    пользователями - меньше всего заданий уже проверяется, ранний номер
+    задания в собственной очереди пользователя (по кругу между
+    пользователями) - и, наконец, время постановки в очередь.
+
+    Returns:
+        Захваченное задание или None, если очередь пуста
+    """
+    running_per_user = (
+        JudgeJob.objects
+        .filter(user=OuterRef('user'), status=JudgeJob.JobStatus.RUNNING)
+        .values('user')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+
+    # Кандидата выбираем без блокировок (оконные функции несовместимы с
+    # FOR UPDATE), а захват выполняем условным UPDATE; при гонке - повторяем
+    for _ in range(5):
+        job = (
+            JudgeJob.objects
+            .filter(status=JudgeJob.JobStatus.QUEUED)
+            .annotate(
+                user_running=Coalesce(Subquery(running_per_user), Value(0)),
+                user_rank=Window(
+                    expression=RowNumber(),
+                    partition_by=[F('user'), F('priority')],
+                    order_by=[F('created_at').asc(), F('id').asc()]
+                )
+            )
+            .order_by('priority', 'user_running', 'user_rank', 'created_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        if claim_job(job, worker):
+            return job
+
+    return None
+
+
+def requeue_stale_jobs(timeout: timedelta = STALE_JOB_TIMEOUT) -> int:
+    """
+    Возвращает в очередь задания, зависшие в статусе «проверяется»
+
+    Задания, исчерпавшие число попыток, завершаются с ошибкой.
+
+    Returns:
+        Количество возвращенных в очередь заданий
+    """
+    threshold = timezone.now() - timeout
+    stale = JudgeJob.objects.filter(status=JudgeJob.JobStatus.RUNNING, started_at__lt=threshold)
+
+    stale.filter(attempts__gte=MAX_JOB_ATTEMPTS).update(
+        status=JudgeJob.JobStatus.DONE,
+        finished_at=timezone.now(),
+        result={'success': False, 'error': 'Проверка не была завершена'},
+        error_message='Превышено число попыток проверки'
+    )
+    return stale.filter(attempts__lt=MAX_JOB_ATTEMPTS).update(status=JudgeJob.JobStatus.QUEUED)
+
+
+def queue_metrics() -> List[Dict[str, Any]]:
+    """
+    Возвращает метрики очереди по классам приоритета
+
+    Returns:
+        Список словарей: класс, число ожидающих и проверяемых заданий,
+        максимальное время ожидания в очереди сейчас и среднее время ожидания
+        заданий, начатых за последние METRICS_WINDOW (в секундах)
+    """
+    now = timezone.now()
+    metrics = []
+
+    for priority, label in JudgeJob.JobPriority.choices:
+        jobs = JudgeJob.objects.filter(priority=priority)
+        queued = jobs.filter(status=JudgeJob.JobStatus.QUEUED).aggregate(
+            depth=Count('id'),
+            oldest=Min('created_at')
+        )
+        started = jobs.filter(started_at__gte=now - METRICS_WINDOW).aggregate(
+            avg_wait=Avg(F('started_at') - F('created_at'))
+        )
+
+        metrics.append({
+            'priority': priority,
+            'label': str(label),
+            'queued': queued['depth'],
+            'running': jobs.filter(status=JudgeJob.JobStatus.RUNNING).count(),
+            'max_wait_seconds': (now - queued['oldest']).total_seconds() if queued['oldest'] else 0,
+            'avg_wait_seconds': started['avg_wait'].total_seconds() if started['avg_wait'] else 0,
+        })
+
+    return metrics
+
+
+def process_job(job: JudgeJob) -> JudgeJob:
+    """
+    Выполняет захваченное задание и сохраняет результат
+
+    Ошибки обработчика не пробрасываются, а сохраняются в задании.
+    """
+    handler = JOB_HANDLERS.get(job.kind)
+
+    try:
+        if handler is None:
+            raise ValueError(f"Неизвестный тип задания: {job.kind}")
+        job.result = handler(job.payload)
+        job.error_message = ''
+    except Exception as e:
+        logger.exception("Ошибка при обработке задания проверки #%s", job.pk)
+        job.result = {
+            'success': False,
+            'error': 'Произошла ошибка при проверке решения',
+            'error_details': str(e)
+        }
+        job.error_message = str(e)
+
+    job.status = JudgeJob.JobStatus.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['result', 'error_message', 'status', 'finished_at'])
+
+    if job.rejudge_batch_id:
+        finish_rejudge_batch(job.rejudge_batch_id)
+    return job
+
+
+def get_task_limits(task: OlympiadTask):
+    """
+    Возвращает ограничения запуска для задания олимпиады
+
+    Returns:
+        Кортеж (время_в_секундах, память_в_байтах)
+    """
+    time_limit = task.time_limit_minutes * 60 if task.time_limit_minutes > 0 else DEFAULT_TIME_LIMIT
+    memory_limit = task.memory_limit_mb * 1024 * 1024 if task.memory_limit_mb > 0 else DEFAULT_MEMORY_LIMIT
+    return time_limit, memory_limit
+
+
+def run_task_tests(task: OlympiadTask, code: str, language: str) -> Dict[str, Any]:
+    """
+    Проверяет код на всех тестовых случаях задания олимпиады
+
+    Повторная проверка того же кода на тех же тестах берется из кэша вердиктов.
+    Если у задания есть группы тестов, тесты запускаются по группам (см.
+    code_runner.run_test_groups).
+
+    Returns:
+        Результат check_solution, список тестовых случаев в поле 'test_cases'
+        и групп в поле 'test_groups'; поле 'cached' показывает, взят ли
+        результат из кэша, 'judge_host' - сервер, на котором выполнялась
+        проверка (для результата из кэша - исходная)
+    """
+    test_cases = list(task.test_cases.all().order_by('order'))
+    test_groups = list(task.test_groups.prefetch_related('depends_on'))
+    group_specs = [group.judge_spec() for group in test_groups]
+    time_limit, memory_limit = get_task_limits(task)
+
+    checker = task.get_checker()
+
+    version = verdict_cache.tests_version(
+        ({'id': tc.id, 'input': tc.input_data, 'expected': tc.expected_output, 'points': tc.points,
+          'input_blob': tc.input_blob, 'expected_blob': tc.expected_blob, 'group': tc.group_id}
+         for tc in test_cases),
+        time_limit=time_limit,
+        memory_limit=memory_limit,
+        checker=checker,
+        compile_profile=task.compile_profile,
+        groups=group_specs
+    )
+    cache_args = (VerdictCache.TaskKind.OLYMPIAD, task.id, language, code, version)
+
+    result = verdict_cache.get_verdict(*cache_args)
+    if result is not None:
+        # Входные и ожидаемые данные не хранятся в кэше - берем их из тестов
+        for test_case, test_result in zip(test_cases, result['test_results']):
+            test_result['input'] = test_case.input_preview
+            test_result['expected'] = test_case.expected_preview.strip()
+        result['cached'] = True
+        # Записи кэша до сохранения сервера проверки
+        result.setdefault('judge_host', '')
+        result['test_cases'] = test_cases
+        result['test_groups'] = test_groups
+        return result
+
+    result = check_solution(
+        code,
+        language,
+        [tc.judge_spec() for tc in test_cases],
+        time_limit=time_limit,
+        memory_limit=memory_limit,
+        checker=checker,
+        compile_profile=task.compile_profile,
+        groups=group_specs or None
+    )
+
+    result['judge_host'] = socket.gethostname()
+    if verdict_cache.is_cacheable(result):
+        stored = dict(result, test_results=[
+            {k: v for k, v in r.items() if k not in ('input', 'expected')}
+            for r in result['test_results']
+        ])
+        verdict_cache.store_verdict(*cache_args, stored)
+
+    result['cached'] = False
+    result['test_cases'] = test_cases
+    result['test_groups'] = test_groups
+    return result
+
+
+def format_test_results(check_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Готовит результаты тестов для отправки участнику, скрывая данные скрытых тестов"""
+    formatted_results = []
+    for test_case, result in zip(check_result['test_cases'], check_result['test_results']):
+        hidden = test_case.is_hidden
+        formatted_results.append({
+            'test_case_id': test_case.id,
+            'passed': result['passed'],
+            'input': '(скрытый тест)' if hidden else result['input'],
+            'expected': '(скрытый тест)' if hidden else result['expected'],
+            'actual': '(скрытый тест)' if hidden else result['actual'],
+            'error': result.get('error', False),
+            'execution_time': result.get('execution_time', 0),
+            'memory_used': result.get('memory_used', 0)
+        })
+    return formatted_results
+
+
+def group_score(task: OlympiadTask, check_result: Dict[str, Any]) -> int:
+    """
+    Вычисляет балл отправки по группам тестов
+
+    Группа приносит свои баллы целиком, если пройдены все ее тесты, а группа
+    с начислением за каждый тест - долю баллов по числу пройденных тестов.
+    Тест без группы считается отдельной группой со своими баллами. Сумма
+    приводится к баллам задания.
+    """
+    groups = {group.id: group for group in check_result['test_groups']}
+    earned = total = 0
+    for group_result in check_result['group_results']:
+        group = groups.get(group_result['id'])
+        if group is None:
+            continue
+        total += group.points
+        if group_result['passed']:
+            earned += group.points
+        elif (group.scoring == OlympiadTestGroup.Scoring.PER_TEST and not group_result['skipped']
+              and group_result['total_count']):
+            earned += group.points * group_result['passed_count'] / group_result['total_count']
+
+    for test_case, result in zip(check_result['test_cases'], check_result['test_results']):
+        if test_case.group_id is None:
+            total += test_case.points
+            if result['passed']:
+                earned += test_case.points
+
+    return round(task.points * earned / total) if total > 0 else 0
+
+
+def apply_check_result(submission: OlympiadTaskSubmission, check_result: Dict[str, Any]) -> None:
+    """Записывает результат проверки в отправку (без сохранения)"""
+    total_count = check_result['total_count']
+    passed_count = check_result['passed_count']
+
+    submission.max_score = submission.task.points
+    submission.passed_test_cases = passed_count
+    submission.total_test_cases = total_count
+    if check_result.get('group_results'):
+        submission.score = group_score(submission.task, check_result)
+    else:
+        submission.score = round(submission.max_score * (passed_count / total_count)) if total_count > 0 else 0
+    submission.is_correct = total_count > 0 and passed_count == total_count
+    submission.error_message = check_result.get('error', '')
+    submission.execution_time = max(
+        (r.get('execution_time') or 0 for r in check_result['test_results']),
+        default=0
+    )
+    submission.memory_usage = max(
+        (r.get('memory_used') or 0 for r in check_result['test_results']),
+        default=0
+    ) / (1024 * 1024)
+
+
+def test_verdict(result: Dict[str, Any]) -> str:
+    """Определяет вердикт теста по результату run_test_case"""
+    if result['passed']:
+        return OlympiadTestResult.Verdict.ACCEPTED
+    if result.get('skipped'):
+        return OlympiadTestResult.Verdict.SKIPPED
+    if result.get('timed_out'):
+        return OlympiadTestResult.Verdict.TIME_LIMIT
+    if result.get('memory_limit_exceeded'):
+        return OlympiadTestResult.Verdict.MEMORY_LIMIT
+    if result.get('output_limit_exceeded'):
+        return OlympiadTestResult.Verdict.OUTPUT_LIMIT
+    if result.get('error'):
+        return OlympiadTestResult.Verdict.RUNTIME_ERROR
+    return OlympiadTestResult.Verdict.WRONG_ANSWER
+
+
+def save_test_results(submission: OlympiadTaskSubmission, check_result: Dict[str, Any]) -> None:
+    """
+    Сохраняет время и память каждого теста отправки для анализа ограничений
+
+    Для результата из кэша вердиктов замеры относятся к исходной проверке:
+    записи помечаются from_cache и получают ее сервер.
+    """
+    cached = check_result.get('cached', False)
+    host = check_result.get('judge_host', '') if cached else socket.gethostname()
+    OlympiadTestResult.objects.bulk_create([
+        OlympiadTestResult(
+            submission=submission,
+            test_case=test_case,
+            test_number=result['test_number'],
+            verdict=test_verdict(result),
+            passed=result['passed'],
+            cpu_time=result.get('execution_time') or 0,
+            wall_time=result.get('wall_time') or 0,
+            memory_used=result.get('memory_used') or 0,
+            judge_host=host,
+            from_cache=cached
+        )
+        for test_case, result in zip(check_result['test_cases'], check_result['test_results'])
+    ])
+
+
+def _judge_olympiad_test(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Проверка кода из редактора задания (кнопка «Проверить»)"""
+    task = OlympiadTask.objects.select_related('olympiad').get(pk=payload['task_id'])
+    olympiad = task.olympiad
+
+    check_result = run_task_tests(task, payload['code'], payload.get('language', 'python'))
+
+    # Получаем или создаем запись об участии
+    participation, created = OlympiadParticipation.objects.get_or_create(
+        olympiad=olympiad,
+        user_id=payload['user_id'],
+        defaults={
+            'max_score': sum(t.points for t in olympiad.tasks.all())
+        }
+    )
+
+    # Сохраняем результаты
+    submission = OlympiadTaskSubmission(
+        participation=participation,
+        task=task,
+        code=payload['code'],
+        language=payload.get('language', 'python')
+    )
+    apply_check_result(submission, check_result)
+    submission.save()
+    save_test_results(submission, check_result)
+
+    # Обновляем лучший результат по заданию и общий счет участника
+    participation.record_submission(submission)
+
+    if check_result['status'] != 'success':
+        return {
+            'success': False,
+            'error': 'Ошибка компиляции или выполнения',
+            'error_details': check_result.get('error', ''),
+            'submission_id': submission.id
+        }
+
+    return {
+        'success': True,
+        'submission_id': submission.id,
+        'passed_tests': submission.passed_test_cases,
+        'total_tests': submission.total_test_cases,
+        'score': submission.score,
+        'max_score': submission.max_score,
+        'is_correct': submission.is_correct,
+        'cached': check_result['cached'],
+        'test_results': format_test_results(check_result)
+    }
+
+
+def _judge_olympiad_submission(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Проверка отправленного решения задания олимпиады"""
+    submission = OlympiadTaskSubmission.objects.select_related('task', 'participation').get(
+        pk=payload['submission_id']
+    )
+
+    submission.language = payload.get('language', submission.language)
+    check_result = run_task_tests(submission.task, submission.code, submission.language)
+    apply_check_result(submission, check_result)
+    submission.save()
+    save_test_results(submission, check_result)
+
+    submission.participation.record_submission(submission)
+
+    return {
+        'success': check_result['status'] == 'success',
+        'submission_id': submission.id,
+        'passed_tests': submission.passed_test_cases,
+        'total_tests': submission.total_test_cases,
+        'score': submission.score,
+        'max_score': submission.max_score,
+        'is_correct': submission.is_correct,
+        'cached': check_result['cached'],
+        'error': submission.error_message
+    }
+
+
+def _judge_olympiad_run(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Тренировочный запуск кода с пользовательским вводом (кнопка «Запустить»)"""
+    task = OlympiadTask.objects.get(pk=payload['task_id'])
+    language = payload.get('language', 'python')
+    time_limit, memory_limit = get_task_limits(task)
+
+    file_path, _, _ = create_temp_file(payload['code'], language)
+    try:
+        result = run_code_with_input(
+            file_path, language, payload.get('input', ''), time_limit, memory_limit,
+            compile_profile=task.compile_profile
+        )
+    finally:
+        remove_temp_file(file_path, language)
+
+    if result['status'] != 'success':
+        return {
+            'success': False,
+            'error': 'Ошибка выполнения',
+            'error_details': result['output'],
+            'execution_time': result.get('execution_time')
+        }
+
+    return {
+        'success': True,
+        'output': result['output'],
+        'execution_time': result['execution_time'],
+        'memory_usage': result.get('memory_used')
+    }
+
+
+def _rejudge_olympiad_submission(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Перепроверка отправки олимпиады
+
+    Лучшие результаты и баллы участника здесь не пересчитываются: это
+    делается один раз после перепроверки всех отправок (см. finish_rejudge_batch).
+    """
+    submission = OlympiadTaskSubmission.objects.select_related('task').get(pk=payload['submission_id'])
+
+    check_result = run_task_tests(submission.task, submission.code, submission.language)
+    apply_check_result(submission, check_result)
+    submission.save()
+
+    # Результаты прошлой проверки заменяются новыми
+    OlympiadTestResult.objects.filter(submission=submission).delete()
+    save_test_results(submission, check_result)
+
+    return {
+        'success': check_result['status'] == 'success',
+        'submission_id': submission.id,
+        'passed_tests': submission.passed_test_cases,
+        'total_tests': submission.total_test_cases,
+        'score': submission.score,
+        'is_correct': submission.is_correct,
+        'cached': check_result['cached']
+    }
+
+
+def _judge_assignment(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Проверка решения задания курса"""
+    from assignments.models import AssignmentSubmission
+    from assignments.code_checker import check_assignment
+
+    submission = AssignmentSubmission.objects.get(pk=payload['submission_id'])
+    check_assignment(submission)
+
+    return {
+        'success': True,
+        'submission_id': submission.id,
+        'status': submission.status,
+        'score': submission.score
+    }
+
+
+JOB_HANDLERS = {
+    JudgeJob.JobKind.OLYMPIAD_TEST: _judge_olympiad_test,
+    JudgeJob.JobKind.OLYMPIAD_SUBMISSION: _judge_olympiad_submission,
+    JudgeJob.JobKind.OLYMPIAD_RUN: _judge_olympiad_run,
+    JudgeJob.JobKind.ASSIGNMENT: _judge_assignment,
+    JudgeJob.JobKind.OLYMPIAD_REJUDGE: _rejudge_olympiad_submission,
+}
+
+
+def start_rejudge(olympiad, task: Optional[OlympiadTask] = None, user=None) -> RejudgeBatch:
+    """
+    Ставит в очередь перепроверку отправок задания или всей олимпиады
+
+    Задания перепроверки имеют низший приоритет и выполняются обработчиками
+    judge_worker или командой rejudge. Если незавершенная перепроверка того же
+    задания (олимпиады) уже есть, возвращается она.
+
+    Args:
+        olympiad: Олимпиада
+        task: Задание; None - все задания на программирование олимпиады
+        user: Пользователь, запустивший перепроверку
+
+    Returns:
+        Перепроверка
+    """
+    existing = RejudgeBatch.objects.filter(
+        olympiad=olympiad, task=task, status=RejudgeBatch.BatchStatus.RUNNING
+    ).first()
+    if existing is not None:
+        return existing
+
+    submissions = OlympiadTaskSubmission.objects.filter(
+        task__olympiad=olympiad,
+        task__task_type=OlympiadTask.TaskType.PROGRAMMING
+    ).exclude(code='')
+    if task is not None:
+        submissions = submissions.filter(task=task)
+    submission_ids = list(submissions.order_by('id').values_list('id', flat=True))
+
+    batch = RejudgeBatch.objects.create(olympiad=olympiad, task=task, total=len(submission_ids), created_by=user)
+    JudgeJob.objects.bulk_create([
+        JudgeJob(
+            kind=JudgeJob.JobKind.OLYMPIAD_REJUDGE,
+            priority=JudgeJob.JobPriority.REJUDGE,
+            payload={'submission_id': submission_id, 'batch_id': batch.id},
+            rejudge_batch=batch
+        )
+        for submission_id in submission_ids
+    ], batch_size=1000)
+
+    # Пустая перепроверка завершается сразу
+    finish_rejudge_batch(batch.id)
+    batch.refresh_from_db()
+    return batch
+
+
+def rebuild_task_results(participations, task: Optional[OlympiadTask] = None) -> Dict[str, int]:
+    """
+    Перестраивает лучшие результаты по заданиям (OlympiadTaskResult) по отправкам
+
+    Записи с тем же баллом и статусом решения не меняются, даже если лучшей
+    могла бы считаться другая отправка с тем же баллом.
+
+    Args:
+        participations: Участия, результаты которых перестраиваются
+        task: Перестроить результаты только по этому заданию
+
+    Returns:
+        Число исправленных записей: {'created', 'updated', 'deleted'}
+    """
+    participations = list(participations)
+    submissions = OlympiadTaskSubmission.objects.filter(participation__in=participations)
+    results = OlympiadTaskResult.objects.filter(participation__in=participations)
+    if task is not None:
+        submissions = submissions.filter(task=task)
+        results = results.filter(task=task)
+
+    best = {}
+    for submission in (submissions.order_by(*OlympiadTaskResult.BEST_ORDERING)
+                       .only('id', 'participation_id', 'task_id', 'score', 'is_correct', 'submitted_at')
+                       .iterator()):
+        best.setdefault((submission.participation_id, submission.task_id), submission)
+
+    current = {(result.participation_id, result.task_id): result for result in results}
+    to_create = []
+    to_update = []
+    now = timezone.now()
+    for (participation_id, task_id), submission in best.items():
+        result = current.pop((participation_id, task_id), None)
+        if result is None:
+            result = OlympiadTaskResult(participation_id=participation_id, task_id=task_id)
+            result.set_best(submission)
+            to_create.append(result)
+        elif (result.best_submission_id is None
+              or (result.score, result.is_correct) != (submission.score, submission.is_correct)):
+            result.set_best(submission)
+            # bulk_update не обновляет поля auto_now
+            result.updated_at = now
+            to_update.append(result)
+
+    # Результаты по заданиям, у которых не осталось отправок
+    stale = [result.pk for result in current.values()]
+
+    with transaction.atomic():
+        OlympiadTaskResult.objects.bulk_create(to_create, batch_size=1000)
+        OlympiadTaskResult.objects.bulk_update(
+            to_update, ['best_submission', 'score', 'is_correct', 'updated_at'], batch_size=1000
+        )
+        OlympiadTaskResult.objects.filter(pk__in=stale).delete()
+
+    return {'created': len(to_create), 'updated': len(to_update), 'deleted': len(stale)}
+
+
+def recalculate_scores(olympiad, participations) -> int:
+    """
+    Пересчитывает баллы участников по лучшим результатам одним запросом агрегации
+
+    Эквивалентно вызову OlympiadParticipation.calculate_score для каждого
+    участника, но без отдельного запроса на каждого.
+
+    Returns:
+        Количество обновленных записей участия
+    """
+    participations = list(participations)
+    totals = dict(
+        OlympiadTaskResult.objects
+        .filter(participation__in=participations)
+        .values('participation')
+        .annotate(total=Sum('score'))
+        .values_list('participation', 'total')
+    )
+    for participation in participations:
+        participation.score = totals.get(participation.id) or 0
+        participation.passed = participation.score >= olympiad.min_passing_score
+
+    OlympiadParticipation.objects.bulk_update(participations, ['score', 'passed'], batch_size=1000)
+    if participations:
+        OlympiadLeaderboard.touch(olympiad.id, [participation.pk for participation in participations])
+    return len(participations)
+
+
+def finish_rejudge_batch(batch_id: int) -> bool:
+    """
+    Завершает перепроверку, если все ее отправки проверены, и пересчитывает
+    баллы затронутых участников
+
+    Вызывается после каждого задания перепроверки; пересчет выполняет ровно
+    один обработчик - тот, кто первым перевел перепроверку в статус «завершена».
+
+    Returns:
+        True, если перепроверка завершена этим вызовом
+    """
+    pending = JudgeJob.objects.filter(
+        rejudge_batch_id=batch_id,
+        status__in=[JudgeJob.JobStatus.QUEUED, JudgeJob.JobStatus.RUNNING]
+    )
+    if pending.exists():
+        return False
+
+    updated = RejudgeBatch.objects.filter(pk=batch_id, status=RejudgeBatch.BatchStatus.RUNNING).update(
+        status=RejudgeBatch.BatchStatus.DONE,
+        finished_at=timezone.now()
+    )
+    if not updated:
+        return False
+
+    batch = RejudgeBatch.objects.select_related('olympiad').get(pk=batch_id)
+    participations = OlympiadParticipation.objects.filter(olympiad=batch.olympiad)
+    if batch.task_id:
+        participations = participations.filter(submissions__task_id=batch.task_id).distinct()
+
+    participations = list(participations)
+    with transaction.atomic():
+        rebuild_task_results(participations, batch.task)
+        count = recalculate_scores(batch.olympiad, participations)
+    logger.info("Перепроверка #%s завершена, пересчитаны баллы %s участников", batch_id, count)
+    return True
+
+
+def requeue_orphaned_jobs(batch: RejudgeBatch) -> int:
+    """
+    Возвращает в очередь задания перепроверки, захваченные процессами этого
+    хоста, которые уже завершились (например, прерванной командой rejudge)
+
+    Returns:
+        Количество возвращенных в очередь заданий
+    """
+    host = socket.gethostname()
+    orphaned = []
+    for job in batch.jobs.filter(status=JudgeJob.JobStatus.RUNNING, worker__startswith=f'{host}:'):
+        pid = job.worker.rsplit(':', 1)[-1]
+        if not pid.isdigit():
+            continue
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            orphaned.append(job.pk)
+        except PermissionError:
+            # Процесс существует, но принадлежит другому пользователю
+            pass
+
+    return JudgeJob.objects.filter(pk__in=orphaned, status=JudgeJob.JobStatus.RUNNING).update(
+        status=JudgeJob.JobStatus.QUEUED
+    )
+
+
+def claim_next_batch_job(batch: RejudgeBatch, worker: Optional[str] = None) -> Optional[JudgeJob]:
+    """Забирает из очереди следующее задание перепроверки"""
+    for _ in range(5):
+        job = batch.jobs.filter(status=JudgeJob.JobStatus.QUEUED).order_by('id').first()
+        if job is None:
+            return None
+        if claim_job(job, worker):
+            return job
+    return None
+
+
+def run_rejudge(batch: RejudgeBatch, workers: int = 1,
+                progress: Optional[Callable[[int, int], None]] = None,
+                progress_interval: float = 1.0) -> RejudgeBatch:
+    """
+    Выполняет задания перепроверки в пуле потоков текущего процесса
+
+    Параллельно с пулом задания могут забирать обработчики judge_worker.
+    После того как очередь перепроверки опустела, функция дожидается
+    заданий, которые еще проверяются другими обработчиками.
+
+    Args:
+        batch: Перепроверка
+        workers: Число потоков (сами запуски ограничены слотами хоста)
+        progress: Функция (проверено, всего), вызываемая по ходу проверки
+        progress_interval: Период вызова progress (секунд)
+
+    Returns:
+        Обновленная перепроверка
+    """
+    name = worker_name()
+    pending_statuses = [JudgeJob.JobStatus.QUEUED, JudgeJob.JobStatus.RUNNING]
+
+    def work():
+        try:
+            while True:
+                job = claim_next_batch_job(batch, name)
+                if job is None:
+                    return
+                process_job(job)
+        finally:
+            connection.close()
+
+    threads: List[threading.Thread] = []
+    while True:
+        threads = [thread for thread in threads if thread.is_alive()]
+        if not threads:
+            # Задания, брошенные прерванным запуском или упавшим обработчиком,
+            # снова ставятся в очередь
+            requeue_orphaned_jobs(batch)
+            requeue_stale_jobs()
+            if batch.jobs.filter(status=JudgeJob.JobStatus.QUEUED).exists():
+                threads = [threading.Thread(target=work, daemon=True) for _ in range(max(1, workers))]
+                for thread in threads:
+                    thread.start()
+
+        batch.refresh_from_db()
+        if progress is not None:
+            progress(batch.processed_count(), batch.total)
+
+        if not threads:
+            if batch.status == RejudgeBatch.BatchStatus.DONE:
+                return batch
+            if not batch.jobs.filter(status__in=pending_statuses).exists():
+                # Все отправки проверены, но завершение еще не зафиксировано
+                finish_rejudge_batch(batch.id)
+                continue
+
+        time.sleep(progress_interval)
@@ -0,0 +1,210 @@
+"""
+Таблица лидеров олимпиады.
+
+Каждый процесс держит для олимпиады отсортированный индекс завершенных
+участий по ключу (-балл, время завершения, id): выше тот, у кого больше
+баллов, при равенстве - кто раньше завершил. Место участника ищется
+двоичным поиском, страница и топ-N - срезом индекса, поэтому запросы
+не перебирают всех участников.
+
+Индекс обновляется по изменениям, а не перестраивается: любое изменение
+балла или завершения участия увеличивает версию OlympiadLeaderboard и
+записывает ее в участие (OlympiadLeaderboard.touch). Перед запросом индекс
+сравнивает свою версию с версией в базе и дочитывает только участия с
+большей версией. Раз в REBUILD_INTERVAL секунд индекс строится заново,
+чтобы учесть удаленные участия.
+
+Во время заморозки (Olympiad.freeze_minutes) участникам показывается
+замороженный индекс: из балла каждого участия вычитаются изменения, сделанные
+во время заморозки (OlympiadScoreEvent.is_frozen).
+"""
+import time
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .models import OlympiadLeaderboard, OlympiadParticipation, OlympiadScoreEvent
+
+# Как часто индекс строится заново (секунд)
+REBUILD_INTERVAL = 300
+
+# Время завершения для участий без finished_at: такие участники ниже остальных с тем же баллом
+_NO_FINISH = float('inf')
+
+Key = Tuple[int, float, int]
+
+
+def ranking_key(participation_id: int, score: int, finished_at) -> Key:
+    """Ключ сортировки участия в таблице лидеров"""
+    return (-score, finished_at.timestamp() if finished_at else _NO_FINISH, participation_id)
+
+
+class LeaderboardIndex:
+    """Отсортированный индекс участий одной олимпиады"""
+
+    def __init__(self, olympiad_id: int, frozen: bool = False):
+        self.olympiad_id = olympiad_id
+        self.frozen = frozen
+        self.version = -1
+        self.built_at: Optional[float] = None
+        self._keys: List[Key] = []
+        self._by_participation: Dict[int, Key] = {}
+        self._by_user: Dict[int, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _remove(self, participation_id: int) -> None:
+        key = self._by_participation.pop(participation_id, None)
+        if key is not None:
+            index = bisect.bisect_left(self._keys, key)
+            del self._keys[index]
+
+    def update(self, participation_id: int, user_id: int, score: int, finished_at, is_completed: bool) -> None:
+        """Добавляет, перемещает или (для незавершенного участия) удаляет участие"""
+        with self._lock:
+            self._remove(participation_id)
+            if not is_completed:
+                if self._by_user.get(user_id) == participation_id:
+                    del self._by_user[user_id]
+                return
+            key = ranking_key(participation_id, score, finished_at)
+            bisect.insort(self._keys, key)
+            self._by_participation[participation_id] = key
+            self._by_user[user_id] = participation_id
+
+    def _apply(self, participations, full: bool = False) -> None:
+        rows = participations.values_list('id', 'user_id', 'score', 'finished_at', 'is_completed')
+        if self.frozen:
+            rows = list(rows)
+            hidden = OlympiadScoreEvent.hidden_deltas(
+                self.olympiad_id, None if full else [row[0] for row in rows]
+            )
+        else:
+            hidden = {}
+            rows = rows.iterator()
+        for participation_id, user_id, score, finished_at, is_completed in rows:
+            score = max(0, score - hidden.get(participation_id, 0))
+            self.update(participation_id, user_id, score, finished_at, is_completed)
+
+    def sync(self, version: Optional[int] = None) -> 'LeaderboardIndex':
+        """
+        Приводит индекс к версии таблицы лидеров в базе
+
+        Args:
+            version: Текущая версия (по умолчанию читается из базы)
+        """
+        if version is None:
+            version = OlympiadLeaderboard.current_version(self.olympiad_id)
+
+        with self._lock:
+            # Версия меньше известной - база восстановлена или пересоздана
+            stale = version < self.version
+            if stale or self.built_at is None or time.monotonic() - self.built_at > REBUILD_INTERVAL:
+                self._keys = []
+                self._by_participation = {}
+                self._by_user = {}
+                self._apply(OlympiadParticipation.objects.filter(olympiad_id=self.olympiad_id, is_completed=True),
+                            full=True)
+                self.built_at = time.monotonic()
+            elif version != self.version:
+                # Участия с версией новее переданной будут прочитаны еще раз
+                # при следующей синхронизации - обновление идемпотентно
+                self._apply(OlympiadParticipation.objects.filter(
+                    olympiad_id=self.olympiad_id, leaderboard_version__gt=self.version
+                ))
+            self.version = version
+        return self
+
+    def rank(self, participation_id: int) -> Optional[int]:
+        """
+        Место участия (участники с равными баллом и временем делят место)
+
+        Returns:
+            Место, начиная с 1, или None, если участие не в таблице
+        """
+        with self._lock:
+            key = self._by_participation.get(participation_id)
+            if key is None:
+                return None
+            return bisect.bisect_left(self._keys, key[:2]) + 1
+
+    def rank_of_user(self, user_id: int) -> Optional[int]:
+        with self._lock:
+            participation_id = self._by_user.get(user_id)
+        return self.rank(participation_id) if participation_id is not None else None
+
+    def slice(self, start: int, stop: int) -> List[Tuple[int, int, int]]:
+        """Тройки (место, id участия, балл) для позиций [start, stop)"""
+        with self._lock:
+            return [(bisect.bisect_left(self._keys, key[:2]) + 1, key[2], -key[0])
+                    for key in self._keys[start:stop]]
+
+    def participations(self) -> 'RankedParticipations':
+        """Участия в порядке мест - последовательность для Paginator"""
+        return RankedParticipations(self)
+
+    def top(self, count: int) -> List[OlympiadParticipation]:
+        return self.participations()[:count]
+
+
+class RankedParticipations:
+    """
+    Участия из индекса в порядке мест
+
+    Срез загружает из базы только участия своих позиций; у каждого участия
+    заполнен атрибут rank, а в замороженном индексе score - балл на момент
+    заморозки.
+    """
+
+    def __init__(self, index: LeaderboardIndex):
+        self.index = index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, item):
+        if isinstance(item, int):
+            return self[item:item + 1][0]
+
+        start, stop, _ = item.indices(len(self.index))
+        ranked = self.index.slice(start, stop)
+        participations = OlympiadParticipation.objects.select_related('user').in_bulk(
+            [participation_id for _, participation_id, _ in ranked]
+        )
+        result = []
+        for rank, participation_id, score in ranked:
+            participation = participations.get(participation_id)
+            # Участие могли удалить после построения индекса
+            if participation is not None:
+                participation.rank = rank
+                if self.index.frozen:
+                    participation.score = score
+                result.append(participation)
+        return result
+
+
+_indexes: Dict[Tuple[int, bool], LeaderboardIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_leaderboard(olympiad_id: int, frozen: bool = False) -> LeaderboardIndex:
+    """
+    Индекс таблицы лидеров олимпиады, синхронизированный с базой
+
+    Args:
+        olympiad_id: ID олимпиады
+        frozen: Вернуть таблицу на момент начала заморозки
+    """
+    with _indexes_lock:
+        index = _indexes.get((olympiad_id, frozen))
+        if index is None:
+            index = _indexes[olympiad_id, frozen] = LeaderboardIndex(olympiad_id, frozen)
+    return index.sync()
+
+
+def clear_leaderboards() -> None:
+    """Сбрасывает индексы процесса (например, после восстановления базы)"""
+    with _indexes_lock:
+        _indexes.clear()
@@ -0,0 +1,68 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from olympiads.benchmark import KINDS, run_benchmark
+from olympiads.code_runner import LANGUAGE_CONFIG, DEFAULT_MEMORY_LIMIT
+
+
+def int_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def name_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест проверки решений: задержки, пропускная способность и разброс замеров времени'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--languages', type=name_list, default=list(LANGUAGE_CONFIG),
+                            help='Языки через запятую (по умолчанию все установленные)')
+        parser.add_argument('--kinds', type=name_list, default=list(KINDS),
+                            help=f'Виды эталонных решений через запятую: {", ".join(KINDS)}')
+        parser.add_argument('--concurrency', type=int_list, default=[1, 4],
+                            help='Уровни параллельности через запятую')
+        parser.add_argument('--iterations', type=int, default=3,
+                            help='Сколько раз проверяется каждое решение на каждом уровне')
+        parser.add_argument('--tests', type=int, default=5, help='Число тестов в каждой проверке')
+        parser.add_argument('--time-limit', type=float, default=1.0, help='Ограничение времени на тест (сек)')
+        parser.add_argument('--memory-limit', type=int, default=DEFAULT_MEMORY_LIMIT // (1024 * 1024),
+                            help='Ограничение памяти (МБ)')
+        parser.add_argument('--jitter-runs', type=int, default=10,
+                            help='Число запусков для замеров накладных расходов и разброса времени')
+        parser.add_argument('--no-assignments', action='store_true',
+                            help='Не проверять функции solution заданий курсов')
+        parser.add_argument('--output', help='Файл для отчета в JSON (по умолчанию stdout)')
+
+    def handle(self, *args, **options):
+        unknown = [language for language in options['languages'] if language not in LANGUAGE_CONFIG]
+        if unknown:
+            raise CommandError(f'Неизвестные языки: {", ".join(unknown)}')
+        unknown = [kind for kind in options['kinds'] if kind not in KINDS]
+        if unknown:
+            raise CommandError(f'Неизвестные виды решений: {", ".join(unknown)}')
+        if not options['concurrency'] or min(options['concurrency']) < 1:
+            raise CommandError('Уровни параллельности должны быть положительными')
+
+        report = run_benchmark(
+            languages=options['languages'],
+            kinds=options['kinds'],
+            concurrency_levels=options['concurrency'],
+            iterations=max(1, options['iterations']),
+            tests=max(1, options['tests']),
+            time_limit=options['time_limit'],
+            memory_limit=options['memory_limit'] * 1024 * 1024,
+            assignments=not options['no_assignments'],
+            jitter_runs=max(2, options['jitter_runs']),
+            log=lambda message: self.stderr.write(message)
+        )
+
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(data + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Отчет сохранен в {options["output"]}'))
+        else:
+            self.stdout.write(data)
@@ -1,97 +1,121 @@
-from django.core.management.base import BaseCommand
-from olympiads.models import Problem, TestCase
-import random
+import os
+import json
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from olympiads.code_runner import LANGUAGE_CONFIG
+from olympiads.judge import get_task_limits
+from olympiads.models import OlympiadTask
+from olympiads.test_pipeline import (
+    DEFAULT_PIPELINE_TIME_LIMIT, PipelineError, Program,
+    build_tests, parse_script, save_tests, timing_report
+)
+
 
 class Command(BaseCommand):
-    help = 'Создает тестовые случаи для задач олимпиады'
+    help = ('Создает тесты задания олимпиады: генераторы строят входы, валидаторы их проверяют, '
+            'эталонное решение дает ожидаемые ответы')
 
     def add_arguments(self, parser):
-        parser.add_argument('problem_id', type=int, help='ID задачи олимпиады')
-        parser.add_argument('--count', type=int, default=5, help='Количество тестовых случаев')
+        parser.add_argument('task_id', type=int, help='ID задания олимпиады')
+        parser.add_argument('--solution', required=True, help='Файл эталонного решения')
+        parser.add_argument('--solution-language', choices=list(LANGUAGE_CONFIG),
+                            help='Язык эталонного решения (по умолчанию по расширению файла)')
+        parser.add_argument('--generator', action='append', default=[],
+                            help='Файл генератора; в скрипте указывается по имени файла без расширения')
+        parser.add_argument('--script', help='Скрипт генерации: по строке `<генератор> <аргументы>` на тест')
+        parser.add_argument('--input', action='append', default=[],
+                            help='Файл с входными данными ручного теста')
+        parser.add_argument('--validator', action='append', default=[],
+                            help='Валидатор входных данных (ненулевой код возврата отклоняет тест)')
+        parser.add_argument('--group', help='Название группы тестов задания (создается, если ее нет)')
+        parser.add_argument('--points', type=int, default=1, help='Баллы за каждый тест')
+        parser.add_argument('--samples', type=int, default=0,
+                            help='Сколько первых тестов открыть участникам')
+        parser.add_argument('--replace', action='store_true', help='Удалить существующие тесты задания')
+        parser.add_argument('--time-limit', type=float, default=DEFAULT_PIPELINE_TIME_LIMIT,
+                            help='Ограничение времени каждого запуска (сек)')
+        parser.add_argument('--workers', type=int, help='Число параллельных запусков')
+        parser.add_argument('--dry-run', action='store_true', help='Не сохранять тесты, только вывести замеры')
+        parser.add_argument('--report', help='Файл для замеров эталонного решения в JSON')
 
     def handle(self, *args, **options):
-        problem_id = options['problem_id']
-        count = options['count']
+        try:
+            task = OlympiadTask.objects.get(pk=options['task_id'])
+        except OlympiadTask.DoesNotExist:
+            raise CommandError(f'Задание с ID {options["task_id"]} не найдено')
+
+        if options['script'] and not options['generator']:
+            raise CommandError('Для скрипта генерации нужен хотя бы один --generator')
 
         try:
-            problem = Problem.objects.get(pk=problem_id)
-        except Problem.DoesNotExist:
-            self.stdout.write(self.style.ERROR(f'Задача с ID {problem_id} не найдена!'))
-            return
+            script = []
+            if options['script']:
+                with open(options['script'], encoding='utf-8') as f:
+                    script = parse_script(f.read())
+            manual_inputs = []
+            for path in options['input']:
+                with open(path, encoding='utf-8') as f:
+                    manual_inputs.append((os.path.basename(path), f.read()))
+        except OSError as e:
+            raise CommandError(str(e))
 
-        # Удаляем существующие тестовые случаи для задачи
-        TestCase.objects.filter(problem=problem).delete()
-
-        # Примеры тестовых случаев для разных типов задач
-        test_cases = []
-
-        # Простой пример: сложение двух чисел
-        if "сложение" in problem.title.lower() or "сумма" in problem.title.lower():
-            for i in range(count):
-                a = random.randint(1, 100)
-                b = random.randint(1, 100)
-                input_data = f"{a} {b}"
-                expected_output = str(a + b)
-                weight = 1 if i < count // 2 else 2  # более сложные тесты имеют больший вес
-                is_example = (i == 0)  # первый тест будет примером
-                test_cases.append((input_data, expected_output, is_example, weight, i + 1))
-
-        # Пример: поиск максимального числа
-        elif "максимум" in problem.title.lower() or "наибольшее" in problem.title.lower():
-            for i in range(count):
-                nums_count = random.randint(3, 10)
-                nums = [random.randint(-100, 100) for _ in range(nums_count)]
-                input_data = f"{nums_count}\n" + " ".join(map(str, nums))
-                expected_output = str(max(nums))
-                weight = 1 if nums_count < 5 else 2
-                is_example = (i == 0)
-                test_cases.append((input_data, expected_output, is_example, weight, i + 1))
-
-        # Пример: проверка на простое число
-        elif "простое" in problem.title.lower() or "prime" in problem.title.lower():
-            for i in range(count):
-                if i == 0:  # пример
-                    num = 7  # простое число
-                elif i == 1:
-                    num = 4  # составное число
-                else:
-                    num = random.randint(2, 1000)
-                input_data = str(num)
-                
-                # Проверка на простое число
-                is_prime = True
-                if num < 2:
-                    is_prime = False
-                else:
-                    for j in range(2, int(num**0.5) + 1):
-                        if num % j == 0:
-                            is_prime = False
-                            break
-                            
-                expected_output = "YES" if is_prime else "NO"
-                weight = 1 if num < 100 else 2
-                is_example = (i < 2)  # первые два теста будут примерами
-                test_cases.append((input_data, expected_output, is_example, weight, i + 1))
-
-        # Общий случай - создаем базовые тестовые случаи
-        else:
-            test_cases = [
-                ("10", "10", True, 1, 1),
-                ("5 7", "12", True, 1, 2),
-                ("100 200", "300", False, 2, 3),
-                ("15 -5", "10", False, 2, 4),
-                ("1000 1000", "2000", False, 3, 5)
-            ]
-
-        # Создаем тестовые случаи
-        for input_data, expected_output, is_example, weight, order in test_cases:
-            TestCase.objects.create(
-                problem=problem,
-                input_data=input_data,
-                expected_output=expected_output,
-                is_example=is_example,
-                weight=weight,
-                order=order
+        # Эталон должен укладываться в ограничение памяти задания
+        _, memory_limit = get_task_limits(task)
+
+        try:
+            with ExitStack() as stack:
+                solution = stack.enter_context(Program(options['solution'], options['solution_language'],
+                                                       task.compile_profile or None))
+                generators = [stack.enter_context(Program(path)) for path in options['generator']]
+                validators = [stack.enter_context(Program(path)) for path in options['validator']]
+
+                tests = build_tests(
+                    solution,
+                    generators=generators,
+                    script=script,
+                    manual_inputs=manual_inputs,
+                    validators=validators,
+                    time_limit=options['time_limit'],
+                    memory_limit=memory_limit,
+                    workers=options['workers'],
+                    log=lambda message: self.stderr.write(message)
+                )
+        except PipelineError as e:
+            raise CommandError(str(e))
+
+        for number, test in enumerate(tests, 1):
+            self.stdout.write(
+                f'{number:>4}  {test["execution_time"] * 1000:>9.1f} мс  {test["wall_time"] * 1000:>9.1f} мс  '
+                f'{test["memory_used"] / (1024 * 1024):>7.1f} МБ  {test["source"]}'
             )
 
-        self.stdout.write(self.style.SUCCESS(f'Создано {len(test_cases)} тестовых случаев для задачи "{problem.title}"'))
\ No newline at end of file
+        report = timing_report(tests)
+        self.stdout.write(
+            f'Эталон: процессорное время p50 {report["cpu"]["p50"]} мс, p95 {report["cpu"]["p95"]} мс, '
+            f'максимум {report["cpu"]["max"]} мс; память до {report["max_memory_mb"]} МБ'
+        )
+        self.stdout.write(f'Рекомендуемое ограничение времени: {report["suggested_time_limit"]} сек')
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as f:
+                json.dump({
+                    'task': task.pk,
+                    'summary': report,
+                    'tests': [{key: test[key] for key in ('source', 'execution_time', 'wall_time', 'memory_used')}
+                              for test in tests],
+                }, f, ensure_ascii=False, indent=2)
+
+        if options['dry_run']:
+            return
+
+        with transaction.atomic():
+            group = None
+            if options['group']:
+                group, _ = task.test_groups.get_or_create(name=options['group'])
+
+            created = save_tests(task, tests, group=group, points=options['points'],
+                                 samples=options['samples'], replace=options['replace'])
+        self.stdout.write(self.style.SUCCESS(f'Создано {len(created)} тестовых случаев для задания "{task.title}"'))
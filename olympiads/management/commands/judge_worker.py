@@ -0,0 +1,98 @@
+import time
+import signal
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from olympiads.code_runner import get_workspace_manager, prepare_cpp_pch
+from olympiads.judge import claim_next_job, process_job, requeue_stale_jobs, worker_name
+
+# Как часто обработчик проверяет зависшие задания (секунд)
+STALE_CHECK_INTERVAL = 60
+
+
+def run_worker(poll_interval, stop_event):
+    """Цикл одного обработчика очереди проверки"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    name = worker_name()
+    last_stale_check = 0
+
+    while not stop_event.is_set():
+        if time.monotonic() - last_stale_check > STALE_CHECK_INTERVAL:
+            requeue_stale_jobs()
+            last_stale_check = time.monotonic()
+
+        job = claim_next_job(name)
+        if job is None:
+            stop_event.wait(poll_interval)
+            continue
+
+        process_job(job)
+
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Запускает обработчики очереди проверки решений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Количество процессов-обработчиков')
+        parser.add_argument('--poll-interval', type=float, default=0.5,
+                            help='Пауза между опросами пустой очереди (сек)')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+
+        stop_event = multiprocessing.Event()
+        stopping = []
+
+        def stop(signum, frame):
+            # Только выставляем флаг: вызов stop_event.set() из обработчика
+            # сигнала может заблокироваться на внутренней блокировке Event
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        # Дочерние процессы не должны использовать соединения родителя
+        connections.close_all()
+
+        # Рабочие каталоги, оставшиеся от упавших обработчиков
+        removed = get_workspace_manager().collect_garbage()
+        if removed:
+            self.stdout.write(f'Удалено брошенных рабочих каталогов: {removed}')
+
+        # Предкомпилированные заголовки C++ собираем до запуска обработчиков,
+        # чтобы первые компиляции не ждали их сборки
+        pch = prepare_cpp_pch()
+        if pch:
+            ready = [profile for profile, built in pch.items() if built]
+            self.stdout.write(f'Предкомпилированные заголовки C++: {", ".join(ready) or "недоступны"}')
+
+        processes = []
+        for _ in range(workers):
+            process = multiprocessing.Process(target=run_worker, args=(poll_interval, stop_event))
+            process.start()
+            processes.append(process)
+
+        self.stdout.write(self.style.SUCCESS(f'Запущено обработчиков очереди проверки: {workers}'))
+
+        while not stopping:
+            for i, process in enumerate(processes):
+                if not process.is_alive():
+                    # Перезапускаем упавший обработчик
+                    self.stdout.write(self.style.WARNING(
+                        f'Обработчик {process.pid} завершился с кодом {process.exitcode}, перезапуск'
+                    ))
+                    processes[i] = multiprocessing.Process(target=run_worker, args=(poll_interval, stop_event))
+                    processes[i].start()
+            time.sleep(1)
+
+        # Обработчики доделывают текущие задания и завершаются
+        stop_event.set()
+        for process in processes:
+            process.join()
+
+        self.stdout.write(self.style.SUCCESS('Обработчики очереди проверки остановлены'))
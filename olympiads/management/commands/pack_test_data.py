@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.db.models.functions import Length
+
+from olympiads.blob_store import get_blob_store, get_blob_threshold
+from olympiads.models import OlympiadTestCase
+
+
+class Command(BaseCommand):
+    help = 'Переносит большие тестовые данные из базы в хранилище блобов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--task', type=int, help='ID задания олимпиады (по умолчанию все задания)')
+
+    def handle(self, *args, **options):
+        if get_blob_store() is None:
+            raise CommandError('Хранилище тестов не настроено (OLYMPIADS_TEST_BLOB_DIR)')
+
+        # Символ занимает не больше 4 байт в UTF-8, поэтому фильтр не пропускает
+        # тесты больше порога; точную проверку делает pack_blobs
+        threshold = get_blob_threshold()
+        test_cases = OlympiadTestCase.objects.annotate(
+            input_length=Length('input_data'),
+            expected_length=Length('expected_output')
+        ).filter(Q(input_length__gt=threshold // 4) | Q(expected_length__gt=threshold // 4))
+        if options['task']:
+            test_cases = test_cases.filter(task_id=options['task'])
+
+        packed = 0
+        for test_case in test_cases.iterator():
+            if test_case.pack_blobs():
+                # Содержимое теста не изменилось - updated_at не трогаем
+                OlympiadTestCase.objects.filter(pk=test_case.pk).update(
+                    input_data=test_case.input_data,
+                    expected_output=test_case.expected_output,
+                    input_blob=test_case.input_blob,
+                    expected_blob=test_case.expected_blob
+                )
+                packed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Перенесено тестов в хранилище: {packed}'))
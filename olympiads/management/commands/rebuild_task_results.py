@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from olympiads.judge import rebuild_task_results, recalculate_scores
+from olympiads.models import Olympiad
+
+
+class Command(BaseCommand):
+    help = ('Сверяет лучшие результаты по заданиям и баллы участников с отправками '
+            'и перестраивает их')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--olympiad', type=int, help='ID олимпиады (по умолчанию все олимпиады)')
+        parser.add_argument('--check', action='store_true',
+                            help='Только сообщить о расхождениях, ничего не меняя')
+
+    def handle(self, *args, **options):
+        olympiads = Olympiad.objects.all()
+        if options['olympiad']:
+            olympiads = olympiads.filter(pk=options['olympiad'])
+            if not olympiads.exists():
+                raise CommandError(f'Олимпиада с ID {options["olympiad"]} не найдена')
+
+        total_results = 0
+        total_scores = 0
+        for olympiad in olympiads:
+            with transaction.atomic():
+                participations = list(olympiad.participations.all())
+                old_scores = {participation.pk: (participation.score, participation.passed)
+                              for participation in participations}
+
+                fixed = rebuild_task_results(participations)
+                recalculate_scores(olympiad, participations)
+                changed_scores = sum(
+                    1 for participation in participations
+                    if old_scores[participation.pk] != (participation.score, participation.passed)
+                )
+
+                if options['check']:
+                    transaction.set_rollback(True)
+
+            fixed_results = sum(fixed.values())
+            total_results += fixed_results
+            total_scores += changed_scores
+            if fixed_results or changed_scores:
+                self.stdout.write(
+                    f'{olympiad.title}: результатов по заданиям создано {fixed["created"]}, '
+                    f'исправлено {fixed["updated"]}, удалено {fixed["deleted"]}; '
+                    f'баллов участников исправлено {changed_scores}'
+                )
+
+        if not total_results and not total_scores:
+            self.stdout.write(self.style.SUCCESS('Расхождений не найдено'))
+        elif options['check']:
+            self.stdout.write(self.style.WARNING(
+                f'Найдено расхождений: результатов {total_results}, баллов {total_scores} '
+                f'(запустите без --check, чтобы исправить)'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Исправлено: результатов {total_results}, баллов {total_scores}'
+            ))
@@ -0,0 +1,71 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from olympiads.judge import run_rejudge, start_rejudge
+from olympiads.models import Olympiad, OlympiadTask, RejudgeBatch
+
+
+class Command(BaseCommand):
+    help = 'Перепроверяет отправки задания или олимпиады и пересчитывает баллы участников'
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument('--task', type=int, help='ID задания олимпиады')
+        scope.add_argument('--olympiad', type=int, help='ID олимпиады (все задания на программирование)')
+        scope.add_argument('--resume', type=int, metavar='BATCH_ID', help='Продолжить прерванную перепроверку')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Число параллельных проверок в этом процессе')
+        parser.add_argument('--no-wait', action='store_true',
+                            help='Только поставить перепроверку в очередь для judge_worker')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            try:
+                batch = RejudgeBatch.objects.get(pk=options['resume'])
+            except RejudgeBatch.DoesNotExist:
+                raise CommandError(f'Перепроверка #{options["resume"]} не найдена')
+        elif options['task']:
+            try:
+                task = OlympiadTask.objects.select_related('olympiad').get(pk=options['task'])
+            except OlympiadTask.DoesNotExist:
+                raise CommandError(f'Задание с ID {options["task"]} не найдено')
+            batch = start_rejudge(task.olympiad, task)
+        else:
+            try:
+                olympiad = Olympiad.objects.get(pk=options['olympiad'])
+            except Olympiad.DoesNotExist:
+                raise CommandError(f'Олимпиада с ID {options["olympiad"]} не найдена')
+            batch = start_rejudge(olympiad)
+
+        # Повторный запуск той же команды продолжает незавершенную перепроверку
+        processed = batch.processed_count()
+        if processed:
+            self.stdout.write(f'Перепроверка #{batch.id}: продолжение, уже проверено {processed} из {batch.total}')
+        else:
+            self.stdout.write(f'Перепроверка #{batch.id}: отправок {batch.total}')
+
+        if options['no_wait'] or batch.status == RejudgeBatch.BatchStatus.DONE:
+            self.report(batch)
+            return
+
+        last = [None]
+
+        def progress(done, total):
+            if done != last[0]:
+                last[0] = done
+                self.stdout.write(f'Проверено {done} из {total}')
+
+        batch = run_rejudge(batch, workers=max(1, options['workers']), progress=progress)
+        self.report(batch)
+
+    def report(self, batch):
+        if batch.status == RejudgeBatch.BatchStatus.DONE:
+            self.stdout.write(self.style.SUCCESS(
+                f'Перепроверка #{batch.id} завершена, баллы участников пересчитаны'
+            ))
+        else:
+            self.stdout.write(
+                f'Перепроверка #{batch.id} поставлена в очередь; '
+                f'продолжить здесь: manage.py rejudge --resume {batch.id}'
+            )
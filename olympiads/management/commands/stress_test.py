@@ -0,0 +1,107 @@
+import json
+import shlex
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+
+from olympiads.code_runner import LANGUAGE_CONFIG, DEFAULT_MEMORY_LIMIT
+from olympiads.judge import get_task_limits
+from olympiads.models import OlympiadTask, OlympiadTaskSubmission
+from olympiads.stress import DEFAULT_STRESS_TIME_LIMIT, stress_test
+from olympiads.test_pipeline import PipelineError, Program
+
+
+class Command(BaseCommand):
+    help = 'Стресс-тест: ищет вход, на котором решение расходится с эталоном'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--generator', required=True, help='Файл генератора')
+        parser.add_argument('--args', default='',
+                            help='Аргументы генератора; {seed} и {size} заменяются зерном и размером теста')
+        parser.add_argument('--reference', required=True, help='Файл эталонного решения')
+        candidate = parser.add_mutually_exclusive_group(required=True)
+        candidate.add_argument('--candidate', help='Файл проверяемого решения')
+        candidate.add_argument('--submission', type=int, help='ID отправки олимпиады с проверяемым решением')
+        parser.add_argument('--language', choices=list(LANGUAGE_CONFIG),
+                            help='Язык проверяемого решения (по умолчанию по расширению файла)')
+        parser.add_argument('--task', type=int,
+                            help='ID задания: проверка вывода, профиль компиляции и ограничение памяти')
+        parser.add_argument('--iterations', type=int, default=1000, help='Наибольшее число случаев')
+        parser.add_argument('--seed', type=int, default=1, help='Зерно первого случая')
+        parser.add_argument('--max-size', type=int, help='Наибольший размер теста для {size}')
+        parser.add_argument('--time-limit', type=float, default=DEFAULT_STRESS_TIME_LIMIT,
+                            help='Ограничение времени каждого запуска (сек)')
+        parser.add_argument('--workers', type=int, help='Число параллельных случаев')
+        parser.add_argument('--output', help='Файл для отчета в JSON')
+
+    def handle(self, *args, **options):
+        task = None
+        code = None
+        language = options['language']
+        candidate_path = options['candidate']
+
+        if options['submission']:
+            try:
+                submission = OlympiadTaskSubmission.objects.select_related('task').get(pk=options['submission'])
+            except OlympiadTaskSubmission.DoesNotExist:
+                raise CommandError(f'Отправка с ID {options["submission"]} не найдена')
+            task = submission.task
+            code = submission.code
+            language = submission.language
+            candidate_path = f'submission-{submission.pk}'
+
+        if options['task']:
+            try:
+                task = OlympiadTask.objects.get(pk=options['task'])
+            except OlympiadTask.DoesNotExist:
+                raise CommandError(f'Задание с ID {options["task"]} не найдено')
+
+        checker = task.get_checker() if task else None
+        compile_profile = (task.compile_profile or None) if task else None
+        memory_limit = get_task_limits(task)[1] if task else DEFAULT_MEMORY_LIMIT
+
+        try:
+            with ExitStack() as stack:
+                generator = stack.enter_context(Program(options['generator']))
+                reference = stack.enter_context(Program(options['reference'], compile_profile=compile_profile))
+                candidate = stack.enter_context(
+                    Program(candidate_path, language, compile_profile=compile_profile, code=code)
+                )
+
+                report = stress_test(
+                    generator, reference, candidate,
+                    iterations=max(1, options['iterations']),
+                    args=shlex.split(options['args']),
+                    seed=options['seed'],
+                    max_size=options['max_size'],
+                    checker=checker,
+                    time_limit=options['time_limit'],
+                    memory_limit=memory_limit,
+                    workers=options['workers'],
+                    log=lambda message: self.stderr.write(message)
+                )
+        except (PipelineError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+        self.stdout.write(
+            f'Случаев: {report["cases"]} за {report["elapsed"]} сек ({report["throughput"]} в секунду); '
+            f'время эталона p95 {report["reference_time"]["p95"]} мс, '
+            f'решения p95 {report["candidate_time"]["p95"]} мс'
+        )
+
+        failure = report['failure']
+        if failure is None:
+            self.stdout.write(self.style.SUCCESS('Расхождений не найдено'))
+            return
+
+        self.stdout.write(self.style.ERROR(
+            f'{failure["verdict"].capitalize()}: зерно {failure["seed"]}, '
+            f'аргументы генератора: {shlex.join(failure["args"])}'
+        ))
+        for title, text in (('Вход', failure['input']), ('Эталон', failure['expected']),
+                            ('Решение', failure['output'])):
+            self.stdout.write(f'--- {title} ---\n{text}')
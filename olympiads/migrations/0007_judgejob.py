@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympiads', '0006_olympiad_invitation_code'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JudgeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('olympiad_test', 'Проверка кода задания олимпиады'), ('olympiad_submission', 'Проверка отправки олимпиады'), ('assignment', 'Проверка задания курса')], max_length=30, verbose_name='Тип')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Проверяется'), ('done', 'Завершено')], default='queued', max_length=20, verbose_name='Статус')),
+                ('payload', models.JSONField(default=dict, verbose_name='Параметры')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Результат')),
+                ('error_message', models.TextField(blank=True, verbose_name='Сообщение об ошибке')),
+                ('worker', models.CharField(blank=True, max_length=255, verbose_name='Обработчик')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начало проверки')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Окончание проверки')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='judge_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Задание проверки',
+                'verbose_name_plural': 'Очередь проверки',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='olympiads_j_status_cf4f8e_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympiads', '0007_judgejob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='judgejob',
+            name='olympiads_j_status_cf4f8e_idx',
+        ),
+        migrations.AddField(
+            model_name='judgejob',
+            name='priority',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Активная олимпиада'), (1, 'Задание курса'), (2, 'Тренировочный запуск'), (3, 'Перепроверка')], default=2, verbose_name='Приоритет'),
+        ),
+        migrations.AlterField(
+            model_name='judgejob',
+            name='kind',
+            field=models.CharField(choices=[('olympiad_test', 'Проверка кода задания олимпиады'), ('olympiad_submission', 'Проверка отправки олимпиады'), ('olympiad_run', 'Запуск кода задания олимпиады'), ('assignment', 'Проверка задания курса')], max_length=30, verbose_name='Тип'),
+        ),
+        migrations.AddIndex(
+            model_name='judgejob',
+            index=models.Index(fields=['status', 'priority', 'created_at'], name='olympiads_j_status_000cec_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympiads', '0008_judgejob_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerdictCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='Ключ')),
+                ('task_kind', models.CharField(choices=[('olympiad', 'Задание олимпиады'), ('assignment', 'Задание курса')], max_length=20, verbose_name='Тип задания')),
+                ('task_id', models.PositiveIntegerField(verbose_name='ID задания')),
+                ('language', models.CharField(max_length=20, verbose_name='Язык')),
+                ('tests_version', models.CharField(max_length=64, verbose_name='Версия тестов')),
+                ('result', models.JSONField(verbose_name='Результат проверки')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='Попаданий')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('last_used_at', models.DateTimeField(auto_now=True, verbose_name='Последнее использование')),
+            ],
+            options={
+                'verbose_name': 'Кэшированный вердикт',
+                'verbose_name_plural': 'Кэш вердиктов',
+                'indexes': [models.Index(fields=['task_kind', 'task_id'], name='olympiads_v_task_ki_cecfeb_idx')],
+            },
+        ),
+    ]
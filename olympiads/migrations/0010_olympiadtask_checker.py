@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympiads', '0009_verdictcache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='olympiadtask',
+            name='checker_code',
+            field=models.TextField(blank=True, help_text='Запускается с аргументами <вход> <вывод> <ответ>, код возврата 0 означает верный ответ', verbose_name='Код чекера (C++)'),
+        ),
+        migrations.AddField(
+            model_name='olympiadtask',
+            name='checker_epsilon',
+            field=models.FloatField(default=1e-06, help_text='Для проверки чисел с погрешностью', verbose_name='Допустимая погрешность'),
+        ),
+        migrations.AddField(
+            model_name='olympiadtask',
+            name='checker_type',
+            field=models.CharField(choices=[('exact', 'Точное совпадение'), ('tokens', 'Совпадение токенов'), ('float', 'Числа с погрешностью'), ('unordered_lines', 'Строки в любом порядке'), ('custom', 'Собственный чекер')], default='exact', max_length=20, verbose_name='Проверка вывода'),
+        ),
+    ]
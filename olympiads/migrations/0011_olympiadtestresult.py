@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympiads', '0010_olympiadtask_checker'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OlympiadTestResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('test_number', models.PositiveIntegerField(verbose_name='Номер теста')),
+                ('verdict', models.CharField(choices=[('accepted', 'Верно'), ('wrong_answer', 'Неверный ответ'), ('time_limit', 'Превышено время'), ('output_limit', 'Превышен объем вывода'), ('runtime_error', 'Ошибка выполнения'), ('skipped', 'Не запускался')], max_length=20, verbose_name='Вердикт')),
+                ('passed', models.BooleanField(default=False, verbose_name='Пройден')),
+                ('cpu_time', models.FloatField(default=0, verbose_name='Процессорное время (сек)')),
+                ('wall_time', models.FloatField(default=0, verbose_name='Реальное время (сек)')),
+                ('memory_used', models.PositiveBigIntegerField(default=0, verbose_name='Пиковая память (байт)')),
+                ('judge_host', models.CharField(blank=True, max_length=255, verbose_name='Сервер проверки')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_results', to='olympiads.olympiadtasksubmission', verbose_name='Отправка')),
+                ('test_case', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='results', to='olympiads.olympiadtestcase', verbose_name='Тестовый случай')),
+            ],
+            options={
+                'verbose_name': 'Результат теста',
+                'verbose_name_plural': 'Результаты тестов',
+                'ordering': ['submission', 'test_number'],
+            },
+        ),
+    ]
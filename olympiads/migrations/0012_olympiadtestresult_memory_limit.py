@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympiads', '0011_olympiadtestresult'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='olympiadtestresult',
+            name='verdict',
+            field=models.CharField(choices=[('accepted', 'Верно'), ('wrong_answer', 'Неверный ответ'), ('time_limit', 'Превышено время'), ('memory_limit', 'Превышена память'), ('output_limit', 'Превышен объем вывода'), ('runtime_error', 'Ошибка выполнения'), ('skipped', 'Не запускался')], max_length=20, verbose_name='Вердикт'),
+        ),
+    ]
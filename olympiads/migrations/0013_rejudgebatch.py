@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympiads', '0012_olympiadtestresult_memory_limit'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='olympiadtasksubmission',
+            name='language',
+            field=models.CharField(default='python', max_length=20, verbose_name='Язык программирования'),
+        ),
+        migrations.AlterField(
+            model_name='judgejob',
+            name='kind',
+            field=models.CharField(choices=[('olympiad_test', 'Проверка кода задания олимпиады'), ('olympiad_submission', 'Проверка отправки олимпиады'), ('olympiad_run', 'Запуск кода задания олимпиады'), ('olympiad_rejudge', 'Перепроверка отправки олимпиады'), ('assignment', 'Проверка задания курса')], max_length=30, verbose_name='Тип'),
+        ),
+        migrations.CreateModel(
+            name='RejudgeBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('running', 'Выполняется'), ('done', 'Завершена')], default='running', max_length=20, verbose_name='Статус')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Всего отправок')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rejudge_batches', to=settings.AUTH_USER_MODEL, verbose_name='Запустил')),
+                ('olympiad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rejudge_batches', to='olympiads.olympiad', verbose_name='Олимпиада')),
+                ('task', models.ForeignKey(blank=True, help_text='Пусто - перепроверяются все задания олимпиады', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rejudge_batches', to='olympiads.olympiadtask', verbose_name='Задание')),
+            ],
+            options={
+                'verbose_name': 'Перепроверка',
+                'verbose_name_plural': 'Перепроверки',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='judgejob',
+            name='rejudge_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='olympiads.rejudgebatch', verbose_name='Перепроверка'),
+        ),
+    ]
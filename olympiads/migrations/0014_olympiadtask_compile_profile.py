@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympiads', '0013_rejudgebatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='olympiadtask',
+            name='compile_profile',
+            field=models.CharField(blank=True, help_text='Стандарт и оптимизация из OLYMPIADS_CPP_PROFILES, например c++17-O2; пусто - профиль по умолчанию', max_length=32, verbose_name='Профиль компиляции C++'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympiads', '0014_olympiadtask_compile_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='olympiadtestcase',
+            name='expected_blob',
+            field=models.CharField(blank=True, help_text='sha256 ожидаемого результата в хранилище тестов', max_length=64, verbose_name='Блоб ожидаемого результата'),
+        ),
+        migrations.AddField(
+            model_name='olympiadtestcase',
+            name='input_blob',
+            field=models.CharField(blank=True, help_text='sha256 входных данных в хранилище тестов', max_length=64, verbose_name='Блоб входных данных'),
+        ),
+        migrations.AlterField(
+            model_name='olympiadtestcase',
+            name='expected_output',
+            field=models.TextField(blank=True, verbose_name='Ожидаемый результат'),
+        ),
+        migrations.AlterField(
+            model_name='olympiadtestcase',
+            name='input_data',
+            field=models.TextField(blank=True, verbose_name='Входные данные'),
+        ),
+    ]
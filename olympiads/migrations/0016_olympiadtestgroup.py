@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympiads', '0015_olympiadtestcase_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OlympiadTestGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Название')),
+                ('points', models.PositiveIntegerField(default=0, verbose_name='Баллы')),
+                ('scoring', models.CharField(choices=[('all', 'Баллы за прохождение всех тестов группы'), ('per_test', 'Баллы пропорционально пройденным тестам')], default='all', max_length=10, verbose_name='Начисление баллов')),
+                ('is_sample', models.BooleanField(default=False, help_text='Группы примеров проверяются первыми', verbose_name='Примеры')),
+                ('order', models.PositiveIntegerField(default=0, verbose_name='Порядок')),
+                ('depends_on', models.ManyToManyField(blank=True, help_text='Тесты группы не запускаются, если одна из этих групп не пройдена', related_name='dependents', to='olympiads.olympiadtestgroup', verbose_name='Зависит от групп')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_groups', to='olympiads.olympiadtask', verbose_name='Задание')),
+            ],
+            options={
+                'verbose_name': 'Группа тестов',
+                'verbose_name_plural': 'Группы тестов',
+                'ordering': ['task', 'order'],
+            },
+        ),
+        migrations.AddField(
+            model_name='olympiadtestcase',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='test_cases', to='olympiads.olympiadtestgroup', verbose_name='Группа'),
+        ),
+    ]
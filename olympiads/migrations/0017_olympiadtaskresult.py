@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_task_results(apps, schema_editor):
+    """Заполняет лучшие результаты по заданиям и баллы участников по отправкам"""
+    OlympiadTaskSubmission = apps.get_model('olympiads', 'OlympiadTaskSubmission')
+    OlympiadTaskResult = apps.get_model('olympiads', 'OlympiadTaskResult')
+    OlympiadParticipation = apps.get_model('olympiads', 'OlympiadParticipation')
+
+    best = {}
+    submissions = OlympiadTaskSubmission.objects.order_by('-score', '-is_correct', 'submitted_at', 'id')
+    for submission in submissions.only('id', 'participation_id', 'task_id', 'score', 'is_correct').iterator():
+        best.setdefault((submission.participation_id, submission.task_id), submission)
+
+    OlympiadTaskResult.objects.bulk_create([
+        OlympiadTaskResult(
+            participation_id=participation_id,
+            task_id=task_id,
+            best_submission_id=submission.id,
+            score=submission.score,
+            is_correct=submission.is_correct
+        )
+        for (participation_id, task_id), submission in best.items()
+    ], batch_size=1000)
+
+    totals = {}
+    for (participation_id, _), submission in best.items():
+        totals[participation_id] = totals.get(participation_id, 0) + submission.score
+    participations = list(OlympiadParticipation.objects.select_related('olympiad'))
+    for participation in participations:
+        participation.score = totals.get(participation.id, 0)
+        participation.passed = participation.score >= participation.olympiad.min_passing_score
+    OlympiadParticipation.objects.bulk_update(participations, ['score', 'passed'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympiads', '0016_olympiadtestgroup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OlympiadTaskResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField(default=0, verbose_name='Лучший балл')),
+                ('is_correct', models.BooleanField(default=False, verbose_name='Решено')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлен')),
+                ('best_submission', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='olympiads.olympiadtasksubmission', verbose_name='Лучшая отправка')),
+                ('participation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_results', to='olympiads.olympiadparticipation', verbose_name='Участие')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='olympiads.olympiadtask', verbose_name='Задание')),
+            ],
+            options={
+                'verbose_name': 'Результат по заданию',
+                'verbose_name_plural': 'Результаты по заданиям',
+                'unique_together': {('participation', 'task')},
+            },
+        ),
+        migrations.RunPython(fill_task_results, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympiads', '0017_olympiadtaskresult'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OlympiadLeaderboard',
+            fields=[
+                ('olympiad', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard', serialize=False, to='olympiads.olympiad', verbose_name='Олимпиада')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Таблица лидеров',
+                'verbose_name_plural': 'Таблицы лидеров',
+            },
+        ),
+        migrations.AddField(
+            model_name='olympiadparticipation',
+            name='leaderboard_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Версия таблицы лидеров'),
+        ),
+        migrations.AddIndex(
+            model_name='olympiadparticipation',
+            index=models.Index(fields=['olympiad', 'leaderboard_version'], name='olympiads_o_olympia_6b9114_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympiads', '0018_olympiadleaderboard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='olympiad',
+            name='freeze_minutes',
+            field=models.PositiveIntegerField(default=0, help_text='За сколько минут до окончания скрыть от участников изменения таблицы лидеров (до подведения итогов); 0 - без заморозки', verbose_name='Заморозка таблицы лидеров (мин)'),
+        ),
+        migrations.CreateModel(
+            name='OlympiadScoreEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField(default=0, verbose_name='Изменение балла')),
+                ('score', models.PositiveIntegerField(default=0, verbose_name='Балл участника')),
+                ('task_score', models.PositiveIntegerField(default=0, verbose_name='Лучший балл по заданию')),
+                ('is_correct', models.BooleanField(default=False, verbose_name='Решено')),
+                ('is_frozen', models.BooleanField(default=False, verbose_name='Во время заморозки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('olympiad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_events', to='olympiads.olympiad', verbose_name='Олимпиада')),
+                ('participation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_events', to='olympiads.olympiadparticipation', verbose_name='Участие')),
+                ('submission', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='olympiads.olympiadtasksubmission', verbose_name='Отправка')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='olympiads.olympiadtask', verbose_name='Задание')),
+            ],
+            options={
+                'verbose_name': 'Событие таблицы лидеров',
+                'verbose_name_plural': 'События таблицы лидеров',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['olympiad', 'id'], name='olympiads_o_olympia_ec9a89_idx')],
+            },
+        ),
+    ]
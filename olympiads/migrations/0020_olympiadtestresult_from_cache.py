@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('olympiads', '0019_olympiadscoreevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='olympiadtestresult',
+            name='from_cache',
+            field=models.BooleanField(default=False, help_text='Время и память измерены при исходной проверке на сервере judge_host, а не для этой отправки', verbose_name='Из кэша вердиктов'),
+        ),
+    ]
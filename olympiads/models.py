@@ -1,5 +1,7 @@
 import uuid
-from django.db import models
+from datetime import timedelta
+from django.db import models, transaction
+from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.contrib.auth import get_user_model
@@ -30,6 +32,10 @@ class Olympiad(models.Model):
                                                    default=0, 
                                                    help_text=_('0 означает без ограничения'))
     min_passing_score = models.PositiveIntegerField(_('Минимальный проходной балл'), default=0)
+    freeze_minutes = models.PositiveIntegerField(_('Заморозка таблицы лидеров (мин)'), default=0,
+                                                 help_text=_('За сколько минут до окончания скрыть от участников '
+                                                             'изменения таблицы лидеров (до подведения итогов); '
+                                                             '0 - без заморозки'))
     invitation_code = models.CharField(_('Код приглашения'), max_length=20, blank=True, null=True, unique=True)
     
     status = models.CharField(_('Статус'), max_length=20, choices=OlympiadStatus.choices, default=OlympiadStatus.DRAFT)
@@ -71,6 +77,18 @@ class Olympiad(models.Model):
         """Проверяет, началась ли олимпиада (но не обязательно активна)"""
         return self.start_datetime <= timezone.now()
     
+    def is_scoreboard_frozen(self, now=None):
+        """
+        Проверяет, заморожена ли таблица лидеров
+        
+        Заморозка начинается за freeze_minutes до окончания и длится, пока
+        организатор не завершит олимпиаду (статус «Завершена» или «В архиве»).
+        """
+        if not self.freeze_minutes or self.status in (self.OlympiadStatus.COMPLETED, self.OlympiadStatus.ARCHIVED):
+            return False
+        now = now or timezone.now()
+        return now >= self.end_datetime - timedelta(minutes=self.freeze_minutes)
+    
     def get_or_create_invitation(self):
         """Получает или создает приглашение на олимпиаду на основе invitation_code"""
         # Если код приглашения не задан, генерируем его
@@ -124,6 +142,13 @@ class OlympiadTask(models.Model):
         MULTIPLE_CHOICE = 'multiple_choice', _('Тест с выбором ответа')
         THEORETICAL = 'theoretical', _('Теоретический вопрос')
     
+    class CheckerType(models.TextChoices):
+        EXACT = 'exact', _('Точное совпадение')
+        TOKENS = 'tokens', _('Совпадение токенов')
+        FLOAT = 'float', _('Числа с погрешностью')
+        UNORDERED_LINES = 'unordered_lines', _('Строки в любом порядке')
+        CUSTOM = 'custom', _('Собственный чекер')
+    
     olympiad = models.ForeignKey(Olympiad, on_delete=models.CASCADE, 
                                related_name='tasks', verbose_name=_('Олимпиада'))
     title = models.CharField(_('Название'), max_length=255)
@@ -156,6 +181,18 @@ class OlympiadTask(models.Model):
     difficulty = models.PositiveSmallIntegerField(_('Сложность'), default=1,
                                                help_text=_('Уровень сложности от 1 до 5'))
     
+    # Проверка вывода программы (для задач на программирование)
+    checker_type = models.CharField(_('Проверка вывода'), max_length=20, choices=CheckerType.choices,
+                                    default=CheckerType.EXACT)
+    checker_epsilon = models.FloatField(_('Допустимая погрешность'), default=1e-6,
+                                        help_text=_('Для проверки чисел с погрешностью'))
+    checker_code = models.TextField(_('Код чекера (C++)'), blank=True,
+                                    help_text=_('Запускается с аргументами <вход> <вывод> <ответ>, '
+                                                'код возврата 0 означает верный ответ'))
+    compile_profile = models.CharField(_('Профиль компиляции C++'), max_length=32, blank=True,
+                                       help_text=_('Стандарт и оптимизация из OLYMPIADS_CPP_PROFILES, '
+                                                   'например c++17-O2; пусто - профиль по умолчанию'))
+    
     # Опции отображения и форматирования
     use_markdown = models.BooleanField(_('Использовать Markdown'), default=True,
                                     help_text=_('Отображать описание с поддержкой Markdown'))
@@ -173,6 +210,67 @@ class OlympiadTask(models.Model):
     
     def __str__(self):
         return f"{self.olympiad.title} - {self.title}"
+    
+    def clean(self):
+        super().clean()
+        from .code_runner import get_cpp_profiles
+
+        profiles = get_cpp_profiles()
+        if self.compile_profile and self.compile_profile not in profiles:
+            raise ValidationError({
+                'compile_profile': _('Неизвестный профиль компиляции. Доступны: %(profiles)s') % {
+                    'profiles': ', '.join(profiles)
+                }
+            })
+    
+    def get_checker(self):
+        """Возвращает режим проверки вывода для check_solution"""
+        # У нового объекта поле хранит член CheckerType: обычная строка нужна,
+        # чтобы задание передавалось рабочим процессам песочницы без импорта моделей
+        checker = {'mode': str(self.checker_type)}
+        if self.checker_type == self.CheckerType.FLOAT:
+            checker['epsilon'] = self.checker_epsilon
+        elif self.checker_type == self.CheckerType.CUSTOM:
+            checker['source'] = self.checker_code
+        return checker
+
+
+class OlympiadTestGroup(models.Model):
+    """Группа тестов (подзадача) задания олимпиады"""
+    
+    class Scoring(models.TextChoices):
+        ALL_OR_NOTHING = 'all', _('Баллы за прохождение всех тестов группы')
+        PER_TEST = 'per_test', _('Баллы пропорционально пройденным тестам')
+    
+    task = models.ForeignKey(OlympiadTask, on_delete=models.CASCADE,
+                             related_name='test_groups', verbose_name=_('Задание'))
+    name = models.CharField(_('Название'), max_length=255)
+    points = models.PositiveIntegerField(_('Баллы'), default=0)
+    scoring = models.CharField(_('Начисление баллов'), max_length=10, choices=Scoring.choices,
+                               default=Scoring.ALL_OR_NOTHING)
+    is_sample = models.BooleanField(_('Примеры'), default=False,
+                                    help_text=_('Группы примеров проверяются первыми'))
+    depends_on = models.ManyToManyField('self', symmetrical=False, blank=True,
+                                        related_name='dependents', verbose_name=_('Зависит от групп'),
+                                        help_text=_('Тесты группы не запускаются, если одна из этих групп не пройдена'))
+    order = models.PositiveIntegerField(_('Порядок'), default=0)
+    
+    class Meta:
+        verbose_name = _('Группа тестов')
+        verbose_name_plural = _('Группы тестов')
+        ordering = ['task', 'order']
+    
+    def __str__(self):
+        return f"{self.task.title} - {self.name}"
+    
+    def judge_spec(self) -> dict:
+        """Группа в формате code_runner.run_test_groups"""
+        return {
+            'id': self.id,
+            'depends_on': [group.id for group in self.depends_on.all()],
+            'is_sample': self.is_sample,
+            'all_or_nothing': self.scoring == self.Scoring.ALL_OR_NOTHING
+        }
 
 
 class OlympiadTestCase(models.Model):
@@ -180,8 +278,16 @@ class OlympiadTestCase(models.Model):
     
     task = models.ForeignKey(OlympiadTask, on_delete=models.CASCADE, 
                           related_name='test_cases', verbose_name=_('Задание'))
-    input_data = models.TextField(_('Входные данные'))
-    expected_output = models.TextField(_('Ожидаемый результат'))
+    group = models.ForeignKey(OlympiadTestGroup, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='test_cases', verbose_name=_('Группа'))
+    input_data = models.TextField(_('Входные данные'), blank=True)
+    expected_output = models.TextField(_('Ожидаемый результат'), blank=True)
+    # Большие данные хранятся в хранилище блобов (см. blob_store.py), а в
+    # текстовых полях остается пустая строка
+    input_blob = models.CharField(_('Блоб входных данных'), max_length=64, blank=True,
+                                  help_text=_('sha256 входных данных в хранилище тестов'))
+    expected_blob = models.CharField(_('Блоб ожидаемого результата'), max_length=64, blank=True,
+                                     help_text=_('sha256 ожидаемого результата в хранилище тестов'))
     is_hidden = models.BooleanField(_('Скрытый тест'), default=False,
                                 help_text=_('Если отмечено, данные теста не будут видны участнику'))
     explanation = models.TextField(_('Пояснение'), blank=True)
@@ -199,6 +305,107 @@ class OlympiadTestCase(models.Model):
     
     def __str__(self):
         return f"{self.task.title} - Тест #{self.order}"
+    
+    # Сколько байт данных из блоба показывать на странице
+    PREVIEW_BYTES = 1024
+    
+    def clean(self):
+        super().clean()
+        if self.group_id and self.task_id and self.group.task_id != self.task_id:
+            raise ValidationError({'group': _('Группа должна относиться к тому же заданию')})
+    
+    def save(self, *args, **kwargs):
+        self.pack_blobs()
+        super().save(*args, **kwargs)
+    
+    def pack_blobs(self) -> bool:
+        """
+        Переносит большие входные данные и ответ в хранилище блобов
+        
+        Пустое текстовое поле при заданном блобе означает данные из блоба;
+        непустое - новые данные, заменяющие блоб.
+        
+        Returns:
+            True, если поля теста изменились
+        """
+        from .blob_store import get_blob_store, get_blob_threshold
+        
+        store = get_blob_store()
+        changed = False
+        for text_field, blob_field in (('input_data', 'input_blob'), ('expected_output', 'expected_blob')):
+            text = getattr(self, text_field)
+            if not text:
+                continue
+            data = text.encode('utf-8')
+            if store is not None and len(data) > get_blob_threshold():
+                setattr(self, blob_field, store.put(data))
+                setattr(self, text_field, '')
+                changed = True
+            elif getattr(self, blob_field):
+                setattr(self, blob_field, '')
+                changed = True
+        return changed
+    
+    @staticmethod
+    def _blob_store():
+        from .blob_store import get_blob_store, BlobNotFound
+        
+        store = get_blob_store()
+        if store is None:
+            raise BlobNotFound("Хранилище тестов не настроено (OLYMPIADS_TEST_BLOB_DIR)")
+        return store
+    
+    def _blob_text(self, digest: str, limit=None) -> str:
+        return self._blob_store().read_text(digest, limit)
+    
+    def get_input_data(self) -> str:
+        """Входные данные теста целиком"""
+        return self._blob_text(self.input_blob) if self.input_blob else self.input_data
+    
+    def get_expected_output(self) -> str:
+        """Ожидаемый результат целиком"""
+        return self._blob_text(self.expected_blob) if self.expected_blob else self.expected_output
+    
+    def get_input_path(self):
+        """Путь к распакованному файлу входных данных или None для данных в базе"""
+        if not self.input_blob:
+            return None
+        return self._blob_store().path(self.input_blob)
+    
+    def get_expected_path(self):
+        """Путь к распакованному файлу ожидаемого результата или None для данных в базе"""
+        if not self.expected_blob:
+            return None
+        return self._blob_store().path(self.expected_blob)
+    
+    def _preview(self, text: str, digest: str) -> str:
+        if not digest:
+            return text
+        return self._blob_text(digest, self.PREVIEW_BYTES) + '\n...'
+    
+    @property
+    def input_preview(self) -> str:
+        """Входные данные для отображения (начало данных из блоба)"""
+        return self._preview(self.input_data, self.input_blob)
+    
+    @property
+    def expected_preview(self) -> str:
+        """Ожидаемый результат для отображения (начало данных из блоба)"""
+        return self._preview(self.expected_output, self.expected_blob)
+    
+    def judge_spec(self) -> dict:
+        """
+        Тестовый случай в формате check_solution
+
+        Данные из блобов передаются путями к файлам и в память не читаются.
+        """
+        spec = {'input': self.input_preview, 'expected': self.expected_output, 'group': self.group_id}
+        if self.input_blob:
+            spec['input_file'] = self.get_input_path()
+        if self.expected_blob:
+            spec['expected_file'] = self.get_expected_path()
+            spec['expected_preview'] = self.expected_preview.strip()
+        return spec
 
 
 class OlympiadMultipleChoiceOption(models.Model):
@@ -240,30 +447,152 @@ class OlympiadParticipation(models.Model):
     is_completed = models.BooleanField(_('Завершил'), default=False)
     passed = models.BooleanField(_('Сдал'), default=False)
     
+    # Версия таблицы лидеров, в которой запись изменилась последний раз (см. leaderboard.py)
+    leaderboard_version = models.PositiveBigIntegerField(_('Версия таблицы лидеров'), default=0, editable=False)
+    
+    # Поля, от которых зависит место в таблице лидеров
+    RANKING_FIELDS = {'score', 'finished_at', 'is_completed'}
+    
     class Meta:
         verbose_name = _('Участие в олимпиаде')
         verbose_name_plural = _('Участия в олимпиадах')
         unique_together = ['olympiad', 'user']
+        indexes = [models.Index(fields=['olympiad', 'leaderboard_version'])]
     
     def __str__(self):
         return f"{self.user.username} - {self.olympiad.title}"
     
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        super().save(*args, **kwargs)
+        
+        ranking_changed = update_fields is None or bool(self.RANKING_FIELDS & set(update_fields))
+        if ranking_changed and (self.is_completed or not adding):
+            self.leaderboard_version = OlympiadLeaderboard.touch(self.olympiad_id, [self.pk])
+    
     def calculate_score(self):
-        """Рассчитывает общий балл участника на основе выполненных заданий"""
-        total_score = 0
-        task_submissions = OlympiadTaskSubmission.objects.filter(
-            participation=self,
-            is_correct=True
-        )
+        """
+        Рассчитывает общий балл участника как сумму лучших результатов по заданиям
         
-        for submission in task_submissions:
-            total_score += submission.score
+        Балл и так поддерживается record_submission; пересчет нужен, например,
+        после изменения проходного балла олимпиады.
+        """
+        total_score = self.task_results.aggregate(total=models.Sum('score'))['total'] or 0
         
         self.score = total_score
         self.passed = total_score >= self.olympiad.min_passing_score
-        self.save()
+        self.save(update_fields=['score', 'passed'])
         
         return total_score
+    
+    def record_submission(self, submission):
+        """
+        Учитывает оцененную отправку в лучшем результате по заданию и общем балле
+        
+        Вызывается после сохранения оценки отправки. Общий балл меняется на
+        разницу лучших результатов по заданию, без пересчета по всем отправкам.
+        Запись участия блокируется, поэтому параллельные проверки одного
+        участника не теряют обновления.
+        
+        Returns:
+            Лучший результат по заданию (OlympiadTaskResult)
+        """
+        with transaction.atomic():
+            participation = (OlympiadParticipation.objects.select_for_update()
+                             .select_related('olympiad').get(pk=self.pk))
+            result, created = OlympiadTaskResult.objects.get_or_create(
+                participation=participation,
+                task_id=submission.task_id,
+                defaults={
+                    'best_submission': submission,
+                    'score': submission.score,
+                    'is_correct': submission.is_correct,
+                }
+            )
+            old_score = 0 if created else result.score
+            
+            if not created:
+                if result.best_submission_id == submission.pk and submission.score < result.score:
+                    # Лучшая отправка после перепроверки стала хуже - ищем новую лучшую
+                    result.set_best(OlympiadTaskResult.best_of(
+                        OlympiadTaskSubmission.objects.filter(participation=participation, task_id=submission.task_id)
+                    ))
+                    result.save()
+                elif (result.best_submission_id == submission.pk or result.best_submission_id is None
+                      or OlympiadTaskResult.is_better(submission, result)):
+                    result.set_best(submission)
+                    result.save()
+            
+            if result.score != old_score:
+                participation.score = max(0, participation.score + result.score - old_score)
+                participation.passed = participation.score >= participation.olympiad.min_passing_score
+                participation.save(update_fields=['score', 'passed'])
+            
+            # Событие для трансляции таблицы лидеров (scoreboard.py) создается под
+            # блокировкой счетчика олимпиады, даже если балл не изменился: тогда
+            # события одной олимпиады фиксируются в порядке id
+            OlympiadLeaderboard.lock(participation.olympiad_id)
+            OlympiadScoreEvent.objects.create(
+                olympiad_id=participation.olympiad_id,
+                participation=participation,
+                task_id=submission.task_id,
+                submission=submission,
+                delta=result.score - old_score,
+                score=participation.score,
+                task_score=result.score,
+                is_correct=result.is_correct,
+                is_frozen=participation.olympiad.is_scoreboard_frozen(),
+            )
+        
+        self.score = participation.score
+        self.passed = participation.passed
+        return result
+
+
+class OlympiadLeaderboard(models.Model):
+    """Счетчик изменений таблицы лидеров олимпиады"""
+    
+    olympiad = models.OneToOneField(Olympiad, on_delete=models.CASCADE, primary_key=True,
+                                    related_name='leaderboard', verbose_name=_('Олимпиада'))
+    version = models.PositiveBigIntegerField(_('Версия'), default=0)
+    
+    class Meta:
+        verbose_name = _('Таблица лидеров')
+        verbose_name_plural = _('Таблицы лидеров')
+    
+    def __str__(self):
+        return f"{self.olympiad} - v{self.version}"
+    
+    @classmethod
+    def current_version(cls, olympiad_id) -> int:
+        return cls.objects.filter(olympiad_id=olympiad_id).values_list('version', flat=True).first() or 0
+    
+    @classmethod
+    def lock(cls, olympiad_id) -> 'OlympiadLeaderboard':
+        """Блокирует счетчик олимпиады до конца текущей транзакции"""
+        board, _ = cls.objects.select_for_update().get_or_create(olympiad_id=olympiad_id)
+        return board
+    
+    @classmethod
+    def touch(cls, olympiad_id, participation_ids) -> int:
+        """
+        Отмечает изменение мест участников: увеличивает версию таблицы лидеров
+        и записывает ее в измененные участия
+        
+        Строка счетчика блокируется до конца транзакции, поэтому версии
+        фиксируются в порядке возрастания и индексы лидеров (leaderboard.py)
+        не пропускают изменений.
+        
+        Returns:
+            Новая версия
+        """
+        with transaction.atomic():
+            board = cls.lock(olympiad_id)
+            board.version += 1
+            board.save(update_fields=['version'])
+            OlympiadParticipation.objects.filter(pk__in=participation_ids).update(leaderboard_version=board.version)
+        return board.version
 
 
 class OlympiadTaskSubmission(models.Model):
@@ -275,6 +604,7 @@ class OlympiadTaskSubmission(models.Model):
                           related_name='submissions', verbose_name=_('Задание'))
     
     code = models.TextField(_('Код решения'), blank=True)
+    language = models.CharField(_('Язык программирования'), max_length=20, default='python')
     text_answer = models.TextField(_('Текстовый ответ'), blank=True)
     selected_options = models.ManyToManyField(OlympiadMultipleChoiceOption, 
                                            blank=True,
@@ -305,6 +635,239 @@ class OlympiadTaskSubmission(models.Model):
         return f"{self.participation.user.username} - {self.task.title}"
 
 
+class OlympiadTaskResult(models.Model):
+    """Лучший результат участника по заданию олимпиады"""
+    
+    participation = models.ForeignKey(OlympiadParticipation, on_delete=models.CASCADE,
+                                      related_name='task_results', verbose_name=_('Участие'))
+    task = models.ForeignKey(OlympiadTask, on_delete=models.CASCADE,
+                             related_name='results', verbose_name=_('Задание'))
+    best_submission = models.ForeignKey(OlympiadTaskSubmission, on_delete=models.SET_NULL, null=True, blank=True,
+                                        related_name='+', verbose_name=_('Лучшая отправка'))
+    score = models.PositiveIntegerField(_('Лучший балл'), default=0)
+    is_correct = models.BooleanField(_('Решено'), default=False)
+    updated_at = models.DateTimeField(_('Обновлен'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Результат по заданию')
+        verbose_name_plural = _('Результаты по заданиям')
+        unique_together = ['participation', 'task']
+    
+    def __str__(self):
+        return f"{self.participation} - {self.task.title}: {self.score}"
+    
+    # Лучшая отправка: наибольший балл, затем верное решение, затем более ранняя
+    BEST_ORDERING = ['-score', '-is_correct', 'submitted_at', 'id']
+    
+    @classmethod
+    def best_of(cls, submissions):
+        """Лучшая отправка из набора (или None)"""
+        return submissions.order_by(*cls.BEST_ORDERING).first()
+    
+    @staticmethod
+    def is_better(submission, result) -> bool:
+        """Лучше ли отправка текущего лучшего результата"""
+        return (submission.score, submission.is_correct) > (result.score, result.is_correct)
+    
+    def set_best(self, submission) -> None:
+        self.best_submission = submission
+        self.score = submission.score if submission else 0
+        self.is_correct = submission.is_correct if submission else False
+
+
+class OlympiadScoreEvent(models.Model):
+    """Изменение результата участника после проверки отправки"""
+    
+    olympiad = models.ForeignKey(Olympiad, on_delete=models.CASCADE,
+                                 related_name='score_events', verbose_name=_('Олимпиада'))
+    participation = models.ForeignKey(OlympiadParticipation, on_delete=models.CASCADE,
+                                      related_name='score_events', verbose_name=_('Участие'))
+    task = models.ForeignKey(OlympiadTask, on_delete=models.CASCADE,
+                             related_name='+', verbose_name=_('Задание'))
+    submission = models.ForeignKey(OlympiadTaskSubmission, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='+', verbose_name=_('Отправка'))
+    delta = models.IntegerField(_('Изменение балла'), default=0)
+    score = models.PositiveIntegerField(_('Балл участника'), default=0)
+    task_score = models.PositiveIntegerField(_('Лучший балл по заданию'), default=0)
+    is_correct = models.BooleanField(_('Решено'), default=False)
+    is_frozen = models.BooleanField(_('Во время заморозки'), default=False)
+    created_at = models.DateTimeField(_('Создано'), auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('Событие таблицы лидеров')
+        verbose_name_plural = _('События таблицы лидеров')
+        ordering = ['id']
+        indexes = [models.Index(fields=['olympiad', 'id'])]
+    
+    def __str__(self):
+        return f"{self.participation_id} - {self.task_id}: {self.delta:+d}"
+    
+    @classmethod
+    def hidden_deltas(cls, olympiad_id, participation_ids=None) -> dict:
+        """Суммарное изменение баллов участников за время заморозки: {id участия: изменение}"""
+        events = cls.objects.filter(olympiad_id=olympiad_id, is_frozen=True)
+        if participation_ids is not None:
+            events = events.filter(participation_id__in=participation_ids)
+        return dict(events.values('participation_id').annotate(total=models.Sum('delta'))
+                    .values_list('participation_id', 'total'))
+
+
+class OlympiadTestResult(models.Model):
+    """Модель результата проверки отправки на одном тестовом случае"""
+    
+    class Verdict(models.TextChoices):
+        ACCEPTED = 'accepted', _('Верно')
+        WRONG_ANSWER = 'wrong_answer', _('Неверный ответ')
+        TIME_LIMIT = 'time_limit', _('Превышено время')
+        MEMORY_LIMIT = 'memory_limit', _('Превышена память')
+        OUTPUT_LIMIT = 'output_limit', _('Превышен объем вывода')
+        RUNTIME_ERROR = 'runtime_error', _('Ошибка выполнения')
+        SKIPPED = 'skipped', _('Не запускался')
+    
+    submission = models.ForeignKey(OlympiadTaskSubmission, on_delete=models.CASCADE,
+                                 related_name='test_results', verbose_name=_('Отправка'))
+    test_case = models.ForeignKey(OlympiadTestCase, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='results', verbose_name=_('Тестовый случай'))
+    test_number = models.PositiveIntegerField(_('Номер теста'))
+    
+    verdict = models.CharField(_('Вердикт'), max_length=20, choices=Verdict.choices)
+    passed = models.BooleanField(_('Пройден'), default=False)
+    
+    cpu_time = models.FloatField(_('Процессорное время (сек)'), default=0)
+    wall_time = models.FloatField(_('Реальное время (сек)'), default=0)
+    memory_used = models.PositiveBigIntegerField(_('Пиковая память (байт)'), default=0)
+    judge_host = models.CharField(_('Сервер проверки'), max_length=255, blank=True)
+    from_cache = models.BooleanField(_('Из кэша вердиктов'), default=False,
+                                     help_text=_('Время и память измерены при исходной проверке '
+                                                 'на сервере judge_host, а не для этой отправки'))
+    
+    class Meta:
+        verbose_name = _('Результат теста')
+        verbose_name_plural = _('Результаты тестов')
+        ordering = ['submission', 'test_number']
+    
+    def __str__(self):
+        return f"{self.submission} - Тест #{self.test_number} ({self.get_verdict_display()})"
+
+
+class JudgeJob(models.Model):
+    """Модель задания в очереди проверки решений"""
+    
+    class JobKind(models.TextChoices):
+        OLYMPIAD_TEST = 'olympiad_test', _('Проверка кода задания олимпиады')
+        OLYMPIAD_SUBMISSION = 'olympiad_submission', _('Проверка отправки олимпиады')
+        OLYMPIAD_RUN = 'olympiad_run', _('Запуск кода задания олимпиады')
+        OLYMPIAD_REJUDGE = 'olympiad_rejudge', _('Перепроверка отправки олимпиады')
+        ASSIGNMENT = 'assignment', _('Проверка задания курса')
+    
+    class JobStatus(models.TextChoices):
+        QUEUED = 'queued', _('В очереди')
+        RUNNING = 'running', _('Проверяется')
+        DONE = 'done', _('Завершено')
+    
+    class JobPriority(models.IntegerChoices):
+        # Меньшее значение - более высокий приоритет
+        CONTEST = 0, _('Активная олимпиада')
+        ASSIGNMENT = 1, _('Задание курса')
+        PRACTICE = 2, _('Тренировочный запуск')
+        REJUDGE = 3, _('Перепроверка')
+    
+    kind = models.CharField(_('Тип'), max_length=30, choices=JobKind.choices)
+    status = models.CharField(_('Статус'), max_length=20, choices=JobStatus.choices, default=JobStatus.QUEUED)
+    priority = models.PositiveSmallIntegerField(_('Приоритет'), choices=JobPriority.choices,
+                                               default=JobPriority.PRACTICE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True,
+                           related_name='judge_jobs', verbose_name=_('Пользователь'))
+    
+    rejudge_batch = models.ForeignKey('RejudgeBatch', on_delete=models.CASCADE, null=True, blank=True,
+                                    related_name='jobs', verbose_name=_('Перепроверка'))
+    
+    payload = models.JSONField(_('Параметры'), default=dict)
+    result = models.JSONField(_('Результат'), null=True, blank=True)
+    error_message = models.TextField(_('Сообщение об ошибке'), blank=True)
+    
+    worker = models.CharField(_('Обработчик'), max_length=255, blank=True)
+    attempts = models.PositiveIntegerField(_('Попыток'), default=0)
+    
+    created_at = models.DateTimeField(_('Создано'), auto_now_add=True)
+    started_at = models.DateTimeField(_('Начало проверки'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('Окончание проверки'), null=True, blank=True)
+    
+    class Meta:
+        verbose_name = _('Задание проверки')
+        verbose_name_plural = _('Очередь проверки')
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"#{self.id} {self.get_kind_display()} ({self.get_status_display()})"
+
+
+class RejudgeBatch(models.Model):
+    """Модель массовой перепроверки отправок задания или олимпиады"""
+    
+    class BatchStatus(models.TextChoices):
+        RUNNING = 'running', _('Выполняется')
+        DONE = 'done', _('Завершена')
+    
+    olympiad = models.ForeignKey(Olympiad, on_delete=models.CASCADE,
+                              related_name='rejudge_batches', verbose_name=_('Олимпиада'))
+    task = models.ForeignKey(OlympiadTask, on_delete=models.CASCADE, null=True, blank=True,
+                          related_name='rejudge_batches', verbose_name=_('Задание'),
+                          help_text=_('Пусто - перепроверяются все задания олимпиады'))
+    status = models.CharField(_('Статус'), max_length=20, choices=BatchStatus.choices,
+                            default=BatchStatus.RUNNING)
+    total = models.PositiveIntegerField(_('Всего отправок'), default=0)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='rejudge_batches', verbose_name=_('Запустил'))
+    created_at = models.DateTimeField(_('Создано'), auto_now_add=True)
+    finished_at = models.DateTimeField(_('Завершено'), null=True, blank=True)
+    
+    class Meta:
+        verbose_name = _('Перепроверка')
+        verbose_name_plural = _('Перепроверки')
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"#{self.id} {self.task or self.olympiad}"
+    
+    def processed_count(self):
+        """Количество уже перепроверенных отправок"""
+        return self.jobs.filter(status=JudgeJob.JobStatus.DONE).count()
+
+
+class VerdictCache(models.Model):
+    """Модель кэша вердиктов для повторных отправок одинакового кода"""
+    
+    class TaskKind(models.TextChoices):
+        OLYMPIAD = 'olympiad', _('Задание олимпиады')
+        ASSIGNMENT = 'assignment', _('Задание курса')
+    
+    key = models.CharField(_('Ключ'), max_length=64, unique=True)
+    task_kind = models.CharField(_('Тип задания'), max_length=20, choices=TaskKind.choices)
+    task_id = models.PositiveIntegerField(_('ID задания'))
+    language = models.CharField(_('Язык'), max_length=20)
+    tests_version = models.CharField(_('Версия тестов'), max_length=64)
+    
+    result = models.JSONField(_('Результат проверки'))
+    hits = models.PositiveIntegerField(_('Попаданий'), default=0)
+    
+    created_at = models.DateTimeField(_('Создано'), auto_now_add=True)
+    last_used_at = models.DateTimeField(_('Последнее использование'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Кэшированный вердикт')
+        verbose_name_plural = _('Кэш вердиктов')
+        indexes = [
+            models.Index(fields=['task_kind', 'task_id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_task_kind_display()} #{self.task_id} ({self.language})"
+
+
 class OlympiadUserInvitation(models.Model):
     """Модель приглашения на участие в закрытой олимпиаде для конкретного пользователя"""
     
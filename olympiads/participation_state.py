@@ -0,0 +1,119 @@
+"""
+Состояние заданий участника олимпиады.
+
+Для каждого задания нужны последняя отправка (код в редакторе, была ли
+попытка) и лучшая (решено ли задание, баллы). Вместо двух запросов на
+задание все это читается одним запросом с оконными функциями: отправки
+участия нумеруются внутри задания по времени и по порядку лучшего результата
+(OlympiadTaskResult.BEST_ORDERING), из базы возвращаются только первые.
+
+Состояние кэшируется в объекте участия, поэтому представление и фильтры
+шаблона (templatetags/olympiad_extras.py) в одном запросе читают одни и те
+же данные.
+"""
+from typing import Dict, Iterable, Optional
+
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import OlympiadParticipation, OlympiadTaskResult, OlympiadTaskSubmission
+
+# Атрибут участия, в котором хранится загруженное состояние
+_CACHE_ATTR = '_task_states'
+
+
+class TaskState:
+    """Последняя и лучшая отправки участника по заданию"""
+
+    __slots__ = ('latest', 'best', 'attempts')
+
+    def __init__(self, latest: Optional[OlympiadTaskSubmission] = None,
+                 best: Optional[OlympiadTaskSubmission] = None, attempts: int = 0):
+        self.latest = latest
+        self.best = best
+        self.attempts = attempts
+
+    @property
+    def submitted(self) -> bool:
+        return self.latest is not None
+
+    @property
+    def is_correct(self) -> bool:
+        """Задание решено хотя бы одной отправкой"""
+        return self.best is not None and self.best.is_correct
+
+    @property
+    def score(self) -> int:
+        return self.best.score if self.best else 0
+
+    @property
+    def submission_id(self) -> Optional[int]:
+        return self.latest.pk if self.latest else None
+
+
+class ParticipationState:
+    """Состояние всех заданий одного участия"""
+
+    def __init__(self, participation: OlympiadParticipation, states: Dict[int, TaskState]):
+        self.participation = participation
+        self._states = states
+
+    @classmethod
+    def load(cls, participation: OlympiadParticipation) -> 'ParticipationState':
+        """Читает последнюю и лучшую отправки по всем заданиям одним запросом"""
+        partition = [F('task_id')]
+        submissions = (OlympiadTaskSubmission.objects
+                       .filter(participation=participation)
+                       .annotate(
+                           latest_rank=Window(RowNumber(), partition_by=partition,
+                                              order_by=['-submitted_at', '-id']),
+                           best_rank=Window(RowNumber(), partition_by=partition,
+                                            order_by=OlympiadTaskResult.BEST_ORDERING),
+                           attempts=Window(Count('id'), partition_by=partition),
+                       )
+                       .filter(Q(latest_rank=1) | Q(best_rank=1)))
+
+        states: Dict[int, TaskState] = {}
+        for submission in submissions:
+            state = states.setdefault(submission.task_id, TaskState(attempts=submission.attempts))
+            if submission.latest_rank == 1:
+                state.latest = submission
+            if submission.best_rank == 1:
+                state.best = submission
+        return cls(participation, states)
+
+    def __getitem__(self, task_id: int) -> TaskState:
+        return self._states.get(task_id) or TaskState()
+
+    def completed_count(self) -> int:
+        """Число решенных заданий"""
+        return sum(1 for state in self._states.values() if state.is_correct)
+
+    def available_tasks(self, tasks: Iterable) -> list:
+        """
+        Задания, открытые участнику
+
+        Первое задание открыто всегда, каждое следующее - после того как
+        решено предыдущее.
+        """
+        available = []
+        for task in tasks:
+            if available and not self[available[-1].id].is_correct:
+                break
+            available.append(task)
+        return available
+
+
+def get_participation_state(participation: OlympiadParticipation, refresh: bool = False) -> ParticipationState:
+    """
+    Состояние заданий участия, загруженное один раз на объект участия
+
+    Args:
+        participation: Участие
+        refresh: Загрузить заново (например, после новой отправки)
+    """
+    state = getattr(participation, _CACHE_ATTR, None)
+    if state is None or refresh:
+        state = ParticipationState.load(participation)
+        setattr(participation, _CACHE_ATTR, state)
+    return state
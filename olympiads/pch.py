@@ -0,0 +1,127 @@
+"""
+Предкомпилированные заголовки (PCH) для решений на C++.
+
+Почти каждое олимпиадное решение начинается с `#include <bits/stdc++.h>`, и
+разбор этого заголовка занимает большую часть времени компиляции. Для каждого
+набора флагов компилятора собирается каталог:
+
+    pch-<хэш>/bits/stdc++.h      - обертка `#include_next <bits/stdc++.h>`
+    pch-<хэш>/bits/stdc++.h.gch  - предкомпилированная обертка
+
+Каталог передается компилятору через -I. GCC использует .gch, только если он
+собран с совместимыми флагами; иначе подключается обертка, а через нее -
+обычный системный заголовок, так что результат компиляции не меняется.
+
+Хэш каталога учитывает версию компилятора и флаги, поэтому после обновления
+компилятора заголовки собираются заново. Модуль не зависит от Django.
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from typing import Dict, Iterable, List, Optional
+
+HEADER = os.path.join('bits', 'stdc++.h')
+
+# Ограничение времени сборки одного заголовка (секунд)
+BUILD_TIMEOUT = 120
+
+
+class PchManager:
+    """Сборка и поиск предкомпилированных заголовков в каталоге root"""
+
+    def __init__(self, root: str, compiler: str = 'g++'):
+        self.root = root
+        self.compiler = compiler
+        self._compiler_version: Optional[str] = None
+        self._dirs: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def compiler_version(self) -> str:
+        """Версия компилятора (пустая строка, если компилятор недоступен)"""
+        if self._compiler_version is None:
+            try:
+                result = subprocess.run(
+                    [self.compiler, '--version'], capture_output=True, text=True, timeout=10
+                )
+                self._compiler_version = result.stdout if result.returncode == 0 else ''
+            except (OSError, subprocess.TimeoutExpired):
+                self._compiler_version = ''
+        return self._compiler_version
+
+    def pch_dir(self, flags: Iterable[str]) -> str:
+        """Каталог заголовков для флагов компилятора"""
+        data = json.dumps([self.compiler_version(), list(flags)])
+        return os.path.join(self.root, 'pch-' + hashlib.sha256(data.encode('utf-8')).hexdigest()[:16])
+
+    def _build(self, flags: List[str], target: str) -> bool:
+        os.makedirs(self.root, exist_ok=True)
+        build_dir = tempfile.mkdtemp(prefix='.pch-', dir=self.root)
+        try:
+            header = os.path.join(build_dir, HEADER)
+            os.makedirs(os.path.dirname(header))
+            with open(header, 'w') as f:
+                f.write('#include_next <bits/stdc++.h>\n')
+
+            result = subprocess.run(
+                [self.compiler, *flags, '-x', 'c++-header', header, '-o', f'{header}.gch'],
+                capture_output=True, timeout=BUILD_TIMEOUT
+            )
+            if result.returncode != 0:
+                return False
+            try:
+                os.rename(build_dir, target)
+            except OSError:
+                # Заголовок одновременно собрал другой процесс
+                pass
+            return os.path.exists(os.path.join(target, f'{HEADER}.gch'))
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+    def include_dir(self, flags: Iterable[str]) -> Optional[str]:
+        """
+        Возвращает каталог для -I, собирая заголовок при первом обращении
+
+        Returns:
+            Каталог или None, если заголовок собрать не удалось
+        """
+        flags = list(flags)
+        key = json.dumps(flags)
+        if key in self._dirs:
+            return self._dirs[key]
+
+        with self._lock:
+            if key not in self._dirs:
+                if not self.compiler_version():
+                    self._dirs[key] = None
+                else:
+                    target = self.pch_dir(flags)
+                    ready = os.path.exists(os.path.join(target, f'{HEADER}.gch')) or self._build(flags, target)
+                    # Неудачная сборка не повторяется до перезапуска процесса
+                    self._dirs[key] = target if ready else None
+            return self._dirs[key]
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """
+        Удаляет заголовки, не относящиеся к каталогам keep (старые версии
+        компилятора и удаленные профили)
+
+        Returns:
+            Число удаленных каталогов
+        """
+        keep = {os.path.basename(path) for path in keep if path}
+        removed = 0
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return 0
+        for name in names:
+            if name.startswith('pch-') and name not in keep:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+                removed += 1
+        return removed
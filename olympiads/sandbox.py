@@ -0,0 +1,641 @@
+"""
+Песочница для запуска пользовательского кода.
+
+Модуль содержит низкоуровневый запуск процесса с ограничениями ресурсов и пул
+долгоживущих рабочих процессов, которые принимают задания по каналу и
+возвращают результат выполнения. Модуль намеренно не зависит от Django:
+рабочие процессы стартуют в «чистом» интерпретаторе и не получают настроек
+проекта (пароли БД, секретные ключи и т.п.).
+"""
+import os
+import sys
+import math
+import time
+import fcntl
+import random
+import runpy
+import signal
+import resource
+import selectors
+import threading
+import traceback
+import subprocess
+import multiprocessing
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any
+
+from .cgroups import CgroupRun
+from .checkers import make_checker
+
+# Размер блока при чтении вывода программы
+READ_CHUNK_SIZE = 64 * 1024
+
+# Дополнительное время ожидания ответа от рабочего процесса сверх лимита задания
+WORKER_RESPONSE_MARGIN = 10  # секунд
+
+# Ограничение проверяется по процессорному времени; по реальному времени
+# программа снимается, только если она долго ждет (sleep, блокировка на вводе)
+WALL_TIME_FACTOR = 2
+WALL_TIME_EXTRA = 1  # секунд
+
+# Переменные окружения, которые передаются пользовательскому коду
+SANDBOX_ENV_KEYS = ('PATH', 'LANG', 'LC_ALL', 'HOME', 'JAVA_HOME', 'NODE_PATH')
+
+
+class SandboxError(Exception):
+    """Ошибка инфраструктуры песочницы (а не пользовательского кода)"""
+    pass
+
+
+def limit_resources(max_memory_bytes: int, cpu_time_limit: Optional[float] = None, cgroup: bool = False,
+                    file_size_limit: Optional[int] = None) -> None:
+    """
+    Ограничивает ресурсы для дочернего процесса
+
+    Args:
+        max_memory_bytes: Максимальное количество памяти в байтах
+        cpu_time_limit: Ограничение процессорного времени в секундах
+        cgroup: Процесс уже помещен в cgroup, которая ограничивает память и
+            число процессов - соответствующие rlimit не устанавливаются
+        file_size_limit: Максимальный размер записываемого файла в байтах
+    """
+    # Рабочий каталог лежит в tmpfs, поэтому размер файлов ограничиваем
+    # всегда: запись сверх лимита завершает процесс (SIGXFSZ)
+    if file_size_limit:
+        resource.setrlimit(resource.RLIMIT_FSIZE, (file_size_limit, file_size_limit))
+
+    # Ядро останавливает программу, исчерпавшую процессорное время (SIGXCPU,
+    # затем SIGKILL); точное сравнение с лимитом делается по rusage
+    if cpu_time_limit:
+        soft = math.ceil(cpu_time_limit)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+
+    if cgroup:
+        return
+
+    # Ограничение использования памяти
+    resource.setrlimit(resource.RLIMIT_AS, (max_memory_bytes, max_memory_bytes))
+
+    # Запрещаем создание новых процессов
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+
+def wall_time_limit(time_limit: float) -> float:
+    """Ограничение реального времени для запуска с лимитом процессорного времени"""
+    return time_limit * WALL_TIME_FACTOR + WALL_TIME_EXTRA
+
+
+def sandbox_env() -> Dict[str, str]:
+    """Возвращает минимальное окружение для пользовательского процесса"""
+    return {key: os.environ[key] for key in SANDBOX_ENV_KEYS if key in os.environ}
+
+
+def _decode(data: bytes) -> str:
+    """Декодирует вывод программы так же, как universal_newlines в subprocess"""
+    return data.decode('utf-8', errors='replace').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _run_python_file(file_path: str) -> None:
+    """
+    Выполняет Python-файл в текущем (уже отделенном через fork) процессе.
+
+    Эмулирует запуск `python file.py`: `__name__ == '__main__'`, каталог файла
+    в начале sys.path, трассировка необработанного исключения в stderr и код
+    возврата 1. Функция никогда не возвращает управление.
+    """
+    exit_code = 0
+    try:
+        os.environ.clear()
+        os.environ.update(sandbox_env())
+        sys.stdin = open(0, 'r', closefd=False)
+        sys.stdout = open(1, 'w', closefd=False)
+        sys.stderr = open(2, 'w', closefd=False)
+        sys.argv = [file_path]
+        sys.path[0] = os.path.dirname(file_path)
+        runpy.run_path(file_path, run_name='__main__')
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        os._exit(exit_code)
+
+
+def _prepare_child(memory_limit: int, cpu_time_limit: Optional[float], cgroup_procs: Optional[str],
+                   file_size_limit: Optional[int] = None) -> None:
+    """Помещает дочерний процесс в cgroup запуска и ограничивает его ресурсы"""
+    if cgroup_procs:
+        with open(cgroup_procs, 'w') as f:
+            f.write('0')
+    limit_resources(memory_limit, cpu_time_limit, cgroup=bool(cgroup_procs), file_size_limit=file_size_limit)
+
+
+def _spawn(
+    cmd: List[str],
+    cwd: Optional[str],
+    memory_limit: int,
+    python_file: Optional[str],
+    cpu_time_limit: Optional[float] = None,
+    cgroup_procs: Optional[str] = None,
+    file_size_limit: Optional[int] = None,
+    input_file: Optional[str] = None,
+):
+    """
+    Запускает дочерний процесс в собственной сессии с перенаправленными потоками
+
+    Если задан input_file, stdin процесса - сам файл (без канала), и
+    fd_stdin в результате равен None.
+
+    Returns:
+        Кортеж (pid, popen_или_None, fd_stdin, fd_stdout, fd_stderr)
+    """
+    if input_file is not None:
+        stdin_r, stdin_w = os.open(input_file, os.O_RDONLY), None
+    else:
+        stdin_r, stdin_w = os.pipe()
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+    popen = None
+
+    try:
+        if python_file is not None:
+            # Быстрый путь: интерпретатор уже запущен, достаточно fork().
+            # Используется только в однопоточных рабочих процессах пула.
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    os.setsid()
+                    os.dup2(stdin_r, 0)
+                    os.dup2(stdout_w, 1)
+                    os.dup2(stderr_w, 2)
+                    os.closerange(3, os.sysconf('SC_OPEN_MAX'))
+                    if cwd:
+                        os.chdir(cwd)
+                    _prepare_child(memory_limit, cpu_time_limit, cgroup_procs, file_size_limit)
+                    _run_python_file(python_file)
+                finally:
+                    os._exit(1)
+        else:
+            popen = subprocess.Popen(
+                cmd,
+                stdin=stdin_r,
+                stdout=stdout_w,
+                stderr=stderr_w,
+                cwd=cwd,
+                env=sandbox_env(),
+                start_new_session=True,
+                preexec_fn=lambda: _prepare_child(memory_limit, cpu_time_limit, cgroup_procs, file_size_limit)
+            )
+            pid = popen.pid
+    except BaseException:
+        for fd in (stdin_w, stdout_r, stderr_r):
+            if fd is not None:
+                os.close(fd)
+        raise
+    finally:
+        for fd in (stdin_r, stdout_w, stderr_w):
+            os.close(fd)
+
+    return pid, popen, stdin_w, stdout_r, stderr_r
+
+
+def _kill_group(pid: int) -> None:
+    """Убивает всю группу процессов запуска"""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _wait(pid: int, deadline: float) -> bool:
+    """
+    Ожидает завершения процесса не дольше deadline, не забирая его статус
+
+    Процесс остается «зомби», поэтому его идентификатор группы не может быть
+    переиспользован, пока мы не добьем потомков и не вызовем wait4.
+
+    Returns:
+        True, если истекло время ожидания
+    """
+    delay = 0.0005
+    while True:
+        if os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None:
+            return False
+        if time.monotonic() >= deadline:
+            return True
+        time.sleep(delay)
+        delay = min(delay * 2, 0.05)
+
+
+def execute(
+    cmd: List[str],
+    input_data: str = "",
+    time_limit: float = 5,
+    memory_limit: int = 128 * 1024 * 1024,
+    cwd: Optional[str] = None,
+    python_file: Optional[str] = None,
+    output_limit: Optional[int] = None,
+    capture_limit: Optional[int] = None,
+    expected_output: Optional[str] = None,
+    checker: Optional[Dict[str, Any]] = None,
+    cgroup_root: Optional[str] = None,
+    file_size_limit: Optional[int] = None,
+    input_file: Optional[str] = None,
+    expected_file: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Выполняет программу с заданным вводом и ограничениями
+
+    Ограничение времени проверяется по процессорному времени (user + sys) из
+    rusage процесса, поэтому результат не зависит от загрузки хоста; по
+    реальному времени программа снимается через wall_time_limit(time_limit).
+
+    Вывод читается из каналов по частям. Если программа выводит больше
+    output_limit байт, ее группа процессов сразу завершается; в памяти
+    сохраняется не больше capture_limit байт каждого потока, а stdout при
+    необходимости сравнивается с ожидаемым ответом по мере чтения.
+
+    Args:
+        cmd: Команда запуска
+        input_data: Входные данные
+        time_limit: Ограничение процессорного времени в секундах
+        memory_limit: Ограничение памяти в байтах
+        cwd: Рабочий каталог процесса
+        python_file: Если указан, Python-файл выполняется в форке текущего
+            интерпретатора без запуска нового (только для рабочих процессов пула)
+        output_limit: Ограничение суммарного объема stdout и stderr в байтах
+        capture_limit: Сколько байт каждого потока сохранять в результате
+        expected_output: Ожидаемый ответ для потокового сравнения со stdout
+        checker: Режим проверки вывода (см. checkers.make_checker)
+        cgroup_root: Каталог делегированной cgroup v2; если задан, запуск
+            изолируется в собственной дочерней cgroup (см. cgroups.py), а при
+            ошибке ее создания - ограничивается через rlimit
+        file_size_limit: Максимальный размер файла, который может записать программа
+        input_file: Файл, который подается на stdin вместо input_data; данные
+            не читаются в память текущего процесса
+        expected_file: Файл с ожидаемым ответом вместо expected_output; читается
+            по частям во время сравнения
+
+    Returns:
+        Словарь с результатами запуска:
+        {
+            'returncode': код возврата (отрицательный - номер сигнала),
+            'stdout': стандартный вывод (не больше capture_limit байт),
+            'stderr': вывод ошибок (не больше capture_limit байт),
+            'execution_time': процессорное время в секундах (не больше лимита),
+            'cpu_time': процессорное время (user + sys) в секундах,
+            'wall_time': реальное время выполнения в секундах,
+            'memory_used': пиковый объем резидентной памяти в байтах,
+            'timed_out': True, если превышено ограничение времени,
+            'memory_limit_exceeded': True, если процесс убит за превышение
+                памяти (определяется только при изоляции через cgroup),
+            'output_limit_exceeded': True, если превышено ограничение вывода,
+            'output_truncated': True, если вывод сохранен не полностью,
+            'matched': результат сравнения с expected_output (None без него)
+        }
+    """
+    input_bytes = input_data.encode('utf-8') if input_data else b''
+    start_time = time.monotonic()
+    deadline = start_time + wall_time_limit(time_limit)
+
+    cgroup = None
+    if cgroup_root:
+        try:
+            cgroup = CgroupRun(cgroup_root, memory_limit)
+        except OSError:
+            cgroup = None
+
+    try:
+        pid, popen, stdin_fd, stdout_fd, stderr_fd = _spawn(
+            cmd, cwd, memory_limit, python_file, time_limit,
+            cgroup.procs_path if cgroup is not None else None,
+            file_size_limit, input_file
+        )
+    except BaseException:
+        if cgroup is not None:
+            cgroup.remove()
+        raise
+
+    chunks = {stdout_fd: [], stderr_fd: []}
+    captured = {stdout_fd: 0, stderr_fd: 0}
+    output_checker = None
+    if expected_output is not None:
+        output_checker = make_checker(expected_output, checker, input_data, input_file, expected_file)
+    total_output = 0
+    timed_out = False
+    output_limit_exceeded = False
+    output_truncated = False
+    offset = 0
+
+    selector = selectors.DefaultSelector()
+    try:
+        if stdin_fd is None:
+            pass
+        elif input_bytes:
+            os.set_blocking(stdin_fd, False)
+            selector.register(stdin_fd, selectors.EVENT_WRITE)
+        else:
+            os.close(stdin_fd)
+            stdin_fd = None
+        selector.register(stdout_fd, selectors.EVENT_READ)
+        selector.register(stderr_fd, selectors.EVENT_READ)
+
+        # Пишем ввод и читаем вывод одновременно, чтобы не заблокироваться на
+        # заполненном канале
+        while selector.get_map() and not output_limit_exceeded:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+
+            for key, _ in selector.select(remaining):
+                fd = key.fd
+                if fd == stdin_fd:
+                    try:
+                        offset += os.write(fd, input_bytes[offset:offset + READ_CHUNK_SIZE])
+                    except BrokenPipeError:
+                        offset = len(input_bytes)
+                    if offset >= len(input_bytes):
+                        selector.unregister(fd)
+                        os.close(fd)
+                        stdin_fd = None
+                    continue
+
+                data = os.read(fd, READ_CHUNK_SIZE)
+                if not data:
+                    selector.unregister(fd)
+                    continue
+
+                total_output += len(data)
+                if output_limit is not None and total_output > output_limit:
+                    # Не даем программе раздувать память проверяющей системы
+                    output_limit_exceeded = True
+                    break
+
+                if capture_limit is not None and captured[fd] + len(data) > capture_limit:
+                    data_to_keep = data[:max(capture_limit - captured[fd], 0)]
+                    output_truncated = True
+                else:
+                    data_to_keep = data
+                if data_to_keep:
+                    chunks[fd].append(data_to_keep)
+                    captured[fd] += len(data_to_keep)
+
+                if output_checker is not None and fd == stdout_fd:
+                    output_checker.feed(data)
+
+        if not timed_out and not output_limit_exceeded:
+            timed_out = _wait(pid, deadline)
+
+        # Убиваем процесс при превышении ограничений, а также добиваем
+        # возможных потомков, оставшихся в его группе (или в cgroup запуска,
+        # откуда не уйти даже сменив группу процессов)
+        _kill_group(pid)
+        if cgroup is not None:
+            cgroup.kill()
+        _, status, rusage = os.wait4(pid, 0)
+    except BaseException:
+        if cgroup is not None:
+            cgroup.kill()
+            cgroup.remove()
+        raise
+    finally:
+        selector.close()
+        for fd in (stdin_fd, stdout_fd, stderr_fd):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+    wall_time = time.monotonic() - start_time
+    returncode = os.waitstatus_to_exitcode(status)
+    if popen is not None:
+        popen.returncode = returncode
+
+    cpu_time = rusage.ru_utime + rusage.ru_stime
+    # ru_maxrss в Linux измеряется в килобайтах
+    memory_used = rusage.ru_maxrss * 1024
+    memory_limit_exceeded = False
+
+    if cgroup is not None:
+        # Счетчики cgroup учитывают все процессы запуска, а не только первый
+        stats = cgroup.stats()
+        cgroup.remove()
+        if stats['cpu_usec'] is not None:
+            cpu_time = stats['cpu_usec'] / 1000000
+        if stats['memory_peak'] is not None:
+            memory_used = stats['memory_peak']
+        memory_limit_exceeded = stats['oom_killed'] > 0
+
+    if cpu_time > time_limit or returncode == -signal.SIGXCPU:
+        timed_out = True
+
+    matched = None
+    if output_checker is not None:
+        if timed_out or output_limit_exceeded or returncode != 0:
+            # Вывод неуспешного запуска не проверяем
+            output_checker.close()
+            matched = False
+        else:
+            matched = output_checker.finish()
+
+    return {
+        'returncode': returncode,
+        'stdout': _decode(b''.join(chunks[stdout_fd])),
+        'stderr': _decode(b''.join(chunks[stderr_fd])),
+        'execution_time': time_limit if timed_out else cpu_time,
+        'cpu_time': cpu_time,
+        'wall_time': wall_time,
+        'memory_used': memory_used,
+        'timed_out': timed_out,
+        'memory_limit_exceeded': memory_limit_exceeded,
+        'output_limit_exceeded': output_limit_exceeded,
+        'output_truncated': output_truncated or output_limit_exceeded,
+        'matched': matched,
+    }
+
+
+def _worker_main(conn) -> None:
+    """Цикл рабочего процесса пула: принимает задания и возвращает результаты"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        if job is None:
+            break
+
+        try:
+            result = execute(**job)
+        except Exception as e:
+            result = {'sandbox_error': f"{type(e).__name__}: {e}"}
+
+        try:
+            conn.send(result)
+        except (BrokenPipeError, OSError):
+            break
+
+
+class _Worker:
+    """Рабочий процесс пула и канал связи с ним"""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.conn.close()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+class SandboxPool:
+    """
+    Пул заранее запущенных рабочих процессов песочницы.
+
+    Рабочие процессы запускаются лениво (до `size` штук) и живут до завершения
+    основного процесса. Каждый из них выполняет задания по одному, поэтому
+    `size` ограничивает число одновременных запусков в рамках пула.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._context = multiprocessing.get_context('spawn')
+        self._idle: List[_Worker] = []
+        self._workers: List[_Worker] = []
+        self._condition = threading.Condition()
+
+    def _start_worker(self) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def _acquire(self) -> _Worker:
+        """
+        Возвращает свободный рабочий процесс или запускает новый, если пул
+        не заполнен; иначе ждет возврата или удаления одного из процессов
+        """
+        with self._condition:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if len(self._workers) < self.size:
+                    worker = self._start_worker()
+                    self._workers.append(worker)
+                    return worker
+                self._condition.wait()
+
+    def _release(self, worker: _Worker) -> None:
+        with self._condition:
+            if worker in self._workers:
+                self._idle.append(worker)
+                self._condition.notify()
+
+    def _discard(self, worker: _Worker) -> None:
+        with self._condition:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            # Освободилось место - ожидающий поток запустит новый процесс
+            self._condition.notify()
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+
+    def run(self, **job) -> Dict[str, Any]:
+        """
+        Выполняет задание в свободном рабочем процессе
+
+        Принимает те же аргументы, что и `execute`.
+
+        Raises:
+            SandboxError: Если рабочий процесс завершился или не ответил
+        """
+        worker = self._acquire()
+        try:
+            worker.conn.send(job)
+            if not worker.conn.poll(wall_time_limit(job.get('time_limit', 0)) + WORKER_RESPONSE_MARGIN):
+                raise SandboxError("Рабочий процесс песочницы не ответил вовремя")
+            result = worker.conn.recv()
+        except (EOFError, OSError, SandboxError) as e:
+            self._discard(worker)
+            raise SandboxError(str(e) or "Рабочий процесс песочницы завершился") from e
+
+        self._release(worker)
+
+        if 'sandbox_error' in result:
+            raise SandboxError(result['sandbox_error'])
+        return result
+
+    def shutdown(self) -> None:
+        """Останавливает все рабочие процессы пула"""
+        with self._condition:
+            workers, self._workers = self._workers, []
+            self._idle = []
+            self._condition.notify_all()
+        for worker in workers:
+            worker.stop()
+
+
+class HostSlots:
+    """
+    Межпроцессный семафор на число одновременных запусков на хосте.
+
+    Каждый слот - файл блокировки в общем каталоге; запуск удерживает
+    flock на одном из них. Блокировки снимаются ядром при завершении процесса,
+    поэтому упавший веб-процесс или обработчик не «теряет» слоты.
+    """
+
+    def __init__(self, lock_dir: str, size: int):
+        self.lock_dir = lock_dir
+        self.size = size
+        os.makedirs(lock_dir, exist_ok=True)
+
+    @contextmanager
+    def acquire(self):
+        """Занимает свободный слот, ожидая его освобождения при необходимости"""
+        delay = 0.001
+        slots = list(range(self.size))
+        while True:
+            random.shuffle(slots)
+            for slot in slots:
+                fd = os.open(os.path.join(self.lock_dir, f'slot-{slot}.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+
+                try:
+                    yield slot
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    os.close(fd)
+                return
+
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
@@ -0,0 +1,315 @@
+"""
+Трансляция таблицы лидеров олимпиады (server-sent events).
+
+Каждая проверенная отправка создает OlympiadScoreEvent (record_submission).
+Процесс держит один поток ScoreboardBroadcaster, который, пока есть
+подписчики, раз в POLL_INTERVAL секунд одним запросом читает новые события
+олимпиад с подписчиками и раздает их всем подключениям процесса. Поэтому
+нагрузка на базу не растет с числом зрителей таблицы.
+
+id события - курсор потока: браузер при переподключении передает его в
+заголовке Last-Event-ID, и пропущенные события дочитываются из базы. События
+одной олимпиады создаются под блокировкой ее счетчика (OlympiadLeaderboard.lock)
+и фиксируются в порядке id; между олимпиадами порядка нет, поэтому курсор
+опроса у каждой олимпиады свой.
+
+Во время заморозки (Olympiad.is_scoreboard_frozen) события помечаются
+is_frozen и уходят только самому участнику и организаторам; когда
+организатор завершает олимпиаду, подписчики получают событие unfreeze.
+"""
+import json
+import time
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import Max, Q
+
+from .models import Olympiad, OlympiadScoreEvent
+
+# Интервал опроса новых событий (секунд)
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Сколько последних событий олимпиады хранится для подключений
+HISTORY_SIZE = 1000
+
+# Сколько пропущенных событий дочитывается из базы при переподключении
+REPLAY_LIMIT = 500
+
+# Интервал комментариев-пингов, не дающих прокси закрыть соединение (секунд)
+HEARTBEAT_INTERVAL = 15
+
+# Через сколько секунд сервер закрывает поток (браузер переподключается сам)
+DEFAULT_STREAM_TIMEOUT = 300
+
+# Задержка переподключения браузера (мс)
+RETRY_MS = 3000
+
+EVENT_FIELDS = (
+    'id', 'olympiad_id', 'participation_id', 'participation__user_id', 'participation__user__username',
+    'task_id', 'delta', 'score', 'task_score', 'is_correct', 'is_frozen', 'created_at'
+)
+
+
+def get_poll_interval() -> float:
+    return getattr(settings, 'OLYMPIADS_SCOREBOARD_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)
+
+
+def get_stream_timeout() -> float:
+    return getattr(settings, 'OLYMPIADS_SCOREBOARD_STREAM_TIMEOUT', DEFAULT_STREAM_TIMEOUT)
+
+
+def event_message(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Сообщение потока из строки OlympiadScoreEvent.values(*EVENT_FIELDS)"""
+    return {
+        'id': row['id'],
+        'participation': row['participation_id'],
+        'user': row['participation__user_id'],
+        'username': row['participation__user__username'],
+        'task': row['task_id'],
+        'delta': row['delta'],
+        'score': row['score'],
+        'task_score': row['task_score'],
+        'is_correct': row['is_correct'],
+        'frozen': row['is_frozen'],
+        'created_at': row['created_at'].isoformat(),
+    }
+
+
+def events_after(olympiad_id: int, after_id: int, limit: int = REPLAY_LIMIT) -> List[Dict[str, Any]]:
+    """События олимпиады с id больше after_id из базы (не больше limit последних)"""
+    rows = (OlympiadScoreEvent.objects
+            .filter(olympiad_id=olympiad_id, id__gt=after_id)
+            .order_by('-id')
+            .values(*EVENT_FIELDS)[:limit])
+    return [event_message(row) for row in reversed(rows)]
+
+
+def latest_event_id(olympiad_id: Optional[int] = None) -> int:
+    events = OlympiadScoreEvent.objects.all()
+    if olympiad_id is not None:
+        events = events.filter(olympiad_id=olympiad_id)
+    return events.aggregate(last=Max('id'))['last'] or 0
+
+
+def format_sse(data: Any, event: Optional[str] = None, event_id: Optional[int] = None) -> str:
+    """Сообщение в формате text/event-stream"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False))
+    return '\n'.join(lines) + '\n\n'
+
+
+class ScoreboardBroadcaster:
+    """
+    Раздает события таблицы лидеров всем подключениям процесса
+
+    Поток опроса запускается при первой подписке и завершается, когда
+    подписчиков не остается. С autostart=False поток не запускается, и опрос
+    вызывается вручную (poll).
+    """
+
+    def __init__(self, poll_interval: Optional[float] = None, history_size: int = HISTORY_SIZE,
+                 autostart: bool = True):
+        self.poll_interval = poll_interval
+        self.history_size = history_size
+        self.autostart = autostart
+        self._condition = threading.Condition()
+        self._subscribers: Dict[int, int] = {}
+        self._history: Dict[int, Deque[Dict[str, Any]]] = {}
+        self._frozen: Dict[int, bool] = {}
+        self._cursors: Dict[int, int] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, olympiad_id: int) -> None:
+        with self._condition:
+            if olympiad_id not in self._cursors:
+                # Курсор ставится до того, как подключение дочитает события из
+                # базы, поэтому между дочитыванием и опросом нет пропуска
+                self._cursors[olympiad_id] = latest_event_id(olympiad_id)
+            self._subscribers[olympiad_id] = self._subscribers.get(olympiad_id, 0) + 1
+            self._history.setdefault(olympiad_id, deque(maxlen=self.history_size))
+            if self.autostart and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='scoreboard-broadcaster', daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self, olympiad_id: int) -> None:
+        with self._condition:
+            count = self._subscribers.get(olympiad_id, 0) - 1
+            if count > 0:
+                self._subscribers[olympiad_id] = count
+                return
+            self._subscribers.pop(olympiad_id, None)
+            self._history.pop(olympiad_id, None)
+            self._frozen.pop(olympiad_id, None)
+            # Без подписчиков события олимпиады не читаются - при следующей
+            # подписке курсор ставится заново
+            self._cursors.pop(olympiad_id, None)
+
+    def is_frozen(self, olympiad_id: int) -> Optional[bool]:
+        """Состояние заморозки по последнему опросу (None - еще не опрашивалась)"""
+        with self._condition:
+            return self._frozen.get(olympiad_id)
+
+    def poll(self) -> int:
+        """
+        Читает новые события и состояние заморозки олимпиад с подписчиками
+
+        Returns:
+            Число прочитанных событий
+        """
+        with self._condition:
+            cursors = dict(self._cursors)
+        if not cursors:
+            return 0
+        olympiad_ids = list(cursors)
+
+        condition = Q()
+        for olympiad_id, cursor in cursors.items():
+            condition |= Q(olympiad_id=olympiad_id, id__gt=cursor)
+        rows = list(OlympiadScoreEvent.objects
+                    .filter(condition)
+                    .order_by('id')
+                    .values(*EVENT_FIELDS))
+        frozen = {olympiad.pk: olympiad.is_scoreboard_frozen()
+                  for olympiad in Olympiad.objects.filter(pk__in=olympiad_ids)
+                  .only('end_datetime', 'freeze_minutes', 'status')}
+
+        last: Dict[int, int] = {}
+        with self._condition:
+            for row in rows:
+                olympiad_id = row['olympiad_id']
+                if self._cursors.get(olympiad_id) != cursors[olympiad_id]:
+                    # От олимпиады отписались во время запроса (или подписались
+                    # заново с новым курсором) - ее события не раздаем
+                    continue
+                self._history[olympiad_id].append(event_message(row))
+                last[olympiad_id] = row['id']
+            self._cursors.update(last)
+            for olympiad_id, value in frozen.items():
+                if olympiad_id in self._subscribers:
+                    self._frozen[olympiad_id] = value
+            self._condition.notify_all()
+        return len(rows)
+
+    def wait(self, olympiad_id: int, after_id: int, timeout: float,
+             frozen: Optional[bool] = None) -> Tuple[List[Dict[str, Any]], Optional[bool]]:
+        """
+        Ждет событий олимпиады новее after_id или изменения заморозки
+
+        Args:
+            olympiad_id: ID олимпиады
+            after_id: Последнее полученное событие
+            timeout: Наибольшее время ожидания в секундах
+            frozen: Известное подключению состояние заморозки
+
+        Returns:
+            (события с id больше after_id, состояние заморозки)
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                history = self._history.get(olympiad_id, ())
+                messages = [message for message in history if message['id'] > after_id]
+                state = self._frozen.get(olympiad_id)
+                remaining = deadline - time.monotonic()
+                if messages or (state is not None and state != frozen) or remaining <= 0:
+                    return messages, state
+                self._condition.wait(remaining)
+
+    def _run(self) -> None:
+        try:
+            while True:
+                with self._condition:
+                    if not self._subscribers:
+                        self._thread = None
+                        return
+                close_old_connections()
+                try:
+                    self.poll()
+                except Exception:
+                    # Ошибка базы не должна останавливать трансляцию: повторим
+                    # опрос на следующем шаге
+                    connections.close_all()
+                time.sleep(self.poll_interval or get_poll_interval())
+        finally:
+            connections.close_all()
+
+
+_broadcaster = ScoreboardBroadcaster()
+
+
+def get_broadcaster() -> ScoreboardBroadcaster:
+    return _broadcaster
+
+
+def stream_scoreboard(
+    olympiad_id: int,
+    user_id: Optional[int],
+    sees_frozen: bool,
+    last_event_id: Optional[int] = None,
+    broadcaster: Optional[ScoreboardBroadcaster] = None,
+    timeout: Optional[float] = None
+) -> Iterator[str]:
+    """
+    Поток событий таблицы лидеров олимпиады для одного подключения
+
+    Args:
+        olympiad_id: ID олимпиады
+        user_id: Пользователь подключения - свои события он видит и во время заморозки
+        sees_frozen: Показывать все события заморозки (организаторам)
+        last_event_id: Последнее полученное событие (заголовок Last-Event-ID)
+        broadcaster: Источник событий (по умолчанию общий для процесса)
+        timeout: Через сколько секунд закрыть поток (по умолчанию get_stream_timeout)
+
+    Yields:
+        Сообщения text/event-stream: score (изменение результата),
+        freeze и unfreeze (начало и конец заморозки)
+    """
+    broadcaster = broadcaster or get_broadcaster()
+    deadline = time.monotonic() + (timeout if timeout is not None else get_stream_timeout())
+
+    def visible(message):
+        return sees_frozen or not message['frozen'] or message['user'] == user_id
+
+    broadcaster.subscribe(olympiad_id)
+    try:
+        # Все запросы к базе - до первого сообщения: под ASGI шаги генератора
+        # могут выполняться в разных потоках
+        olympiad = Olympiad.objects.only('end_datetime', 'freeze_minutes', 'status').get(pk=olympiad_id)
+        frozen = olympiad.is_scoreboard_frozen()
+        if last_event_id is not None:
+            replay = events_after(olympiad_id, last_event_id)
+            cursor = replay[-1]['id'] if replay else last_event_id
+        else:
+            replay = []
+            cursor = latest_event_id(olympiad_id)
+        close_old_connections()
+
+        yield f'retry: {RETRY_MS}\n\n'
+        yield format_sse({'frozen': frozen}, event='freeze' if frozen else 'unfreeze')
+        for message in replay:
+            if visible(message):
+                yield format_sse(message, event='score', event_id=message['id'])
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            messages, state = broadcaster.wait(olympiad_id, cursor, min(HEARTBEAT_INTERVAL, remaining), frozen)
+            for message in messages:
+                cursor = message['id']
+                if visible(message):
+                    yield format_sse(message, event='score', event_id=message['id'])
+            if state is not None and state != frozen:
+                frozen = state
+                yield format_sse({'frozen': frozen}, event='freeze' if frozen else 'unfreeze')
+            if not messages:
+                yield ': ping\n\n'
+    finally:
+        broadcaster.unsubscribe(olympiad_id)
@@ -0,0 +1,34 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from assignments.models import Assignment, TestCase
+from .models import OlympiadTask, OlympiadTestCase, VerdictCache
+from .verdict_cache import invalidate_task
+
+
+@receiver(post_save, sender=OlympiadTestCase)
+@receiver(post_delete, sender=OlympiadTestCase)
+def invalidate_olympiad_verdicts(sender, instance, **kwargs):
+    """Сбрасывает кэш вердиктов задания олимпиады при изменении его тестов"""
+    invalidate_task(VerdictCache.TaskKind.OLYMPIAD, instance.task_id)
+
+
+@receiver(post_save, sender=OlympiadTask)
+@receiver(post_delete, sender=OlympiadTask)
+def invalidate_olympiad_task_verdicts(sender, instance, created=False, **kwargs):
+    """Сбрасывает кэш вердиктов при изменении ограничений или удалении задания"""
+    if not created:
+        invalidate_task(VerdictCache.TaskKind.OLYMPIAD, instance.id)
+
+
+@receiver(post_save, sender=TestCase)
+@receiver(post_delete, sender=TestCase)
+def invalidate_assignment_verdicts(sender, instance, **kwargs):
+    """Сбрасывает кэш вердиктов задания курса при изменении его тестов"""
+    invalidate_task(VerdictCache.TaskKind.ASSIGNMENT, instance.assignment_id)
+
+
+@receiver(post_delete, sender=Assignment)
+def invalidate_deleted_assignment_verdicts(sender, instance, **kwargs):
+    """Удаляет кэш вердиктов удаленного задания курса"""
+    invalidate_task(VerdictCache.TaskKind.ASSIGNMENT, instance.id)
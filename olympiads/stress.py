@@ -0,0 +1,178 @@
+"""
+Стресс-тестирование решения: сравнение с эталоном на случайных входах.
+
+Генератор запускается с зерном (и, если задан max_size, с размером теста),
+эталонное и проверяемое решения - на полученном входе, ответы сравниваются
+проверкой задания (checkers.make_checker). Размер теста растет от 1 до
+max_size по ходу прогона, поэтому первые найденные контрпримеры - маленькие.
+
+Случаи выполняются параллельно через песочницу (code_runner.run_in_sandbox).
+После первого расхождения новые случаи не запускаются, а из уже запущенных
+расходящихся случаев в отчет попадает вход наименьшего размера.
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .benchmark import percentiles
+from .checkers import check_output
+from .code_runner import (
+    DEFAULT_MEMORY_LIMIT, CompilationError, prepare_custom_checker, remove_temp_file, get_test_workers
+)
+from .test_pipeline import PipelineError, Program, failure_reason
+
+# Ограничение времени запусков стресс-теста по умолчанию (секунд)
+DEFAULT_STRESS_TIME_LIMIT = 2
+
+
+class StressError(PipelineError):
+    """Стресс-тест нельзя продолжить: упал генератор или эталон"""
+    pass
+
+
+def generator_args(args: Sequence[str], seed: int, size: Optional[int]) -> List[str]:
+    """
+    Подставляет зерно и размер в аргументы генератора
+
+    Аргументы могут содержать {seed} и {size}; если {seed} не встречается,
+    зерно передается последним аргументом.
+    """
+    result = [arg.replace('{seed}', str(seed)).replace('{size}', str(size) if size is not None else '')
+              for arg in args]
+    if not any('{seed}' in arg for arg in args):
+        result.append(str(seed))
+    return result
+
+
+def case_size(index: int, iterations: int, max_size: Optional[int]) -> Optional[int]:
+    """Размер теста с номером index: линейно от 1 до max_size"""
+    if not max_size:
+        return None
+    return 1 + (max_size - 1) * index // max(1, iterations - 1)
+
+
+def stress_test(
+    generator: Program,
+    reference: Program,
+    candidate: Program,
+    iterations: int = 1000,
+    args: Sequence[str] = (),
+    seed: int = 1,
+    max_size: Optional[int] = None,
+    checker: Optional[Dict[str, Any]] = None,
+    time_limit: float = DEFAULT_STRESS_TIME_LIMIT,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    workers: Optional[int] = None,
+    log: Callable[[str], None] = lambda message: None
+) -> Dict[str, Any]:
+    """
+    Ищет вход, на котором проверяемое решение расходится с эталоном
+
+    Программы должны быть подготовлены (Program.prepare).
+
+    Args:
+        generator: Генератор входных данных
+        reference: Эталонное решение
+        candidate: Проверяемое решение
+        iterations: Наибольшее число случаев
+        args: Аргументы генератора (см. generator_args)
+        seed: Зерно первого случая; случай i получает зерно seed + i
+        max_size: Наибольший размер теста для {size}
+        checker: Режим проверки вывода (см. OlympiadTask.get_checker)
+        time_limit: Ограничение времени каждого запуска в секундах
+        memory_limit: Ограничение памяти каждого запуска в байтах
+        workers: Число параллельных случаев (по умолчанию get_test_workers)
+        log: Функция для сообщений о ходе работы
+
+    Returns:
+        Отчет: {'status': 'passed' или 'failed', 'cases', 'elapsed',
+        'throughput', 'failure', 'failures_found', 'reference_time',
+        'candidate_time'}; в 'failure' - зерно, размер, аргументы генератора,
+        вход, ответы эталона и решения и вердикт
+
+    Raises:
+        StressError: Если генератор или эталон завершился с ошибкой
+    """
+    workers = workers or get_test_workers()
+    stop = threading.Event()
+    lock = threading.Lock()
+    failures: List[Dict[str, Any]] = []
+    reference_times: List[float] = []
+    candidate_times: List[float] = []
+    completed = 0
+
+    checker_file = None
+    if checker and checker.get('source'):
+        try:
+            checker, checker_file = prepare_custom_checker(checker)
+        except CompilationError as e:
+            raise StressError(f"Ошибка компиляции чекера: {e}")
+
+    def run_case(index: int) -> None:
+        nonlocal completed
+        if stop.is_set():
+            return
+
+        size = case_size(index, iterations, max_size)
+        case_args = generator_args(args, seed + index, size)
+        generated = generator.run(args=case_args, time_limit=time_limit, memory_limit=memory_limit)
+        reason = failure_reason(generated)
+        if reason:
+            raise StressError(f"Генератор с аргументами {' '.join(case_args)}: {reason}")
+        input_data = generated['stdout']
+
+        expected = reference.run(input_data, time_limit=time_limit, memory_limit=memory_limit)
+        reason = failure_reason(expected)
+        if reason:
+            raise StressError(f"Эталон на входе генератора {' '.join(case_args)}: {reason}")
+
+        actual = candidate.run(input_data, time_limit=time_limit, memory_limit=memory_limit)
+        verdict = failure_reason(actual)
+        if verdict is None and not check_output(expected['stdout'], actual['stdout'], checker, input_data):
+            verdict = "неверный ответ"
+
+        with lock:
+            completed += 1
+            reference_times.append(expected['execution_time'])
+            candidate_times.append(actual['execution_time'])
+            if verdict:
+                stop.set()
+                failures.append({
+                    'seed': seed + index,
+                    'size': size,
+                    'args': case_args,
+                    'input': input_data,
+                    'expected': expected['stdout'],
+                    'output': actual['stdout'],
+                    'verdict': verdict,
+                })
+            elif completed % 100 == 0:
+                log(f"Проверено случаев: {completed}")
+
+    started = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(run_case, index) for index in range(iterations)]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                stop.set()
+                raise
+    finally:
+        if checker_file:
+            remove_temp_file(checker_file, 'cpp')
+    elapsed = time.monotonic() - started
+
+    failure = min(failures, key=lambda item: (len(item['input']), item['seed'])) if failures else None
+    return {
+        'status': 'failed' if failure else 'passed',
+        'cases': completed,
+        'elapsed': round(elapsed, 3),
+        'throughput': round(completed / elapsed, 1) if elapsed > 0 else None,
+        'failure': failure,
+        'failures_found': len(failures),
+        'reference_time': percentiles(reference_times),
+        'candidate_time': percentiles(candidate_times),
+    }
@@ -0,0 +1,333 @@
+"""
+Генерация тестов задания олимпиады.
+
+Конвейер из трех этапов:
+
+1. генераторы строят входные данные по строкам скрипта
+   (`<генератор> <аргументы>`, см. parse_script), ручные тесты берутся как есть;
+2. валидаторы читают каждый вход со stdin и завершаются с ненулевым кодом,
+   если вход не соответствует условию задачи;
+3. эталонное решение автора запускается на каждом входе, его вывод становится
+   ожидаемым ответом, а время запуска - основой для ограничения времени.
+
+Все программы запускаются через песочницу (code_runner.run_in_sandbox), запуски
+каждого этапа идут параллельно. Генератор должен быть детерминированным:
+случайность задается аргументами (например, зерном), чтобы повторный запуск
+скрипта давал те же тесты.
+"""
+import os
+import math
+import shlex
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db import transaction
+from django.db.models import Max
+
+from .benchmark import percentiles
+from .code_runner import (
+    LANGUAGE_CONFIG, DEFAULT_MEMORY_LIMIT, CompilationError,
+    create_temp_file, compile_code, remove_temp_file, run_in_sandbox,
+    get_java_flags, get_output_limit, get_test_workers
+)
+from .models import OlympiadTask, OlympiadTestCase, OlympiadTestGroup
+
+# Ограничение времени генераторов, валидаторов и эталона по умолчанию (секунд)
+DEFAULT_PIPELINE_TIME_LIMIT = 10
+
+
+class PipelineError(Exception):
+    """Ошибка этапа генерации тестов"""
+    pass
+
+
+def detect_language(path: str) -> str:
+    """Определяет язык программы по расширению файла"""
+    ext = os.path.splitext(path)[1].lower()
+    for language, config in LANGUAGE_CONFIG.items():
+        if config['file_ext'] == ext:
+            return language
+    raise PipelineError(f"Не удалось определить язык программы {path}")
+
+
+class Program:
+    """Программа конвейера (генератор, валидатор или эталон), собранная в рабочем каталоге"""
+
+    def __init__(self, path: str, language: Optional[str] = None, compile_profile: Optional[str] = None,
+                 code: Optional[str] = None):
+        """
+        Args:
+            path: Файл с исходным кодом (если code задан - только имя программы в сообщениях)
+            language: Язык (по умолчанию по расширению файла)
+            compile_profile: Профиль компиляции C++
+            code: Исходный код вместо содержимого файла
+        """
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.language = language or detect_language(path)
+        self.compile_profile = compile_profile
+        self.code = code
+        self.file_path: Optional[str] = None
+
+    def prepare(self) -> 'Program':
+        """
+        Копирует исходник в рабочий каталог и компилирует его
+
+        Raises:
+            PipelineError: Если файл не читается или не компилируется
+        """
+        code = self.code
+        if code is None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    code = f.read()
+            except OSError as e:
+                raise PipelineError(f"Не удалось прочитать {self.path}: {e}")
+
+        self.file_path, _, _ = create_temp_file(code, self.language)
+        if LANGUAGE_CONFIG[self.language]['compile_cmd']:
+            try:
+                compile_code(self.file_path, self.language, self.compile_profile)
+            except CompilationError as e:
+                self.close()
+                raise PipelineError(f"{self.path}: {e}")
+        return self
+
+    def close(self) -> None:
+        if self.file_path:
+            remove_temp_file(self.file_path, self.language)
+            self.file_path = None
+
+    def __enter__(self) -> 'Program':
+        return self.prepare()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def run(self, input_data: str = '', args: Sequence[str] = (),
+            time_limit: float = DEFAULT_PIPELINE_TIME_LIMIT,
+            memory_limit: int = DEFAULT_MEMORY_LIMIT) -> Dict[str, Any]:
+        """
+        Запускает программу в песочнице с аргументами командной строки
+
+        Returns:
+            Результат sandbox.execute; вывод сохраняется целиком (до лимита вывода)
+        """
+        work_dir = os.path.dirname(self.file_path)
+        cmd = [c.format(file=self.file_path, dir=work_dir) for c in LANGUAGE_CONFIG[self.language]['run_cmd']]
+        if self.language == 'java':
+            cmd[1:1] = get_java_flags()
+        cmd.extend(args)
+
+        return run_in_sandbox(
+            cmd,
+            self.language,
+            input_data,
+            time_limit,
+            memory_limit,
+            cwd=work_dir,
+            # Прогретый интерпретатор не передает программе аргументы
+            python_file=self.file_path if self.language == 'python' and not args else None,
+            capture_limit=get_output_limit()
+        )
+
+
+def failure_reason(result: Dict[str, Any]) -> Optional[str]:
+    """Причина неудачного запуска или None, если программа отработала успешно"""
+    if result['timed_out']:
+        return "превышено ограничение времени"
+    if result['memory_limit_exceeded']:
+        return "превышено ограничение памяти"
+    if result['output_limit_exceeded']:
+        return "превышено ограничение объема вывода"
+    if result['returncode'] != 0:
+        stderr = result['stderr'].strip()
+        return f"код возврата {result['returncode']}" + (f": {stderr}" if stderr else "")
+    return None
+
+
+def parse_script(text: str) -> List[Tuple[str, List[str]]]:
+    """
+    Разбирает скрипт генерации: по строке на тест, `<генератор> <аргументы>`
+
+    Пустые строки и строки, начинающиеся с #, пропускаются.
+
+    Returns:
+        Список пар (имя генератора, аргументы)
+    """
+    commands = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            parts = shlex.split(line)
+        except ValueError as e:
+            raise PipelineError(f"Строка {line_number} скрипта: {e}")
+        commands.append((parts[0], parts[1:]))
+    return commands
+
+
+def _parallel(func: Callable, items: Sequence, workers: int) -> List:
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+def build_tests(
+    solution: Program,
+    generators: Iterable[Program] = (),
+    script: Sequence[Tuple[str, List[str]]] = (),
+    manual_inputs: Sequence[Tuple[str, str]] = (),
+    validators: Iterable[Program] = (),
+    time_limit: float = DEFAULT_PIPELINE_TIME_LIMIT,
+    memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    workers: Optional[int] = None,
+    log: Callable[[str], None] = lambda message: None
+) -> List[Dict[str, Any]]:
+    """
+    Строит тесты: генерация входов, проверка валидаторами и запуск эталона
+
+    Программы должны быть подготовлены (Program.prepare).
+
+    Args:
+        solution: Эталонное решение
+        generators: Генераторы; в скрипте генератор указывается по имени файла без расширения
+        script: Команды генерации (см. parse_script)
+        manual_inputs: Ручные тесты - пары (источник, входные данные); идут перед сгенерированными
+        validators: Валидаторы входных данных
+        time_limit: Ограничение времени каждого запуска в секундах
+        memory_limit: Ограничение памяти каждого запуска в байтах
+        workers: Число параллельных запусков (по умолчанию get_test_workers)
+        log: Функция для сообщений о ходе работы
+
+    Returns:
+        Список тестов: {'source', 'input_data', 'expected_output',
+        'execution_time', 'wall_time', 'memory_used'}, где время и память -
+        замеры эталонного решения
+
+    Raises:
+        PipelineError: Если генератор, валидатор или эталон завершился с ошибкой
+    """
+    workers = workers or get_test_workers()
+    by_name = {generator.name: generator for generator in generators}
+    unknown = sorted({name for name, _ in script if name not in by_name})
+    if unknown:
+        raise PipelineError(f"Неизвестные генераторы в скрипте: {', '.join(unknown)}")
+
+    def generate(command):
+        name, args = command
+        result = by_name[name].run(args=args, time_limit=time_limit, memory_limit=memory_limit)
+        source = shlex.join([name, *args])
+        reason = failure_reason(result)
+        if reason:
+            raise PipelineError(f"Генератор `{source}`: {reason}")
+        return source, result['stdout']
+
+    tests = [{'source': source, 'input_data': input_data} for source, input_data in manual_inputs]
+    if script:
+        log(f"Генерация: {len(script)} тестов")
+        tests.extend({'source': source, 'input_data': input_data}
+                     for source, input_data in _parallel(generate, list(script), workers))
+    if not tests:
+        raise PipelineError("Нет ни одного теста: задайте скрипт генерации или ручные тесты")
+
+    for validator in validators:
+        log(f"Проверка входов валидатором {validator.path}")
+
+        def validate(numbered):
+            number, test = numbered
+            result = validator.run(test['input_data'], time_limit=time_limit, memory_limit=memory_limit)
+            reason = failure_reason(result)
+            if reason:
+                raise PipelineError(f"Тест {number} ({test['source']}) отклонен валидатором {validator.name}: {reason}")
+
+        _parallel(validate, list(enumerate(tests, 1)), workers)
+
+    log(f"Запуск эталонного решения {solution.path}")
+
+    def answer(numbered):
+        number, test = numbered
+        result = solution.run(test['input_data'], time_limit=time_limit, memory_limit=memory_limit)
+        reason = failure_reason(result)
+        if reason:
+            raise PipelineError(f"Эталонное решение на тесте {number} ({test['source']}): {reason}")
+        return {
+            **test,
+            'expected_output': result['stdout'],
+            'execution_time': result['execution_time'],
+            'wall_time': result['wall_time'],
+            'memory_used': result['memory_used'],
+        }
+
+    return _parallel(answer, list(enumerate(tests, 1)), workers)
+
+
+def timing_report(tests: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Сводка времени эталонного решения для выбора ограничения времени
+
+    Рекомендуемое ограничение - утроенное максимальное процессорное время
+    эталона, округленное вверх до 0.5 секунды.
+
+    Returns:
+        {'cpu': перцентили в мс, 'wall': перцентили в мс,
+         'max_memory_mb': пик памяти, 'suggested_time_limit': секунды}
+    """
+    cpu_times = [test['execution_time'] for test in tests]
+    slowest = max(cpu_times, default=0.0)
+    return {
+        'cpu': percentiles(cpu_times),
+        'wall': percentiles([test['wall_time'] for test in tests]),
+        'max_memory_mb': round(max((test['memory_used'] for test in tests), default=0) / (1024 * 1024), 1),
+        'suggested_time_limit': max(0.5, math.ceil(slowest * 3 * 2) / 2),
+    }
+
+
+def save_tests(
+    task: OlympiadTask,
+    tests: Sequence[Dict[str, Any]],
+    group: Optional[OlympiadTestGroup] = None,
+    points: int = 1,
+    samples: int = 0,
+    replace: bool = False
+) -> List[OlympiadTestCase]:
+    """
+    Сохраняет тесты задания одной транзакцией
+
+    Args:
+        task: Задание олимпиады
+        tests: Результат build_tests
+        group: Группа, в которую попадают тесты
+        points: Баллы за каждый тест
+        samples: Сколько первых тестов открыть участникам
+        replace: Удалить существующие тесты задания
+
+    Returns:
+        Созданные тестовые случаи
+    """
+    with transaction.atomic():
+        if replace:
+            task.test_cases.all().delete()
+            start = 1
+        else:
+            start = (task.test_cases.aggregate(last=Max('order'))['last'] or 0) + 1
+
+        test_cases = []
+        for index, test in enumerate(tests):
+            test_case = OlympiadTestCase(
+                task=task,
+                group=group,
+                input_data=test['input_data'],
+                expected_output=test['expected_output'],
+                is_hidden=index >= samples,
+                points=points,
+                order=start + index
+            )
+            # bulk_create не вызывает save(), поэтому большие данные
+            # переносятся в хранилище блобов здесь
+            test_case.pack_blobs()
+            test_cases.append(test_case)
+
+        return OlympiadTestCase.objects.bulk_create(test_cases)
@@ -0,0 +1,1149 @@
+import os
+import sys
+import socket
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.paginator import Paginator
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .code_runner import create_temp_file, remove_temp_file, run_code_with_input, check_solution, format_code
+from .benchmark import percentiles, run_benchmark
+from .blob_store import BlobStore
+from .compile_cache import CompileCache
+from .pch import PchManager
+from .workspace import WorkspaceManager
+from .formatter import DAEMON_SCRIPT, FormatterDaemon, FormatterService
+from .java_runner import JavaRunnerPool, build_runner, jvm_flags
+from . import verdict_cache
+from .cgroups import cgroup_available
+from .checkers import check_output, make_checker
+from .judge import (
+    enqueue, claim_job, claim_next_job, process_job, queue_metrics,
+    group_score, requeue_orphaned_jobs, run_rejudge, run_task_tests, save_test_results, start_rejudge
+)
+from .models import (
+    JudgeJob, VerdictCache, RejudgeBatch, Olympiad, OlympiadTask, OlympiadTestCase,
+    OlympiadLeaderboard, OlympiadParticipation, OlympiadScoreEvent, OlympiadTaskSubmission, OlympiadTaskResult,
+    OlympiadTestGroup, OlympiadTestResult
+)
+from .sandbox import SandboxError, SandboxPool, execute
+from .stress import stress_test
+from .leaderboard import clear_leaderboards, get_leaderboard
+from .participation_state import get_participation_state
+from .templatetags.olympiad_extras import is_attempted, is_correct, task_score
+from .scoreboard import ScoreboardBroadcaster, latest_event_id, stream_scoreboard
+from .test_pipeline import Program
+
+
+class SandboxTests(SimpleTestCase):
+    def setUp(self):
+        self.file_path, _, self.temp_dir = create_temp_file(
+            "name = input()\nprint('Hello, ' + name)\n", 'python'
+        )
+
+    def tearDown(self):
+        remove_temp_file(self.file_path, 'python')
+
+    def test_execute(self):
+        result = execute([sys.executable, self.file_path], 'World\n', time_limit=5)
+        self.assertEqual(result['returncode'], 0)
+        self.assertEqual(result['stdout'], 'Hello, World\n')
+        self.assertFalse(result['timed_out'])
+
+    def test_execute_output_limit(self):
+        result = execute(
+            [sys.executable, '-c', 'while True: print("x" * 1000)'],
+            time_limit=10,
+            output_limit=1024 * 1024,
+            capture_limit=1000
+        )
+        self.assertTrue(result['output_limit_exceeded'])
+        self.assertFalse(result['timed_out'])
+        self.assertLess(result['execution_time'], 5)
+        self.assertEqual(len(result['stdout']), 1000)
+
+    def test_execute_streaming_compare(self):
+        code = 'for i in range(200000): print(i)'
+        expected = '\n'.join(str(i) for i in range(200000))
+        result = execute([sys.executable, '-c', code], capture_limit=100, expected_output=expected)
+        self.assertTrue(result['matched'])
+        self.assertTrue(result['output_truncated'])
+
+        result = execute([sys.executable, '-c', code], expected_output=expected + '\n1')
+        self.assertFalse(result['matched'])
+
+    def test_execute_timeout(self):
+        result = execute([sys.executable, '-c', 'while True: pass'], time_limit=0.5)
+        self.assertTrue(result['timed_out'])
+
+    def test_execute_falls_back_without_cgroup(self):
+        root = tempfile.mkdtemp()
+        try:
+            self.assertFalse(cgroup_available(root))
+        finally:
+            shutil.rmtree(root)
+
+        result = execute([sys.executable, self.file_path], 'World', cgroup_root='/nonexistent/cgroup')
+        self.assertEqual(result['stdout'], 'Hello, World\n')
+        self.assertFalse(result['memory_limit_exceeded'])
+
+    def test_execute_measures_cpu_time_and_memory(self):
+        code = 'import time\ndata = bytearray(64 * 1024 * 1024)\ntime.sleep(0.3)'
+        result = execute([sys.executable, '-c', code], time_limit=2, memory_limit=512 * 1024 * 1024)
+        self.assertFalse(result['timed_out'])
+        # Ожидание не расходует процессорное время
+        self.assertGreaterEqual(result['wall_time'], 0.3)
+        self.assertLess(result['cpu_time'], 0.3)
+        self.assertGreater(result['memory_used'], 64 * 1024 * 1024)
+
+    def test_pool_runs_python_in_process(self):
+        pool = SandboxPool(1)
+        try:
+            for name in ('Alice', 'Bob'):
+                result = pool.run(
+                    cmd=[sys.executable, self.file_path],
+                    input_data=name,
+                    time_limit=5,
+                    python_file=self.file_path
+                )
+                self.assertEqual(result['stdout'], f'Hello, {name}\n')
+
+            result = pool.run(
+                cmd=[sys.executable, self.file_path],
+                input_data='',
+                time_limit=5,
+                python_file=self.file_path
+            )
+            self.assertEqual(result['returncode'], 1)
+            self.assertIn('EOFError', result['stderr'])
+        finally:
+            pool.shutdown()
+
+    def test_pool_replaces_killed_worker_for_waiting_run(self):
+        pool = SandboxPool(1)
+        self.addCleanup(pool.shutdown)
+        results = {}
+
+        def run(name, cmd):
+            try:
+                results[name] = pool.run(cmd=cmd, time_limit=5)
+            except SandboxError as e:
+                results[name] = e
+
+        # Первый запуск убивает свой рабочий процесс, второй в это время ждет
+        # свободного места в пуле
+        killer = threading.Thread(target=run, daemon=True,
+                                  args=('killer', ['sh', '-c', 'sleep 0.3; kill -9 $PPID']))
+        waiter = threading.Thread(target=run, daemon=True, args=('waiter', ['echo', 'ok']))
+        killer.start()
+        time.sleep(0.1)
+        waiter.start()
+        killer.join(10)
+        waiter.join(10)
+
+        self.assertFalse(waiter.is_alive())
+        self.assertIsInstance(results['killer'], SandboxError)
+        self.assertEqual(results['waiter']['stdout'], 'ok\n')
+
+
+class CodeRunnerTests(SimpleTestCase):
+    @override_settings(OLYMPIADS_SANDBOX_POOL_SIZE=0)
+    def test_run_code_without_pool(self):
+        file_path, _, _ = create_temp_file("print(int(input()) * 2)", 'python')
+        try:
+            result = run_code_with_input(file_path, 'python', '21')
+        finally:
+            remove_temp_file(file_path, 'python')
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['output'].strip(), '42')
+
+    def test_check_solution(self):
+        result = check_solution(
+            "a, b = map(int, input().split())\nprint(a + b)",
+            'python',
+            [{'input': '1 2', 'expected': '3'}, {'input': '2 2', 'expected': '5'}]
+        )
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['passed_count'], 1)
+        self.assertFalse(result['all_passed'])
+        self.assertTrue(result['test_results'][0]['passed'])
+
+    @override_settings(OLYMPIADS_PARALLEL_TESTS=4)
+    def test_check_solution_parallel_keeps_order(self):
+        tests = [{'input': str(i), 'expected': str(i * i)} for i in range(8)]
+        tests[5]['expected'] = '-1'
+        result = check_solution("n = int(input())\nprint(n * n)", 'python', tests)
+        self.assertEqual([r['test_number'] for r in result['test_results']], list(range(1, 9)))
+        self.assertEqual(result['passed_count'], 7)
+        self.assertFalse(result['test_results'][5]['passed'])
+
+    @override_settings(OLYMPIADS_PARALLEL_TESTS=1)
+    def test_check_solution_fail_fast(self):
+        tests = [{'input': '1', 'expected': '2'}, {'input': '2', 'expected': '0'}, {'input': '3', 'expected': '4'}]
+        result = check_solution("print(int(input()) + 1)", 'python', tests, fail_fast=True)
+        self.assertEqual(result['passed_count'], 1)
+        self.assertTrue(result['test_results'][2]['skipped'])
+
+
+class TestGroupTests(SimpleTestCase):
+    def test_dependent_groups_are_skipped(self):
+        tests = [
+            {'input': '1', 'expected': '1', 'group': 'samples'},
+            {'input': '20', 'expected': '20', 'group': 'small'},
+            {'input': '2', 'expected': '2', 'group': 'small'},
+            {'input': '3', 'expected': '3', 'group': 'large'},
+            {'input': '5', 'expected': '5'},
+        ]
+        groups = [
+            {'id': 'large', 'depends_on': ['small'], 'all_or_nothing': True},
+            {'id': 'small', 'depends_on': ['samples'], 'all_or_nothing': True},
+            {'id': 'samples', 'is_sample': True, 'all_or_nothing': True},
+        ]
+        result = check_solution("n = int(input())\nprint(n if n < 10 else 0)", 'python', tests,
+                                parallel=False, groups=groups)
+
+        self.assertEqual(
+            [(r['passed'], r.get('skipped', False)) for r in result['test_results']],
+            [(True, False), (False, False), (False, True), (False, True), (True, False)]
+        )
+        by_id = {group['id']: group for group in result['group_results']}
+        self.assertTrue(by_id['samples']['passed'])
+        self.assertFalse(by_id['small']['passed'] or by_id['small']['skipped'])
+        self.assertTrue(by_id['large']['skipped'])
+
+    def test_group_score(self):
+        task = OlympiadTask(points=100)
+        groups = [
+            OlympiadTestGroup(id=1, points=30),
+            OlympiadTestGroup(id=2, points=60, scoring=OlympiadTestGroup.Scoring.PER_TEST),
+        ]
+        test_cases = [OlympiadTestCase(group_id=1), OlympiadTestCase(group_id=2), OlympiadTestCase(group_id=2),
+                      OlympiadTestCase(points=10)]
+        check_result = {
+            'test_groups': groups,
+            'test_cases': test_cases,
+            'test_results': [{'passed': True}, {'passed': True}, {'passed': False}, {'passed': True}],
+            'group_results': [
+                {'id': 1, 'passed': True, 'skipped': False, 'passed_count': 1, 'total_count': 1},
+                {'id': 2, 'passed': False, 'skipped': False, 'passed_count': 1, 'total_count': 2},
+            ]
+        }
+        self.assertEqual(group_score(task, check_result), 70)
+
+class CheckerTests(SimpleTestCase):
+    def feed_in_chunks(self, checker, data, size=3):
+        for i in range(0, len(data), size):
+            checker.feed(data[i:i + size])
+        return checker.finish()
+
+    def test_tokens(self):
+        checker = make_checker('1 2\n3', {'mode': 'tokens'})
+        self.assertTrue(self.feed_in_chunks(checker, b'1\n2   3\n'))
+        self.assertFalse(check_output('1 2 3', '1 23', {'mode': 'tokens'}))
+        self.assertFalse(check_output('1 2 3', '1 2', {'mode': 'tokens'}))
+
+    def test_float(self):
+        checker = make_checker('3.1415926 ok', {'mode': 'float', 'epsilon': 1e-6})
+        self.assertTrue(self.feed_in_chunks(checker, b'3.14159261 ok'))
+        self.assertFalse(check_output('0.5', '0.51', {'mode': 'float', 'epsilon': 1e-3}))
+
+    def test_lines(self):
+        checker = make_checker('1 2\n\n3\n', {'mode': 'lines'})
+        self.assertTrue(self.feed_in_chunks(checker, b'\n  1 2  \r\n\n3\n\n\n'))
+        self.assertFalse(check_output('1 2\n3', '1 2 3', {'mode': 'lines'}))
+        self.assertFalse(check_output('1 2\n3', '1  2\n3', {'mode': 'lines'}))
+        self.assertFalse(check_output('1\n\n2', '1\n2', {'mode': 'lines'}))
+        self.assertTrue(check_output('', '\n \n', {'mode': 'lines'}))
+
+    def test_expected_file(self):
+        cases = [
+            ('exact', '  1 2\n3 \n\n', [b'1 2\n3', b'\n1 2\n3\n', b'1 2 3', b'1 2\n3 4', b'1 2']),
+            ('lines', '\n 1 2 \n\n3\n\n', [b'1 2\n\n3', b'1 2\n3', b'1 2\n\n3\n4']),
+            ('tokens', '10 200\n3', [b'10 200 3', b'10 20 03', b'10 200']),
+            ('unordered_lines', 'a\nb\nb\n', [b'b\na\nb', b'a\nb']),
+            ('exact', ' \n', [b'', b'\n', b'x']),
+            ('lines', '', [b'', b'x']),
+        ]
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir)
+        path = os.path.join(work_dir, 'answer.txt')
+        # Маленькие части, чтобы токены и строки ответа попадали на их границы
+        with mock.patch('olympiads.checkers.EXPECTED_CHUNK_SIZE', 2):
+            for mode, expected, outputs in cases:
+                with open(path, 'wb') as f:
+                    f.write(expected.encode('utf-8'))
+                for output in outputs:
+                    with self.subTest(mode=mode, expected=expected, output=output):
+                        checker = make_checker('', {'mode': mode}, expected_file=path)
+                        self.assertEqual(
+                            self.feed_in_chunks(checker, output),
+                            check_output(expected, output.decode('utf-8'), {'mode': mode})
+                        )
+
+    def test_custom_checker_removes_files_on_error(self):
+        checker = make_checker('1', {'mode': 'custom', 'cmd': ['true']})
+        checker.feed(b'1')
+        with mock.patch('olympiads.checkers.subprocess.run', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                checker.finish()
+        self.assertFalse(os.path.exists(checker.work_dir))
+
+    def test_unordered_lines(self):
+        self.assertTrue(check_output('a\nb\nb', 'b\na\nb\n', {'mode': 'unordered_lines'}))
+        self.assertFalse(check_output('a\nb', 'a\na', {'mode': 'unordered_lines'}))
+
+    def test_check_solution_with_checker(self):
+        result = check_solution(
+            "print(1 / 3)", 'python', [{'input': '', 'expected': '0.333333'}],
+            checker={'mode': 'float', 'epsilon': 1e-5}
+        )
+        self.assertTrue(result['all_passed'])
+
+    @unittest.skipUnless(shutil.which('g++'), 'g++ не установлен')
+    def test_custom_checker(self):
+        # Принимает любое число, большее ответа жюри
+        source = (
+            "#include <fstream>\n"
+            "int main(int argc, char** argv) {"
+            " std::ifstream out(argv[2]), ans(argv[3]); long long a, b;"
+            " if (!(out >> a) || !(ans >> b)) return 1; return a > b ? 0 : 1; }"
+        )
+        result = check_solution(
+            "print(int(input()) + 1)", 'python',
+            [{'input': '5', 'expected': '5'}, {'input': '0', 'expected': '7'}],
+            checker={'mode': 'custom', 'source': source}
+        )
+        self.assertEqual([r['passed'] for r in result['test_results']], [True, False])
+
+
+class CompileCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _artifact(self, name, size):
+        path = os.path.join(self.work_dir, name)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        return path
+
+    def test_store_and_restore(self):
+        cache = CompileCache(self.root, 1024)
+        key = cache.make_key('cpp', ['g++', '-O2'], b'int main() {}')
+        self.assertNotEqual(key, cache.make_key('cpp', ['g++', '-O0'], b'int main() {}'))
+        # Артефакты другой версии компилятора не используются
+        self.assertNotEqual(key, cache.make_key('cpp', ['g++', '-O2'], b'int main() {}', 'g++ 14.1'))
+
+        self.assertFalse(cache.restore(key, self.work_dir))
+        cache.store(key, [self._artifact('a.out', 100)])
+
+        dest_dir = tempfile.mkdtemp()
+        try:
+            self.assertTrue(cache.restore(key, dest_dir))
+            self.assertEqual(os.path.getsize(os.path.join(dest_dir, 'a.out')), 100)
+        finally:
+            shutil.rmtree(dest_dir)
+
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_lru_eviction_by_size(self):
+        cache = CompileCache(self.root, 250)
+        keys = [cache.make_key('cpp', [], str(i).encode()) for i in range(3)]
+        cache.store(keys[0], [self._artifact('a.out', 100)])
+        cache.store(keys[1], [self._artifact('a.out', 100)])
+        # Обращение делает первую запись самой свежей
+        os.utime(cache._entry_dir(keys[1]), (0, 0))
+        self.assertTrue(cache.restore(keys[0], self.work_dir))
+        cache.store(keys[2], [self._artifact('a.out', 100)])
+
+        self.assertTrue(os.path.isdir(cache._entry_dir(keys[0])))
+        self.assertFalse(os.path.isdir(cache._entry_dir(keys[1])))
+        self.assertLessEqual(cache.stats()['bytes'], 250)
+
+    @unittest.skipUnless(shutil.which('g++'), 'g++ не установлен')
+    def test_repeated_cpp_run_uses_cache(self):
+        code = "#include <iostream>\nint main() { int a, b; std::cin >> a >> b; std::cout << a + b; }"
+        with override_settings(OLYMPIADS_COMPILE_CACHE_DIR=self.root):
+            from . import code_runner
+            code_runner._compile_cache = None
+            try:
+                for _ in range(2):
+                    result = check_solution(code, 'cpp', [{'input': '2 3', 'expected': '5'}])
+                    self.assertTrue(result['all_passed'])
+                stats = code_runner.get_compile_cache().stats()
+            finally:
+                code_runner._compile_cache = None
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    @unittest.skipUnless(shutil.which('g++'), 'g++ не установлен')
+    def test_compiler_upgrade_invalidates_cache(self):
+        from . import code_runner
+
+        code = "int main() { return 0; }"
+        with override_settings(OLYMPIADS_COMPILE_CACHE_DIR=self.root):
+            code_runner._compile_cache = None
+            self.addCleanup(setattr, code_runner, '_compile_cache', None)
+            for version in ('g++ 13.2', 'g++ 14.1'):
+                with mock.patch.dict(code_runner._compiler_versions, {'cpp': version}):
+                    self.assertTrue(check_solution(code, 'cpp', [{'input': '', 'expected': ''}])['all_passed'])
+            stats = code_runner.get_compile_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses']), (0, 2))
+
+
+class PchTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    @unittest.skipUnless(shutil.which('g++'), 'g++ не установлен')
+    def test_profile_compiles_with_pch(self):
+        manager = PchManager(self.root)
+        include_dir = manager.include_dir(['-std=c++17', '-O2'])
+        self.assertTrue(os.path.exists(os.path.join(include_dir, 'bits', 'stdc++.h.gch')))
+        self.assertNotEqual(include_dir, manager.pch_dir(['-std=c++17']))
+
+        manager.prune([include_dir])
+        self.assertTrue(os.path.isdir(include_dir))
+        manager.prune([])
+        self.assertFalse(os.path.isdir(include_dir))
+
+        code = "#include <bits/stdc++.h>\nint main() { long long a, b; std::cin >> a >> b; std::cout << a + b; }"
+        with override_settings(OLYMPIADS_COMPILE_CACHE_DIR=self.root):
+            from . import code_runner
+            code_runner._compile_cache = code_runner._pch_manager = None
+            try:
+                self.assertEqual(code_runner.prepare_cpp_pch(), dict.fromkeys(code_runner.get_cpp_profiles(), True))
+                # Заголовок, собранный с другими флагами, не ломает компиляцию
+                for profile in ('c++17-O2', 'c++17', ''):
+                    result = check_solution(code, 'cpp', [{'input': '2 3', 'expected': '5'}], compile_profile=profile)
+                    self.assertTrue(result['all_passed'])
+            finally:
+                code_runner._compile_cache = code_runner._pch_manager = None
+
+class WorkspaceTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def test_reuse_and_garbage_collection(self):
+        manager = WorkspaceManager(self.root, pool_size=1)
+        path = manager.acquire()
+        with open(os.path.join(path, 'a.out'), 'wb') as f:
+            f.write(b'x' * 10)
+        manager.release(path)
+        self.assertEqual(os.listdir(path), [])
+        self.assertEqual(manager.acquire(), path)
+
+        # Каталог завершившегося процесса и каталог, который не вернули в пул
+        os.mkdir(os.path.join(self.root, '999999999-0'))
+        manager.max_age = 0
+        self.assertEqual(manager.collect_garbage(), 2)
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_garbage_collection_concurrent_with_acquire(self):
+        manager = WorkspaceManager(self.root, pool_size=2)
+        errors = []
+        done = threading.Event()
+
+        def use_workspaces():
+            try:
+                for _ in range(200):
+                    path = manager.acquire()
+                    with open(os.path.join(path, 'main.py'), 'w') as f:
+                        f.write('print(1)')
+                    manager.release(path)
+            except OSError as e:
+                errors.append(e)
+
+        def collect():
+            while not done.is_set():
+                manager.collect_garbage()
+
+        collector = threading.Thread(target=collect)
+        workers = [threading.Thread(target=use_workspaces) for _ in range(4)]
+        collector.start()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        done.set()
+        collector.join()
+
+        self.assertEqual(errors, [])
+        # В пуле только существующие каталоги
+        for path in manager._idle:
+            self.assertTrue(os.path.isdir(path))
+
+    def test_quota_and_cleanup(self):
+        from . import code_runner
+
+        with override_settings(OLYMPIADS_WORKSPACE_ROOT=self.root, OLYMPIADS_WORKSPACE_QUOTA=1024 * 1024):
+            code_runner._workspace_manager = None
+            self.addCleanup(setattr, code_runner, '_workspace_manager', None)
+
+            file_path, _, _ = create_temp_file(
+                "for i in range(3):\n    open(f'f{i}', 'wb').write(b'x' * 500000)", 'python'
+            )
+            try:
+                result = run_code_with_input(file_path, 'python')
+            finally:
+                remove_temp_file(file_path, 'python')
+            self.assertEqual(result['status'], 'error')
+            self.assertIn('объем файлов', result['output'])
+
+            result = check_solution("print(", 'python', [{'input': '', 'expected': ''}])
+            self.assertFalse(result['all_passed'])
+            if shutil.which('g++'):
+                result = check_solution("int main() { return }", 'cpp', [{'input': '', 'expected': ''}])
+                self.assertEqual(result['status'], 'error')
+            # Форматер может отсутствовать или завершиться ошибкой - каталог все равно возвращается
+            with mock.patch('olympiads.code_runner.subprocess.Popen', side_effect=OSError('no formatter')):
+                self.assertEqual(format_code('x=1', 'python')['status'], 'error')
+            # Каталоги возвращены в пул и очищены
+            for name in os.listdir(self.root):
+                self.assertEqual(os.listdir(os.path.join(self.root, name)), [])
+
+class FormatterTests(SimpleTestCase):
+    def test_cache_hit_skips_formatter(self):
+        calls = []
+
+        class CountingService(FormatterService):
+            def _format_uncached(self, code, language):
+                calls.append(code)
+                return {'status': 'success', 'formatted_code': code.strip() + '\n'}
+
+        service = CountingService(cache_size=2)
+        for _ in range(3):
+            self.assertEqual(service.format('x=1 ', 'python')['formatted_code'], 'x=1\n')
+        # Отформатированный код тоже считается уже отформатированным
+        service.format('x=1\n', 'python')
+        self.assertEqual(calls, ['x=1 '])
+
+        service.format('y=2 ', 'python')
+        self.assertIsNone(service.get_cached('x=1 ', 'python'))
+
+    @override_settings(OLYMPIADS_FORMAT_RATE_LIMIT=2)
+    def test_rate_limit(self):
+        service = FormatterService()
+        service._format_uncached = lambda code, language: {'status': 'success', 'formatted_code': code}
+        results = [service.format(f'x = {i}', 'python', rate_key='user:test-rate') for i in range(3)]
+        self.assertEqual([r['status'] for r in results], ['success', 'success', 'error'])
+        self.assertTrue(results[2]['rate_limited'])
+        # Попадания в кэш не ограничиваются
+        self.assertEqual(service.format('x = 0', 'python', rate_key='user:test-rate')['status'], 'success')
+
+    @unittest.skipUnless(shutil.which('node'), 'node не установлен')
+    def test_daemon(self):
+        # Процесс-форматер с заглушкой prettier, переводящей код в верхний регистр
+        module_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, module_dir)
+        os.makedirs(os.path.join(module_dir, 'prettier'))
+        with open(os.path.join(module_dir, 'prettier', 'index.js'), 'w') as f:
+            f.write(
+                "exports.format = async (code) => {"
+                " if (code.includes('(')) throw new Error('bad'); return code.toUpperCase(); };"
+            )
+
+        daemon = FormatterDaemon(['env', f'NODE_PATH={module_dir}', 'node', DAEMON_SCRIPT])
+        self.addCleanup(daemon.stop)
+        self.assertEqual(daemon.format('let a', 'babel'), (True, 'LET A'))
+        self.assertEqual(daemon.format('f(', 'babel'), (False, 'bad'))
+        pid = daemon._process.pid
+        self.assertEqual(daemon.format('b', 'babel'), (True, 'B'))
+        self.assertEqual(daemon._process.pid, pid)
+
+
+class BenchmarkTests(SimpleTestCase):
+    def test_percentiles(self):
+        stats = percentiles([0.001 * i for i in range(1, 101)])
+        self.assertEqual((stats['p50'], stats['p95'], stats['p99']), (50.0, 95.0, 99.0))
+
+    def test_run_benchmark(self):
+        report = run_benchmark(
+            ['python'], ['fast', 'compile_error'], [2],
+            iterations=1, tests=2, assignments=True, jitter_runs=2
+        )
+        level = report['concurrency']['2']
+        self.assertEqual(level['submissions'], 4)
+        for group in ('python', 'assignment'):
+            for kind in ('fast', 'compile_error'):
+                self.assertEqual(level['groups'][group][kind]['expected_verdict_ratio'], 1.0)
+        self.assertIsNotNone(report['spawn_overhead']['python']['latency_ms']['p50'])
+        self.assertIn('cpu_time_cv', level['timing_jitter']['python'])
+
+class JavaRunnerTests(SimpleTestCase):
+    def test_jvm_flags(self):
+        self.assertNotIn('-XX:SharedArchiveFile=/tmp/jdk.jsa', jvm_flags())
+        self.assertIn('-XX:SharedArchiveFile=/tmp/jdk.jsa', jvm_flags('/tmp/jdk.jsa'))
+
+    @unittest.skipUnless(shutil.which('javac'), 'javac не установлен')
+    def test_warm_runner(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, True)
+        pool = JavaRunnerPool(build_runner(cache_dir), 1)
+        self.addCleanup(pool.shutdown)
+
+        code = (
+            "import java.util.Scanner;\n"
+            "public class Main { static int calls = 0; public static void main(String[] a) {"
+            " calls++; int n = new Scanner(System.in).nextInt();"
+            " if (n < 0) while (true) {} System.out.println(n * 2 + calls); } }"
+        )
+        file_path, _, temp_dir = create_temp_file(code, 'java')
+        self.addCleanup(remove_temp_file, file_path, 'java')
+        run_code_with_input(file_path, 'java', '1')
+
+        # Статические поля не переживают запуск
+        for _ in range(2):
+            result = pool.run(128 * 1024 * 1024, class_dir=temp_dir, input_data='20', expected_output='41')
+            self.assertTrue(result['matched'])
+
+        result = pool.run(128 * 1024 * 1024, class_dir=temp_dir, input_data='-1', time_limit=0.5)
+        self.assertTrue(result['timed_out'])
+        result = pool.run(128 * 1024 * 1024, class_dir=temp_dir, input_data='5', expected_output='11')
+        self.assertTrue(result['matched'])
+
+@override_settings(OLYMPIADS_JUDGE_ASYNC=True)
+class JudgeQueueTests(TestCase):
+    def test_job_lifecycle(self):
+        job = enqueue('unknown_kind', {'value': 1})
+        self.assertEqual(job.status, JudgeJob.JobStatus.QUEUED)
+
+        claimed = claim_next_job('test-worker')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, JudgeJob.JobStatus.RUNNING)
+        self.assertIsNone(claim_next_job('test-worker'))
+
+        process_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, JudgeJob.JobStatus.DONE)
+        self.assertFalse(job.result['success'])
+        self.assertIn('unknown_kind', job.error_message)
+
+    def test_sync_mode_processes_immediately(self):
+        with self.settings(OLYMPIADS_JUDGE_ASYNC=False):
+            job = enqueue('unknown_kind', {})
+        self.assertEqual(job.status, JudgeJob.JobStatus.DONE)
+
+    def test_priority_and_fairness(self):
+        practice = enqueue('unknown_kind', {}, priority=JudgeJob.JobPriority.PRACTICE)
+        first = enqueue('unknown_kind', {}, priority=JudgeJob.JobPriority.CONTEST)
+        second = enqueue('unknown_kind', {}, priority=JudgeJob.JobPriority.CONTEST)
+
+        self.assertEqual(claim_next_job('w').pk, first.pk)
+        self.assertEqual(claim_next_job('w').pk, second.pk)
+        self.assertEqual(claim_next_job('w').pk, practice.pk)
+
+        metrics = {m['priority']: m for m in queue_metrics()}
+        self.assertEqual(metrics[JudgeJob.JobPriority.CONTEST]['running'], 2)
+        self.assertEqual(metrics[JudgeJob.JobPriority.PRACTICE]['queued'], 0)
+
+
+
+class RejudgeTests(TransactionTestCase):
+    def setUp(self):
+        User = get_user_model()
+        # bulk_create не вызывает сигналы создания профиля и уведомлений
+        User.objects.bulk_create([
+            User(username='rejudge-a', email='rejudge-a@example.com'),
+            User(username='rejudge-b', email='rejudge-b@example.com')
+        ])
+        users = list(User.objects.filter(username__startswith='rejudge-').order_by('username'))
+
+        self.olympiad = Olympiad.objects.create(title='Перепроверка', description='-', min_passing_score=10)
+        self.task = OlympiadTask.objects.create(
+            olympiad=self.olympiad, title='Сумма', description='-',
+            task_type=OlympiadTask.TaskType.PROGRAMMING, points=10
+        )
+        self.test_case = OlympiadTestCase.objects.create(task=self.task, input_data='2 3', expected_output='6')
+
+        self.participations = []
+        for user, code in zip(users, ['print(sum(map(int, input().split())))', 'print(6)']):
+            participation = OlympiadParticipation.objects.create(olympiad=self.olympiad, user=user)
+            OlympiadTaskSubmission.objects.create(
+                participation=participation, task=self.task, code=code,
+                is_correct=code == 'print(6)', score=10 if code == 'print(6)' else 0
+            )
+            self.participations.append(participation)
+
+    def test_rejudge_task(self):
+        # Исправляем неверный тест и перепроверяем отправки
+        self.test_case.expected_output = '5'
+        self.test_case.save()
+
+        batch = start_rejudge(self.olympiad, self.task)
+        self.assertEqual(batch.total, 2)
+        self.assertEqual(start_rejudge(self.olympiad, self.task).pk, batch.pk)
+
+        progress = []
+        batch = run_rejudge(batch, workers=2, progress=lambda done, total: progress.append((done, total)),
+                            progress_interval=0.05)
+        self.assertEqual(batch.status, RejudgeBatch.BatchStatus.DONE)
+        self.assertEqual(progress[-1], (2, 2))
+
+        scores = [OlympiadParticipation.objects.get(pk=p.pk) for p in self.participations]
+        self.assertEqual([(p.score, p.passed) for p in scores], [(10, True), (0, False)])
+        self.assertEqual(OlympiadTestResult.objects.filter(submission__task=self.task).count(), 2)
+
+    def test_resume_requeues_orphaned_jobs(self):
+        batch = start_rejudge(self.olympiad)
+        job = batch.jobs.first()
+        # Задание захвачено процессом, которого уже нет
+        claim_job(job, f'{socket.gethostname()}:999999999')
+
+        self.assertEqual(requeue_orphaned_jobs(batch), 1)
+        batch = run_rejudge(batch, progress_interval=0.05)
+        self.assertEqual(batch.status, RejudgeBatch.BatchStatus.DONE)
+        self.assertEqual(batch.processed_count(), 2)
+
+class BlobStoreTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def test_put_and_read(self):
+        store = BlobStore(self.root)
+        digest = store.put(b'1 2 3\n' * 1000)
+        self.assertEqual(store.put(b'1 2 3\n' * 1000), digest)
+        with open(store.path(digest), 'rb') as f:
+            self.assertEqual(store.put(f), digest)
+        self.assertLess(os.path.getsize(store._find(digest)), 6000)
+        self.assertEqual(store.read_text(digest, 6), '1 2 3\n')
+        self.assertEqual(store.size(digest), 6000)
+
+    def test_large_test_case_runs_from_blob(self):
+        olympiad = Olympiad.objects.create(title='Блобы', description='-')
+        task = OlympiadTask.objects.create(
+            olympiad=olympiad, title='Сумма', description='-', task_type=OlympiadTask.TaskType.PROGRAMMING
+        )
+        with override_settings(OLYMPIADS_TEST_BLOB_DIR=self.root, OLYMPIADS_TEST_BLOB_THRESHOLD=64):
+            test_case = OlympiadTestCase.objects.create(
+                task=task, input_data='\n'.join(['1'] * 100) + '\n', expected_output='100'
+            )
+            self.assertEqual(test_case.input_data, '')
+            self.assertTrue(test_case.input_blob)
+            self.assertEqual(test_case.expected_output, '100')
+
+            result = run_task_tests(task, 'import sys\nprint(sum(map(int, sys.stdin)))', 'python')
+            self.assertTrue(result['all_passed'])
+            self.assertTrue(result['test_results'][0]['input'].endswith('...'))
+
+    def test_large_expected_output_is_not_read_into_memory(self):
+        olympiad = Olympiad.objects.create(title='Блобы', description='-')
+        task = OlympiadTask.objects.create(
+            olympiad=olympiad, title='Счет', description='-', task_type=OlympiadTask.TaskType.PROGRAMMING
+        )
+        with override_settings(OLYMPIADS_TEST_BLOB_DIR=self.root, OLYMPIADS_TEST_BLOB_THRESHOLD=64):
+            test_case = OlympiadTestCase.objects.create(
+                task=task, input_data='100', expected_output='\n'.join(map(str, range(100)))
+            )
+            self.assertTrue(test_case.expected_blob)
+            spec = test_case.judge_spec()
+            self.assertEqual(spec['expected'], '')
+            self.assertEqual(spec['expected_file'], test_case.get_expected_path())
+
+            # Ответ целиком не читается - только начало для отображения
+            with mock.patch.object(BlobStore, 'read_bytes', autospec=True,
+                                   side_effect=BlobStore.read_bytes) as read_bytes:
+                result = run_task_tests(task, 'for i in range(int(input())): print(i)', 'python')
+            self.assertTrue(result['all_passed'])
+            self.assertTrue(read_bytes.call_args_list)
+            self.assertTrue(all(call.args[2] is not None for call in read_bytes.call_args_list))
+            self.assertFalse(run_task_tests(task, 'print(0)', 'python')['all_passed'])
+
+class VerdictCacheTests(TestCase):
+    def test_hit_for_identical_code(self):
+        version = verdict_cache.tests_version([{'input': '1', 'expected': '2'}], time_limit=1)
+        args = (VerdictCache.TaskKind.OLYMPIAD, 1, 'python')
+        verdict_cache.store_verdict(*args, 'print(2)\n', version, {'passed_count': 1})
+
+        self.assertEqual(verdict_cache.get_verdict(*args, 'print(2)\r\n\n', version), {'passed_count': 1})
+        self.assertIsNone(verdict_cache.get_verdict(*args, 'print(3)', version))
+
+        other_version = verdict_cache.tests_version([{'input': '1', 'expected': '3'}], time_limit=1)
+        self.assertIsNone(verdict_cache.get_verdict(*args, 'print(2)', other_version))
+
+        self.assertEqual(verdict_cache.invalidate_task(VerdictCache.TaskKind.OLYMPIAD, 1), 1)
+        self.assertIsNone(verdict_cache.get_verdict(*args, 'print(2)', version))
+
+    def test_cached_results_keep_original_host(self):
+        User = get_user_model()
+        User.objects.bulk_create([User(username='cache-host', email='cache-host@example.com')])
+        olympiad = Olympiad.objects.create(title='Кэш', description='-')
+        task = OlympiadTask.objects.create(
+            olympiad=olympiad, title='Эхо', description='-', task_type=OlympiadTask.TaskType.PROGRAMMING
+        )
+        OlympiadTestCase.objects.create(task=task, input_data='1', expected_output='1')
+        participation = OlympiadParticipation.objects.create(
+            olympiad=olympiad, user=User.objects.get(username='cache-host')
+        )
+
+        code = 'print(input())'
+        with mock.patch('olympiads.judge.socket.gethostname', return_value='judge-a'):
+            self.assertFalse(run_task_tests(task, code, 'python')['cached'])
+        with mock.patch('olympiads.judge.socket.gethostname', return_value='judge-b'):
+            result = run_task_tests(task, code, 'python')
+            self.assertTrue(result['cached'])
+            submission = OlympiadTaskSubmission.objects.create(participation=participation, task=task, code=code)
+            save_test_results(submission, result)
+
+        test_result = submission.test_results.get()
+        self.assertEqual((test_result.judge_host, test_result.from_cache), ('judge-a', True))
+
+    def test_timeouts_are_not_cacheable(self):
+        result = {'status': 'success', 'test_results': [{'passed': False, 'timed_out': True}]}
+        self.assertFalse(verdict_cache.is_cacheable(result))
+        self.assertTrue(verdict_cache.is_cacheable({'status': 'success', 'test_results': [{'passed': True}]}))
+
+
+class TestPipelineTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.files = {
+            'gen.py': 'import sys\nn = int(sys.argv[1])\nprint(n)\nprint(*range(1, n + 1))\n',
+            'validator.py': 'n = int(input())\nassert len(input().split()) == n and 1 <= n <= 5\n',
+            'sol.py': 'input()\nprint(sum(map(int, input().split())))\n',
+            'script.txt': '# n\ngen 2\ngen 3\n',
+            'bad_script.txt': 'gen 10\n',
+            'sample.txt': '1\n7\n',
+        }
+        for name, content in self.files.items():
+            with open(os.path.join(self.root, name), 'w') as f:
+                f.write(content)
+        olympiad = Olympiad.objects.create(title='Генерация', description='-')
+        self.task = OlympiadTask.objects.create(
+            olympiad=olympiad, title='Сумма', description='-', task_type=OlympiadTask.TaskType.PROGRAMMING
+        )
+
+    def command(self, script):
+        path = lambda name: os.path.join(self.root, name)
+        call_command(
+            'create_test_cases', str(self.task.pk), solution=path('sol.py'), generator=[path('gen.py')],
+            validator=[path('validator.py')], script=path(script), input=[path('sample.txt')],
+            samples=1, group='Основная', workers=2, stdout=StringIO(), stderr=StringIO()
+        )
+
+    def test_generates_validated_tests(self):
+        self.command('script.txt')
+
+        test_cases = list(self.task.test_cases.order_by('order'))
+        self.assertEqual([tc.expected_output for tc in test_cases], ['7\n', '3\n', '6\n'])
+        self.assertEqual([tc.is_hidden for tc in test_cases], [False, True, True])
+        self.assertEqual({tc.group.name for tc in test_cases}, {'Основная'})
+
+    def test_invalid_input_rejects_all_tests(self):
+        with self.assertRaisesMessage(CommandError, 'gen 10'):
+            self.command('bad_script.txt')
+        self.assertFalse(self.task.test_cases.exists())
+        self.assertFalse(self.task.test_groups.exists())
+
+
+class StressTests(SimpleTestCase):
+    def setUp(self):
+        self.programs = {}
+        sources = {
+            'gen.py': 'import sys, random\nn, seed = map(int, sys.argv[1:])\nrandom.seed(seed)\n'
+                      'print(n)\nprint(*[random.randint(1, 9) for _ in range(n)])\n',
+            'ref.py': 'input()\nprint(sum(map(int, input().split())))\n',
+            'ok.py': 'input()\nprint(sum(int(x) for x in input().split()))\n',
+            # Ошибается, начиная с трех чисел
+            'bad.py': 'input()\nprint(sum(list(map(int, input().split()))[:2]))\n',
+        }
+        for name, code in sources.items():
+            program = Program(name, code=code).prepare()
+            self.addCleanup(program.close)
+            self.programs[name] = program
+
+    def run_stress(self, candidate):
+        return stress_test(
+            self.programs['gen.py'], self.programs['ref.py'], self.programs[candidate],
+            iterations=20, args=['{size}', '{seed}'], max_size=10, workers=2
+        )
+
+    def test_finds_smallest_counterexample(self):
+        report = self.run_stress('bad.py')
+        self.assertEqual(report['status'], 'failed')
+        self.assertEqual(report['failure']['size'], 3)
+        self.assertTrue(report['failure']['input'].startswith('3\n'))
+        self.assertLess(report['cases'], 20)
+
+    def test_passes_correct_solution(self):
+        report = self.run_stress('ok.py')
+        self.assertEqual(report['status'], 'passed')
+        self.assertEqual(report['cases'], 20)
+        self.assertIsNotNone(report['candidate_time']['p95'])
+
+
+class TaskResultTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        User.objects.bulk_create([User(username='best-score', email='best-score@example.com')])
+        self.olympiad = Olympiad.objects.create(title='Лучший результат', description='-', min_passing_score=10)
+        self.task = OlympiadTask.objects.create(
+            olympiad=self.olympiad, title='Сумма', description='-',
+            task_type=OlympiadTask.TaskType.PROGRAMMING, points=10
+        )
+        self.participation = OlympiadParticipation.objects.create(
+            olympiad=self.olympiad, user=User.objects.get(username='best-score')
+        )
+
+    def submit(self, score):
+        submission = OlympiadTaskSubmission.objects.create(
+            participation=self.participation, task=self.task, score=score, is_correct=score == 10
+        )
+        self.participation.record_submission(submission)
+        return submission
+
+    def test_repeated_correct_submissions_count_once(self):
+        self.submit(4)
+        self.assertEqual(self.participation.score, 4)
+        best = self.submit(10)
+        self.submit(10)
+        self.submit(7)
+
+        self.participation.refresh_from_db()
+        self.assertEqual((self.participation.score, self.participation.passed), (10, True))
+        result = self.participation.task_results.get()
+        self.assertEqual((result.best_submission_id, result.score, result.is_correct), (best.pk, 10, True))
+
+    def test_regraded_best_submission_falls_back(self):
+        self.submit(6)
+        best = self.submit(10)
+
+        best.score, best.is_correct = 3, False
+        best.save()
+        self.participation.record_submission(best)
+        self.assertEqual((self.participation.score, self.participation.passed), (6, False))
+
+    def test_rebuild_command_fixes_drift(self):
+        self.submit(10)
+        OlympiadTaskResult.objects.update(score=2)
+        OlympiadParticipation.objects.update(score=2)
+
+        call_command('rebuild_task_results', check=True, stdout=StringIO())
+        self.assertEqual(OlympiadTaskResult.objects.get().score, 2)
+
+        call_command('rebuild_task_results', stdout=StringIO())
+        self.assertEqual(OlympiadTaskResult.objects.get().score, 10)
+        self.assertEqual(OlympiadParticipation.objects.get().score, 10)
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        User.objects.bulk_create([
+            User(username=f'leader-{i}', email=f'leader-{i}@example.com') for i in range(5)
+        ])
+        self.users = list(User.objects.filter(username__startswith='leader-').order_by('username'))
+        self.olympiad = Olympiad.objects.create(title='Рейтинг', description='-')
+
+        now = timezone.now()
+        self.participations = []
+        # Баллы и минуты до завершения: равные баллы различает время завершения
+        for user, (score, minutes) in zip(self.users, [(5, 10), (9, 30), (9, 20), (5, 10), (0, 0)]):
+            self.participations.append(OlympiadParticipation.objects.create(
+                olympiad=self.olympiad, user=user, score=score,
+                is_completed=minutes > 0, finished_at=now + timedelta(minutes=minutes) if minutes else None
+            ))
+
+    def test_ranks_and_pages(self):
+        leaderboard = get_leaderboard(self.olympiad.id)
+        self.assertEqual(len(leaderboard), 4)
+        ranks = [leaderboard.rank(p.pk) for p in self.participations]
+        # Одинаковые балл и время завершения делят место
+        self.assertEqual(ranks, [3, 2, 1, 3, None])
+        self.assertEqual(leaderboard.rank_of_user(self.users[1].id), 2)
+
+        page = Paginator(leaderboard.participations(), 2).get_page(2)
+        self.assertEqual([(p.rank, p.score) for p in page], [(3, 5), (3, 5)])
+        self.assertEqual([p.user_id for p in leaderboard.top(1)], [self.users[2].id])
+
+    def test_incremental_update(self):
+        leaderboard = get_leaderboard(self.olympiad.id)
+        version = leaderboard.version
+
+        late = self.participations[4]
+        late.is_completed, late.finished_at, late.score = True, timezone.now(), 20
+        late.save()
+        self.participations[2].score = 1
+        self.participations[2].save(update_fields=['score'])
+
+        leaderboard = get_leaderboard(self.olympiad.id)
+        self.assertGreater(leaderboard.version, version)
+        self.assertEqual(leaderboard.rank(late.pk), 1)
+        self.assertEqual(leaderboard.rank(self.participations[2].pk), 5)
+        self.assertEqual(len(leaderboard), 5)
+
+
+class ScoreboardTests(TestCase):
+    def setUp(self):
+        # id олимпиады повторяются между тестами - индексы прошлых тестов устарели
+        clear_leaderboards()
+        User = get_user_model()
+        User.objects.bulk_create([
+            User(username=f'stream-{i}', email=f'stream-{i}@example.com') for i in range(2)
+        ])
+        self.users = list(User.objects.filter(username__startswith='stream-').order_by('username'))
+        # Заморозка за 30 минут до окончания, до окончания - 2 часа
+        self.olympiad = Olympiad.objects.create(
+            title='Трансляция', description='-', freeze_minutes=30,
+            status=Olympiad.OlympiadStatus.ACTIVE, end_datetime=timezone.now() + timedelta(hours=2)
+        )
+        self.task = OlympiadTask.objects.create(
+            olympiad=self.olympiad, title='Сумма', description='-',
+            task_type=OlympiadTask.TaskType.PROGRAMMING, points=10
+        )
+        self.participations = [
+            OlympiadParticipation.objects.create(olympiad=self.olympiad, user=user, is_completed=True,
+                                                 finished_at=timezone.now())
+            for user in self.users
+        ]
+
+    def submit(self, participation, score):
+        submission = OlympiadTaskSubmission.objects.create(
+            participation=participation, task=self.task, score=score, is_correct=score == 10
+        )
+        participation.record_submission(submission)
+
+    def freeze(self):
+        self.olympiad.end_datetime = timezone.now() + timedelta(minutes=10)
+        self.olympiad.save()
+
+    def test_frozen_leaderboard_hides_late_changes(self):
+        self.submit(self.participations[0], 5)
+        self.freeze()
+        self.submit(self.participations[1], 10)
+        self.submit(self.participations[0], 7)
+
+        self.assertEqual(list(OlympiadScoreEvent.objects.values_list('delta', 'is_frozen')),
+                         [(5, False), (10, True), (2, True)])
+        frozen = get_leaderboard(self.olympiad.id, frozen=True)
+        self.assertEqual([(p.user_id, p.score) for p in frozen.top(2)],
+                         [(self.users[0].id, 5), (self.users[1].id, 0)])
+        self.assertEqual(get_leaderboard(self.olympiad.id).rank_of_user(self.users[1].id), 1)
+
+        self.olympiad.status = Olympiad.OlympiadStatus.COMPLETED
+        self.olympiad.save()
+        self.assertFalse(self.olympiad.is_scoreboard_frozen())
+
+    def test_stream_replays_visible_events(self):
+        self.submit(self.participations[0], 5)
+        self.freeze()
+        self.submit(self.participations[0], 10)
+        self.submit(self.participations[1], 10)
+
+        broadcaster = ScoreboardBroadcaster(autostart=False)
+        stream = ''.join(stream_scoreboard(self.olympiad.id, self.users[1].id, sees_frozen=False,
+                                           last_event_id=0, broadcaster=broadcaster, timeout=0))
+        self.assertIn('event: freeze', stream)
+        # Чужое изменение во время заморозки не показывается, свое - показывается
+        self.assertEqual(stream.count('event: score'), 2)
+        self.assertNotIn('"delta": 5, "score": 10', stream)
+
+        organizer = ''.join(stream_scoreboard(self.olympiad.id, None, sees_frozen=True,
+                                              last_event_id=0, broadcaster=broadcaster, timeout=0))
+        self.assertEqual(organizer.count('event: score'), 3)
+
+    def test_broadcaster_polls_new_events(self):
+        broadcaster = ScoreboardBroadcaster(autostart=False)
+        broadcaster.subscribe(self.olympiad.id)
+        self.submit(self.participations[0], 10)
+        self.submit(self.participations[0], 4)
+
+        self.assertEqual(broadcaster.poll(), 2)
+        messages, frozen = broadcaster.wait(self.olympiad.id, 0, timeout=0)
+        self.assertEqual([(m['delta'], m['score']) for m in messages], [(10, 10), (0, 10)])
+        self.assertFalse(frozen)
+
+        broadcaster.unsubscribe(self.olympiad.id)
+        self.assertEqual(broadcaster.poll(), 0)
+
+    def test_unchanged_score_event_locks_counter(self):
+        with mock.patch.object(OlympiadLeaderboard, 'lock', wraps=OlympiadLeaderboard.lock) as lock:
+            self.submit(self.participations[0], 0)
+        lock.assert_called_once_with(self.olympiad.id)
+        self.assertEqual(OlympiadScoreEvent.objects.get().delta, 0)
+
+    def test_broadcaster_reads_events_committed_out_of_id_order(self):
+        other = Olympiad.objects.create(title='Другая', description='-')
+        other_task = OlympiadTask.objects.create(olympiad=other, title='Эхо', description='-', points=10)
+        other_participation = OlympiadParticipation.objects.create(olympiad=other, user=self.users[0])
+        broadcaster = ScoreboardBroadcaster(autostart=False)
+        broadcaster.subscribe(self.olympiad.id)
+        broadcaster.subscribe(other.id)
+
+        # Транзакция другой олимпиады получила id позже, но зафиксировалась раньше
+        first_id = latest_event_id() + 1
+        OlympiadScoreEvent.objects.create(id=first_id + 1, olympiad=other, participation=other_participation,
+                                          task=other_task, delta=10, score=10, task_score=10)
+        self.assertEqual(broadcaster.poll(), 1)
+        OlympiadScoreEvent.objects.create(id=first_id, olympiad=self.olympiad, participation=self.participations[0],
+                                          task=self.task, delta=5, score=5, task_score=5)
+        self.assertEqual(broadcaster.poll(), 1)
+
+        messages, _ = broadcaster.wait(self.olympiad.id, 0, timeout=0)
+        self.assertEqual([m['id'] for m in messages], [first_id])
+        messages, _ = broadcaster.wait(other.id, 0, timeout=0)
+        self.assertEqual([m['id'] for m in messages], [first_id + 1])
+
+
+class ParticipationStateTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        User.objects.bulk_create([User(username='state', email='state@example.com')])
+        olympiad = Olympiad.objects.create(title='Состояние', description='-')
+        self.tasks = [
+            OlympiadTask.objects.create(olympiad=olympiad, title=f'Задание {i}', description='-',
+                                        task_type=OlympiadTask.TaskType.PROGRAMMING, points=10, order=i)
+            for i in range(3)
+        ]
+        self.participation = OlympiadParticipation.objects.create(
+            olympiad=olympiad, user=User.objects.get(username='state')
+        )
+        now = timezone.now()
+        # Первое задание решено второй отправкой, последняя отправка - хуже
+        for task, score, minutes in [(self.tasks[0], 4, 1), (self.tasks[0], 10, 2), (self.tasks[0], 6, 3),
+                                     (self.tasks[1], 5, 4)]:
+            submission = OlympiadTaskSubmission.objects.create(
+                participation=self.participation, task=task, score=score, is_correct=score == 10
+            )
+            OlympiadTaskSubmission.objects.filter(pk=submission.pk).update(
+                submitted_at=now + timedelta(minutes=minutes)
+            )
+
+    def test_latest_and_best_in_one_query(self):
+        with self.assertNumQueries(1):
+            state = get_participation_state(self.participation)
+        first, second, third = (state[task.id] for task in self.tasks)
+
+        self.assertEqual((first.latest.score, first.best.score, first.attempts), (6, 10, 3))
+        self.assertTrue(first.is_correct)
+        self.assertEqual((second.submitted, second.is_correct, second.score), (True, False, 5))
+        self.assertEqual((third.submitted, third.score, third.submission_id), (False, 0, None))
+        self.assertEqual(state.completed_count(), 1)
+        self.assertEqual(state.available_tasks(self.tasks), self.tasks[:2])
+
+    def test_filters_use_cached_state(self):
+        get_participation_state(self.participation)
+        with self.assertNumQueries(0):
+            self.assertEqual([is_correct(task, self.participation) for task in self.tasks], [True, False, False])
+            self.assertEqual([is_attempted(task, self.participation) for task in self.tasks], [True, True, False])
+            self.assertEqual(task_score(self.tasks[0], self.participation), '10/10')
@@ -19,6 +19,7 @@ urlpatterns = [
     path('<int:olympiad_id>/results/', views.olympiad_results, name='olympiad_results'),
     path('<int:olympiad_id>/certificate/', views.olympiad_certificate, name='olympiad_certificate'),
     path('<int:olympiad_id>/leaderboard/', views.olympiad_leaderboard, name='olympiad_leaderboard'),
+    path('<int:olympiad_id>/leaderboard/stream/', views.olympiad_scoreboard_stream, name='olympiad_scoreboard_stream'),
     
     # API для обновления прогресса
     path('<int:olympiad_id>/update_progress/', views.olympiad_update_progress, name='olympiad_update_progress'),
@@ -28,6 +29,8 @@ urlpatterns = [
     path('<int:olympiad_id>/tasks/<int:task_id>/save_code/', views.save_code, name='save_code'),
     path('<int:olympiad_id>/tasks/<int:task_id>/test_code/', views.test_code, name='test_code'),
     path('api/format_code/', format_code_view, name='format_code'),
+    path('judge/<int:job_id>/status/', views.judge_job_status, name='judge_job_status'),
+    path('judge/metrics/', views.judge_queue_metrics, name='judge_queue_metrics'),
     
     # Управление олимпиадами (для преподавателей и администраторов)
     path('manage/', views.olympiad_manage_list, name='olympiad_manage_list'),
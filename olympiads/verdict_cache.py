@@ -0,0 +1,117 @@
+"""
+Кэш вердиктов проверки.
+
+Студенты часто отправляют один и тот же код повторно. Результат проверки
+сохраняется под ключом sha256(нормализованный код, язык, задание, версия
+тестов), и повторная отправка того же кода получает готовые результаты по
+тестам без запуска. Версия тестов - хэш содержимого тестовых случаев и
+ограничений задания, поэтому любое изменение тестов дает новый ключ; старые
+записи задания удаляются сигналами при изменении тестов (см. signals.py).
+"""
+import json
+import hashlib
+import logging
+from typing import Dict, Any, Iterable, Optional
+
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import VerdictCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_code(code: str) -> str:
+    """
+    Приводит код к каноническому виду для вычисления ключа
+
+    Учитываются только различия, не влияющие на выполнение: переводы строк
+    Windows и пробельные символы в конце файла.
+    """
+    return code.replace('\r\n', '\n').replace('\r', '\n').rstrip() + '\n'
+
+
+def tests_version(test_cases: Iterable[Dict[str, Any]], **limits) -> str:
+    """
+    Вычисляет версию набора тестов задания
+
+    Args:
+        test_cases: Тестовые случаи в виде словарей с данными, влияющими на вердикт
+        **limits: Ограничения запуска (время, память и т.п.)
+
+    Returns:
+        Хэш содержимого тестов и ограничений
+    """
+    data = json.dumps([list(test_cases), limits], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def make_key(task_kind: str, task_id: int, language: str, code: str, version: str) -> str:
+    """Вычисляет ключ записи кэша"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([task_kind, task_id, language, version]).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(normalize_code(code).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def get_verdict(task_kind: str, task_id: int, language: str, code: str, version: str) -> Optional[Dict[str, Any]]:
+    """
+    Ищет сохраненный результат проверки
+
+    Returns:
+        Сохраненный результат или None при промахе
+    """
+    key = make_key(task_kind, task_id, language, code, version)
+    entry = VerdictCache.objects.filter(key=key).only('id', 'result').first()
+    if entry is None:
+        return None
+
+    VerdictCache.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    return entry.result
+
+
+def store_verdict(task_kind: str, task_id: int, language: str, code: str, version: str,
+                  result: Dict[str, Any]) -> None:
+    """Сохраняет результат проверки в кэш"""
+    try:
+        VerdictCache.objects.create(
+            key=make_key(task_kind, task_id, language, code, version),
+            task_kind=task_kind,
+            task_id=task_id,
+            language=language,
+            tests_version=version,
+            result=result
+        )
+    except IntegrityError:
+        # Тот же код одновременно проверил другой обработчик
+        pass
+
+
+def is_cacheable(check_result: Dict[str, Any]) -> bool:
+    """
+    Можно ли кэшировать результат check_solution
+
+    Не кэшируются внутренние ошибки и результаты с превышением времени:
+    они зависят от нагрузки на сервер, а не только от решения.
+    """
+    if check_result.get('status') != 'success':
+        return False
+    return not any(
+        r.get('timed_out') or r.get('internal_error')
+        for r in check_result.get('test_results', [])
+    )
+
+
+def invalidate_task(task_kind: str, task_id: int) -> int:
+    """
+    Удаляет все сохраненные вердикты задания
+
+    Returns:
+        Количество удаленных записей
+    """
+    deleted, _ = VerdictCache.objects.filter(task_kind=task_kind, task_id=task_id).delete()
+    if deleted:
+        logger.info("Кэш вердиктов задания %s #%s очищен (%s записей)", task_kind, task_id, deleted)
+    return deleted
@@ -1,6 +1,6 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Sum, Count, Q, F, Max, Avg
@@ -21,8 +21,13 @@ from .forms import OlympiadForm, ProblemForm, TestCaseForm, SubmissionForm
 from .models import (
     Olympiad, OlympiadTask, OlympiadParticipation, OlympiadTaskSubmission,
     OlympiadInvitation, OlympiadUserInvitation, OlympiadMultipleChoiceOption,
-    OlympiadTestCase, OlympiadCertificate
+    OlympiadTestCase, OlympiadCertificate, JudgeJob
 )
+from .judge import enqueue, olympiad_priority, queue_metrics, QueueFull
+from .leaderboard import get_leaderboard
+from .participation_state import get_participation_state
+from .scoreboard import stream_scoreboard
+from asgiref.sync import sync_to_async
 from users.models import CustomUser
 from courses.models import Course
 
@@ -36,6 +41,14 @@ def generate_random_code(length=8):
     chars = string.ascii_uppercase + string.digits
     return ''.join(random.choice(chars) for _ in range(length))
 
+def can_see_frozen_scoreboard(user, olympiad):
+    """Видит ли пользователь изменения таблицы лидеров во время заморозки"""
+    return user.is_authenticated and (user.is_staff or user == olympiad.created_by)
+
+def scoreboard_frozen_for(user, olympiad):
+    """Показывать ли пользователю таблицу лидеров на момент заморозки"""
+    return olympiad.is_scoreboard_frozen() and not can_see_frozen_scoreboard(user, olympiad)
+
 # Просмотр списка олимпиад
 def olympiad_list(request):
     now = timezone.now()
@@ -176,10 +189,7 @@ def olympiad_detail(request, olympiad_id):
     total_points = olympiad.tasks.aggregate(total=Sum('points'))['total'] or 0
     
     # Получаем топ-5 участников
-    top_participants = OlympiadParticipation.objects.filter(
-        olympiad=olympiad,
-        is_completed=True
-    ).order_by('-score')[:5]
+    top_participants = get_leaderboard(olympiad.id, frozen=scoreboard_frozen_for(request.user, olympiad)).top(5)
     
     # Добавляем состояние олимпиады в контекст для улучшения работы шаблона
     olympiad_is_active = olympiad.is_active()
@@ -310,81 +320,44 @@ def olympiad_tasks(request, olympiad_id):
         time_left = (olympiad.end_datetime - now).total_seconds() / 60
     
     # Получаем все задания олимпиады в порядке их выполнения
-    all_tasks = olympiad.tasks.all().order_by('order')
+    all_tasks = list(olympiad.tasks.all().order_by('order'))
     
-    # Определяем, какие задания доступны участнику
-    available_tasks = []
-    current_task = None
-    next_task_locked = False
+    # Последние и лучшие отправки по всем заданиям - одним запросом
+    state = get_participation_state(participation)
     
-    # Подсчитываем статистику выполнения заданий
-    completed_tasks = 0
-    total_score = 0
+    # Задание доступно, если решены все предыдущие
+    available_tasks = state.available_tasks(all_tasks)
+    current_task = None
     
     # Для каждого задания получаем информацию о сдаче и доступности
     task_statuses = {}
     
     for task in all_tasks:
-        # Получаем последнюю отправку для задания
-        submission = OlympiadTaskSubmission.objects.filter(
-            participation=participation,
-            task=task
-        ).order_by('-submitted_at').first()
-        
-        is_correct = submission.is_correct if submission else False
-        has_submission = submission is not None
-        score = submission.score if submission else 0
-        
-        if is_correct:
-            completed_tasks += 1
-            total_score += score
+        task_state = state[task.id]
+        available = task in available_tasks
         
-        # Первое задание всегда доступно
-        if len(available_tasks) == 0:
-            available = True
-        # Последующие задания доступны только если предыдущее выполнено правильно
-        elif next_task_locked:
-            available = False
-        else:
-            # Если предыдущее задание решено правильно, открываем следующее
-            prev_task = available_tasks[-1]
-            prev_submission = OlympiadTaskSubmission.objects.filter(
-                participation=participation,
-                task=prev_task
-            ).order_by('-submitted_at').first()
-            
-            if prev_submission and prev_submission.is_correct:
-                available = True
-            else:
-                available = False
-                next_task_locked = True
-        
-        # Добавляем информацию о доступности задания
         task_statuses[task.id] = {
-            'submitted': has_submission,
-            'is_correct': is_correct,
-            'score': score,
-            'submission_id': submission.id if submission else None,
+            'submitted': task_state.submitted,
+            'is_correct': task_state.is_correct,
+            'score': task_state.score,
+            'submission_id': task_state.submission_id,
             'available': available
         }
         
-        # Если задание доступно, добавляем его в список
-        if available:
-            available_tasks.append(task)
-            # Если ещё нет выбранного текущего задания или предыдущее задание
-            # ещё не решено правильно, устанавливаем его как текущее
-            if current_task is None or not is_correct:
-                current_task = task
+        # Текущее задание - первое доступное и еще не решенное
+        if available and (current_task is None or not task_state.is_correct):
+            current_task = task
     
     # Если нет текущего задания, выбираем первое доступное
     if current_task is None and available_tasks:
         current_task = available_tasks[0]
     
     # Вычисляем прогресс выполнения олимпиады
+    completed_tasks = state.completed_count()
     progress = {
         'completed': completed_tasks,
-        'total': all_tasks.count(),
-        'percent': int(completed_tasks / max(1, all_tasks.count()) * 100)
+        'total': len(all_tasks),
+        'percent': int(completed_tasks / max(1, len(all_tasks)) * 100)
     }
     
     # Добавляем состояние олимпиады в контекст для улучшения работы шаблона
@@ -441,42 +414,18 @@ def olympiad_task_detail(request, olympiad_id, task_id):
     
     # Проверяем, доступно ли это задание пользователю
     # Получаем все задания олимпиады
-    tasks = olympiad.tasks.all().order_by('order')
+    tasks = list(olympiad.tasks.all().order_by('order'))
     
-    # Определяем, какие задания доступны участнику
-    task_available = False
-    
-    if tasks.first().id == task.id:
-        # Первое задание всегда доступно
-        task_available = True
-    else:
-        # Находим предыдущее задание
-        prev_task = None
-        for t in tasks:
-            if t.id == task.id:
-                break
-            prev_task = t
-        
-        # Проверяем, решено ли предыдущее задание
-        if prev_task:
-            prev_submission = OlympiadTaskSubmission.objects.filter(
-                participation=participation,
-                task=prev_task,
-                is_correct=True
-            ).first()
-            
-            task_available = prev_submission is not None
+    # Последние и лучшие отправки по всем заданиям - одним запросом
+    state = get_participation_state(participation)
     
     # Если задание недоступно, перенаправляем на страницу со списком заданий
-    if not task_available:
+    if task not in state.available_tasks(tasks):
         messages.error(request, _('Это задание будет доступно после выполнения предыдущего задания'))
         return redirect('olympiads:olympiad_tasks', olympiad_id=olympiad.id)
     
     # Получаем последнюю отправку для этого задания
-    submission = OlympiadTaskSubmission.objects.filter(
-        participation=participation,
-        task=task
-    ).order_by('-submitted_at').first()
+    submission = state[task.id].latest
     
     # Получаем тестовые случаи (только нескрытые)
     test_cases = task.test_cases.filter(is_hidden=False).order_by('order')
@@ -501,20 +450,15 @@ def olympiad_task_detail(request, olympiad_id, task_id):
             prev_task = t
     
     # Проверяем, доступно ли следующее задание
-    next_task_available = False
-    if next_task and submission and submission.is_correct:
-        next_task_available = True
+    next_task_available = next_task is not None and state[task.id].is_correct
     
     # Получаем информацию о прогрессе
-    completed_tasks = OlympiadTaskSubmission.objects.filter(
-        participation=participation,
-        is_correct=True
-    ).values('task').distinct().count()
+    completed_tasks = state.completed_count()
     
     progress = {
         'completed': completed_tasks,
-        'total': tasks.count(),
-        'percent': int(completed_tasks / max(1, tasks.count()) * 100)
+        'total': len(tasks),
+        'percent': int(completed_tasks / max(1, len(tasks)) * 100)
     }
     
     # Получаем информацию о времени
@@ -614,14 +558,8 @@ def olympiad_task_submit(request, olympiad_id, task_id):
     if task.task_type == OlympiadTask.TaskType.PROGRAMMING:
         code = request.POST.get('code', '')
         submission.code = code
-        
-        # Здесь должен быть код для проверки программы
-        # Для примера просто считаем, что решение верное, если код непустой
-        if code.strip():
-            submission.is_correct = True
-            submission.score = task.points
-            submission.passed_test_cases = task.test_cases.count()
-            submission.total_test_cases = task.test_cases.count()
+        submission.language = request.POST.get('language', 'python')
+        submission.total_test_cases = task.test_cases.count()
         
     elif task.task_type == OlympiadTask.TaskType.THEORETICAL:
         answer = request.POST.get('answer', '')
@@ -659,8 +597,29 @@ def olympiad_task_submit(request, olympiad_id, task_id):
     if task.task_type != OlympiadTask.TaskType.MULTIPLE_CHOICE:
         submission.save()
     
-    # Обновляем общий балл участника
-    participation.calculate_score()
+    # Решение задачи на программирование проверяется в очереди проверки
+    if task.task_type == OlympiadTask.TaskType.PROGRAMMING and submission.code.strip():
+        try:
+            job = enqueue(
+                JudgeJob.JobKind.OLYMPIAD_SUBMISSION,
+                {
+                    'submission_id': submission.id,
+                    'language': request.POST.get('language', 'python')
+                },
+                user=request.user,
+                priority=olympiad_priority(olympiad)
+            )
+        except QueueFull as e:
+            submission.delete()
+            messages.error(request, str(e))
+            return redirect('olympiads:olympiad_task_detail', olympiad_id=olympiad.id, task_id=task.id)
+        if job.status != JudgeJob.JobStatus.DONE:
+            messages.success(request, _('Решение отправлено на проверку'))
+            return redirect('olympiads:olympiad_task_detail', olympiad_id=olympiad.id, task_id=task.id)
+    
+    # Проверенное в очереди решение уже учтено обработчиком проверки
+    if task.task_type != OlympiadTask.TaskType.PROGRAMMING or not submission.code.strip():
+        participation.record_submission(submission)
     
     messages.success(request, _('Решение успешно отправлено!'))
     return redirect('olympiads:olympiad_task_detail', olympiad_id=olympiad.id, task_id=task.id)
@@ -677,27 +636,19 @@ def olympiad_results(request, olympiad_id):
         user=request.user
     )
     
-    # Получаем все задания и отправки
+    # Получаем все задания и последние и лучшие отправки по ним
     tasks = olympiad.tasks.all().order_by('order')
-    submissions = OlympiadTaskSubmission.objects.filter(
-        participation=participation
-    )
-    
-    # Группируем отправки по заданиям
-    submission_by_task = {}
-    for submission in submissions:
-        if submission.task_id not in submission_by_task or submission.submitted_at > submission_by_task[submission.task_id].submitted_at:
-            submission_by_task[submission.task_id] = submission
+    state = get_participation_state(participation)
     
     # Формируем данные о результатах
     results = []
     for task in tasks:
-        submission = submission_by_task.get(task.id)
+        task_state = state[task.id]
         results.append({
             'task': task,
-            'submission': submission,
-            'is_correct': submission.is_correct if submission else False,
-            'score': submission.score if submission else 0,
+            'submission': task_state.latest,
+            'is_correct': task_state.is_correct,
+            'score': task_state.score,
             'max_score': task.points
         })
     
@@ -710,20 +661,11 @@ def olympiad_results(request, olympiad_id):
         has_certificate = certificate is not None
     
     # Получаем топ-10 участников
-    top_participants = OlympiadParticipation.objects.filter(
-        olympiad=olympiad,
-        is_completed=True
-    ).order_by('-score')[:10]
+    leaderboard = get_leaderboard(olympiad.id, frozen=scoreboard_frozen_for(request.user, olympiad))
+    top_participants = leaderboard.top(10)
     
     # Определяем место пользователя в рейтинге
-    if participation.is_completed:
-        user_rank = OlympiadParticipation.objects.filter(
-            olympiad=olympiad,
-            is_completed=True,
-            score__gt=participation.score
-        ).count() + 1
-    else:
-        user_rank = None
+    user_rank = leaderboard.rank(participation.id)
     
     # Добавляем состояние олимпиады в контекст для улучшения работы шаблона
     olympiad_is_active = olympiad.is_active()
@@ -1247,41 +1189,67 @@ def olympiad_finish(request, olympiad_id):
 def olympiad_leaderboard(request, olympiad_id):
     olympiad = get_object_or_404(Olympiad, id=olympiad_id)
     
-    # Получаем завершенные участия в порядке убывания баллов и времени
-    participations = OlympiadParticipation.objects.filter(
-        olympiad=olympiad,
-        is_completed=True
-    ).order_by('-score', 'finished_at')
+    # Завершенные участия в порядке убывания баллов и возрастания времени завершения
+    frozen = scoreboard_frozen_for(request.user, olympiad)
+    leaderboard = get_leaderboard(olympiad.id, frozen=frozen)
     
     # Создаем пагинатор
-    paginator = Paginator(participations, 20)
+    paginator = Paginator(leaderboard.participations(), 20)
     page_number = request.GET.get('page', 1)
     participants_page = paginator.get_page(page_number)
     
     # Получаем ранг текущего пользователя
-    user_rank = None
-    if request.user.is_authenticated:
-        user_participation = OlympiadParticipation.objects.filter(
-            olympiad=olympiad,
-            user=request.user,
-            is_completed=True
-        ).first()
-        
-        if user_participation:
-            for i, participation in enumerate(participations):
-                if participation.user_id == request.user.id:
-                    user_rank = i + 1
-                    break
+    user_rank = leaderboard.rank_of_user(request.user.id)
     
     context = {
         'olympiad': olympiad,
         'participants': participants_page,
         'user_rank': user_rank,
-        'total_participants': participations.count()
+        'total_participants': len(leaderboard),
+        'scoreboard_frozen': frozen
     }
     
     return render(request, 'olympiads/olympiad_leaderboard.html', context)
 
+async def _async_stream(events):
+    next_event = sync_to_async(next, thread_sensitive=False)
+    try:
+        while True:
+            event = await next_event(events, None)
+            if event is None:
+                return
+            yield event
+    finally:
+        await sync_to_async(events.close, thread_sensitive=False)()
+
+# Поток изменений таблицы лидеров (server-sent events)
+@login_required
+@require_GET
+def olympiad_scoreboard_stream(request, olympiad_id):
+    olympiad = get_object_or_404(Olympiad, id=olympiad_id)
+    
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+    except (TypeError, ValueError):
+        last_event_id = None
+    
+    events = stream_scoreboard(
+        olympiad.id,
+        user_id=request.user.id,
+        sees_frozen=can_see_frozen_scoreboard(request.user, olympiad),
+        last_event_id=last_event_id
+    )
+    
+    if hasattr(request, 'scope'):
+        # Под ASGI ожидание событий выполняется в пуле потоков, не занимая цикл событий
+        events = _async_stream(events)
+    
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Запрещаем nginx буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 # API для обновления прогресса участника
 @login_required
 @require_POST
@@ -1303,23 +1271,17 @@ def olympiad_update_progress(request, olympiad_id):
         
         # Получаем задания и их статус
         tasks = olympiad.tasks.all()
+        state = get_participation_state(participation)
         task_statuses = {}
         
         for task in tasks:
-            submission = OlympiadTaskSubmission.objects.filter(
-                participation=participation,
-                task=task
-            ).order_by('-submitted_at').first()
-            
+            task_state = state[task.id]
             task_statuses[str(task.id)] = {
-                'submitted': submission is not None,
-                'is_correct': submission.is_correct if submission else False,
-                'score': submission.score if submission else 0
+                'submitted': task_state.submitted,
+                'is_correct': task_state.is_correct,
+                'score': task_state.score
             }
         
-        # Обновляем общий балл
-        participation.calculate_score()
-        
         # Проверяем, не истекло ли время
         now = timezone.now()
         time_left = 0
@@ -1640,76 +1602,24 @@ def execute_code(request, olympiad_id, task_id):
             'error': 'Код не может быть пустым'
         })
     
-    # Импортируем модуль для запуска кода
-    from .code_runner import (
-        run_code_with_input, 
-        ExecutionTimeLimitExceeded, 
-        ExecutionMemoryLimitExceeded, 
-        ExecutionRuntimeError, 
-        CompilationError,
-        DEFAULT_TIME_LIMIT,
-        DEFAULT_MEMORY_LIMIT
-    )
-    
-    # Определяем ограничения
-    time_limit = task.time_limit_minutes * 60 if task.time_limit_minutes > 0 else DEFAULT_TIME_LIMIT
-    memory_limit = task.memory_limit_mb if task.memory_limit_mb > 0 else DEFAULT_MEMORY_LIMIT
-    
+    # Тренировочный запуск идет в очередь с низшим приоритетом, чтобы не
+    # задерживать проверку оцениваемых решений
     try:
-        # Компилируем и запускаем код
-        from .code_runner import compile_code
-        temp_dir, filename, executable = compile_code(code, language)
-        
-        try:
-            # Запускаем код с пользовательским вводом
-            output, execution_time, memory_usage = run_code_with_input(
-                executable, language, input_data, time_limit, memory_limit
-            )
-            
-            # Возвращаем результат
-            return JsonResponse({
-                'success': True,
-                'output': output,
-                'execution_time': execution_time,
-                'memory_usage': memory_usage
-            })
-            
-        finally:
-            # Удаляем временные файлы
-            import shutil
-            shutil.rmtree(temp_dir)
-            
-    except CompilationError as e:
-        return JsonResponse({
-            'success': False,
-            'error': 'Ошибка компиляции',
-            'error_details': str(e)
-        })
-    except ExecutionTimeLimitExceeded as e:
-        return JsonResponse({
-            'success': False,
-            'error': 'Превышено ограничение по времени',
-            'error_details': str(e)
-        })
-    except ExecutionMemoryLimitExceeded as e:
-        return JsonResponse({
-            'success': False,
-            'error': 'Превышено ограничение по памяти',
-            'error_details': str(e)
-        })
-    except ExecutionRuntimeError as e:
-        return JsonResponse({
-            'success': False,
-            'error': 'Ошибка выполнения',
-            'error_details': str(e)
-        })
-    except Exception as e:
-        # Обрабатываем прочие ошибки
-        return JsonResponse({
-            'success': False,
-            'error': 'Произошла ошибка при выполнении кода',
-            'error_details': str(e)
-        })
+        job = enqueue(
+            JudgeJob.JobKind.OLYMPIAD_RUN,
+            {
+                'task_id': task.id,
+                'code': code,
+                'language': language,
+                'input': input_data
+            },
+            user=request.user,
+            priority=JudgeJob.JobPriority.PRACTICE
+        )
+    except QueueFull as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=429)
+    
+    return JsonResponse(judge_job_response(job))
 
 
 # API для сохранения кода
@@ -1814,97 +1724,69 @@ def test_code(request, olympiad_id, task_id):
             'error': 'Код не может быть пустым'
         })
     
-    # Получаем тестовые случаи
-    test_cases = task.test_cases.all().order_by('order')
-    
     # Если тестовые случаи отсутствуют
-    if not test_cases.exists():
+    if not task.test_cases.exists():
         return JsonResponse({
             'success': False,
             'error': 'Для этого задания не настроены тестовые случаи'
         })
     
-    # Формируем список тестов для проверки
-    test_case_data = [(tc.input_data, tc.expected_output) for tc in test_cases]
-    
-    # Импортируем модуль для проверки решения
-    from .code_runner import check_solution
-    
-    # Определяем ограничения
-    time_limit = task.time_limit_minutes * 60 if task.time_limit_minutes > 0 else 5
-    memory_limit = task.memory_limit_mb if task.memory_limit_mb > 0 else 512
-    
+    # Ставим проверку в очередь (или выполняем сразу, если очередь отключена)
     try:
-        # Проверяем решение на всех тестовых случаях
-        results, passed_count, total_count = check_solution(
-            code, language, test_case_data, 
-            time_limit=time_limit, memory_limit=memory_limit
-        )
-        
-        # Считаем баллы за решение
-        max_score = task.points
-        score = round(max_score * (passed_count / total_count)) if total_count > 0 else 0
-        is_correct = passed_count == total_count
-        
-        # Получаем или создаем запись об участии
-        participation, created = OlympiadParticipation.objects.get_or_create(
-            olympiad=olympiad,
+        job = enqueue(
+            JudgeJob.JobKind.OLYMPIAD_TEST,
+            {
+                'task_id': task.id,
+                'user_id': request.user.id,
+                'code': code,
+                'language': language
+            },
             user=request.user,
-            defaults={
-                'max_score': sum(t.points for t in olympiad.tasks.all())
-            }
+            priority=olympiad_priority(olympiad)
         )
-        
-        # Сохраняем результаты
-        submission = OlympiadTaskSubmission.objects.create(
-            participation=participation,
-            task=task,
-            code=code,
-            score=score,
-            max_score=max_score,
-            is_correct=is_correct,
-            passed_test_cases=passed_count,
-            total_test_cases=total_count
-        )
-        
-        # Обновляем общий счет участника
-        participation.calculate_score()
-        
-        # Преобразуем результаты для отправки
-        formatted_results = []
-        for i, result in enumerate(results):
-            test_case = test_cases[i]
-            formatted_results.append({
-                'test_case_id': result['test_case_id'],
-                'passed': result['passed'],
-                'input_data': test_case.input_data if not test_case.is_hidden else '(скрытый тест)',
-                'expected': test_case.expected_output if not test_case.is_hidden else '(скрытый тест)',
-                'output': result['output'],
-                'error': result['error'],
-                'execution_time': result['execution_time'],
-                'memory_usage': result['memory_usage']
-            })
-        
-        # Возвращаем результат проверки
-        return JsonResponse({
-            'success': True,
-            'passed_tests': passed_count,
-            'total_tests': total_count,
-            'score': score,
-            'max_score': max_score,
-            'is_correct': is_correct,
-            'test_results': formatted_results
-        })
-        
-    except Exception as e:
-        # Обрабатываем ошибки
-        return JsonResponse({
-            'success': False,
-            'error': 'Произошла ошибка при проверке решения',
-            'error_details': str(e)
-        })
+    except QueueFull as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=429)
+    
+    return JsonResponse(judge_job_response(job))
+
+
+def judge_job_response(job):
+    """Формирует JSON-ответ о состоянии задания проверки"""
+    if job.status == JudgeJob.JobStatus.DONE:
+        response = dict(job.result or {})
+        response.update({'job_id': job.id, 'status': job.status})
+        return response
+    
+    return {
+        'success': True,
+        'queued': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': reverse('olympiads:judge_job_status', args=[job.id])
+    }
+
+
+# API для получения состояния проверки
+@login_required
+@require_GET
+def judge_job_status(request, job_id):
+    job = get_object_or_404(JudgeJob, id=job_id)
+    
+    # Состояние проверки доступно только ее владельцу и персоналу
+    if job.user_id != request.user.id and not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Нет доступа'}, status=403)
+    
+    return JsonResponse(judge_job_response(job))
+
+
+# API метрик очереди проверки для персонала
+@login_required
+@require_GET
+def judge_queue_metrics(request):
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Нет доступа'}, status=403)
     
-    return render(request, 'olympiads/manage/statistics.html', context)
+    return JsonResponse({'success': True, 'classes': queue_metrics()})
 
 
 # Регистрация на олимпиаду по коду приглашения
@@ -0,0 +1,195 @@
+"""
+Рабочие каталоги запусков решений.
+
+Каждой проверке нужен каталог для исходника и артефактов компиляции.
+Каталоги выдаются из корня в tmpfs (по умолчанию /dev/shm), поэтому запись
+исходника и бинарника не обращается к диску. После проверки каталог
+очищается и возвращается в пул процесса для следующего запуска.
+
+Каталоги называются `<pid>-<номер>`. Каталоги завершившихся процессов и
+каталоги, не возвращенные в пул дольше max_age, удаляются сборщиком мусора
+(collect_garbage), который вызывается не чаще раза в GC_INTERVAL секунд
+при выдаче каталогов. Модуль не зависит от Django.
+"""
+import os
+import time
+import shutil
+import tempfile
+import itertools
+import threading
+from typing import List, Dict
+
+# Как часто выдача каталогов запускает сборку мусора (секунд)
+GC_INTERVAL = 60
+
+
+class WorkspaceQuotaExceeded(Exception):
+    """Файлы в рабочем каталоге превысили квоту"""
+    pass
+
+
+def default_root() -> str:
+    """Корень рабочих каталогов по умолчанию: tmpfs, если он есть"""
+    base = '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else tempfile.gettempdir()
+    return os.path.join(base, 'olympiads-workspaces')
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class WorkspaceManager:
+    """Пул рабочих каталогов с очисткой и квотой на объем файлов"""
+
+    def __init__(self, root: str, pool_size: int = 16, quota_bytes: int = 64 * 1024 * 1024,
+                 max_age: float = 3600):
+        """
+        Args:
+            root: Корень рабочих каталогов
+            pool_size: Сколько очищенных каталогов процесс хранит для повторного использования
+            quota_bytes: Квота на объем файлов в каталоге
+            max_age: Через сколько секунд невозвращенный каталог считается утекшим
+        """
+        self.root = root
+        self.pool_size = pool_size
+        self.quota_bytes = quota_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._counter = itertools.count()
+        self._idle: List[str] = []
+        self._active: Dict[str, float] = {}
+        self._last_gc = 0.0
+
+    def acquire(self) -> str:
+        """Выдает пустой рабочий каталог"""
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Процесс-потомок после fork не должен делить каталоги с родителем
+                self._reset()
+            run_gc = time.monotonic() - self._last_gc > GC_INTERVAL
+            if run_gc:
+                self._last_gc = time.monotonic()
+
+            path = self._idle.pop() if self._idle else None
+            if path is None:
+                os.makedirs(self.root, mode=0o700, exist_ok=True)
+                while True:
+                    path = os.path.join(self.root, f'{self._pid}-{next(self._counter)}')
+                    try:
+                        os.mkdir(path, 0o700)
+                        break
+                    except FileExistsError:
+                        # Остался от прежнего процесса с тем же pid
+                        continue
+            self._active[path] = time.monotonic()
+
+        if run_gc:
+            self.collect_garbage()
+        return path
+
+    def owns(self, path: str) -> bool:
+        """Выдан ли каталог этим менеджером"""
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.root)
+
+    @staticmethod
+    def wipe(path: str) -> None:
+        """Удаляет содержимое каталога, оставляя сам каталог"""
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+
+    @staticmethod
+    def usage(path: str) -> int:
+        """Суммарный объем файлов в каталоге в байтах"""
+        total = 0
+        for dir_path, _, file_names in os.walk(path):
+            for name in file_names:
+                try:
+                    total += os.lstat(os.path.join(dir_path, name)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def check_quota(self, path: str) -> None:
+        """
+        Raises:
+            WorkspaceQuotaExceeded: Если файлы каталога превысили квоту
+        """
+        if self.quota_bytes and self.usage(path) > self.quota_bytes:
+            raise WorkspaceQuotaExceeded(
+                f"Превышено ограничение на объем файлов ({self.quota_bytes // (1024 * 1024)} МБ)"
+            )
+
+    def release(self, path: str) -> None:
+        """Очищает каталог и возвращает его в пул (или удаляет, если пул полон)"""
+        with self._lock:
+            known = path in self._active and os.getpid() == self._pid
+            reuse = known and len(self._idle) < self.pool_size
+        if reuse:
+            # Пока каталог очищается, он остается в _active, и сборщик мусора
+            # его не удаляет
+            try:
+                self.wipe(path)
+            except OSError:
+                reuse = False
+        with self._lock:
+            reuse = self._active.pop(path, None) is not None and reuse and len(self._idle) < self.pool_size
+            if reuse:
+                self._idle.append(path)
+        if not reuse:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def collect_garbage(self) -> int:
+        """
+        Удаляет каталоги завершившихся процессов и каталоги этого процесса,
+        не возвращенные в пул дольше max_age
+
+        Returns:
+            Число удаленных каталогов
+        """
+        now = time.monotonic()
+        with self._lock:
+            leaked = [path for path, acquired in self._active.items() if now - acquired > self.max_age]
+            for path in leaked:
+                del self._active[path]
+
+        removed = 0
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return 0
+
+        for name in names:
+            path = os.path.join(self.root, name)
+            pid, _, _ = name.partition('-')
+            if not pid.isdigit():
+                continue
+            if int(pid) == self._pid:
+                # Проверяем под блокировкой в момент удаления: каталог мог быть
+                # выдан или возвращен после чтения списка. Каталог, не известный
+                # менеджеру сейчас, уже не будет выдан - новое имя не совпадет
+                # с существующим
+                with self._lock:
+                    stale = path not in self._active and path not in self._idle
+            else:
+                stale = not _pid_alive(int(pid))
+            if stale:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        return removed
@@ -0,0 +1,63 @@
+/**
+ * Модуль для получения изменений таблицы лидеров олимпиады (server-sent events)
+ */
+class OlympiadScoreboardStream {
+    /**
+     * Инициализирует подписку на таблицу лидеров
+     * @param {string} url - адрес потока событий олимпиады
+     * @param {Object} handlers - обратные вызовы: onScore(event), onFreeze(frozen)
+     */
+    constructor(url, handlers) {
+        this.url = url;
+        this.onScore = handlers.onScore || (() => {});
+        this.onFreeze = handlers.onFreeze || (() => {});
+        this.source = null;
+        this.frozen = null;
+    }
+
+    /**
+     * Подключается к потоку. Браузер сам переподключается при обрыве
+     * и передает id последнего события, поэтому события не теряются
+     */
+    start() {
+        if (!window.EventSource || this.source) return;
+
+        this.source = new EventSource(this.url);
+        this.source.addEventListener('score', (e) => this.onScore(JSON.parse(e.data)));
+
+        const handleFreeze = (e) => {
+            const frozen = JSON.parse(e.data).frozen;
+            // Первое сообщение после подключения сообщает текущее состояние
+            if (this.frozen !== null && this.frozen !== frozen) {
+                this.onFreeze(frozen);
+            }
+            this.frozen = frozen;
+        };
+        this.source.addEventListener('freeze', handleFreeze);
+        this.source.addEventListener('unfreeze', handleFreeze);
+    }
+
+    /**
+     * Отключается от потока
+     */
+    stop() {
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+    }
+}
+
+/**
+ * Вызывает функцию не чаще одного раза за interval миллисекунд
+ */
+function throttleScoreboardUpdate(callback, interval = 2000) {
+    let timeout = null;
+    return function() {
+        if (timeout) return;
+        timeout = setTimeout(() => {
+            timeout = null;
+            callback();
+        }, interval);
+    };
+}